@@ -0,0 +1,112 @@
+import argparse
+import time
+
+import numpy as np
+
+from leglove.ann import IVFIndex
+from leglove.model import GloveModel
+from leglove.neighbors import METRICS, NearestNeighbors
+
+from .common import clustered_vectors
+
+"""
+    bench_ann.py
+    --------
+    Measures the recall@k and query speed of the IVF approximate nearest
+    neighbor index against exact search, for several numbers of probed
+    lists. Uses a trained model if one is given, and otherwise random
+    vectors drawn around random cluster centers (uniform random vectors
+    have no neighborhood structure for an index to exploit).
+
+        uv run python -m benchmarks.bench_ann --model LeGlove.model
+"""
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark the IVF index")
+    parser.add_argument("--model", default=None, help="Trained model to index")
+    parser.add_argument(
+        "--vocab_size", default=200000, type=int, help="Random vocabulary size"
+    )
+    parser.add_argument(
+        "--no_components", default=100, type=int, help="Random vector dimensions"
+    )
+    parser.add_argument(
+        "--num_clusters",
+        default=100,
+        type=int,
+        help="Cluster centers of the random vectors",
+    )
+    parser.add_argument(
+        "--metric", default="cosine", choices=METRICS, help="Distance metric"
+    )
+    parser.add_argument(
+        "--num_lists", default=None, type=int, help="Index lists (default 4 sqrt(n))"
+    )
+    parser.add_argument(
+        "--num_probes",
+        default=[1, 2, 4, 8, 16, 32],
+        type=int,
+        nargs="+",
+        help="Numbers of probed lists to benchmark",
+    )
+    parser.add_argument("--k", default=10, type=int, help="Neighbors per query")
+    parser.add_argument(
+        "--num_queries", default=1000, type=int, help="Number of query words"
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Build the index and compare it with exact search."""
+    args = parse_arguments()
+    if args.model is not None:
+        model = GloveModel.load(args.model)
+        assert model.dictionary is not None and model.word_vectors is not None
+        dictionary, word_vectors = model.dictionary, model.word_vectors
+    else:
+        word_vectors = clustered_vectors(
+            args.vocab_size, args.no_components, args.num_clusters
+        )
+        dictionary = {f"word{index}": index for index in range(args.vocab_size)}
+    words = list(dictionary)
+    rng = np.random.default_rng(1)
+    queries = [words[i] for i in rng.integers(0, len(words), args.num_queries)]
+    print(f"{len(words)} words, {word_vectors.shape[1]} dimensions, k={args.k}")
+
+    exact = NearestNeighbors(word_vectors, dictionary, args.metric)
+    start = time.perf_counter()
+    expected = exact.query_batch(queries, args.k)
+    seconds = time.perf_counter() - start
+    print(f"exact search: {len(queries) / seconds:10.1f} queries/sec (batched)")
+
+    start = time.perf_counter()
+    index = IVFIndex(
+        word_vectors, dictionary, args.metric, num_lists=args.num_lists, random_state=0
+    )
+    print(
+        f"index of {index.num_lists} lists built in "
+        f"{time.perf_counter() - start:.1f} sec"
+    )
+
+    print("probes  recall@k  queries/sec  ms/query")
+    for num_probes in args.num_probes:
+        index.num_probes = num_probes
+        start = time.perf_counter()
+        found = [index.query(word, args.k) for word in queries]
+        seconds = time.perf_counter() - start
+        recall = np.mean(
+            [
+                len({w for w, _ in a} & {w for w, _ in b}) / args.k
+                for a, b in zip(found, expected)
+            ]
+        )
+        print(
+            f"{num_probes:>6}  {recall:8.3f}  {len(queries) / seconds:11.1f}  "
+            f"{1000 * seconds / len(queries):8.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import argparse
+import os
+import pickle
+import tempfile
+import time
+
+import numpy as np
+
+from leglove.checkpoint import TrainingCheckpoint
+from leglove.cooccurrence import CooccurrenceMatrix
+from leglove.model import PARAMETERS, GloveModel
+
+"""
+    bench_checkpoint.py
+    --------
+    Measures what a training checkpoint costs (see leglove.checkpoint):
+    the time to write and load the parameters and AdaGrad accumulators
+    of a model as raw arrays, against pickling and unpickling the same
+    arrays, and against the time of one training epoch on a random
+    co-occurrence matrix. Both formats are written atomically, to a new
+    file or directory that is flushed to disk with fsync and renamed.
+
+        uv run python -m benchmarks.bench_checkpoint --vocab_size 400000 --nnz 5000000
+"""
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark training checkpoints")
+    parser.add_argument(
+        "--vocab_size", default=200000, type=int, help="Number of words of the model"
+    )
+    parser.add_argument(
+        "--no_components", default=100, type=int, help="Vector dimensions"
+    )
+    parser.add_argument(
+        "--nnz",
+        default=2000000,
+        type=int,
+        help="Nonzero co-occurrence entries trained per epoch",
+    )
+    parser.add_argument(
+        "--repeats", default=5, type=int, help="Checkpoints written per format"
+    )
+    return parser.parse_args()
+
+
+def random_matrix(vocab_size: int, nnz: int) -> CooccurrenceMatrix:
+    """Return an upper triangular matrix with about nnz random entries."""
+    rng = np.random.default_rng(0)
+    rows = rng.integers(0, vocab_size - 1, nnz)
+    cols = rows + 1 + rng.integers(0, vocab_size - 1 - rows)
+    keys = np.unique((rows << 32) | cols)
+    counts = rng.integers(1, 1000, len(keys))
+    dictionary = {f"word{index}": index for index in range(vocab_size)}
+    return CooccurrenceMatrix.from_keys(dictionary, keys, counts, 10)
+
+
+def pickle_parameters(model: GloveModel, path: str) -> None:
+    """Pickle the checkpointed arrays of a model to path, atomically."""
+    with open(path + ".tmp", "wb") as file:
+        state = {name: getattr(model, name) for name in PARAMETERS}
+        state["loss_history"] = model.loss_history
+        pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(path + ".tmp", path)
+
+
+def save_epoch(checkpoint: TrainingCheckpoint, model: GloveModel) -> None:
+    """Checkpoint the model as the next epoch, as during training."""
+    model.loss_history.append(model.loss_history[-1])
+    checkpoint.save_model(model)
+
+
+def main() -> None:
+    """Time an epoch and checkpoints in both formats."""
+    args = parse_arguments()
+    matrix = random_matrix(args.vocab_size, args.nnz)
+    model = GloveModel(no_components=args.no_components)
+    start = time.perf_counter()
+    model.fit(matrix, epochs=1)
+    epoch_seconds = time.perf_counter() - start
+    size_mb = sum(getattr(model, name).nbytes for name in PARAMETERS) / 2**20
+    print(
+        f"{args.vocab_size} words, {size_mb:.0f} MB of parameters; "
+        f"one epoch over {matrix.nnz} entries: {epoch_seconds:.2f}s"
+    )
+
+    with tempfile.TemporaryDirectory(prefix="leglove-bench-") as temp_dir:
+        checkpoint = TrainingCheckpoint(os.path.join(temp_dir, "raw"), {})
+        os.makedirs(checkpoint.path)
+        pickle_file = os.path.join(temp_dir, "parameters.pkl")
+
+        timings = {}
+        for name, save, load in [
+            ("raw", lambda: save_epoch(checkpoint, model), checkpoint.load_model),
+            (
+                "pickle",
+                lambda: pickle_parameters(model, pickle_file),
+                lambda: pickle.load(open(pickle_file, "rb")),
+            ),
+        ]:
+            # The first writes of a run also pay for allocating the files
+            save()
+            start = time.perf_counter()
+            for _ in range(args.repeats):
+                save()
+            write_seconds = (time.perf_counter() - start) / args.repeats
+            start = time.perf_counter()
+            load()
+            timings[name] = (write_seconds, time.perf_counter() - start)
+
+        for name, (write_seconds, load_seconds) in timings.items():
+            print(
+                f"{name:>6}: write {1000 * write_seconds:8.1f} ms "
+                f"({100 * write_seconds / epoch_seconds:.1f}% of an epoch), "
+                f"load {1000 * load_seconds:8.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import argparse
+
+from leglove.cleanup import CLEANUP_BACKENDS, clean_html, lxml
+
+from .common import load_documents, time_per_item
+
+"""
+    bench_cleanup.py
+    --------
+    Reports HTML cleanup throughput (documents per second) for every
+    clean_html backend, and checks each backend's output against the
+    html5lib reference implementation.
+
+        uv run python -m benchmarks.bench_cleanup --data_dir data/
+"""
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark clean_html backends")
+    parser.add_argument(
+        "--data_dir",
+        default=None,
+        help="Corpus directory to read opinions from (synthetic opinions if omitted)",
+    )
+    parser.add_argument(
+        "--num_docs", default=50, type=int, help="Number of opinions to clean"
+    )
+    parser.add_argument(
+        "--repeat", default=3, type=int, help="Number of timing repetitions"
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Time every cleanup backend on the same documents."""
+    args = parse_arguments()
+    documents = load_documents(args.data_dir, args.num_docs)
+    reference = [clean_html(document, backend="html5lib") for document in documents]
+
+    for backend in CLEANUP_BACKENDS:
+        if backend == "lxml" and lxml is None:
+            print(f"{backend:>12}: skipped (not installed)")
+            continue
+        seconds = time_per_item(
+            lambda document, backend=backend: clean_html(document, backend=backend),
+            documents,
+            repeat=args.repeat,
+        )
+        matches = sum(
+            clean_html(document, backend=backend) == expected
+            for document, expected in zip(documents, reference)
+        )
+        print(
+            f"{backend:>12}: {len(documents) / seconds:10.1f} docs/sec, "
+            f"{matches}/{len(documents)} identical to html5lib"
+        )
+
+
+if __name__ == "__main__":
+    main()
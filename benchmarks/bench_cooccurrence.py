@@ -0,0 +1,110 @@
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from leglove.cooccurrence import CooccurrenceBuilder, build_cooccurrence_matrix
+
+from .common import zipf_corpus
+
+try:
+    from glove import Corpus
+except ImportError:
+    Corpus = None
+
+"""
+    bench_cooccurrence.py
+    --------
+    Measures co-occurrence counting throughput (tokens per second), the
+    number of shards spilled to disk and the peak memory traced during
+    counting for several memory budgets, on a Zipf-distributed random
+    corpus, and the wall-clock time of counting with several worker
+    processes (checking that every worker count gives the same matrix).
+    glove.Corpus.fit is timed as well when glove-python is installed.
+
+        uv run python -m benchmarks.bench_cooccurrence --num_docs 2000
+"""
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark co-occurrence counting")
+    parser.add_argument(
+        "--num_docs", default=1000, type=int, help="Number of random documents"
+    )
+    parser.add_argument(
+        "--doc_length", default=2000, type=int, help="Tokens per random document"
+    )
+    parser.add_argument(
+        "--vocab_size", default=50000, type=int, help="Size of the random vocabulary"
+    )
+    parser.add_argument(
+        "--memory_limits_mb",
+        default=[1024.0, 64.0, 16.0],
+        type=float,
+        nargs="+",
+        help="Memory budgets to benchmark",
+    )
+    parser.add_argument(
+        "--num_workers",
+        default=[1, 2, 4, 8, 16],
+        type=int,
+        nargs="+",
+        help="Worker counts to benchmark",
+    )
+    parser.add_argument("--window", default=10, type=int, help="Context window")
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Count the same corpus under every memory budget and worker count."""
+    args = parse_arguments()
+    corpus = zipf_corpus(args.num_docs, args.doc_length, args.vocab_size)
+    num_tokens = sum(len(tokens) for tokens in corpus)
+
+    for memory_limit_mb in args.memory_limits_mb:
+        builder = CooccurrenceBuilder(args.window, memory_limit_mb)
+        tracemalloc.start()
+        start = time.perf_counter()
+        for tokens in corpus:
+            builder.add_document(tokens)
+        matrix = builder.build()
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(
+            f"{memory_limit_mb:8.0f} MB budget: {num_tokens / seconds:10.0f} tokens/sec, "
+            f"{matrix.nnz} pairs, {builder.num_spills} shards, "
+            f"peak {peak / 2**20:.0f} MB traced"
+        )
+
+    reference = None
+    for num_workers in args.num_workers:
+        start = time.perf_counter()
+        matrix = build_cooccurrence_matrix(
+            corpus, window=args.window, num_workers=num_workers
+        )
+        seconds = time.perf_counter() - start
+        if reference is None:
+            reference = matrix
+        identical = all(
+            np.array_equal(getattr(matrix, name), getattr(reference, name))
+            for name in ("rows", "cols", "counts")
+        )
+        print(
+            f"{num_workers:8d} workers: {seconds:7.2f} sec, "
+            f"{num_tokens / seconds:10.0f} tokens/sec, "
+            f"{'identical' if identical else 'DIFFERENT'}"
+        )
+
+    if Corpus is not None:
+        corpus_model = Corpus()
+        start = time.perf_counter()
+        corpus_model.fit(corpus, window=args.window)
+        seconds = time.perf_counter() - start
+        print(f"{'glove':>18}: {num_tokens / seconds:10.0f} tokens/sec")
+
+
+if __name__ == "__main__":
+    main()
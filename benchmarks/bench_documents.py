@@ -0,0 +1,106 @@
+import argparse
+import time
+
+import numpy as np
+
+from leglove.documents import (
+    BATCH_TOKENS,
+    document_frequencies,
+    document_vectors,
+    inverse_document_frequencies,
+)
+from leglove.model import GloveModel
+
+from .common import zipf_corpus
+
+"""
+    bench_documents.py
+    --------
+    Compares embedding documents one at a time with a Python loop (look
+    up every token, stack its vector, average) against
+    leglove.documents.document_vectors, which gathers the vectors of a
+    whole batch at once and averages them with np.add.reduceat, on a
+    random Zipf-distributed corpus. Tokenization is not included.
+
+        uv run python -m benchmarks.bench_documents --num_docs 2000
+"""
+
+
+def loop_vectors(model: GloveModel, documents: list) -> np.ndarray:
+    """Average the token vectors of each document in a Python loop."""
+    assert model.dictionary is not None and model.word_vectors is not None
+    vectors = np.zeros((len(documents), model.no_components), dtype=np.float32)
+    for row, tokens in enumerate(documents):
+        ids = [model.dictionary[token] for token in tokens if token in model.dictionary]
+        if ids:
+            vectors[row] = np.mean([model.word_vectors[i] for i in ids], axis=0)
+    return vectors
+
+
+def batches(documents: list) -> list:
+    """Split documents into batches of about BATCH_TOKENS tokens."""
+    size = max(1, BATCH_TOKENS // max(1, len(documents[0])))
+    return [documents[i : i + size] for i in range(0, len(documents), size)]
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark document embedding")
+    parser.add_argument("--num_docs", default=2000, type=int, help="Documents")
+    parser.add_argument(
+        "--doc_length", default=2000, type=int, help="Tokens per document"
+    )
+    parser.add_argument("--vocab_size", default=50000, type=int, help="Vocabulary size")
+    parser.add_argument(
+        "--no_components", default=100, type=int, help="Vector dimensions"
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Time both implementations and check that they agree."""
+    args = parse_arguments()
+    documents = zipf_corpus(args.num_docs, args.doc_length, args.vocab_size)
+    model = GloveModel(no_components=args.no_components)
+    # float32, like the vectors of a memory-mapped export
+    model.word_vectors = (
+        np.random.default_rng(0)
+        .normal(size=(args.vocab_size, args.no_components))
+        .astype(np.float32)
+    )
+    model.add_dictionary(
+        {f"w{rank}": rank - 1 for rank in range(1, args.vocab_size + 1)}
+    )
+    assert model.dictionary is not None
+    num_tokens = args.num_docs * args.doc_length
+
+    start = time.perf_counter()
+    expected = loop_vectors(model, documents)
+    loop_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectors = np.concatenate([document_vectors(model, b) for b in batches(documents)])
+    mean_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    idf = inverse_document_frequencies(
+        *document_frequencies(documents, model.dictionary, args.vocab_size)
+    )
+    np.concatenate([document_vectors(model, b, idf) for b in batches(documents)])
+    tfidf_seconds = time.perf_counter() - start
+
+    print(f"{args.num_docs} documents of {args.doc_length} tokens")
+    for name, seconds in [
+        ("python loop", loop_seconds),
+        ("reduceat mean", mean_seconds),
+        ("reduceat tfidf (2 passes)", tfidf_seconds),
+    ]:
+        print(
+            f"{name:>26}: {seconds:7.2f} sec, {num_tokens / seconds / 1e6:6.2f} "
+            f"M tokens/sec, {loop_seconds / seconds:5.1f}x"
+        )
+    print(f"max difference: {np.abs(vectors - expected).max():.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from leglove.incremental import neighbor_drift, update_model
+from leglove.model import GloveModel
+from leglove.train import train_and_save_model
+
+from .corpus import generate_corpus
+
+"""
+    bench_incremental.py
+    --------
+    Compares adding new opinions to a model with update_model (see
+    leglove.incremental) against retraining it on the whole corpus. A
+    base model is trained on all but --num_new opinions of a synthetic
+    corpus, the rest are added with an update, and the model is also
+    retrained from scratch on every opinion, twice. It reports the time
+    of the update and of a retrain, the nearest neighbor drift of the
+    updated model against the first retrain, and, as the noise floor,
+    the drift between the two retrains.
+
+        uv run python -m benchmarks.bench_incremental --num_docs 500 --num_new 25
+"""
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark incremental updates")
+    parser.add_argument(
+        "--num_docs", default=400, type=int, help="Number of synthetic opinions"
+    )
+    parser.add_argument(
+        "--num_new",
+        default=20,
+        type=int,
+        help="Number of those opinions added by the update",
+    )
+    parser.add_argument(
+        "--num_paragraphs",
+        default=10,
+        type=int,
+        help="Average number of paragraphs per synthetic opinion",
+    )
+    parser.add_argument(
+        "--epochs", default=10, type=int, help="Epochs of the base model and retrains"
+    )
+    parser.add_argument(
+        "--update_epochs", default=3, type=int, help="Epochs of the update"
+    )
+    parser.add_argument(
+        "--k", default=10, type=int, help="Number of neighbors compared per word"
+    )
+    parser.add_argument(
+        "--tokenizer", default="legal", help="Tokenizer used to read the corpus"
+    )
+    return parser.parse_args()
+
+
+def timed_training(data_dir: str, model_name: str, args, **kwargs) -> float:
+    """Train a model on data_dir and return the seconds taken."""
+    start = time.perf_counter()
+    train_and_save_model(
+        data_dir,
+        model_name=model_name,
+        num_epochs=args.epochs,
+        tokenizer=args.tokenizer,
+        **kwargs,
+    )
+    return time.perf_counter() - start
+
+
+def run(work_dir: str, args) -> None:
+    """Train, update and retrain models in work_dir and print the comparison."""
+    data_dir = os.path.join(work_dir, "data")
+    held_dir = os.path.join(work_dir, "held")
+    paths = generate_corpus(data_dir, args.num_docs, num_paragraphs=args.num_paragraphs)
+    new_paths = paths[len(paths) - args.num_new :]
+    held_paths = [
+        os.path.join(held_dir, os.path.relpath(path, data_dir)) for path in new_paths
+    ]
+    for path, held_path in zip(new_paths, held_paths):
+        os.makedirs(os.path.dirname(held_path), exist_ok=True)
+        os.rename(path, held_path)
+
+    base = os.path.join(work_dir, "Updated")
+    timed_training(data_dir, base, args, save_cooccurrence=True)
+    for path, held_path in zip(new_paths, held_paths):
+        os.rename(held_path, path)
+
+    start = time.perf_counter()
+    result = update_model(data_dir, model_name=base, num_epochs=args.update_epochs)
+    update_seconds = time.perf_counter() - start
+    retrain_seconds = timed_training(data_dir, os.path.join(work_dir, "Retrain1"), args)
+    timed_training(data_dir, os.path.join(work_dir, "Retrain2"), args)
+
+    updated, first, second = (
+        GloveModel.load(os.path.join(work_dir, name + ".model"))
+        for name in ["Updated", "Retrain1", "Retrain2"]
+    )
+    update_drift = neighbor_drift(updated, first, k=args.k)
+    retrain_drift = neighbor_drift(second, first, k=args.k)
+
+    print(
+        f"update:  {result.documents} opinions, {result.new_words} new words, "
+        f"{update_seconds:.2f}s ({retrain_seconds / update_seconds:.1f}x faster)"
+    )
+    print(f"retrain: {len(paths)} opinions, {retrain_seconds:.2f}s")
+    print(
+        f"drift over {update_drift['words']} words at k={args.k}: "
+        f"update vs retrain {update_drift['drift']:.3f}, "
+        f"retrain vs retrain {retrain_drift['drift']:.3f}"
+    )
+
+
+def main() -> None:
+    """Run the benchmark on a synthetic corpus."""
+    args = parse_arguments()
+    logging.basicConfig(level=logging.WARNING)
+    with tempfile.TemporaryDirectory(prefix="leglove-bench-") as work_dir:
+        run(work_dir, args)
+
+
+if __name__ == "__main__":
+    main()
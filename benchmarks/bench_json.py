@@ -0,0 +1,126 @@
+import argparse
+import json
+import os
+from typing import List
+from unittest.mock import patch
+
+from leglove import cleanup
+from leglove.cleanup import extract_html, extract_html_from_json
+
+from .common import sample_opinion_html, time_per_item
+
+"""
+    bench_json.py
+    --------
+    Compares the time to get the text field out of opinion JSON with a
+    full json.loads (the original extract_text) and with both paths of
+    extract_html_from_json: the field scan, which decodes only the
+    selected field, and a full orjson.loads when orjson is installed.
+    Synthetic opinions carry three HTML variants and some metadata, like
+    CourtListener opinions.
+
+        uv run python -m benchmarks.bench_json --data_dir data/
+"""
+
+
+def synthetic_opinion(num_paragraphs: int) -> bytes:
+    """Return the JSON of an opinion with every text field populated."""
+    opinion_html = sample_opinion_html(num_paragraphs)
+    return json.dumps(
+        {
+            "resource_uri": "https://www.courtlistener.com/api/rest/v3/opinions/1/",
+            "id": 1,
+            "absolute_url": "/opinion/1/smith-v-jones/",
+            "cluster": "https://www.courtlistener.com/api/rest/v3/clusters/1/",
+            "author": None,
+            "joined_by": [],
+            "date_created": "2010-04-28T17:06:23Z",
+            "type": "010combined",
+            "sha1": "0" * 40,
+            "page_count": 12,
+            "download_url": None,
+            "plain_text": "",
+            "html": opinion_html,
+            "html_lawbox": opinion_html,
+            "html_columbia": None,
+            "html_with_citations": opinion_html,
+            "extracted_by_ocr": False,
+            "opinions_cited": [
+                f"https://www.courtlistener.com/api/rest/v3/opinions/{index}/"
+                for index in range(100)
+            ],
+        }
+    ).encode("utf-8")
+
+
+def load_opinions(data_dir: str, limit: int) -> List[bytes]:
+    """Return the raw JSON of up to limit opinion files of a corpus directory."""
+    opinions = []
+    for juris_dir in sorted(os.listdir(data_dir)):
+        juris_dir_path = os.path.join(data_dir, juris_dir)
+        if juris_dir.startswith(".") or not os.path.isdir(juris_dir_path):
+            continue
+        for json_file in sorted(os.listdir(juris_dir_path)):
+            if json_file.endswith(".json"):
+                opinions.append(
+                    cleanup.read_bytes(os.path.join(juris_dir_path, json_file))
+                )
+                if len(opinions) >= limit:
+                    return opinions
+    return opinions
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark opinion JSON parsing")
+    parser.add_argument(
+        "--data_dir",
+        default=None,
+        help="Corpus directory to read opinions from (synthetic opinions if omitted)",
+    )
+    parser.add_argument(
+        "--num_docs", default=200, type=int, help="Number of opinions to parse"
+    )
+    parser.add_argument(
+        "--num_paragraphs",
+        default=200,
+        type=int,
+        help="Paragraphs per HTML variant of synthetic opinions",
+    )
+    parser.add_argument(
+        "--repeat", default=3, type=int, help="Number of timing repetitions"
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Time full parses and the field scan on the same opinions."""
+    args = parse_arguments()
+    if args.data_dir is None:
+        opinions = [synthetic_opinion(args.num_paragraphs)] * args.num_docs
+    else:
+        opinions = load_opinions(args.data_dir, args.num_docs)
+    size = sum(len(opinion) for opinion in opinions) / len(opinions)
+    print(f"{len(opinions)} opinions of {size / 1024:.1f} KiB on average")
+
+    methods = [
+        ("json.loads", lambda data: extract_html(json.loads(data.decode("utf-8")))),
+        ("field scan", extract_html_from_json),
+    ]
+    if cleanup.orjson is not None:
+        methods.append(("orjson.loads", extract_html_from_json))
+
+    baseline = None
+    for name, method in methods:
+        orjson = None if name == "field scan" else cleanup.orjson
+        with patch("leglove.cleanup.orjson", orjson):
+            seconds = time_per_item(method, opinions, repeat=args.repeat)
+        baseline = baseline or seconds
+        print(
+            f"{name:>12}: {1e6 * seconds / len(opinions):10.1f} us/doc, "
+            f"{baseline / seconds:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import argparse
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from leglove.model import GloveModel
+from leglove.neighbors import METRICS, NearestNeighbors
+
+"""
+    bench_neighbors.py
+    --------
+    Measures nearest neighbor queries per second: the original
+    per-word loop of leglove.example (a dict of vectors, one
+    np.linalg.norm call per word and a full sort) against
+    leglove.neighbors.NearestNeighbors, queried one word at a time and
+    in batches. Uses random vectors unless a trained model is given.
+
+        uv run python -m benchmarks.bench_neighbors --model LeGlove.model
+"""
+
+
+def loop_neighbors(
+    dictionary: Dict[str, int], word_vectors: np.ndarray, word: str, k: int
+) -> List[Tuple[str, float]]:
+    """The original find_nearest_neighbors search, kept for comparison."""
+    word_to_vector = {w: word_vectors[dictionary[w]] for w in dictionary}
+    query_vector = word_to_vector[word]
+    nbr_distances = []
+    for nbr in word_to_vector:
+        nbr_distances.append((nbr, np.linalg.norm(query_vector - word_to_vector[nbr])))
+    return sorted(nbr_distances, key=lambda x: x[1])[:k]
+
+
+def report(name: str, num_queries: int, seconds: float) -> None:
+    """Print the throughput of a query method."""
+    print(f"{name:>24}: {num_queries / seconds:10.1f} queries/sec")
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark nearest neighbor queries")
+    parser.add_argument("--model", default=None, help="Trained model to query")
+    parser.add_argument(
+        "--vocab_size", default=100000, type=int, help="Random vocabulary size"
+    )
+    parser.add_argument(
+        "--no_components", default=100, type=int, help="Random vector dimensions"
+    )
+    parser.add_argument("--k", default=10, type=int, help="Neighbors per query")
+    parser.add_argument(
+        "--num_queries", default=1000, type=int, help="Queries per method"
+    )
+    parser.add_argument(
+        "--loop_queries",
+        default=3,
+        type=int,
+        help="Queries for the (slow) original loop",
+    )
+    parser.add_argument(
+        "--batch_sizes",
+        default=[1, 16, 256],
+        type=int,
+        nargs="+",
+        help="Numbers of words per query_batch call",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Time each query method on the same words."""
+    args = parse_arguments()
+    if args.model is not None:
+        model = GloveModel.load(args.model)
+        assert model.dictionary is not None and model.word_vectors is not None
+        dictionary, word_vectors = model.dictionary, model.word_vectors
+    else:
+        rng = np.random.default_rng(0)
+        word_vectors = rng.normal(size=(args.vocab_size, args.no_components))
+        word_vectors = word_vectors.astype(np.float32)
+        dictionary = {f"word{index}": index for index in range(args.vocab_size)}
+    words = list(dictionary)
+    queries = [
+        words[i]
+        for i in np.random.default_rng(1).integers(0, len(words), args.num_queries)
+    ]
+    print(f"{len(words)} words, {word_vectors.shape[1]} dimensions, k={args.k}")
+
+    start = time.perf_counter()
+    for word in queries[: args.loop_queries]:
+        loop_neighbors(dictionary, word_vectors, word, args.k)
+    report("original loop", args.loop_queries, time.perf_counter() - start)
+
+    for metric in METRICS:
+        start = time.perf_counter()
+        neighbors = NearestNeighbors(word_vectors, dictionary, metric=metric)
+        print(f"{metric} index built in {time.perf_counter() - start:.2f} sec")
+        for batch_size in args.batch_sizes:
+            start = time.perf_counter()
+            for offset in range(0, len(queries), batch_size):
+                neighbors.query_batch(queries[offset : offset + batch_size], args.k)
+            report(
+                f"{metric}, batch {batch_size}",
+                len(queries),
+                time.perf_counter() - start,
+            )
+
+
+if __name__ == "__main__":
+    main()
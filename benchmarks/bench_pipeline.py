@@ -0,0 +1,342 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from leglove.cleanup import extract_text
+from leglove.cooccurrence import build_cooccurrence_matrix
+from leglove.model import GloveModel
+from leglove.neighbors import NearestNeighbors
+from leglove.profiling import text_bytes
+from leglove.tokenizers import TOKENIZERS
+from leglove.train import CONTEXT_WINDOW, read_corpus, tokenize_text
+
+from .corpus import DEFAULT_VOCAB_SIZE, generate_corpus
+
+"""
+    bench_pipeline.py
+    --------
+    End-to-end benchmark of the training pipeline on a deterministic
+    synthetic corpus (see corpus.py), or on a given corpus directory. It
+    times, in order:
+
+        extract_text     JSON parsing and HTML cleanup of every opinion
+        tokenize_text    regex substitution and tokenization, for each
+                         tokenizer
+        read_corpus      the whole preprocessing stage, with one and
+                         with several worker processes
+        cooccurrence     building the co-occurrence matrix
+        training         GloVe epochs of the NumPy trainer
+        neighbors        nearest neighbor queries, one word at a time
+                         and in batches
+
+    Results are printed and can be saved as JSON with --output, together
+    with the git commit, versions and arguments of the run. --compare
+    prints the change of every metric against a saved result, so that
+    regressions can be spotted between commits:
+
+        uv run python -m benchmarks.bench_pipeline --output base.json
+        git checkout my-branch
+        uv run python -m benchmarks.bench_pipeline --compare base.json
+"""
+
+# Constants
+REGRESSION_THRESHOLD = 0.1  # relative change flagged by --compare
+
+
+def timed(func: Callable[[], Any], repeat: int = 1) -> float:
+    """Return the best wall-clock time of calling func."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def list_opinions(data_dir: str) -> List[str]:
+    """Return the paths of the JSON opinions of a corpus directory."""
+    paths = []
+    for juris_dir in sorted(os.listdir(data_dir)):
+        juris_dir_path = os.path.join(data_dir, juris_dir)
+        if juris_dir.startswith(".") or not os.path.isdir(juris_dir_path):
+            continue
+        for json_file in sorted(os.listdir(juris_dir_path)):
+            if json_file.endswith(".json"):
+                paths.append(os.path.join(juris_dir_path, json_file))
+    return paths
+
+
+def bench_extract_text(paths: List[str], repeat: int) -> Dict[str, float]:
+    """Time extract_text over all opinion files."""
+    num_bytes = sum(os.path.getsize(path) for path in paths)
+    seconds = timed(lambda: [extract_text(path) for path in paths], repeat)
+    return {
+        "seconds": seconds,
+        "docs_per_second": len(paths) / seconds,
+        "mb_per_second": num_bytes / 2**20 / seconds,
+    }
+
+
+def bench_tokenize_text(texts: List[str], repeat: int) -> Dict[str, Dict[str, float]]:
+    """Time tokenize_text over all cleaned texts with each tokenizer."""
+    num_bytes = sum(text_bytes(text) for text in texts)
+    results = {}
+    for tokenizer in TOKENIZERS:
+        try:
+            tokenize_text("", tokenizer=tokenizer)
+        except (ImportError, LookupError) as error:
+            print(f"Skipping tokenizer {tokenizer}: {error}")
+            continue
+        seconds = timed(
+            lambda tokenizer=tokenizer: [
+                tokenize_text(text, tokenizer=tokenizer) for text in texts
+            ],
+            repeat,
+        )
+        results[tokenizer] = {
+            "seconds": seconds,
+            "docs_per_second": len(texts) / seconds,
+            "mb_per_second": num_bytes / 2**20 / seconds,
+        }
+    return results
+
+
+def bench_read_corpus(
+    data_dir: str, num_workers: List[int], repeat: int
+) -> Dict[str, Dict[str, float]]:
+    """Time read_corpus over the whole corpus for each number of workers."""
+    results = {}
+    for workers in num_workers:
+        num_docs = 0
+
+        def read(workers: int = workers) -> None:
+            nonlocal num_docs
+            num_docs = sum(1 for _ in read_corpus(data_dir, num_workers=workers))
+
+        seconds = timed(read, repeat)
+        results[f"workers_{workers}"] = {
+            "seconds": seconds,
+            "docs_per_second": num_docs / seconds,
+        }
+    return results
+
+
+def bench_cooccurrence(corpus: List[List[str]], repeat: int) -> Dict[str, float]:
+    """Time building the co-occurrence matrix of a tokenized corpus."""
+    num_tokens = sum(len(tokens) for tokens in corpus)
+    matrix = None
+
+    def build() -> None:
+        nonlocal matrix
+        matrix = build_cooccurrence_matrix(corpus, window=CONTEXT_WINDOW)
+
+    seconds = timed(build, repeat)
+    assert matrix is not None
+    return {
+        "seconds": seconds,
+        "tokens_per_second": num_tokens / seconds,
+        "vocab_size": len(matrix.dictionary),
+        "nnz": matrix.nnz,
+    }
+
+
+def bench_training(matrix, args) -> Dict[str, Any]:
+    """Time the epochs of the NumPy trainer and return the trained model."""
+    model = GloveModel(no_components=args.no_components, random_state=0)
+    epoch_seconds: List[float] = []
+    last = time.perf_counter()
+
+    def record_epoch(epoch: int, loss: float) -> None:
+        nonlocal last
+        now = time.perf_counter()
+        epoch_seconds.append(now - last)
+        last = now
+
+    model.fit(
+        matrix, epochs=args.epochs, no_threads=args.threads, callback=record_epoch
+    )
+    model.add_dictionary(matrix.dictionary)
+    return {
+        "model": model,
+        "seconds_per_epoch": float(np.median(epoch_seconds)),
+        "final_loss": model.loss_history[-1],
+    }
+
+
+def bench_neighbors(model: GloveModel, args) -> Dict[str, float]:
+    """Time nearest neighbor queries on the trained model."""
+    index = NearestNeighbors.from_model(model)
+    words = index.words
+    rng = np.random.default_rng(0)
+    queries = [words[i] for i in rng.integers(0, len(words), args.num_queries)]
+    single = timed(lambda: [index.query(word, k=args.k) for word in queries])
+    batch = timed(lambda: index.query_batch(queries, k=args.k))
+    return {
+        "queries_per_second": len(queries) / single,
+        "batch_queries_per_second": len(queries) / batch,
+    }
+
+
+def git_commit() -> Optional[str]:
+    """Return the current git commit, or None outside a git checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(data_dir: str, args) -> Dict[str, Any]:
+    """Run every benchmark on a corpus directory and return the results."""
+    paths = list_opinions(data_dir)
+    size = sum(os.path.getsize(path) for path in paths)
+    print(f"{len(paths)} opinions, {size / 2**20:.1f} MB")
+    results: Dict[str, Any] = {}
+
+    results["extract_text"] = bench_extract_text(paths, args.repeat)
+    texts = [extract_text(path) for path in paths]
+    results["tokenize_text"] = bench_tokenize_text(texts, args.repeat)
+    results["read_corpus"] = bench_read_corpus(
+        data_dir, sorted({1, args.workers}), args.repeat
+    )
+    corpus = list(read_corpus(data_dir))
+    results["cooccurrence"] = bench_cooccurrence(corpus, args.repeat)
+    matrix = build_cooccurrence_matrix(corpus, window=CONTEXT_WINDOW)
+    training = bench_training(matrix, args)
+    model = training.pop("model")
+    results["training"] = training
+    results["neighbors"] = bench_neighbors(model, args)
+    return results
+
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """Return the numeric leaves of nested results keyed by dotted paths."""
+    flat = {}
+    for name, value in results.items():
+        path = prefix + name
+        if isinstance(value, dict):
+            flat.update(flatten(value, path + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """
+    Print the change of each metric against a baseline.
+
+    Throughputs (*_per_second) are better when higher and times
+    (*seconds*) when lower; changes worse than REGRESSION_THRESHOLD are
+    flagged. Other metrics, such as sizes, are printed for reference.
+    """
+    current, previous = flatten(results), flatten(baseline)
+    for name, value in current.items():
+        if name not in previous:
+            continue
+        old = previous[name]
+        change = (value - old) / old if old else 0.0
+        if name.endswith("_per_second"):
+            regression = change < -REGRESSION_THRESHOLD
+        elif "seconds" in name.rsplit(".", 1)[-1]:
+            regression = change > REGRESSION_THRESHOLD
+        else:
+            regression = False
+        flag = "  REGRESSION" if regression else ""
+        print(f"{name:>48}: {old:12.4g} -> {value:12.4g} ({change:+7.1%}){flag}")
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark the training pipeline")
+    parser.add_argument(
+        "--data_dir",
+        default=None,
+        help="Corpus directory to benchmark (a synthetic corpus if omitted)",
+    )
+    parser.add_argument(
+        "--num_docs", default=200, type=int, help="Number of synthetic opinions"
+    )
+    parser.add_argument(
+        "--num_paragraphs",
+        default=20,
+        type=int,
+        help="Average number of paragraphs per synthetic opinion",
+    )
+    parser.add_argument(
+        "--vocab_size",
+        default=DEFAULT_VOCAB_SIZE,
+        type=int,
+        help="Vocabulary size of synthetic opinions",
+    )
+    parser.add_argument("--seed", default=0, type=int, help="Synthetic corpus seed")
+    parser.add_argument(
+        "--workers", default=4, type=int, help="Worker processes for read_corpus"
+    )
+    parser.add_argument("--epochs", default=3, type=int, help="Training epochs")
+    parser.add_argument("--threads", default=1, type=int, help="Training processes")
+    parser.add_argument(
+        "--no_components", default=100, type=int, help="Word vector dimensions"
+    )
+    parser.add_argument("--k", default=10, type=int, help="Neighbors per query")
+    parser.add_argument(
+        "--num_queries", default=1000, type=int, help="Nearest neighbor queries"
+    )
+    parser.add_argument(
+        "--repeat", default=1, type=int, help="Number of timing repetitions"
+    )
+    parser.add_argument("--output", default=None, help="JSON file to save results to")
+    parser.add_argument(
+        "--compare", default=None, help="JSON results of an earlier run to compare to"
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Run the benchmarks and save or compare their results."""
+    args = parse_arguments()
+    if args.data_dir is not None:
+        results = run(args.data_dir, args)
+    else:
+        with tempfile.TemporaryDirectory(prefix="leglove-bench-") as data_dir:
+            generate_corpus(
+                data_dir,
+                args.num_docs,
+                num_paragraphs=args.num_paragraphs,
+                vocab_size=args.vocab_size,
+                seed=args.seed,
+            )
+            results = run(data_dir, args)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "arguments": vars(args),
+        "results": results,
+    }
+    print(json.dumps(results, indent=2))
+    if args.output is not None:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    if args.compare is not None:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        print(f"Compared to {baseline.get('commit')} ({args.compare}):")
+        compare(results, baseline["results"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import argparse
+import time
+
+import numpy as np
+
+from leglove.model import GloveModel
+from leglove.neighbors import METRICS, NearestNeighbors
+from leglove.quantize import QUANTIZATIONS, QuantizedNeighbors, quantization_report
+
+from .common import clustered_vectors
+
+"""
+    bench_quantize.py
+    --------
+    Compares full-precision nearest neighbor search with search on int8
+    and product quantization codes: memory of the vectors, time to
+    quantize, recall@k against exact search and queries per second. Uses
+    a trained model if one is given, and otherwise clustered random
+    vectors.
+
+        uv run python -m benchmarks.bench_quantize --model LeGlove.model
+"""
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark vector quantization")
+    parser.add_argument("--model", default=None, help="Trained model to quantize")
+    parser.add_argument(
+        "--vocab_size", default=100000, type=int, help="Random vocabulary size"
+    )
+    parser.add_argument(
+        "--no_components", default=100, type=int, help="Random vector dimensions"
+    )
+    parser.add_argument(
+        "--num_clusters",
+        default=100,
+        type=int,
+        help="Cluster centers of the random vectors",
+    )
+    parser.add_argument(
+        "--metric", default="cosine", choices=METRICS, help="Distance metric"
+    )
+    parser.add_argument(
+        "--num_subspaces",
+        default=None,
+        type=int,
+        help="Product quantization subvectors (default: 4 dimensions each)",
+    )
+    parser.add_argument("--k", default=10, type=int, help="Neighbors per query")
+    parser.add_argument(
+        "--num_queries", default=500, type=int, help="Number of query words"
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Quantize the vectors and compare each quantizer with exact search."""
+    args = parse_arguments()
+    if args.model is not None:
+        model = GloveModel.load(args.model)
+        assert model.dictionary is not None and model.word_vectors is not None
+        dictionary, word_vectors = model.dictionary, model.word_vectors
+    else:
+        word_vectors = clustered_vectors(
+            args.vocab_size, args.no_components, args.num_clusters
+        )
+        dictionary = {f"word{index}": index for index in range(args.vocab_size)}
+    words = list(dictionary)
+    rng = np.random.default_rng(1)
+    queries = [words[i] for i in rng.integers(0, len(words), args.num_queries)]
+    print(f"{len(words)} words, {word_vectors.shape[1]} dimensions, k={args.k}")
+
+    exact = NearestNeighbors(word_vectors, dictionary, args.metric)
+    start = time.perf_counter()
+    exact.query_batch(queries, args.k)
+    seconds = time.perf_counter() - start
+    print("quantization       MB  compression  build sec  recall@k  queries/sec")
+    print(
+        f"{'float32':>12} {exact.vectors.nbytes / 2**20:8.1f}  {1.0:11.1f}  "
+        f"{0.0:9.1f}  {1.0:8.3f}  {len(queries) / seconds:11.1f}"
+    )
+
+    for quantization in QUANTIZATIONS:
+        kwargs = {}
+        if quantization == "pq":
+            kwargs = {"num_subspaces": args.num_subspaces, "random_state": 0}
+        start = time.perf_counter()
+        neighbors = QuantizedNeighbors.quantize(
+            word_vectors, dictionary, args.metric, quantization, **kwargs
+        )
+        build_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        neighbors.query_batch(queries, args.k)
+        seconds = time.perf_counter() - start
+        report = quantization_report(
+            word_vectors, dictionary, neighbors, args.k, args.num_queries
+        )
+        print(
+            f"{quantization:>12} {report['quantized_bytes'] / 2**20:8.1f}  "
+            f"{exact.vectors.nbytes / report['quantized_bytes']:11.1f}  "
+            f"{build_seconds:9.1f}  {report[f'recall@{args.k}']:8.3f}  "
+            f"{len(queries) / seconds:11.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
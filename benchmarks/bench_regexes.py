@@ -0,0 +1,101 @@
+import argparse
+import re
+
+from leglove.cleanup import clean_html
+from leglove.regexes import COMPILED_REGEXES, REGEX_TOKENS, REGEXES
+
+from .common import load_documents, time_per_item
+
+"""
+    bench_regexes.py
+    --------
+    Compares strategies for replacing citations with placeholder tokens on
+    long opinions:
+
+        - baseline: re.sub with the original pattern strings (a leading
+          "\\d+" in the judicial opinion citation regex)
+        - compiled: COMPILED_REGEXES, as used by tokenize_text
+        - combined: one alternation of all patterns with named groups,
+          scanned once (shown for reference)
+
+        uv run python -m benchmarks.bench_regexes --data_dir data/
+"""
+
+# The judicial opinion citation regex before its leading "\d+" was rewritten
+BASELINE_REGEXES = [REGEXES[0].replace(r"(\d\d*) ", r"(\d+) ", 1)] + REGEXES[1:]
+
+COMBINED_REGEX = re.compile(
+    "|".join(f"(?P<regex{index}>{regex})" for index, regex in enumerate(REGEXES)),
+    re.IGNORECASE,
+)
+COMBINED_TOKENS = {f"regex{index}": token for index, token in enumerate(REGEX_TOKENS)}
+
+
+def substitute_baseline(text: str) -> str:
+    """Replace citations the way tokenize_text originally did."""
+    for regex, token in zip(BASELINE_REGEXES, REGEX_TOKENS):
+        text = re.sub(regex, token, text, flags=re.IGNORECASE)
+    return text
+
+
+def substitute_compiled(text: str) -> str:
+    """Replace citations with the precompiled regexes."""
+    for regex, token in zip(COMPILED_REGEXES, REGEX_TOKENS):
+        text = regex.sub(token, text)
+    return text
+
+
+def substitute_combined(text: str) -> str:
+    """Replace citations in a single scan (ignores cross-pattern precedence)."""
+    return COMBINED_REGEX.sub(lambda match: COMBINED_TOKENS[match.lastgroup], text)
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark citation substitution")
+    parser.add_argument(
+        "--data_dir",
+        default=None,
+        help="Corpus directory to read opinions from (synthetic opinions if omitted)",
+    )
+    parser.add_argument(
+        "--num_docs", default=20, type=int, help="Number of opinions to process"
+    )
+    parser.add_argument(
+        "--num_paragraphs",
+        default=2000,
+        type=int,
+        help="Paragraphs per synthetic opinion",
+    )
+    parser.add_argument(
+        "--repeat", default=5, type=int, help="Number of timing repetitions"
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Time every substitution strategy on the same cleaned opinions."""
+    args = parse_arguments()
+    texts = [
+        clean_html(document)
+        for document in load_documents(
+            args.data_dir, args.num_docs, args.num_paragraphs
+        )
+    ]
+    megabytes = sum(len(text) for text in texts) / 1e6
+
+    baseline_seconds = time_per_item(substitute_baseline, texts, repeat=args.repeat)
+    for name, func in [
+        ("baseline", substitute_baseline),
+        ("compiled", substitute_compiled),
+        ("combined", substitute_combined),
+    ]:
+        seconds = time_per_item(func, texts, repeat=args.repeat)
+        print(
+            f"{name:>10}: {megabytes / seconds:8.1f} MB/sec "
+            f"({baseline_seconds / seconds:.2f}x baseline)"
+        )
+
+
+if __name__ == "__main__":
+    main()
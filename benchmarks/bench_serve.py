@@ -0,0 +1,263 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+import numpy as np
+
+from leglove.model import GloveModel
+from leglove.neighbors import METRICS
+from leglove.serve import DEFAULT_HOST
+
+from .common import clustered_vectors
+
+"""
+    bench_serve.py
+    --------
+    Load test of the "leglove serve" HTTP API on localhost. Concurrent
+    clients send neighbor (or vector, or analogy) requests over
+    keep-alive connections, and the client-side throughput and latency
+    percentiles are printed along with the server's own /stats counters.
+    Without --port, a server is started in a subprocess on a random
+    model (or on --model).
+
+        uv run python -m benchmarks.bench_serve --concurrency 64
+        uv run python -m benchmarks.bench_serve --port 8000 --endpoint analogy
+"""
+
+# Constants
+STARTUP_TIMEOUT = 120  # seconds to wait for the server to accept connections
+
+
+def free_port() -> int:
+    """Return a port that is free on localhost."""
+    with socket.socket() as sock:
+        sock.bind((DEFAULT_HOST, 0))
+        return sock.getsockname()[1]
+
+
+def start_server(model_file: str, port: int, args) -> subprocess.Popen:
+    """Start "leglove serve" in a subprocess and wait until it listens."""
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "leglove",
+            "serve",
+            "--model",
+            model_file,
+            "--port",
+            str(port),
+            "--metric",
+            args.metric,
+            "--cache_size",
+            str(args.cache_size),
+            "--batch_wait_ms",
+            str(args.batch_wait_ms),
+        ]
+    )
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            socket.create_connection((DEFAULT_HOST, port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Server did not start in time")
+
+
+async def request(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, target: str
+) -> Tuple[int, Dict[str, Any]]:
+    """Send a GET request on a keep-alive connection and read the response."""
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: {DEFAULT_HOST}\r\n\r\n".encode())
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    length = next(
+        int(line.split(":", 1)[1])
+        for line in lines
+        if line.lower().startswith("content-length")
+    )
+    return int(lines[0].split()[1]), json.loads(await reader.readexactly(length))
+
+
+def targets(args, words: List[str]) -> List[str]:
+    """Return the request targets of the load test."""
+    rng = np.random.default_rng(1)
+    hot = words[: args.distinct_words]
+    picks = [
+        [hot[i] for i in row]
+        for row in rng.integers(0, len(hot), (args.num_requests, 3)).tolist()
+    ]
+    if args.endpoint == "analogy":
+        return [
+            "/analogy?"
+            + urlencode(
+                {"positive": [a, b], "negative": c, "k": args.k},
+                doseq=True,
+            )
+            for a, b, c in picks
+        ]
+    if args.endpoint == "vector":
+        return [f"/vector?{urlencode({'word': a})}" for a, _, _ in picks]
+    return [f"/neighbors?{urlencode({'word': a, 'k': args.k})}" for a, _, _ in picks]
+
+
+async def load_test(port: int, args, words: List[str]) -> Dict[str, Any]:
+    """Send the requests from concurrent clients and return the statistics."""
+    pending = targets(args, words)
+    latencies: List[float] = []
+    errors = 0
+
+    async def client() -> None:
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(DEFAULT_HOST, port)
+        while pending:
+            target = pending.pop()
+            start = time.perf_counter()
+            status, _ = await request(reader, writer, target)
+            latencies.append(time.perf_counter() - start)
+            errors += status != 200
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(args.concurrency)])
+    seconds = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(DEFAULT_HOST, port)
+    _, stats = await request(reader, writer, "/stats")
+    writer.close()
+    milliseconds = np.array(latencies) * 1000.0
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": seconds,
+        "requests_per_second": len(latencies) / seconds,
+        "latency_ms": dict(
+            zip(["p50", "p95", "p99"], np.percentile(milliseconds, [50, 95, 99]))
+        ),
+        "server": stats,
+    }
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Load test the LeGlove server")
+    parser.add_argument(
+        "--port",
+        default=None,
+        type=int,
+        help="Port of a running server (default: start one)",
+    )
+    parser.add_argument("--model", default=None, help="Model for the started server")
+    parser.add_argument(
+        "--vocab_size", default=100000, type=int, help="Random vocabulary size"
+    )
+    parser.add_argument(
+        "--no_components", default=100, type=int, help="Random vector dimensions"
+    )
+    parser.add_argument(
+        "--metric", default="cosine", choices=METRICS, help="Distance metric"
+    )
+    parser.add_argument(
+        "--endpoint",
+        default="neighbors",
+        choices=["neighbors", "vector", "analogy"],
+        help="Endpoint to load",
+    )
+    parser.add_argument("--k", default=10, type=int, help="Neighbors per query")
+    parser.add_argument(
+        "--num_requests", default=2000, type=int, help="Total requests to send"
+    )
+    parser.add_argument(
+        "--concurrency", default=32, type=int, help="Concurrent client connections"
+    )
+    parser.add_argument(
+        "--distinct_words",
+        default=100000,
+        type=int,
+        help="Words queried (fewer words raise the cache hit rate)",
+    )
+    parser.add_argument(
+        "--cache_size", default=10000, type=int, help="Cache size of the started server"
+    )
+    parser.add_argument(
+        "--batch_wait_ms",
+        default=1.0,
+        type=float,
+        help="Batching wait of the started server",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Start a server if needed and load test it."""
+    args = parse_arguments()
+    process: Optional[subprocess.Popen] = None
+    with tempfile.TemporaryDirectory(prefix="leglove-serve-") as temp_dir:
+        if args.model is not None:
+            model = GloveModel.load(args.model)
+            assert model.dictionary is not None
+            words = list(model.dictionary)
+            model_file = args.model
+        else:
+            words = [f"word{index}" for index in range(args.vocab_size)]
+            model = GloveModel(no_components=args.no_components)
+            model.word_vectors = clustered_vectors(
+                args.vocab_size, args.no_components, 100
+            )
+            model.add_dictionary({word: index for index, word in enumerate(words)})
+            model_file = os.path.join(temp_dir, "bench.model")
+            model.save(model_file)
+
+        port = args.port
+        if port is None:
+            port = free_port()
+            process = start_server(model_file, port, args)
+        try:
+            results = asyncio.run(load_test(port, args, words))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    server = results["server"]
+    print(
+        f"{results['requests']} {args.endpoint} requests from "
+        f"{args.concurrency} clients in {results['seconds']:.2f} sec, "
+        f"{results['errors']} errors"
+    )
+    print(f"throughput: {results['requests_per_second']:.1f} requests/sec")
+    print(
+        "client latency ms: "
+        + ", ".join(
+            f"{name} {value:.2f}" for name, value in results["latency_ms"].items()
+        )
+    )
+    print(
+        f"server: {server['batches']} batches of {server['mean_batch_size']:.1f} "
+        f"queries on average, cache hit rate {server['cache']['hit_rate']:.2f}"
+    )
+    print(
+        "server latency ms: "
+        + ", ".join(
+            f"{name} {value:.2f}"
+            for name, value in server["latency_ms"].items()
+            if name in ("p50", "p95", "p99")
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import argparse
+import logging
+import os
+import tempfile
+import time
+from typing import Dict, List
+
+from leglove.sharded import train_jurisdiction_models
+from leglove.train import train_and_save_model
+
+from .corpus import generate_corpus, jurisdictions
+
+"""
+    bench_sharded.py
+    --------
+    Compares training one model per jurisdiction group in a single pass
+    over the corpus (train_jurisdiction_models, see leglove.sharded)
+    against training each model separately with train_and_save_model,
+    which cleans, tokenizes and counts the opinions of a jurisdiction
+    once for every model that includes it. The models are one per
+    jurisdiction of a synthetic corpus, one for all but the first and
+    one for all of them.
+
+        uv run python -m benchmarks.bench_sharded --num_docs 1000 --num_jurisdictions 6
+"""
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark training one model per jurisdiction group"
+    )
+    parser.add_argument(
+        "--num_docs", default=600, type=int, help="Number of synthetic opinions"
+    )
+    parser.add_argument(
+        "--num_jurisdictions",
+        default=4,
+        type=int,
+        help="Number of jurisdictions of the synthetic corpus",
+    )
+    parser.add_argument(
+        "--num_paragraphs",
+        default=10,
+        type=int,
+        help="Average number of paragraphs per synthetic opinion",
+    )
+    parser.add_argument("--epochs", default=2, type=int, help="Epochs per model")
+    parser.add_argument(
+        "--workers",
+        default=1,
+        type=int,
+        help="Preprocessing and co-occurrence worker processes",
+    )
+    parser.add_argument(
+        "--tokenizer", default="legal", help="Tokenizer used to read the corpus"
+    )
+    return parser.parse_args()
+
+
+def model_jurisdictions(names: List[str]) -> Dict[str, List[str]]:
+    """Return the jurisdictions of each benchmarked model, by model name."""
+    models = {f"LeGlove-{name}": [name] for name in names}
+    models["LeGlove-rest"] = names[1:]
+    models["LeGlove-all"] = names
+    return models
+
+
+def run(work_dir: str, args) -> None:
+    """Train the models both ways in work_dir and print the comparison."""
+    data_dir = os.path.join(work_dir, "data")
+    generate_corpus(
+        data_dir,
+        args.num_docs,
+        num_paragraphs=args.num_paragraphs,
+        num_jurisdictions=args.num_jurisdictions,
+    )
+    models = model_jurisdictions(jurisdictions(args.num_jurisdictions))
+    options = {
+        "num_epochs": args.epochs,
+        "num_workers": args.workers,
+        "cooccurrence_workers": args.workers,
+        "tokenizer": args.tokenizer,
+    }
+
+    start = time.perf_counter()
+    for model_name, selection in models.items():
+        train_and_save_model(
+            data_dir,
+            model_name=os.path.join(work_dir, "separate-" + model_name),
+            jurisdictions=selection,
+            **options,
+        )
+    separate_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    train_jurisdiction_models(
+        data_dir,
+        {
+            os.path.join(work_dir, "sharded-" + model_name): selection
+            for model_name, selection in models.items()
+        },
+        **options,
+    )
+    sharded_seconds = time.perf_counter() - start
+
+    reads = sum(len(selection) for selection in models.values())
+    print(
+        f"{len(models)} models over {args.num_jurisdictions} jurisdictions, "
+        f"{args.num_docs} opinions"
+    )
+    print(
+        f"separate: {separate_seconds:.2f}s "
+        f"({reads / args.num_jurisdictions:.1f} reads of the corpus)"
+    )
+    print(
+        f"sharded:  {sharded_seconds:.2f}s "
+        f"({separate_seconds / sharded_seconds:.1f}x faster)"
+    )
+
+
+def main() -> None:
+    """Run the benchmark on a synthetic corpus."""
+    args = parse_arguments()
+    logging.basicConfig(level=logging.WARNING)
+    with tempfile.TemporaryDirectory(prefix="leglove-bench-") as work_dir:
+        run(work_dir, args)
+
+
+if __name__ == "__main__":
+    main()
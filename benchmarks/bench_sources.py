@@ -0,0 +1,133 @@
+import argparse
+import gzip
+import json
+import os
+import tarfile
+import tempfile
+import time
+import zipfile
+from contextlib import ExitStack
+from typing import Dict, Tuple
+
+from leglove.sources import DirectorySource, corpus_source
+from leglove.train import read_documents
+
+from .common import sample_opinion_html
+
+"""
+    bench_sources.py
+    --------
+    Compares opinions per second read from a corpus directory with the
+    same opinions packed into tar, tar.gz, zip and gzipped JSON lines
+    archives: once reading only the raw JSON, and once through
+    read_documents (cleanup and tokenization). Packs the given corpus
+    directory, or synthetic opinions if none is given. The directory is
+    read from a warm page cache, like the archives; extracted corpora
+    of millions of files are usually much slower when cold.
+
+        uv run python -m benchmarks.bench_sources --data_dir data/
+"""
+
+
+def write_synthetic_corpus(data_dir: str, num_docs: int, num_paragraphs: int) -> None:
+    """Write num_docs synthetic opinion files into a jurisdiction directory."""
+    juris_dir = os.path.join(data_dir, "synthetic")
+    os.makedirs(juris_dir)
+    opinion = json.dumps({"html_with_citations": sample_opinion_html(num_paragraphs)})
+    for index in range(num_docs):
+        with open(os.path.join(juris_dir, f"opinion_{index}.json"), "w") as file:
+            file.write(opinion)
+
+
+def pack_corpus(data_dir: str, temp_dir: str) -> Dict[str, str]:
+    """Pack every JSON file of a corpus directory into each archive format."""
+    paths = {
+        kind: os.path.join(temp_dir, f"corpus.{kind}")
+        for kind in ["tar", "tar.gz", "zip", "jsonl.gz"]
+    }
+    with ExitStack() as stack:
+        tar = stack.enter_context(tarfile.open(paths["tar"], "w"))
+        tar_gz = stack.enter_context(tarfile.open(paths["tar.gz"], "w:gz"))
+        zip_file = stack.enter_context(
+            zipfile.ZipFile(paths["zip"], "w", zipfile.ZIP_DEFLATED)
+        )
+        json_lines = stack.enter_context(gzip.open(paths["jsonl.gz"], "wb"))
+        for record in DirectorySource(data_dir).records():
+            member_name = os.path.relpath(record.name, data_dir)
+            tar.add(record.name, arcname=member_name)
+            tar_gz.add(record.name, arcname=member_name)
+            zip_file.write(record.name, arcname=member_name)
+            with open(record.name, "rb") as file:
+                json_lines.write(json.dumps(json.load(file)).encode("utf-8") + b"\n")
+    return paths
+
+
+def time_reads(path: str) -> Tuple[int, float]:
+    """Return the number of opinions and seconds to read their raw JSON."""
+    count = 0
+    start = time.perf_counter()
+    for record in corpus_source(path).records():
+        if record.data is None:
+            with open(record.name, "rb") as file:
+                file.read()
+        count += 1
+    return count, time.perf_counter() - start
+
+
+def time_documents(path: str, num_workers: int) -> Tuple[int, float]:
+    """Return the number of documents and seconds to read and tokenize them."""
+    start = time.perf_counter()
+    count = sum(1 for _ in read_documents(path, num_workers=num_workers))
+    return count, time.perf_counter() - start
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark corpus sources")
+    parser.add_argument(
+        "--data_dir",
+        default=None,
+        help="Corpus directory to pack into archives (synthetic opinions if omitted)",
+    )
+    parser.add_argument(
+        "--num_docs", default=2000, type=int, help="Number of synthetic opinions"
+    )
+    parser.add_argument(
+        "--num_paragraphs",
+        default=20,
+        type=int,
+        help="Paragraphs per synthetic opinion",
+    )
+    parser.add_argument(
+        "--workers", default=1, type=int, help="Preprocessing worker processes"
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Time every corpus source on the same opinions."""
+    args = parse_arguments()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        data_dir = args.data_dir
+        if data_dir is None:
+            data_dir = os.path.join(temp_dir, "data")
+            write_synthetic_corpus(data_dir, args.num_docs, args.num_paragraphs)
+        paths = {"directory": data_dir, **pack_corpus(data_dir, temp_dir)}
+
+        for kind, path in paths.items():
+            if os.path.isdir(path):
+                records = DirectorySource(path).records()
+                size = sum(os.path.getsize(record.name) for record in records)
+            else:
+                size = os.path.getsize(path)
+            num_read, read_seconds = time_reads(path)
+            num_documents, document_seconds = time_documents(path, args.workers)
+            print(
+                f"{kind:>10}: {size / 2**20:8.1f} MiB, "
+                f"{num_read / read_seconds:10.1f} files/sec read, "
+                f"{num_documents / document_seconds:8.1f} docs/sec tokenized"
+            )
+
+
+if __name__ == "__main__":
+    main()
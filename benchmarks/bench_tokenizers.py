@@ -0,0 +1,95 @@
+import argparse
+from collections import Counter
+from typing import List
+
+from leglove.cleanup import clean_html
+from leglove.regexes import COMPILED_REGEXES, REGEX_TOKENS
+from leglove.tokenizers import TOKENIZERS
+
+from .common import load_documents, time_per_item
+
+"""
+    bench_tokenizers.py
+    --------
+    Measures the throughput of every registered tokenizer on cleaned,
+    citation-substituted opinions, and reports how closely each agrees
+    with the NLTK reference (token multiset precision and recall, and the
+    fraction of documents tokenized identically).
+
+        uv run python -m benchmarks.bench_tokenizers --data_dir data/
+"""
+
+REFERENCE_TOKENIZER = "nltk"
+
+
+def prepare_text(html: str) -> str:
+    """Clean an opinion and substitute citations, as tokenize_text does."""
+    text = clean_html(html)
+    for regex, token in zip(COMPILED_REGEXES, REGEX_TOKENS):
+        text = regex.sub(token, text)
+    return text.lower()
+
+
+def agreement(reference: List[List[str]], candidate: List[List[str]]) -> str:
+    """Summarize how closely candidate tokens match the reference tokens."""
+    matched = reference_total = candidate_total = exact = 0
+    for expected, actual in zip(reference, candidate):
+        matched += sum((Counter(expected) & Counter(actual)).values())
+        reference_total += len(expected)
+        candidate_total += len(actual)
+        exact += expected == actual
+    precision = matched / max(candidate_total, 1)
+    recall = matched / max(reference_total, 1)
+    return (
+        f"precision {precision:.4f}, recall {recall:.4f}, "
+        f"{exact}/{len(reference)} documents identical"
+    )
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark word tokenizers")
+    parser.add_argument(
+        "--data_dir",
+        default=None,
+        help="Corpus directory to read opinions from (synthetic opinions if omitted)",
+    )
+    parser.add_argument(
+        "--num_docs", default=50, type=int, help="Number of opinions to tokenize"
+    )
+    parser.add_argument(
+        "--repeat", default=3, type=int, help="Number of timing repetitions"
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Time every tokenizer and compare its output with the reference."""
+    args = parse_arguments()
+    texts = [
+        prepare_text(html) for html in load_documents(args.data_dir, args.num_docs)
+    ]
+    megabytes = sum(len(text) for text in texts) / 1e6
+
+    outputs = {}
+    for name, tokenize in sorted(TOKENIZERS.items()):
+        try:
+            seconds = time_per_item(tokenize, texts, repeat=args.repeat)
+        except LookupError as error:
+            print(f"{name:>10}: skipped ({str(error).strip().splitlines()[0]})")
+            continue
+        outputs[name] = [tokenize(text) for text in texts]
+        print(f"{name:>10}: {megabytes / seconds:8.2f} MB/sec")
+
+    reference = outputs.get(REFERENCE_TOKENIZER)
+    if reference is None:
+        return
+    for name, tokens in outputs.items():
+        if name != REFERENCE_TOKENIZER:
+            print(
+                f"{name:>10} vs {REFERENCE_TOKENIZER}: {agreement(reference, tokens)}"
+            )
+
+
+if __name__ == "__main__":
+    main()
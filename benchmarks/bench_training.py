@@ -0,0 +1,165 @@
+import argparse
+import time
+
+import numpy as np
+
+from leglove.cooccurrence import build_cooccurrence_matrix
+from leglove.model import GloveModel, glove_loss
+
+from .common import zipf_corpus
+
+try:
+    from glove import Glove
+    from glove.glove_cython import fit_vectors
+except ImportError:
+    Glove = None
+    fit_vectors = None
+
+"""
+    bench_training.py
+    --------
+    Trains GloVe models on the co-occurrence matrix of a Zipf-distributed
+    random corpus and reports the time per epoch and the loss curve (the
+    GloVe objective evaluated after every epoch) of the built-in NumPy
+    trainer for several batch sizes. When glove-python is installed, its
+    loss curve on the same matrix is reported for comparison.
+
+    It then reports how Hogwild training scales: the time per epoch and
+    the final loss of the NumPy trainer for each number of training
+    processes.
+
+        uv run python -m benchmarks.bench_training --epochs 10 --num_threads 1 2 4 8
+"""
+
+
+def glove_python_curve(matrix, args) -> None:
+    """Train glove-python one epoch at a time and print its loss curve."""
+    assert Glove is not None and fit_vectors is not None
+    coo = matrix.to_coo()
+    model = Glove(no_components=args.no_components, learning_rate=args.learning_rate)
+    model.fit(coo, epochs=0, no_threads=1)
+    shuffle_indices = np.arange(coo.nnz, dtype=np.int32)
+    rng = np.random.RandomState(0)
+
+    curve = []
+    start = time.perf_counter()
+    for _ in range(args.epochs):
+        rng.shuffle(shuffle_indices)
+        fit_vectors(
+            model.word_vectors,
+            model.vectors_sum_gradients,
+            model.word_biases,
+            model.biases_sum_gradients,
+            coo.row,
+            coo.col,
+            coo.data,
+            shuffle_indices,
+            model.learning_rate,
+            model.max_count,
+            model.alpha,
+            model.max_loss,
+            1,
+        )
+        curve.append(glove_loss(model.word_vectors, model.word_biases, matrix))
+    seconds = (time.perf_counter() - start) / args.epochs
+    print(f"{'glove':>12}: {seconds:6.2f} sec/epoch, loss {format_curve(curve)}")
+
+
+def thread_scaling(matrix, args) -> None:
+    """Print the time per epoch and final loss for each number of threads."""
+    print("threads  sec/epoch  speedup  final loss")
+    baseline = None
+    for no_threads in args.num_threads:
+        model = GloveModel(
+            no_components=args.no_components,
+            learning_rate=args.learning_rate,
+            random_state=0,
+        )
+        start = time.perf_counter()
+        model.fit(matrix, epochs=args.epochs, no_threads=no_threads)
+        seconds = (time.perf_counter() - start) / args.epochs
+        if baseline is None:
+            baseline = seconds
+        assert model.word_vectors is not None and model.word_biases is not None
+        loss = glove_loss(model.word_vectors, model.word_biases, matrix)
+        print(
+            f"{no_threads:>7}  {seconds:9.2f}  {baseline / seconds:6.2f}x  {loss:10.4f}"
+        )
+
+
+def format_curve(curve) -> str:
+    """Format a loss curve for printing."""
+    return " ".join(f"{loss:.4f}" for loss in curve)
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark GloVe training")
+    parser.add_argument(
+        "--num_docs", default=200, type=int, help="Number of random documents"
+    )
+    parser.add_argument(
+        "--doc_length", default=1000, type=int, help="Tokens per random document"
+    )
+    parser.add_argument(
+        "--vocab_size", default=5000, type=int, help="Size of the random vocabulary"
+    )
+    parser.add_argument(
+        "--batch_sizes",
+        default=[64, 512, 4096],
+        type=int,
+        nargs="+",
+        help="Minibatch sizes of the NumPy trainer to benchmark",
+    )
+    parser.add_argument(
+        "--num_threads",
+        default=[1, 2, 4],
+        type=int,
+        nargs="+",
+        help="Numbers of Hogwild training processes to benchmark",
+    )
+    parser.add_argument("--epochs", default=10, type=int, help="Training epochs")
+    parser.add_argument(
+        "--no_components", default=100, type=int, help="Word vector dimensions"
+    )
+    parser.add_argument(
+        "--learning_rate", default=0.05, type=float, help="AdaGrad learning rate"
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Train every configuration on the same matrix and print its loss curve."""
+    args = parse_arguments()
+    corpus = zipf_corpus(args.num_docs, args.doc_length, args.vocab_size)
+    matrix = build_cooccurrence_matrix(corpus)
+    print(f"{matrix.shape[0]} words, {matrix.nnz} co-occurrence entries")
+
+    for batch_size in args.batch_sizes:
+        model = GloveModel(
+            no_components=args.no_components,
+            learning_rate=args.learning_rate,
+            batch_size=batch_size,
+            random_state=0,
+        )
+        curve = []
+        seconds = 0.0
+        for epoch in range(args.epochs):
+            start = time.perf_counter()
+            model.fit(matrix, epochs=1, warm_start=epoch > 0)
+            seconds += time.perf_counter() - start
+            assert model.word_vectors is not None and model.word_biases is not None
+            curve.append(glove_loss(model.word_vectors, model.word_biases, matrix))
+        print(
+            f"{batch_size:>12}: {seconds / args.epochs:6.2f} sec/epoch, "
+            f"loss {format_curve(curve)}"
+        )
+
+    if Glove is not None:
+        glove_python_curve(matrix, args)
+
+    thread_scaling(matrix, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from leglove.model import GloveModel
+from leglove.vector_store import MappedModel, export_model, store_path
+
+"""
+    bench_vector_store.py
+    --------
+    Compares the time to load a model and look up a word from the
+    pickled "<model_name>.model" file with the memory-mapped
+    "<model_name>.vectors" layout. Uses a random model unless a trained
+    one is given. Run it twice to see warm page cache timings.
+
+        uv run python -m benchmarks.bench_vector_store --model LeGlove.model
+"""
+
+
+def random_model(vocab_size: int, no_components: int) -> GloveModel:
+    """Return a model with random vectors and vocab_size words."""
+    model = GloveModel(no_components=no_components)
+    rng = np.random.default_rng(0)
+    model.word_vectors = rng.normal(size=(vocab_size, no_components)).astype(np.float32)
+    model.word_biases = np.zeros(vocab_size, dtype=np.float32)
+    model.add_dictionary({f"word{index}": index for index in range(vocab_size)})
+    return model
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark model loading")
+    parser.add_argument("--model", default=None, help="Trained model to load")
+    parser.add_argument(
+        "--vocab_size", default=1000000, type=int, help="Random vocabulary size"
+    )
+    parser.add_argument(
+        "--no_components", default=100, type=int, help="Random vector dimensions"
+    )
+    parser.add_argument(
+        "--lookups", default=10000, type=int, help="Words looked up after loading"
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Time loading and word lookups with both formats."""
+    args = parse_arguments()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        model_file = args.model
+        if model_file is None:
+            model_file = os.path.join(temp_dir, "random.model")
+            random_model(args.vocab_size, args.no_components).save(model_file)
+        path = store_path(model_file)
+        if not os.path.isdir(path):
+            path = os.path.join(temp_dir, "exported.vectors")
+            export_model(GloveModel.load(model_file), path)
+
+        start = time.perf_counter()
+        model = GloveModel.load(model_file)
+        print(f"GloveModel.load:  {1000 * (time.perf_counter() - start):10.1f} ms")
+        assert model.dictionary is not None and model.word_vectors is not None
+        rng = np.random.default_rng(1)
+        words = list(model.dictionary)
+        words = [words[i] for i in rng.integers(0, len(words), args.lookups)]
+
+        start = time.perf_counter()
+        mapped = MappedModel.load(path)
+        print(f"MappedModel.load: {1000 * (time.perf_counter() - start):10.1f} ms")
+
+        for name, lookup in [
+            (
+                "pickled lookups",
+                lambda word: model.word_vectors[model.dictionary[word]],
+            ),
+            ("mapped lookups", mapped.vector),
+        ]:
+            start = time.perf_counter()
+            for word in words:
+                lookup(word)
+            seconds = time.perf_counter() - start
+            print(f"{name:>16}: {1e6 * seconds / len(words):10.1f} us/word")
+
+
+if __name__ == "__main__":
+    main()
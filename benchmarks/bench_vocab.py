@@ -0,0 +1,104 @@
+import argparse
+import gc
+import time
+import tracemalloc
+from typing import Callable, Mapping, Tuple
+
+import numpy as np
+
+from leglove.model import GloveModel
+from leglove.vocab import CompactVocabulary
+
+"""
+    bench_vocab.py
+    --------
+    Compares the memory and lookup speed of a word-to-id dict with
+    leglove.vocab.CompactVocabulary. Memory is measured with tracemalloc
+    and includes the word strings themselves, which a dict keeps as
+    separate Python objects. Uses random legal-looking tokens unless a
+    trained model is given.
+
+        uv run python -m benchmarks.bench_vocab --model LeGlove.model
+"""
+
+
+def random_words(vocab_size: int) -> list:
+    """Return vocab_size distinct random lowercase tokens."""
+    rng = np.random.default_rng(0)
+    letters = np.frombuffer(b"abcdefghijklmnopqrstuvwxyz", dtype=np.uint8)
+    words = set()
+    while len(words) < vocab_size:
+        length = int(rng.integers(3, 14))
+        words.add(letters[rng.integers(0, 26, length)].tobytes().decode("ascii"))
+    return sorted(words)
+
+
+def allocated(build: Callable[[], Mapping[str, int]]) -> Tuple[Mapping[str, int], int]:
+    """Return the result of build and the bytes it keeps allocated."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark vocabulary structures")
+    parser.add_argument(
+        "--model", default=None, help="Trained model to read words from"
+    )
+    parser.add_argument(
+        "--vocab_size", default=1000000, type=int, help="Random vocabulary size"
+    )
+    parser.add_argument(
+        "--num_lookups", default=100000, type=int, help="Words looked up per structure"
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Measure both structures on the same words."""
+    args = parse_arguments()
+    if args.model is not None:
+        model = GloveModel.load(args.model)
+        assert model.dictionary is not None
+        words = [word.encode("utf-8") for word in model.dictionary]
+    else:
+        words = [word.encode("ascii") for word in random_words(args.vocab_size)]
+    print(f"{len(words)} words")
+
+    # Decode inside the measured builds, so each owns its strings
+    dictionary, dict_bytes = allocated(
+        lambda: {word.decode("utf-8"): index for index, word in enumerate(words)}
+    )
+    vocabulary, compact_bytes = allocated(
+        lambda: CompactVocabulary.from_dictionary(
+            {word.decode("utf-8"): index for index, word in enumerate(words)}
+        )
+    )
+    assert isinstance(vocabulary, CompactVocabulary)
+    print(f"{'dict':>20}: {dict_bytes / 2**20:8.1f} MB")
+    print(
+        f"{'CompactVocabulary':>20}: {compact_bytes / 2**20:8.1f} MB "
+        f"({vocabulary.nbytes / 2**20:.1f} MB of arrays, "
+        f"{dict_bytes / max(compact_bytes, 1):.1f}x smaller)"
+    )
+
+    rng = np.random.default_rng(1)
+    queries = [
+        words[index].decode("utf-8")
+        for index in rng.integers(0, len(words), args.num_lookups)
+    ]
+    for name, mapping in [("dict", dictionary), ("CompactVocabulary", vocabulary)]:
+        start = time.perf_counter()
+        for word in queries:
+            mapping[word]
+        seconds = time.perf_counter() - start
+        print(f"{name:>20}: {seconds / len(queries) * 1e6:8.2f} us/lookup")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import json
+import os
+import time
+from typing import Callable, Iterator, List, Optional
+
+import numpy as np
+
+from leglove.cleanup import extract_html, is_well_formatted
+
+"""
+    common.py
+    --------
+    Helpers shared by the benchmark scripts: loading opinion HTML from a
+    CourtListener-style corpus directory (or building a sample opinion
+    when no corpus is given), generating Zipf-distributed token corpora
+    and clustered word vectors, and timing a function over many inputs.
+"""
+
+# Constants
+SAMPLE_PARAGRAPH = (
+    "The court held in Smith v. Jones, 123 F.3d 456, 460 (1999), that the "
+    'statute, <i>see</i> 42 U.S.C. &sect; 1983(a)(1), applies.<a class="footnote" '
+    'href="#fn1" id="fnref1">1</a> <span class="star-pagination">*457</span> '
+    "<i>Id.,</i> at 461. The defendant&#39;s argument &mdash; that the rule "
+    "does not reach conduct <sup>2</sup> of this kind &mdash; fails."
+)
+
+
+def sample_opinion_html(num_paragraphs: int = 200) -> str:
+    """Return a synthetic opinion of num_paragraphs paragraphs."""
+    paragraphs = "".join(f"<p>{SAMPLE_PARAGRAPH}</p>\n" for _ in range(num_paragraphs))
+    return f"<div>{paragraphs}</div>"
+
+
+def iter_opinion_html(data_dir: str, limit: Optional[int] = None) -> Iterator[str]:
+    """Yield well-formatted opinion HTML from a corpus directory."""
+    count = 0
+    for juris_dir in sorted(os.listdir(data_dir)):
+        juris_dir_path = os.path.join(data_dir, juris_dir)
+        if juris_dir.startswith(".") or not os.path.isdir(juris_dir_path):
+            continue
+        for json_file in sorted(os.listdir(juris_dir_path)):
+            if not json_file.endswith(".json"):
+                continue
+            with open(os.path.join(juris_dir_path, json_file)) as file:
+                raw_html = extract_html(json.load(file))
+            if is_well_formatted(raw_html):
+                yield raw_html
+                count += 1
+                if limit is not None and count >= limit:
+                    return
+
+
+def load_documents(
+    data_dir: Optional[str], limit: int, num_paragraphs: int = 200
+) -> List[str]:
+    """Return opinion HTML from data_dir, or synthetic opinions if it is None."""
+    if data_dir is None:
+        return [sample_opinion_html(num_paragraphs) for _ in range(limit)]
+    return list(iter_opinion_html(data_dir, limit))
+
+
+def zipf_corpus(
+    num_docs: int, doc_length: int, vocab_size: int, seed: int = 0
+) -> List[List[str]]:
+    """Return random documents whose token frequencies follow Zipf's law."""
+    rng = np.random.default_rng(seed)
+    ranks = np.arange(1, vocab_size + 1)
+    probabilities = 1.0 / ranks
+    probabilities /= probabilities.sum()
+    words = [f"w{rank}" for rank in ranks]
+    return [
+        [words[index] for index in rng.choice(vocab_size, doc_length, p=probabilities)]
+        for _ in range(num_docs)
+    ]
+
+
+def time_per_item(func: Callable, items: List, repeat: int = 1) -> float:
+    """Return the best total wall-clock time of applying func to all items."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def clustered_vectors(
+    vocab_size: int, dimensions: int, num_clusters: int, seed: int = 0
+) -> np.ndarray:
+    """Return float32 vectors scattered around random cluster centers."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(num_clusters, dimensions))
+    labels = rng.integers(0, num_clusters, vocab_size)
+    noise = rng.normal(size=(vocab_size, dimensions))
+    return (centers[labels] + noise).astype(np.float32)
@@ -0,0 +1,288 @@
+import argparse
+import bisect
+import json
+import os
+import random
+from functools import lru_cache
+from itertools import accumulate
+from typing import Any, Dict, List, Tuple
+
+from leglove.jurisdictions import abbreviations
+
+"""
+    corpus.py
+    --------
+    Generates a deterministic synthetic corpus of CourtListener-style
+    JSON opinions for the benchmarks. Each opinion is a JSON object with
+    the metadata fields of the CourtListener opinion API and its text in
+    one of the HTML fields (mostly html_with_citations), written as
+    paragraphs of Zipf-distributed words with case citations, Id.
+    citations, section references, footnote links and footnotes,
+    <sup> tags, star pagination and HTML entities. Opinions are laid out
+    like CourtListener bulk data, one directory per jurisdiction.
+
+    The same arguments always give the same corpus, and the opinion with
+    a given index does not depend on how many opinions are generated.
+
+        uv run python -m benchmarks.corpus --output data/ --num_docs 1000
+"""
+
+# Constants
+LEGAL_WORDS = (
+    "the court of appeals district judgment defendant plaintiff appellant "
+    "appellee statute evidence trial jury motion order claim counsel rule "
+    "section act law state federal government contract damages review "
+    "standard error opinion case petition habeas corpus jurisdiction "
+    "constitutional amendment due process summary reversed affirmed remanded "
+    "dismissed granted denied held finding testimony witness record brief "
+    "argument question whether because however therefore under pursuant"
+).split()
+SYLLABLES = ["ab", "con", "de", "ex", "in", "ju", "le", "mo", "pro", "re", "sta", "ti"]
+REPORTERS = ["U.S.", "S.Ct.", "L.Ed.2d", "F.2d", "F.3d", "F. Supp.", "B.R."]
+PARTIES = ["Smith", "Jones", "United States", "Miller", "State", "Garcia", "Brown"]
+CODES = ["U.S.C.", "C.F.R.", "Pa.C.S.", "Cal. Civ. Code"]
+TEXT_FIELDS = ["html_with_citations", "html_lawbox", "html", "html_columbia"]
+TEXT_FIELD_WEIGHTS = [0.8, 0.1, 0.05, 0.05]
+DEFAULT_VOCAB_SIZE = 20000
+
+
+@lru_cache(maxsize=4)
+def vocabulary(vocab_size: int, seed: int) -> Tuple[List[str], List[float]]:
+    """Return legal words followed by made-up words, and their Zipf cumulative weights."""
+    rng = random.Random(f"vocabulary:{seed}")
+    words = list(LEGAL_WORDS)
+    seen = set(words)
+    while len(words) < vocab_size:
+        word = "".join(rng.choices(SYLLABLES, k=rng.randint(2, 4)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    weights = [1.0 / rank for rank in range(1, vocab_size + 1)]
+    return words, list(accumulate(weights))
+
+
+def _words(rng: random.Random, count: int, vocab_size: int, seed: int) -> List[str]:
+    """Return count Zipf-distributed words."""
+    words, cum_weights = vocabulary(vocab_size, seed)
+    total = cum_weights[-1]
+    return [
+        words[bisect.bisect(cum_weights, rng.random() * total)] for _ in range(count)
+    ]
+
+
+def _case_citation(rng: random.Random) -> str:
+    """Return a case citation such as "Smith v. Jones, 123 F.3d 456, 460 (1999)"."""
+    page = rng.randint(1, 1500)
+    plaintiff, defendant = rng.sample(PARTIES, 2)
+    citation = f"<i>{plaintiff} v. {defendant}</i>, {rng.randint(1, 999)} "
+    citation += f"{rng.choice(REPORTERS)} {page}"
+    if rng.random() < 0.6:
+        citation += f", {page + rng.randint(1, 30)}"
+    return citation + f" ({rng.randint(1900, 2020)})"
+
+
+def _law_citation(rng: random.Random) -> str:
+    """Return a section reference such as "42 U.S.C. &sect; 1983(a)(1)"."""
+    section = rng.choice(["&sect;", "§", "&sect;&sect;"])
+    citation = (
+        f"{rng.randint(1, 50)} {rng.choice(CODES)} {section} {rng.randint(1, 9999)}"
+    )
+    if rng.random() < 0.5:
+        citation += f"({rng.choice('abcde')})({rng.randint(1, 9)})"
+    return citation
+
+
+def _sentence(
+    rng: random.Random, footnotes: List[str], vocab_size: int, seed: int
+) -> str:
+    """Return a sentence of words with citations and markup mixed in."""
+    words = _words(rng, rng.randint(8, 30), vocab_size, seed)
+    words[0] = words[0].capitalize()
+    if rng.random() < 0.1:
+        words.insert(rng.randrange(len(words)), "<i>see</i>")
+    if rng.random() < 0.1:
+        words.insert(rng.randrange(1, len(words)), "&mdash;")
+    if rng.random() < 0.05:
+        words.insert(rng.randrange(1, len(words)), "defendant&#39;s")
+    sentence = " ".join(words)
+
+    roll = rng.random()
+    if roll < 0.25:
+        sentence += ", " + _case_citation(rng)
+    elif roll < 0.35:
+        sentence += ". <i>Id.,</i> at " + str(rng.randint(1, 999))
+    elif roll < 0.5:
+        sentence += ", <i>see</i> " + _law_citation(rng)
+    sentence += "."
+
+    roll = rng.random()
+    if roll < 0.05:
+        number = len(footnotes) + 1
+        sentence += (
+            f'<a class="footnote" href="#fn{number}" id="fnref{number}">{number}</a>'
+        )
+        footnotes.append(
+            " ".join(_words(rng, rng.randint(10, 40), vocab_size, seed)).capitalize()
+            + ", "
+            + _case_citation(rng)
+            + "."
+        )
+    elif roll < 0.1:
+        sentence += f"<sup>{rng.randint(1, 99)}</sup>"
+    if rng.random() < 0.03:
+        sentence += f' <span class="star-pagination">*{rng.randint(2, 999)}</span>'
+    return sentence
+
+
+def opinion_html(
+    rng: random.Random, num_paragraphs: int, vocab_size: int, seed: int
+) -> str:
+    """Return the HTML of an opinion with paragraphs and footnotes."""
+    footnotes: List[str] = []
+    paragraphs = [
+        "<p>"
+        + " ".join(
+            _sentence(rng, footnotes, vocab_size, seed)
+            for _ in range(rng.randint(3, 8))
+        )
+        + "</p>"
+        for _ in range(num_paragraphs)
+    ]
+    notes = "".join(
+        f'<div class="footnote" id="fn{number}">'
+        f'<a class="footnote" href="#fnref{number}">{number}</a>'
+        f"<p>{text}</p></div>"
+        for number, text in enumerate(footnotes, start=1)
+    )
+    return (
+        '<div class="opinion">\n'
+        + "\n".join(paragraphs)
+        + f'\n<div class="footnotes">{notes}</div>\n</div>'
+    )
+
+
+def generate_opinion(
+    index: int,
+    num_paragraphs: int = 20,
+    vocab_size: int = DEFAULT_VOCAB_SIZE,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Return the JSON object of the opinion with the given index.
+
+    The number of paragraphs varies between half and one and a half
+    times num_paragraphs.
+    """
+    rng = random.Random(f"opinion:{seed}:{index}")
+    html_text = opinion_html(
+        rng,
+        rng.randint(max(num_paragraphs // 2, 1), max(num_paragraphs * 3 // 2, 1)),
+        vocab_size,
+        seed,
+    )
+    text_field = rng.choices(TEXT_FIELDS, TEXT_FIELD_WEIGHTS)[0]
+    opinion_id = 1000000 + index
+    api = "https://www.courtlistener.com/api/rest/v3"
+    opinion: Dict[str, Any] = {
+        "resource_uri": f"{api}/opinions/{opinion_id}/",
+        "id": opinion_id,
+        "absolute_url": f"/opinion/{opinion_id}/synthetic-v-opinion/",
+        "cluster": f"{api}/clusters/{opinion_id}/",
+        "author": None,
+        "joined_by": [],
+        "per_curiam": rng.random() < 0.1,
+        "date_created": f"20{rng.randint(10, 20)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}T00:00:00Z",
+        "type": "010combined",
+        "sha1": f"{rng.getrandbits(160):040x}",
+        "page_count": rng.randint(1, 60),
+        "download_url": None,
+        "local_path": None,
+        "plain_text": "",
+        "html": "",
+        "html_lawbox": "",
+        "html_columbia": None,
+        "html_with_citations": "",
+        "extracted_by_ocr": False,
+        "opinions_cited": [
+            f"{api}/opinions/{rng.randint(1, 999999)}/"
+            for _ in range(rng.randint(0, 40))
+        ],
+    }
+    opinion[text_field] = html_text
+    return opinion
+
+
+def jurisdictions(count: int) -> List[str]:
+    """Return the first count jurisdiction abbreviations of juris_abbrevs.txt."""
+    return list(abbreviations()[:count])
+
+
+def generate_corpus(
+    data_dir: str,
+    num_docs: int,
+    num_paragraphs: int = 20,
+    num_jurisdictions: int = 4,
+    vocab_size: int = DEFAULT_VOCAB_SIZE,
+    seed: int = 0,
+) -> List[str]:
+    """
+    Write num_docs opinions into jurisdiction directories of data_dir.
+
+    Returns:
+        The paths of the opinion files.
+    """
+    juris_dirs = [
+        os.path.join(data_dir, abbrev) for abbrev in jurisdictions(num_jurisdictions)
+    ]
+    for juris_dir in juris_dirs:
+        os.makedirs(juris_dir, exist_ok=True)
+    paths = []
+    for index in range(num_docs):
+        opinion = generate_opinion(index, num_paragraphs, vocab_size, seed)
+        path = os.path.join(
+            juris_dirs[index % len(juris_dirs)], f"{opinion['id']}.json"
+        )
+        with open(path, "w") as file:
+            json.dump(opinion, file)
+        paths.append(path)
+    return paths
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Generate a synthetic legal corpus")
+    parser.add_argument("--output", required=True, help="Directory to write into")
+    parser.add_argument("--num_docs", default=1000, type=int, help="Number of opinions")
+    parser.add_argument(
+        "--num_paragraphs",
+        default=20,
+        type=int,
+        help="Average number of paragraphs per opinion",
+    )
+    parser.add_argument(
+        "--num_jurisdictions", default=4, type=int, help="Number of jurisdictions"
+    )
+    parser.add_argument(
+        "--vocab_size", default=DEFAULT_VOCAB_SIZE, type=int, help="Number of words"
+    )
+    parser.add_argument("--seed", default=0, type=int, help="Random seed")
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Write a synthetic corpus."""
+    args = parse_arguments()
+    paths = generate_corpus(
+        args.output,
+        args.num_docs,
+        num_paragraphs=args.num_paragraphs,
+        num_jurisdictions=args.num_jurisdictions,
+        vocab_size=args.vocab_size,
+        seed=args.seed,
+    )
+    size = sum(os.path.getsize(path) for path in paths)
+    print(f"Wrote {len(paths)} opinions ({size / 2**20:.1f} MB) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+import logging
+import os
+from typing import Mapping, Optional, Tuple
+
+import numpy as np
+
+from .neighbors import DEFAULT_METRIC, QUERY_BLOCK_SIZE, NearestNeighbors
+from .vocab import CompactVocabulary
+
+"""
+    ann.py
+    --------
+    This module contains an approximate nearest neighbor index for large
+    vocabularies: an inverted file (IVF) index with a k-means coarse
+    quantizer, in pure NumPy. The vectors are clustered into num_lists
+    lists and stored grouped by list; a query is compared with the list
+    centroids and then searched exactly, but only within its num_probes
+    closest lists. num_lists is fixed when the index is built; num_probes
+    can be changed at any time to trade speed for recall (probing every
+    list gives the exact result).
+
+    Indexes are saved next to the model they were built from, as
+    "<model_name>.ivf.npz", and rebuilt when the model is newer.
+"""
+
+# Constants
+INDEX_SUFFIX = ".ivf.npz"  # file name suffix of a saved index
+INDEX_VERSION = 2  # format version of saved indexes
+DEFAULT_NUM_PROBES = 8  # lists searched per query
+KMEANS_ITERATIONS = 20  # Lloyd iterations of the coarse quantizer
+KMEANS_SAMPLE_PER_LIST = 64  # training vectors sampled per list for k-means
+ASSIGN_BLOCK_SIZE = 4096  # vectors assigned to centroids per matrix multiplication
+
+
+def index_file(model_file: str) -> str:
+    """Return the path of the index stored next to a model file."""
+    return os.path.splitext(model_file)[0] + INDEX_SUFFIX
+
+
+def default_num_lists(num_vectors: int) -> int:
+    """Return the default number of lists, about 4 * sqrt(num_vectors)."""
+    return int(min(max(4 * np.sqrt(num_vectors), 1), num_vectors))
+
+
+def nearest_centroids(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Return the index of the nearest centroid of each vector."""
+    squared_norms = np.einsum("ij,ij->i", centroids, centroids)
+    assignments = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), ASSIGN_BLOCK_SIZE):
+        scores = vectors[start : start + ASSIGN_BLOCK_SIZE] @ centroids.T
+        scores *= -2.0
+        scores += squared_norms
+        assignments[start : start + len(scores)] = np.argmin(scores, axis=1)
+    return assignments
+
+
+def kmeans(
+    vectors: np.ndarray,
+    num_clusters: int,
+    iterations: int = KMEANS_ITERATIONS,
+    rng: Optional[np.random.Generator] = None,
+) -> np.ndarray:
+    """
+    Cluster vectors with Lloyd's algorithm and return the centroids.
+
+    Centroids start at randomly chosen vectors; a cluster that becomes
+    empty is restarted at a random vector.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    centroids = vectors[rng.choice(len(vectors), num_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = nearest_centroids(vectors, centroids)
+        sizes = np.bincount(assignments, minlength=num_clusters)
+        order = np.argsort(assignments, kind="stable")
+        filled = sizes > 0
+        starts = np.cumsum(sizes) - sizes
+        centroids[filled] = (
+            np.add.reduceat(vectors[order], starts[filled]) / sizes[filled, None]
+        )
+        empty = ~filled
+        centroids[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+    return centroids
+
+
+class IVFIndex(NearestNeighbors):
+    """
+    Approximate top-K nearest neighbor queries with an inverted file index.
+
+    Example:
+        >>> index = IVFIndex.from_model(model, num_lists=1000)
+        >>> index.num_probes = 16
+        >>> index.query("legal", k=10)
+        >>> index.save(index_file("LeGlove.model"))
+    """
+
+    def __init__(
+        self,
+        word_vectors: np.ndarray,
+        dictionary: Mapping[str, int],
+        metric: str = DEFAULT_METRIC,
+        num_lists: Optional[int] = None,
+        num_probes: int = DEFAULT_NUM_PROBES,
+        iterations: int = KMEANS_ITERATIONS,
+        random_state: Optional[int] = None,
+    ) -> None:
+        super().__init__(word_vectors, dictionary, metric)
+        if num_lists is None:
+            num_lists = default_num_lists(len(self))
+        if not 1 <= num_lists <= len(self):
+            raise ValueError("num_lists must be between 1 and the vocabulary size")
+
+        rng = np.random.default_rng(random_state)
+        sample_size = min(len(self), KMEANS_SAMPLE_PER_LIST * num_lists)
+        sample = self.vectors[rng.choice(len(self), sample_size, replace=False)]
+        logging.info(f"Clustering {sample_size} vectors into {num_lists} lists...")
+        centroids = kmeans(sample, num_lists, iterations, rng)
+        assignments = nearest_centroids(self.vectors, centroids)
+
+        # Store the vectors grouped by list, so each list is a slice
+        order = np.argsort(assignments, kind="stable")
+        rows = np.empty_like(order)
+        rows[order] = np.arange(len(order))
+        offsets = np.zeros(num_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignments, minlength=num_lists), out=offsets[1:])
+        self._set_lists(
+            self.dictionary.renumber(rows[self.dictionary.ids]),
+            self.vectors[order],
+            self.norms[order],
+            centroids,
+            offsets,
+        )
+        self.num_probes = num_probes
+
+    def _set_lists(
+        self,
+        dictionary: CompactVocabulary,
+        vectors: np.ndarray,
+        norms: np.ndarray,
+        centroids: np.ndarray,
+        offsets: np.ndarray,
+    ) -> None:
+        """Set the vectors, grouped by list, and the list structure."""
+        self.dictionary = dictionary
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.norms = norms
+        self._squared_norms = norms * norms
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.offsets = offsets
+        self._centroid_squared_norms = np.einsum(
+            "ij,ij->i", self.centroids, self.centroids
+        )
+
+    @classmethod
+    def from_model(cls, model, metric: str = DEFAULT_METRIC, **kwargs) -> "IVFIndex":
+        """Build the index from a model with word_vectors and a dictionary."""
+        if model.dictionary is None or model.word_vectors is None:
+            raise ValueError("Model must be fit and have a dictionary")
+        return cls(model.word_vectors, model.dictionary, metric, **kwargs)
+
+    @property
+    def num_lists(self) -> int:
+        return len(self.centroids)
+
+    def search(
+        self, queries: np.ndarray, k: int = 10, num_probes: Optional[int] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find approximately the k nearest indexed vectors of each query vector.
+
+        Args:
+            queries: Array of shape (num_queries, dimensions).
+            k: Number of neighbors to return per query.
+            num_probes: Number of lists searched per query. Defaults to
+                self.num_probes.
+
+        Returns:
+            A (num_queries, k) array of row indices of the words and a
+            (num_queries, k) array of their distances, nearest first. If
+            the probed lists hold fewer than k vectors, the remaining
+            entries have index -1 and distance inf.
+        """
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        if num_probes is None:
+            num_probes = self.num_probes
+        num_probes = min(max(num_probes, 1), self.num_lists)
+        queries = np.asarray(queries, dtype=np.float32)
+        if self.metric == "cosine":
+            norms = np.linalg.norm(queries, axis=1, keepdims=True)
+            queries = queries / np.maximum(norms, np.finfo(np.float32).tiny)
+
+        indices = np.full((len(queries), k), -1, dtype=np.int64)
+        distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+        for start in range(0, len(queries), QUERY_BLOCK_SIZE):
+            block = queries[start : start + QUERY_BLOCK_SIZE]
+            scores = block @ self.centroids.T
+            scores *= -2.0
+            scores += self._centroid_squared_norms
+            if num_probes < self.num_lists:
+                probes = np.argpartition(scores, num_probes - 1, axis=1)
+                probes = probes[:, :num_probes]
+            else:
+                probes = np.broadcast_to(np.arange(self.num_lists), scores.shape)
+
+            for offset, (query, lists) in enumerate(zip(block, probes)):
+                bounds = zip(
+                    self.offsets[lists].tolist(), self.offsets[lists + 1].tolist()
+                )
+                rows = np.concatenate([np.arange(begin, end) for begin, end in bounds])
+                found_rows, found_distances = self._search_rows(query, rows, k)
+                indices[start + offset, : len(found_rows)] = found_rows
+                distances[start + offset, : len(found_rows)] = found_distances
+        return indices, distances
+
+    def _search_rows(
+        self, query: np.ndarray, rows: np.ndarray, k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the k nearest of the given rows to one query, nearest first."""
+        scores = self.vectors[rows] @ query
+        if self.metric == "euclidean":
+            scores *= -2.0
+            scores += self._squared_norms[rows]
+        else:
+            np.negative(scores, out=scores)
+        if k < len(rows):
+            rows = rows[np.argpartition(scores, k - 1)[:k]]
+        exact = self._distances(query[None, :], rows[None, :])[0]
+        order = np.argsort(exact, kind="stable")
+        return rows[order], exact[order]
+
+    def save(self, filename: str) -> None:
+        """Save the index as an uncompressed .npz file."""
+        with open(filename, "wb") as file:
+            np.savez(
+                file,
+                version=np.array(INDEX_VERSION),
+                metric=np.array(self.metric),
+                num_probes=np.array(self.num_probes),
+                strings=np.frombuffer(self.dictionary.strings, dtype=np.uint8),
+                word_offsets=self.dictionary.offsets,
+                word_rows=self.dictionary.ids,
+                vectors=self.vectors,
+                norms=self.norms,
+                centroids=self.centroids,
+                offsets=self.offsets,
+            )
+
+    @classmethod
+    def load(cls, filename: str) -> "IVFIndex":
+        """Load an index saved by IVFIndex.save."""
+        with np.load(filename) as data:
+            if int(data["version"]) != INDEX_VERSION:
+                raise ValueError(
+                    f"{filename} has index format version {int(data['version'])}, "
+                    f"expected {INDEX_VERSION}"
+                )
+            instance = cls.__new__(cls)
+            instance.metric = str(data["metric"])
+            instance.num_probes = int(data["num_probes"])
+            instance._set_lists(
+                CompactVocabulary(
+                    data["strings"].tobytes(), data["word_offsets"], data["word_rows"]
+                ),
+                data["vectors"],
+                data["norms"],
+                data["centroids"],
+                data["offsets"],
+            )
+        return instance
+
+
+def load_or_build_index(
+    model_file: str, metric: str = DEFAULT_METRIC, **kwargs
+) -> IVFIndex:
+    """
+    Load the index saved next to a model file, building it if needed.
+
+    The model is read like leglove.vector_store.load_model does, from its
+    exported layout when that is up to date or there is no model file.
+    The index is rebuilt (and saved) if it does not exist, is older than
+    what the model is read from or was built for another metric. Keyword
+    arguments are passed to IVFIndex when building.
+    """
+    # vector_store imports this module
+    from .vector_store import load_model, model_source
+
+    path = index_file(model_file)
+    source = model_source(model_file)
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(source):
+        index = IVFIndex.load(path)
+        if index.metric == metric:
+            return index
+
+    logging.info(f"Building approximate nearest neighbor index {path}...")
+    index = IVFIndex.from_model(load_model(model_file), metric, **kwargs)
+    index.save(path)
+    return index
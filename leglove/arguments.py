@@ -0,0 +1,118 @@
+import argparse
+
+from .cleanup import CLEANUP_BACKENDS, DEFAULT_CLEANUP_BACKEND
+from .cooccurrence import DEFAULT_MEMORY_LIMIT_MB
+from .model import DEFAULT_BATCH_SIZE
+from .quantize import QUANTIZATIONS
+from .tokenizers import DEFAULT_TOKENIZER, TOKENIZERS
+from .train import DEFAULT_TRAINING_BACKEND, TRAINING_BACKENDS
+
+"""
+    arguments.py
+    --------
+    This module holds the command line options shared by the programs
+    that train models, leglove.example and "leglove sharded", so that
+    both accept every option of train_and_save_model that applies to
+    them.
+"""
+
+
+def add_training_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the options of train_and_save_model shared by training commands."""
+    parser.add_argument(
+        "--num_epochs",
+        default=10,
+        type=int,
+        help="Train LeGlove model for this number of epochs",
+    )
+    parser.add_argument(
+        "--parallel_threads",
+        default=1,
+        type=int,
+        help="Number of parallel threads to use for training",
+    )
+    parser.add_argument(
+        "--preprocess_workers",
+        default=1,
+        type=int,
+        help="Number of worker processes to use for cleaning and tokenizing the corpus",
+    )
+    parser.add_argument(
+        "--prefetch",
+        default=0,
+        type=int,
+        help="Number of opinion files to read ahead in background threads "
+        "(0 disables prefetching)",
+    )
+    parser.add_argument(
+        "--cache_dir",
+        default=None,
+        help="Directory of a persistent token cache reused across training runs",
+    )
+    parser.add_argument(
+        "--cleanup_backend",
+        default=DEFAULT_CLEANUP_BACKEND,
+        choices=CLEANUP_BACKENDS,
+        help="HTML parser used to extract paragraph text from opinions",
+    )
+    parser.add_argument(
+        "--tokenizer",
+        default=DEFAULT_TOKENIZER,
+        choices=sorted(TOKENIZERS),
+        help="Word tokenizer used on the cleaned opinion text",
+    )
+    parser.add_argument(
+        "--cooccurrence_memory_mb",
+        default=DEFAULT_MEMORY_LIMIT_MB,
+        type=float,
+        help="Memory budget in MB for co-occurrence counting before spilling to disk",
+    )
+    parser.add_argument(
+        "--cooccurrence_workers",
+        default=1,
+        type=int,
+        help="Number of worker processes to use for counting co-occurrences",
+    )
+    parser.add_argument(
+        "--min_count",
+        default=1,
+        type=int,
+        help="Drop tokens that occur fewer times than this before counting co-occurrences",
+    )
+    parser.add_argument(
+        "--max_vocab_size",
+        default=None,
+        type=int,
+        help="Keep at most this many of the most frequent tokens",
+    )
+    parser.add_argument(
+        "--backend",
+        default=DEFAULT_TRAINING_BACKEND,
+        choices=TRAINING_BACKENDS,
+        help="GloVe trainer: the built-in NumPy trainer or glove-python",
+    )
+    parser.add_argument(
+        "--batch_size",
+        default=DEFAULT_BATCH_SIZE,
+        type=int,
+        help="Co-occurrence entries per minibatch of the NumPy trainer",
+    )
+    parser.add_argument(
+        "--quantization",
+        default=None,
+        choices=QUANTIZATIONS,
+        help="Export the trained vectors as int8 or product quantization codes",
+    )
+    parser.add_argument(
+        "--exclude_jurisdictions",
+        default=None,
+        nargs="+",
+        help="Jurisdictions to leave out: abbreviations of juris_abbrevs.txt, "
+        "groups such as 'circuits' or glob patterns",
+    )
+    parser.add_argument(
+        "--profile",
+        default=None,
+        help="Show training progress and write a JSON report of the time, size and "
+        "peak memory of each pipeline stage to this file",
+    )
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+import struct
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .cleanup import CLEANUP_VERSION
+from .regexes import REGEX_TOKENS, REGEXES
+
+"""
+    cache.py
+    --------
+    This module implements a persistent, content-addressed cache of
+    tokenized opinions. Each opinion file is stored as a compact binary
+    shard of token ids, keyed by the file's path, modification time and
+    size together with a fingerprint of the preprocessing configuration
+    (regexes, placeholder tokens and cleanup code version). Token ids
+    refer to an append-only vocabulary shared by all shards of a cache
+    directory, so retraining runs only need to preprocess files that are
+    new or have changed since the cache was populated.
+"""
+
+# Constants
+CACHE_FORMAT_VERSION = 2  # bumped whenever the shard layout changes
+SHARD_MAGIC = b"LGTC"  # magic bytes at the start of every token shard
+# Magic, flags, number of tokens and vocabulary size the token ids need
+SHARD_HEADER = struct.Struct("<4sIII")
+SHARD_FLAG_HAS_DOCUMENT = 1  # set unless the opinion had no usable text
+VOCABULARY_FILE = "vocabulary.jsonl"  # one JSON-encoded token per line
+SHARD_DIR = "tokens"  # subdirectory holding all token shards
+
+
+def preprocessing_fingerprint(**options: str) -> str:
+    """
+    Return a digest of everything that determines the tokens of an opinion.
+
+    Args:
+        **options: Additional preprocessing options (e.g. backend names)
+            that affect the tokens produced for a file.
+
+    Returns:
+        A hexadecimal digest that changes whenever cached tokens go stale.
+    """
+    state = {
+        "cache_format_version": CACHE_FORMAT_VERSION,
+        "cleanup_version": CLEANUP_VERSION,
+        "regexes": REGEXES,
+        "regex_tokens": REGEX_TOKENS,
+        "options": options,
+    }
+    return hashlib.sha1(json.dumps(state, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class TokenCache:
+    """
+    On-disk cache of tokenized opinion files.
+
+    A cache directory may be shared by many training runs, but only one
+    process may write to it at a time.
+
+    Example:
+        >>> cache = TokenCache("cache/")
+        >>> key = cache.key("data/scotus/opinion.json")
+        >>> if key not in cache:
+        ...     cache.store(key, ["the", "court", "held"])
+        >>> cache.load(key)
+        ['the', 'court', 'held']
+    """
+
+    def __init__(self, cache_dir: str, fingerprint: Optional[str] = None) -> None:
+        self.cache_dir = cache_dir
+        self.fingerprint = fingerprint or preprocessing_fingerprint()
+        self.vocabulary: List[str] = []
+        self.token_ids: Dict[str, int] = {}
+
+        os.makedirs(os.path.join(cache_dir, SHARD_DIR), exist_ok=True)
+        self._vocabulary_path = os.path.join(cache_dir, VOCABULARY_FILE)
+        self._load_vocabulary()
+
+    def _load_vocabulary(self) -> None:
+        """Read the vocabulary, discarding a partially written last line."""
+        if not os.path.exists(self._vocabulary_path):
+            return
+
+        valid_size = 0
+        with open(self._vocabulary_path, "rb") as file:
+            for line in file:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    token = json.loads(line)
+                except ValueError:
+                    break
+                self.token_ids[token] = len(self.vocabulary)
+                self.vocabulary.append(token)
+                valid_size += len(line)
+
+        if valid_size != os.path.getsize(self._vocabulary_path):
+            with open(self._vocabulary_path, "r+b") as file:
+                file.truncate(valid_size)
+
+    def _add_tokens(self, tokens: List[str]) -> None:
+        """Append unseen tokens to the vocabulary and persist them."""
+        new_tokens = []
+        for token in tokens:
+            if token not in self.token_ids:
+                self.token_ids[token] = len(self.vocabulary)
+                self.vocabulary.append(token)
+                new_tokens.append(token)
+
+        if new_tokens:
+            with open(self._vocabulary_path, "a", encoding="utf-8") as file:
+                file.writelines(json.dumps(token) + "\n" for token in new_tokens)
+
+    def _shard_path(self, key: str) -> str:
+        """Return the path of the shard stored under a key."""
+        return os.path.join(self.cache_dir, SHARD_DIR, key[:2], key + ".bin")
+
+    def key(self, file_path: str, stamp: Optional[str] = None) -> str:
+        """
+        Return the cache key of a file in its current state.
+
+        Opinions that are not files of their own (e.g. archive members)
+        pass a stamp that changes whenever they may have changed, instead
+        of the file's modification time and size.
+        """
+        if stamp is None:
+            stat = os.stat(file_path)
+            stamp = f"{stat.st_mtime_ns}\0{stat.st_size}"
+        identity = "\0".join([os.path.abspath(file_path), stamp, self.fingerprint])
+        return hashlib.sha1(identity.encode("utf-8")).hexdigest()
+
+    def __contains__(self, key: str) -> bool:
+        # Only the header is read: it holds everything a shard is checked for
+        try:
+            with open(self._shard_path(key), "rb") as file:
+                header = file.read(SHARD_HEADER.size)
+                size = os.fstat(file.fileno()).st_size
+        except FileNotFoundError:
+            return False
+        return self._valid_header(header, size)
+
+    def _valid_header(self, header: bytes, size: int) -> bool:
+        """Return True if a shard header is intact and matches the shard size."""
+        if len(header) < SHARD_HEADER.size:
+            return False
+        magic, _, num_tokens, vocabulary_size = SHARD_HEADER.unpack_from(header)
+        # Ids beyond the vocabulary belong to a run that died before
+        # persisting its new tokens, so the shard cannot be trusted
+        return (
+            magic == SHARD_MAGIC
+            and size == SHARD_HEADER.size + 4 * num_tokens
+            and vocabulary_size <= len(self.vocabulary)
+        )
+
+    def store(self, key: str, tokens: Optional[List[str]]) -> None:
+        """
+        Store the tokens of a file under the given key.
+
+        Args:
+            key: Cache key returned by key().
+            tokens: Tokens of the opinion, or None if it had no usable text.
+        """
+        if tokens is None:
+            flags, ids = 0, np.zeros(0, dtype="<u4")
+        else:
+            self._add_tokens(tokens)
+            flags = SHARD_FLAG_HAS_DOCUMENT
+            ids = np.array([self.token_ids[token] for token in tokens], dtype="<u4")
+
+        shard_path = self._shard_path(key)
+        os.makedirs(os.path.dirname(shard_path), exist_ok=True)
+        temp_path = f"{shard_path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(
+                SHARD_HEADER.pack(SHARD_MAGIC, flags, len(ids), len(self.vocabulary))
+            )
+            file.write(ids.tobytes())
+        os.replace(temp_path, shard_path)
+
+    def load_ids(self, key: str) -> Optional[np.ndarray]:
+        """
+        Return the token ids stored under a key.
+
+        Returns:
+            A uint32 array of token ids, or None if the file had no usable text.
+
+        Raises:
+            KeyError: If the key is missing or its shard is invalid.
+        """
+        try:
+            with open(self._shard_path(key), "rb") as file:
+                data = file.read()
+        except FileNotFoundError:
+            raise KeyError(key) from None
+
+        if not self._valid_header(data, len(data)):
+            raise KeyError(key)
+        _, flags, _, _ = SHARD_HEADER.unpack_from(data)
+        if not flags & SHARD_FLAG_HAS_DOCUMENT:
+            return None
+        return np.frombuffer(data, dtype="<u4", offset=SHARD_HEADER.size)
+
+    def load(self, key: str) -> Optional[List[str]]:
+        """Return the tokens stored under a key, or None if there is no document."""
+        ids = self.load_ids(key)
+        if ids is None:
+            return None
+        vocabulary = self.vocabulary
+        return [vocabulary[token_id] for token_id in ids.tolist()]
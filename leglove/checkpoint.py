@@ -0,0 +1,215 @@
+import json
+import logging
+import os
+import shutil
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .cooccurrence import CooccurrenceMatrix
+from .cooccurrence_store import CooccurrenceStore, write_store
+from .model import PARAMETERS, GloveModel
+
+"""
+    checkpoint.py
+    --------
+    This module checkpoints training runs, so that a run that dies is
+    resumed where it stopped instead of starting over. A run training
+    "<model_name>.model" keeps its checkpoint in the directory
+    "<model_name>.checkpoint", which contains:
+
+        cooccurrence/    the co-occurrence matrix, the names of the
+                         opinions counted and the options of the run, as
+                         a co-occurrence store (see cooccurrence_store.py),
+                         written once the matrix is built
+        epoch_<n>/       the model after n epochs:
+            header.json          hyperparameters, loss history and the
+                                 shape and dtype of each array
+            <parameter>.bin      raw word vectors, biases and their
+                                 AdaGrad accumulators
+        latest           name of the newest epoch directory
+
+    An epoch directory is written under a temporary name and renamed,
+    and only then is latest replaced to point at it, so a crash at any
+    moment leaves the previous checkpoint readable. Arrays are written
+    as raw buffers rather than pickled, so a checkpoint costs little more
+    than writing the parameters to disk.
+"""
+
+# Constants
+FORMAT_VERSION = 1  # version of the on-disk layout
+CHECKPOINT_SUFFIX = ".checkpoint"  # directory name suffix of a checkpoint
+COOCCURRENCE_DIR = "cooccurrence"
+EPOCH_PREFIX = "epoch_"
+LATEST_FILE = "latest"
+HEADER_FILE = "header.json"
+HYPERPARAMETERS = (
+    "no_components",
+    "learning_rate",
+    "alpha",
+    "max_count",
+    "max_loss",
+    "batch_size",
+    "random_state",
+)
+
+
+def checkpoint_path(model_file: str) -> str:
+    """Return the checkpoint directory of a model file."""
+    return os.path.splitext(model_file)[0] + CHECKPOINT_SUFFIX
+
+
+def _write_synced(path: str, data: Union[bytes, memoryview]) -> None:
+    """Write a file and flush it to disk."""
+    with open(path, "wb") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def save_parameters(model: GloveModel, path: str) -> None:
+    """
+    Write the parameters, optimizer state and loss history of a model
+    to a new directory, as raw arrays and a JSON header.
+    """
+    os.makedirs(path)
+    arrays = {}
+    for name in PARAMETERS:
+        array = np.ascontiguousarray(getattr(model, name))
+        # Written from the array's own buffer, without a copy
+        _write_synced(os.path.join(path, name + ".bin"), array.data)
+        arrays[name] = {"dtype": array.dtype.str, "shape": list(array.shape)}
+    header = {
+        "version": FORMAT_VERSION,
+        "hyperparameters": {name: getattr(model, name) for name in HYPERPARAMETERS},
+        "loss_history": list(model.loss_history),
+        "arrays": arrays,
+    }
+    _write_synced(os.path.join(path, HEADER_FILE), json.dumps(header).encode())
+
+
+def load_parameters(path: str) -> GloveModel:
+    """Return the model written to a directory by save_parameters."""
+    with open(os.path.join(path, HEADER_FILE)) as file:
+        header = json.load(file)
+    if header["version"] != FORMAT_VERSION:
+        raise ValueError(
+            f"{path} has format version {header['version']}, expected {FORMAT_VERSION}"
+        )
+    model = GloveModel(**header["hyperparameters"])
+    for name, spec in header["arrays"].items():
+        array = np.fromfile(os.path.join(path, name + ".bin"), dtype=spec["dtype"])
+        setattr(model, name, array.reshape(spec["shape"]))
+    model.loss_history = list(header["loss_history"])
+    return model
+
+
+class TrainingCheckpoint:
+    """
+    The checkpoint of a training run.
+
+    The options of the run (corpus, preprocessing and training options)
+    are recorded with the co-occurrence matrix, and a run resumes from a
+    checkpoint only if its options are the same.
+
+    Example:
+        >>> checkpoint = TrainingCheckpoint("LeGlove.checkpoint", options, every=2)
+        >>> checkpoint.save_cooccurrence(matrix, documents, window=10)
+        >>> model.fit(matrix, epochs=10, callback=checkpoint.callback(model))
+        >>> checkpoint.load_model().loss_history  # after epochs 2, 4, ..., 10
+    """
+
+    def __init__(self, path: str, options: Dict[str, Any], every: int = 0) -> None:
+        if every < 0:
+            raise ValueError("every must be at least 0")
+        self.path = path
+        self.options = options
+        self.every = every
+
+    @property
+    def cooccurrence_path(self) -> str:
+        return os.path.join(self.path, COOCCURRENCE_DIR)
+
+    def save_cooccurrence(
+        self, matrix: CooccurrenceMatrix, documents: List[str], window: int
+    ) -> None:
+        """Save the co-occurrence matrix of the run and the opinions counted."""
+        os.makedirs(self.path, exist_ok=True)
+        write_store(
+            self.cooccurrence_path,
+            matrix.dictionary,
+            documents,
+            window=window,
+            scale=matrix.scale,
+            options=self.options,
+            matrix=matrix,
+        )
+        logging.info(f"Checkpointed the co-occurrence matrix to {self.path}")
+
+    def load_cooccurrence(self) -> Optional[Tuple[CooccurrenceMatrix, List[str]]]:
+        """
+        Return the saved matrix, memory-mapped, and the opinions counted,
+        or None if no matrix was saved.
+        """
+        try:
+            store = CooccurrenceStore.load(self.cooccurrence_path)
+        except FileNotFoundError:
+            return None
+        # Round trip through JSON, so that tuples compare equal to lists
+        if store.header["options"] != json.loads(json.dumps(self.options)):
+            raise ValueError(
+                f"The checkpoint {self.path} is of a run with other options "
+                f"({store.header['options']}); train without resume, or remove it"
+            )
+        logging.info(f"Resuming with the co-occurrence matrix of {self.path}")
+        return store.matrix(), sorted(store.documents())
+
+    def latest(self) -> Optional[str]:
+        """Return the directory of the newest saved model, if any."""
+        try:
+            with open(os.path.join(self.path, LATEST_FILE)) as file:
+                name = file.read().strip()
+        except FileNotFoundError:
+            return None
+        return os.path.join(self.path, name)
+
+    def save_model(self, model: GloveModel) -> None:
+        """Save the parameters and optimizer state of a model, atomically."""
+        name = f"{EPOCH_PREFIX}{len(model.loss_history)}"
+        path = os.path.join(self.path, name)
+        temporary = path + ".tmp"
+        shutil.rmtree(temporary, ignore_errors=True)
+        save_parameters(model, temporary)
+        shutil.rmtree(path, ignore_errors=True)
+        os.rename(temporary, path)
+
+        latest = os.path.join(self.path, LATEST_FILE)
+        _write_synced(latest + ".tmp", name.encode())
+        os.replace(latest + ".tmp", latest)
+
+        for entry in os.listdir(self.path):
+            if entry.startswith(EPOCH_PREFIX) and entry != name:
+                shutil.rmtree(os.path.join(self.path, entry), ignore_errors=True)
+        logging.info(f"Checkpointed epoch {len(model.loss_history)} to {self.path}")
+
+    def load_model(self) -> Optional[GloveModel]:
+        """Return the newest saved model, or None if none was saved."""
+        path = self.latest()
+        if path is None:
+            return None
+        model = load_parameters(path)
+        logging.info(f"Resuming from epoch {len(model.loss_history)} of {path}")
+        return model
+
+    def callback(self, model: GloveModel) -> Callable[[int, float], None]:
+        """Return a GloveModel.fit callback saving model every self.every epochs."""
+
+        def save_epoch(epoch: int, loss: float) -> None:
+            if self.every and (epoch + 1) % self.every == 0:
+                self.save_model(model)
+
+        return save_epoch
+
+    def clear(self) -> None:
+        """Remove the checkpoint."""
+        shutil.rmtree(self.path, ignore_errors=True)
@@ -1,10 +1,100 @@
 import html
 import json
 import re
-from typing import Any, Dict
+from html.parser import HTMLParser
+from json.decoder import scanstring
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import bs4
 
+try:
+    import lxml.etree
+    import lxml.html
+except ImportError:
+    lxml = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Version of the cleanup code, bumped whenever extract_text output changes
+CLEANUP_VERSION = 3
+
+# Backends available to clean_html, from fastest to most faithful to browsers
+CLEANUP_BACKENDS: Tuple[str, ...] = ("html.parser", "lxml", "html5lib")
+DEFAULT_CLEANUP_BACKEND = "html5lib"
+
+# Opinion fields holding its text, in the order extract_html prefers them
+HTML_FIELDS: Tuple[str, ...] = (
+    "html_with_citations",
+    "html_lawbox",
+    "html",
+    "html_columbia",
+    "plain_text",
+)
+KEY_SEPARATOR_REGEX = re.compile(r"\s*:\s*")
+
+# Start tags that implicitly close an open paragraph in the HTML5 tree
+# construction algorithm (tables are excluded, as opinions parse in quirks mode)
+PARAGRAPH_CLOSING_TAGS = frozenset(
+    [
+        "address",
+        "article",
+        "aside",
+        "blockquote",
+        "center",
+        "details",
+        "dialog",
+        "dir",
+        "div",
+        "dl",
+        "dd",
+        "dt",
+        "fieldset",
+        "figcaption",
+        "figure",
+        "footer",
+        "form",
+        "h1",
+        "h2",
+        "h3",
+        "h4",
+        "h5",
+        "h6",
+        "header",
+        "hgroup",
+        "hr",
+        "li",
+        "listing",
+        "main",
+        "menu",
+        "nav",
+        "ol",
+        "p",
+        "plaintext",
+        "pre",
+        "section",
+        "summary",
+        "ul",
+        "xmp",
+    ]
+)
+
+# Elements whose content html5lib reads as text up to their end tag,
+# decoding entities in it (RCDATA) or not (raw text). <noscript> is parsed
+# as markup, as html5lib parses with scripting disabled
+RCDATA_TAGS = frozenset(["textarea", "title"])
+RAW_TEXT_TAGS = frozenset(["iframe", "noembed", "noframes", "script", "style", "xmp"])
+
+# Start tags that end a <select>; html5lib ignores all others inside one
+SELECT_ENDING_TAGS = frozenset(["input", "keygen", "select", "textarea"])
+
+HEADING_TAGS = ("h1", "h2", "h3", "h4", "h5", "h6")
+
+# List items, each closing the open items of the tags it maps to
+LIST_ITEM_TAGS = {"li": ("li",), "dd": ("dd", "dt"), "dt": ("dd", "dt")}
+
 
 def read_file(file_path: str) -> str:
     """Return the contents of a file as a string."""
@@ -12,6 +102,22 @@ def read_file(file_path: str) -> str:
         return file.read()
 
 
+def read_bytes(file_path: str) -> bytes:
+    """Return the contents of a file as bytes."""
+    with open(file_path, "rb") as file:
+        return file.read()
+
+
+def _loads(json_data: Union[str, bytes]) -> Any:
+    """Parse JSON with orjson when it is installed, else with the json module."""
+    if orjson is not None:
+        try:
+            return orjson.loads(json_data)
+        except orjson.JSONDecodeError:
+            pass  # e.g. lone surrogate escapes, which the json module accepts
+    return json.loads(json_data)
+
+
 def extract_html(json_object: Dict[str, Any]) -> str:
     """Extract primary HTML content from a judicial opinion JSON object."""
     if json_object["html_with_citations"]:
@@ -26,6 +132,60 @@ def extract_html(json_object: Dict[str, Any]) -> str:
         return json_object["plain_text"]
 
 
+def _field_value_start(text: str, field: str) -> Optional[int]:
+    """
+    Return the index at which the value of a field starts, or None if the
+    field is missing or its key occurs more than once.
+    """
+    key = f'"{field}"'
+    start = text.rfind(key)
+    # A preceding backslash means the match is the end of another key
+    if start <= 0 or text[start - 1] == "\\" or text.find(key, 0, start) != -1:
+        return None
+    separator = KEY_SEPARATOR_REGEX.match(text, start + len(key))
+    return None if separator is None else separator.end()
+
+
+def _scan_html(text: str) -> Optional[str]:
+    """
+    Return extract_html of the JSON of an opinion by decoding only the
+    selected field, or None if the scan cannot read it unambiguously
+    (e.g. repeated keys or non-string values).
+    """
+    for field in HTML_FIELDS:
+        start = _field_value_start(text, field)
+        if start is None:
+            return None
+        if field != "plain_text" and text.startswith("null", start):
+            continue
+        if not text.startswith('"', start):
+            return None
+        value, _ = scanstring(text, start + 1)
+        if value or field == "plain_text":
+            return value
+    return None
+
+
+def extract_html_from_json(json_data: Union[str, bytes]) -> str:
+    """
+    Return extract_html of the JSON of an opinion.
+
+    With orjson installed, the JSON is parsed in full by orjson, which is
+    faster than any scan in Python. Otherwise the keys of the text fields
+    are found with substring searches and only the selected string is
+    unescaped; the other fields, including the metadata, are never parsed.
+    """
+    if orjson is None:
+        try:
+            text = json_data.decode() if isinstance(json_data, bytes) else json_data
+            raw_html = _scan_html(text)
+        except ValueError:
+            raw_html = None  # undecodable text, reported by the full parse below
+        if raw_html is not None:
+            return raw_html
+    return extract_html(_loads(json_data))
+
+
 def is_well_formatted(html: str) -> bool:
     """Return True if HTML is non-empty, starts with a tag, and isn't preformatted."""
     return (
@@ -35,8 +195,234 @@ def is_well_formatted(html: str) -> bool:
     )
 
 
-def clean_html(html_content: str) -> str:
-    """Remove metadata from opinion HTML and extract paragraph text."""
+class _TextParser(HTMLParser):
+    """HTMLParser reading the content of RCDATA and raw text elements as text."""
+
+    CDATA_CONTENT_ELEMENTS = tuple(sorted(RCDATA_TAGS | RAW_TEXT_TAGS))
+    RCDATA_CONTENT_ELEMENTS = ()  # read raw too by Pythons that support it
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+
+    def close(self) -> None:
+        super().close()
+        if self.cdata_elem is not None and self.rawdata:
+            # An unterminated element runs to the end of the document, but
+            # some Python versions drop its content
+            data, self.rawdata = self.rawdata, ""
+            self.handle_data(data)
+            self.clear_cdata_mode()
+
+
+class _ParagraphCollector(_TextParser):
+    """
+    Single-pass HTML parser collecting paragraph text outside <sup> tags.
+
+    It emulates the html5lib cleanup, which parses the document, removes
+    its <sup> tags, decodes the serialized tree and parses that again:
+    entities are decoded twice, and text that decodes to markup (e.g.
+    "&lt;p&gt;") is parsed as markup too, with the exception of <sup>
+    tags, which the second parse keeps.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.paragraphs: List[str] = []
+        self._paragraph: List[str] = []
+        self._in_paragraph = False
+        self._paragraph_in_sup = False  # paragraph lies inside a removed <sup>
+        self._paragraph_sup_depth = 0  # <sup> tags opened inside the paragraph
+        self._outer_sup_depth = 0  # <sup> tags opened outside any paragraph
+        # Open paragraph closing elements, with the <sup> depth outside them
+        self._open_blocks: List[Tuple[str, int]] = []
+        self._in_select = False
+        self._in_plaintext = False  # the rest of the document is plain text
+        self._decoded = False  # handling markup decoded from text
+        self._source_paragraph = False  # paragraph open in the first parse
+
+    def _close_paragraph(self) -> None:
+        if not self._paragraph_in_sup:
+            self.paragraphs.append("".join(self._paragraph))
+        self._paragraph = []
+        self._in_paragraph = False
+        self._paragraph_sup_depth = 0
+
+    def handle_starttag(self, tag: str, attrs: Any) -> None:
+        if self._in_plaintext or (tag == "sup" and self._decoded):
+            return
+        if self._in_select:
+            if tag not in SELECT_ENDING_TAGS:
+                return
+            self._in_select = False
+            if tag == "select":
+                return
+        if tag in PARAGRAPH_CLOSING_TAGS:
+            if self._in_paragraph:
+                self._close_paragraph()
+            if not self._decoded:
+                self._source_paragraph = tag == "p"
+        if tag in LIST_ITEM_TAGS:
+            # A list item closes the open one, unless other blocks are between
+            for index in range(len(self._open_blocks) - 1, -1, -1):
+                name = self._open_blocks[index][0]
+                if name in LIST_ITEM_TAGS[tag]:
+                    self._close_block(index)
+                    break
+                if name not in ("address", "div"):
+                    break
+        if tag == "p":
+            self._in_paragraph = True
+            self._paragraph_in_sup = self._outer_sup_depth > 0
+        elif tag == "sup":
+            if self._in_paragraph:
+                self._paragraph_sup_depth += 1
+            else:
+                self._outer_sup_depth += 1
+        elif tag == "select":
+            self._in_select = True
+        elif tag == "plaintext":
+            self._in_plaintext = True
+        elif tag in PARAGRAPH_CLOSING_TAGS and tag != "hr":
+            self._open_blocks.append((tag, self._outer_sup_depth))
+
+    def handle_startendtag(self, tag: str, attrs: Any) -> None:
+        # Self-closing syntax is ignored on non-void elements, as in browsers
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag: str) -> None:
+        if self._in_plaintext or (tag == "sup" and self._decoded):
+            return
+        if self._in_select:
+            self._in_select = tag != "select"
+            return
+        if tag == "p":
+            if self._in_paragraph and (self._decoded or self._source_paragraph):
+                self._close_paragraph()
+            elif not self._outer_sup_depth:
+                # A stray </p> produces an empty paragraph, in the first
+                # parse even if decoded markup opened one for the second
+                if self._in_paragraph:
+                    self._close_paragraph()
+                self.paragraphs.append("")
+            if not self._decoded:
+                self._source_paragraph = False
+        elif tag in PARAGRAPH_CLOSING_TAGS:
+            # End tags of elements that are not open are ignored
+            names = HEADING_TAGS if tag in HEADING_TAGS else (tag,)
+            opened = [
+                index
+                for index, (name, _) in enumerate(self._open_blocks)
+                if name in names
+            ]
+            if opened:
+                self._close_block(opened[-1])
+        elif tag == "sup":
+            if self._in_paragraph:
+                if self._paragraph_sup_depth:
+                    self._paragraph_sup_depth -= 1
+            elif self._outer_sup_depth > self._block_sup_depth():
+                # </sup> only closes a <sup> inside the innermost block
+                self._outer_sup_depth -= 1
+
+    def _close_block(self, index: int) -> None:
+        """Close an open block and everything opened inside it."""
+        _, sup_depth = self._open_blocks[index]
+        del self._open_blocks[index:]
+        self._outer_sup_depth = min(self._outer_sup_depth, sup_depth)
+        if self._in_paragraph:
+            self._close_paragraph()
+        if not self._decoded:
+            self._source_paragraph = False
+
+    def _block_sup_depth(self) -> int:
+        return self._open_blocks[-1][1] if self._open_blocks else 0
+
+    def set_cdata_mode(self, *args: Any, **kwargs: Any) -> None:
+        # html5lib ignores these elements inside a <select>, all but <script>
+        if not self._in_select or args[0] == "script":
+            super().set_cdata_mode(*args, **kwargs)
+
+    def _parse_decoded(self, markup: str) -> None:
+        """Handle markup decoded from text, as the second html5lib parse does."""
+        self._decoded = True
+        try:
+            parser = _DecodedMarkup(self)
+            parser.feed(markup)
+            parser.close()
+        finally:
+            self._decoded = False
+
+    def handle_data(self, data: str) -> None:
+        if self._decoded:
+            self._add_text(data)
+        elif self._in_plaintext or self._paragraph_sup_depth or self._outer_sup_depth:
+            pass  # removed before its markup could be decoded
+        elif self.cdata_elem is not None:
+            # Decoded between the two html5lib parses, the second of which
+            # ends the element at the first end tag in the decoded text
+            data = html.unescape(data)
+            end = re.search(rf"</{self.cdata_elem}[\t\n\f />]", data, re.IGNORECASE)
+            text = data if end is None else data[: end.start()]
+            self._add_text(
+                html.unescape(text) if self.cdata_elem in RCDATA_TAGS else text
+            )
+            if end is not None:
+                self._parse_decoded(data[end.start() :])
+        elif "<" in data:
+            self._parse_decoded(data)
+        else:
+            self._add_text(html.unescape(data) if "&" in data else data)
+
+    def _add_text(self, text: str) -> None:
+        if self._in_paragraph and not self._paragraph_sup_depth:
+            self._paragraph.append(text)
+
+    def close(self) -> None:
+        super().close()
+        if self._in_paragraph:
+            self._close_paragraph()
+
+
+class _DecodedMarkup(_TextParser):
+    """Parses markup decoded from text, handing it to a _ParagraphCollector."""
+
+    def __init__(self, collector: _ParagraphCollector) -> None:
+        super().__init__()
+        self.collector = collector
+
+    def handle_starttag(self, tag: str, attrs: Any) -> None:
+        self.collector.handle_starttag(tag, attrs)
+
+    def handle_startendtag(self, tag: str, attrs: Any) -> None:
+        self.collector.handle_startendtag(tag, attrs)
+
+    def handle_endtag(self, tag: str) -> None:
+        self.collector.handle_endtag(tag)
+
+    def handle_data(self, data: str) -> None:
+        if self.cdata_elem is not None:
+            data = html.unescape(data) if self.cdata_elem in RCDATA_TAGS else data
+        self.collector.handle_data(data)
+
+
+def _normalize_html(html_content: str) -> str:
+    """
+    Apply the entity decoding and newline normalization of the html5lib path.
+
+    The reference cleanup serializes the parsed tree and unescapes it before
+    parsing it again, so entities are effectively decoded twice: once here
+    and once by the parser itself.
+    """
+    return html.unescape(_normalize_newlines(html_content))
+
+
+def _normalize_newlines(html_content: str) -> str:
+    """Normalize newlines as the HTML parsing algorithm does."""
+    return html_content.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def _clean_html_html5lib(html_content: str) -> str:
+    """Reference cleanup: two html5lib parses with serialization in between."""
     soup = bs4.BeautifulSoup(html_content, "html5lib")
 
     for tag in soup.find_all("sup"):
@@ -48,11 +434,76 @@ def clean_html(html_content: str) -> str:
     return "\n\n".join(paragraphs)
 
 
-def extract_text(file_path: str) -> str:
+def _clean_html_stdlib(html_content: str) -> str:
+    """Single-pass cleanup built on the standard library's html.parser."""
+    collector = _ParagraphCollector()
+    collector.feed(_normalize_newlines(html_content))
+    collector.close()
+    return "\n\n".join(collector.paragraphs)
+
+
+def _clean_html_lxml(html_content: str) -> str:
+    """Single-pass cleanup built on lxml's libxml2 HTML parser."""
+    if lxml is None:
+        raise ImportError(
+            "lxml is required for the lxml cleanup backend. Install with: uv sync --extra fast"
+        )
+    try:
+        root = lxml.html.document_fromstring(_normalize_html(html_content))
+    except lxml.etree.ParserError:
+        return ""
+
+    lxml.etree.strip_elements(root, "sup", with_tail=False)
+    paragraphs = [paragraph.text_content() for paragraph in root.iter("p")]
+    return "\n\n".join(paragraphs)
+
+
+def clean_html(html_content: str, backend: str = DEFAULT_CLEANUP_BACKEND) -> str:
+    """
+    Remove metadata from opinion HTML and extract paragraph text.
+
+    Args:
+        html_content: Raw opinion HTML.
+        backend: One of CLEANUP_BACKENDS. "html.parser" and "lxml" parse the
+            document once; "html5lib" is the slower reference implementation
+            that parses the document twice, and the default. "html.parser"
+            emulates the paragraph handling of html5lib, including its
+            second parse of escaped markup, but not where that parse reads
+            across the markup of the first: a decoded "<" followed by a
+            letter opens a tag that html5lib closes at the next ">" of the
+            serialized document ("a&lt;b then</p>" loses " then"), and the
+            end tags that serialization adds to unclosed elements are not
+            parsed again ("<p>a&lt;/p&gt;" loses the empty paragraph after
+            "a"). Neither is the reordering of content misplaced in tables
+            emulated. "lxml" follows libxml2's error recovery and may differ
+            on malformed markup.
+
+    Returns:
+        The text of all paragraphs outside <sup> tags, separated by blank lines.
+    """
+    if backend == "html.parser":
+        return _clean_html_stdlib(html_content)
+    elif backend == "lxml":
+        return _clean_html_lxml(html_content)
+    elif backend == "html5lib":
+        return _clean_html_html5lib(html_content)
+    else:
+        raise ValueError(
+            f"Unknown cleanup backend {backend!r}, expected one of {CLEANUP_BACKENDS}"
+        )
+
+
+def extract_text(file_path: str, backend: str = DEFAULT_CLEANUP_BACKEND) -> str:
     """Extract cleaned plain text from a judicial opinion JSON file."""
-    json_object = json.loads(read_file(file_path))
-    raw_html = extract_html(json_object)
+    return extract_text_from_json(read_bytes(file_path), backend=backend)
+
+
+def extract_text_from_json(
+    json_data: Union[str, bytes], backend: str = DEFAULT_CLEANUP_BACKEND
+) -> str:
+    """Extract cleaned plain text from the JSON of a judicial opinion."""
+    raw_html = extract_html_from_json(json_data)
     if is_well_formatted(raw_html):
-        return clean_html(raw_html)
+        return clean_html(raw_html, backend=backend)
     else:
         return ""
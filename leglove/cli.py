@@ -0,0 +1,40 @@
+import logging
+import sys
+from typing import Callable, Dict, Optional, Sequence
+
+from . import documents, incremental, serve, sharded
+
+"""
+    cli.py
+    --------
+    This module is the "leglove" command, which dispatches to the main
+    function of a subcommand:
+
+        leglove serve --model LeGlove.model     serve a model over HTTP
+        leglove embed --data_dir data/          embed whole opinions
+        leglove update --data_dir data/         add new opinions to a model
+        leglove sharded --data_dir data/        train one model per jurisdiction group
+
+    It is installed as a console script and can also be run with
+    "python -m leglove".
+"""
+
+# Constants
+COMMANDS: Dict[str, Callable[[Optional[Sequence[str]]], None]] = {
+    "serve": serve.main,
+    "embed": documents.main,
+    "update": incremental.main,
+    "sharded": sharded.main,
+}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Run the subcommand named by the first argument."""
+    if argv is None:
+        argv = sys.argv[1:]
+    if not argv or argv[0] not in COMMANDS:
+        names = ", ".join(sorted(COMMANDS))
+        sys.exit(f"usage: leglove {{{names}}} [options]")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    COMMANDS[argv[0]](argv[1:])
@@ -0,0 +1,601 @@
+import logging
+import multiprocessing
+import os
+import queue
+import shutil
+import tempfile
+from functools import partial
+from math import gcd
+from typing import Any, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from .parallel import PENDING_CHUNKS_PER_WORKER, tree_reduce
+
+"""
+    cooccurrence.py
+    --------
+    This module builds the sparse word-word co-occurrence matrix that
+    GloVe is trained on, as a bounded-memory replacement for
+    glove.Corpus.fit. Documents are mapped to token ids and buffered;
+    each full buffer is turned into (word, context) pairs with one
+    vectorized pass per window offset, then sorted and summed. Once the
+    accumulated pairs exceed the memory budget they are spilled to disk
+    as sorted shards, which are combined by a blockwise k-way merge at
+    the end, so peak memory does not grow with the size of the corpus.
+
+    With several workers, the calling process maps tokens to ids and
+    deals the documents out to worker processes, each of which counts a
+    partial matrix over the shared dictionary. The partial matrices are
+    then merged pairwise in a tree reduction.
+
+    The matrix follows glove-python's conventions: word ids are assigned
+    in order of first occurrence, a pair of words at distance d adds 1/d,
+    pairs of identical words are skipped and only the upper triangle
+    (row < column) is stored. Counts are accumulated as integers in
+    units of 1/lcm(1, ..., window), so the result does not depend on the
+    order in which pairs are summed. That unit shrinks quickly as the
+    window grows, so windows are limited to MAX_WINDOW: at 20 words, a
+    pair can still reach a weight of about 4e10 before its int64 count
+    overflows, while at 25 words it could wrap at about 3e8.
+"""
+
+# Constants
+DEFAULT_WINDOW = 10  # default length of the (symmetric) context window
+MAX_WINDOW = 20  # longest window whose int64 counts cannot overflow in practice
+DEFAULT_MEMORY_LIMIT_MB = 1024  # default memory budget for pair accumulation
+ENTRY_BYTES = 48  # approximate bytes per pair, including sort temporaries
+ID_BITS = 32  # pairs are packed into int64 keys as (row << ID_BITS) | column
+ID_MASK = (1 << ID_BITS) - 1
+PADDING_ID = -1  # separates buffered documents so no pair spans two of them
+KEYS_SUFFIX = "_keys.bin"  # raw int64 keys of a sorted shard
+COUNTS_SUFFIX = "_counts.bin"  # raw int64 counts of a sorted shard
+CHUNK_TOKENS = 2**18  # tokens sent to a counting worker at once
+
+
+def check_window(window: int) -> None:
+    """Raise a ValueError if counts cannot be accumulated for a window."""
+    if window < 1:
+        raise ValueError("window must be at least 1")
+    if window > MAX_WINDOW:
+        raise ValueError(
+            f"window must be at most {MAX_WINDOW}, as counts in units of "
+            f"1/lcm(1, ..., {window}) could overflow int64"
+        )
+
+
+def count_scale(window: int) -> int:
+    """Return the number of count units per unit of co-occurrence weight."""
+    scale = 1
+    for distance in range(2, window + 1):
+        scale = scale * distance // gcd(scale, distance)
+    return scale
+
+
+def token_ids(
+    dictionary: Mapping[str, int], tokens: List[str], grow: bool = True
+) -> np.ndarray:
+    """
+    Map tokens to ids.
+
+    If grow is True, unseen tokens are assigned the next free id;
+    otherwise they are mapped to PADDING_ID, so they keep their position
+    in the window but pair with nothing (glove-python's ignore_missing).
+    """
+    if grow:
+        assert isinstance(dictionary, dict)
+        ids = [dictionary.setdefault(token, len(dictionary)) for token in tokens]
+    else:
+        ids = [dictionary.get(token, PADDING_ID) for token in tokens]
+    return np.array(ids, dtype=np.int64)
+
+
+def _reduce_pairs(
+    keys: np.ndarray, counts: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Sort pairs by key and sum the counts of duplicate keys."""
+    if len(keys) == 0:
+        return keys, counts
+    order = np.argsort(keys)
+    keys = keys[order]
+    counts = counts[order]
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    return keys[starts], np.add.reduceat(counts, starts)
+
+
+def window_pairs(
+    ids: np.ndarray, window: int, scale: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return the packed keys and counts of all pairs within a window.
+
+    Args:
+        ids: Token ids, with PADDING_ID marking positions that pair with nothing.
+        window: Maximum distance between paired tokens.
+        scale: Count units per unit of weight, see count_scale().
+
+    Returns:
+        Unsorted (keys, counts) arrays with one entry per co-occurring pair.
+    """
+    keys = []
+    counts = []
+    for distance in range(1, min(window, len(ids) - 1) + 1):
+        left = ids[:-distance]
+        right = ids[distance:]
+        mask = (left != right) & (left != PADDING_ID) & (right != PADDING_ID)
+        left = left[mask]
+        right = right[mask]
+        keys.append((np.minimum(left, right) << ID_BITS) | np.maximum(left, right))
+        counts.append(np.full(len(left), scale // distance, dtype=np.int64))
+
+    if not keys:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(keys), np.concatenate(counts)
+
+
+def renumber_pairs(
+    keys: np.ndarray, counts: np.ndarray, ids: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Map the word ids of packed pairs to new ids and sort the pairs again.
+
+    Args:
+        keys: Packed keys of the pairs.
+        counts: Counts of the pairs.
+        ids: New id of each old id, or a negative id for words to drop.
+            Pairs with a dropped word are dropped too, as if the word had
+            been missing from a fixed dictionary when counting. Kept ids
+            must be distinct.
+
+    Returns:
+        The sorted (keys, counts) of the kept pairs.
+    """
+    rows = ids[np.asarray(keys) >> ID_BITS]
+    cols = ids[np.asarray(keys) & ID_MASK]
+    kept = (rows >= 0) & (cols >= 0)
+    rows = rows[kept]
+    cols = cols[kept]
+    keys = (np.minimum(rows, cols) << ID_BITS) | np.maximum(rows, cols)
+    order = np.argsort(keys)
+    return keys[order], np.asarray(counts)[kept][order]
+
+
+def save_pairs(shard: str, keys: np.ndarray, counts: np.ndarray) -> None:
+    """Write sorted keys and counts to the raw int64 files of a shard."""
+    keys.astype(np.int64, copy=False).tofile(shard + KEYS_SUFFIX)
+    counts.astype(np.int64, copy=False).tofile(shard + COUNTS_SUFFIX)
+
+
+def load_pairs(shard: str, mmap: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """Read the keys and counts of a shard, optionally memory-mapped."""
+    arrays = []
+    for suffix in (KEYS_SUFFIX, COUNTS_SUFFIX):
+        path = shard + suffix
+        if mmap and os.path.getsize(path):
+            arrays.append(np.memmap(path, dtype=np.int64, mode="r"))
+        else:
+            arrays.append(np.fromfile(path, dtype=np.int64))
+    return arrays[0], arrays[1]
+
+
+def remove_pairs(shard: str) -> None:
+    """Delete the files of a shard."""
+    for suffix in (KEYS_SUFFIX, COUNTS_SUFFIX):
+        os.remove(shard + suffix)
+
+
+def merge_pair_shards(shards: List[str], output: str, max_entries: int) -> None:
+    """
+    Merge sorted shards into one, summing the counts of duplicate keys.
+
+    Shards are read through memory maps in blocks, so at most about
+    max_entries pairs are held in memory at once.
+
+    Args:
+        shards: Shards written by save_pairs, each sorted by key.
+        output: Shard to write the merged pairs to.
+        max_entries: Approximate number of pairs to hold in memory.
+    """
+    arrays = [load_pairs(shard, mmap=True) for shard in shards]
+    block_size = max(max_entries // max(len(arrays), 1), 1)
+    positions = [0] * len(arrays)
+
+    with open(output + KEYS_SUFFIX, "wb") as keys_file, open(
+        output + COUNTS_SUFFIX, "wb"
+    ) as counts_file:
+        while True:
+            blocks = []
+            threshold = None
+            for index, (keys, counts) in enumerate(arrays):
+                start = positions[index]
+                if start == len(keys):
+                    continue
+                stop = min(start + block_size, len(keys))
+                block_keys = np.asarray(keys[start:stop])
+                blocks.append((index, block_keys, counts[start:stop]))
+                # Keys beyond the last key of an unfinished block may
+                # still appear in that shard, so they wait for later
+                if stop < len(keys):
+                    last = int(block_keys[-1])
+                    threshold = last if threshold is None else min(threshold, last)
+            if not blocks:
+                break
+
+            merged_keys = []
+            merged_counts = []
+            for index, block_keys, block_counts in blocks:
+                if threshold is None:
+                    take = len(block_keys)
+                else:
+                    take = int(np.searchsorted(block_keys, threshold, side="right"))
+                merged_keys.append(block_keys[:take])
+                merged_counts.append(np.asarray(block_counts[:take]))
+                positions[index] += take
+
+            keys, counts = _reduce_pairs(
+                np.concatenate(merged_keys), np.concatenate(merged_counts)
+            )
+            keys_file.write(keys.tobytes())
+            counts_file.write(counts.tobytes())
+
+
+class CooccurrenceMatrix:
+    """
+    Sparse, upper triangular co-occurrence matrix and its dictionary.
+
+    Entries are sorted by (row, column). Counts are stored as integers in
+    units of 1/scale; values holds the corresponding float weights.
+    """
+
+    def __init__(
+        self,
+        dictionary: Mapping[str, int],
+        rows: np.ndarray,
+        cols: np.ndarray,
+        counts: np.ndarray,
+        scale: int,
+    ) -> None:
+        self.dictionary = dictionary
+        self.rows = rows
+        self.cols = cols
+        self.counts = counts
+        self.scale = scale
+
+    @classmethod
+    def from_keys(
+        cls,
+        dictionary: Mapping[str, int],
+        keys: np.ndarray,
+        counts: np.ndarray,
+        scale: int,
+    ) -> "CooccurrenceMatrix":
+        """Build a matrix from sorted packed keys and their counts."""
+        rows = (keys >> ID_BITS).astype(np.int32)
+        cols = (keys & ID_MASK).astype(np.int32)
+        return cls(dictionary, rows, cols, counts, scale)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return (len(self.dictionary), len(self.dictionary))
+
+    @property
+    def nnz(self) -> int:
+        return len(self.counts)
+
+    @property
+    def values(self) -> np.ndarray:
+        """Co-occurrence weights as float64, as glove-python computes them."""
+        return self.counts / self.scale
+
+    def to_coo(self):
+        """Return the matrix as a scipy.sparse.coo_matrix, as glove.Glove.fit expects."""
+        from scipy.sparse import coo_matrix
+
+        return coo_matrix((self.values, (self.rows, self.cols)), shape=self.shape)
+
+
+class CooccurrenceBuilder:
+    """
+    Accumulates co-occurrence counts within a fixed memory budget.
+
+    Example:
+        >>> builder = CooccurrenceBuilder(window=2)
+        >>> builder.add_document(["the", "court", "held"])
+        >>> matrix = builder.build()
+        >>> matrix.dictionary
+        {'the': 0, 'court': 1, 'held': 2}
+        >>> matrix.values.tolist()
+        [1.0, 0.5, 1.0]
+    """
+
+    def __init__(
+        self,
+        window: int = DEFAULT_WINDOW,
+        memory_limit_mb: float = DEFAULT_MEMORY_LIMIT_MB,
+        spill_dir: Optional[str] = None,
+        dictionary: Optional[Mapping[str, int]] = None,
+    ) -> None:
+        check_window(window)
+
+        self.window = window
+        self.scale = count_scale(window)
+        # A dictionary given up front is fixed; other tokens are ignored
+        self.dictionary: Mapping[str, int] = {} if dictionary is None else dictionary
+        self._grow = dictionary is None
+
+        # Half of the budget holds accumulated pairs, the other half the
+        # pairs generated from one buffer of tokens
+        max_entries = max(int(memory_limit_mb * 2**20) // ENTRY_BYTES, 2 * window)
+        self._max_entries = max_entries // 2
+        self._buffer_tokens = max(self._max_entries // window, 1)
+
+        self._buffer: List[np.ndarray] = []
+        self._buffered = 0
+        self._keys = np.zeros(0, dtype=np.int64)
+        self._counts = np.zeros(0, dtype=np.int64)
+
+        self._spill_parent = spill_dir
+        self._spill_dir: Optional[str] = None
+        self._shards: List[str] = []
+        self.num_spills = 0  # number of shards written to disk so far
+
+    def add_document(self, tokens: List[str]) -> None:
+        """Add the pairs of one tokenized document, mapping tokens to ids."""
+        self.add_ids(token_ids(self.dictionary, tokens, self._grow))
+
+    def add_ids(self, ids: np.ndarray) -> None:
+        """Add the pairs of one document already mapped to dictionary ids."""
+        if len(ids) < 2:
+            return
+        self._buffer.append(ids.astype(np.int64, copy=False))
+        self._buffer.append(np.full(self.window, PADDING_ID, dtype=np.int64))
+        self._buffered += len(ids) + self.window
+        if self._buffered >= self._buffer_tokens:
+            self._flush()
+
+    @property
+    def num_entries(self) -> int:
+        """Number of pairs held in memory, counting window pairs per buffered token."""
+        return len(self._keys) + self._buffered * self.window
+
+    def fit(self, corpus: Iterable[List[str]]) -> "CooccurrenceMatrix":
+        """Add every document of a corpus and return the finished matrix."""
+        for tokens in corpus:
+            self.add_document(tokens)
+        return self.build()
+
+    def _flush(self) -> None:
+        """Count the buffered documents and fold them into the accumulator."""
+        if not self._buffer:
+            return
+        keys, counts = window_pairs(
+            np.concatenate(self._buffer), self.window, self.scale
+        )
+        self._buffer = []
+        self._buffered = 0
+
+        keys, counts = _reduce_pairs(
+            np.concatenate((self._keys, keys)), np.concatenate((self._counts, counts))
+        )
+        self._keys, self._counts = keys, counts
+        if len(keys) >= self._max_entries:
+            self._spill()
+
+    def spill(self) -> None:
+        """Count any buffered documents and move every pair in memory to disk."""
+        self._flush()
+        if len(self._keys):
+            self._spill()
+
+    def _spill(self) -> None:
+        """Write the accumulated pairs to a sorted shard on disk."""
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(
+                prefix="leglove-cooccurrence-", dir=self._spill_parent
+            )
+        shard = os.path.join(self._spill_dir, f"shard_{len(self._shards)}")
+        save_pairs(shard, self._keys, self._counts)
+        self._shards.append(shard)
+        self.num_spills += 1
+        logging.info(f"Spilled {len(self._keys)} co-occurrence pairs to disk...")
+
+        self._keys = np.zeros(0, dtype=np.int64)
+        self._counts = np.zeros(0, dtype=np.int64)
+
+    def _merge_spills(self, output: str) -> None:
+        """Spill the remaining pairs and merge every shard into output."""
+        if len(self._keys):
+            self._spill()
+        logging.info(f"Merging {len(self._shards)} co-occurrence shards...")
+        merge_pair_shards(self._shards, output, self._max_entries)
+
+    def build(self) -> "CooccurrenceMatrix":
+        """Count any buffered documents and return the finished matrix."""
+        self._flush()
+        if self._shards:
+            assert self._spill_dir is not None
+            output = os.path.join(self._spill_dir, "merged")
+            try:
+                self._merge_spills(output)
+                keys, counts = load_pairs(output)
+            finally:
+                self.close()
+        else:
+            keys, counts = self._keys, self._counts
+
+        self._keys = np.zeros(0, dtype=np.int64)
+        self._counts = np.zeros(0, dtype=np.int64)
+        return CooccurrenceMatrix.from_keys(self.dictionary, keys, counts, self.scale)
+
+    def save(self, output: str) -> None:
+        """Count any buffered documents and write the sorted pairs to output."""
+        self._flush()
+        if self._shards:
+            try:
+                self._merge_spills(output)
+            finally:
+                self.close()
+        else:
+            save_pairs(output, self._keys, self._counts)
+
+        self._keys = np.zeros(0, dtype=np.int64)
+        self._counts = np.zeros(0, dtype=np.int64)
+
+    def close(self) -> None:
+        """Delete any spilled shards."""
+        if self._spill_dir is not None:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+        self._shards = []
+
+
+def _count_partial(
+    chunks: Any, output: str, window: int, memory_limit_mb: float, spill_dir: str
+) -> None:
+    """Count the id arrays received on a queue into one partial shard."""
+    builder = CooccurrenceBuilder(window, memory_limit_mb, spill_dir)
+    for chunk in iter(chunks.get, None):
+        for ids in chunk:
+            builder.add_ids(ids)
+    builder.save(output)
+
+
+def _merge_partials(left: str, right: str, max_entries: int) -> str:
+    """Merge two partial shards into a new one and delete them."""
+    output = left + "m"
+    merge_pair_shards([left, right], output, max_entries)
+    remove_pairs(left)
+    remove_pairs(right)
+    return output
+
+
+def send_chunk(chunks: Any, chunk: Any, process: multiprocessing.Process) -> None:
+    """Send a chunk to a worker, failing if the worker has died."""
+    while True:
+        try:
+            chunks.put(chunk, timeout=1)
+            return
+        except queue.Full:
+            if not process.is_alive():
+                raise RuntimeError(
+                    f"Co-occurrence worker exited with code {process.exitcode}"
+                ) from None
+
+
+def _build_parallel(
+    corpus: Iterable[List[str]],
+    window: int,
+    memory_limit_mb: float,
+    spill_dir: Optional[str],
+    num_workers: int,
+    dictionary: Optional[Mapping[str, int]],
+) -> CooccurrenceMatrix:
+    """Count co-occurrences in worker processes and tree-reduce the partials."""
+    work_dir = tempfile.mkdtemp(prefix="leglove-cooccurrence-", dir=spill_dir)
+    worker_memory_mb = memory_limit_mb / num_workers
+    queues = [
+        multiprocessing.Queue(maxsize=PENDING_CHUNKS_PER_WORKER)
+        for _ in range(num_workers)
+    ]
+    partials = [
+        os.path.join(work_dir, f"partial_{index}") for index in range(num_workers)
+    ]
+    processes = [
+        multiprocessing.Process(
+            target=_count_partial,
+            args=(chunks, output, window, worker_memory_mb, work_dir),
+            daemon=True,
+        )
+        for chunks, output in zip(queues, partials)
+    ]
+
+    try:
+        for process in processes:
+            process.start()
+
+        # Ids are assigned here, in document order, so the dictionary is
+        # the same as with a single process
+        grow = dictionary is None
+        if dictionary is None:
+            dictionary = {}
+        chunk: List[np.ndarray] = []
+        chunk_tokens = 0
+        worker = 0
+        for tokens in corpus:
+            ids = token_ids(dictionary, tokens, grow)
+            if len(ids) < 2:
+                continue
+            chunk.append(ids)
+            chunk_tokens += len(ids)
+            if chunk_tokens >= CHUNK_TOKENS:
+                send_chunk(queues[worker], chunk, processes[worker])
+                worker = (worker + 1) % num_workers
+                chunk = []
+                chunk_tokens = 0
+        if chunk:
+            send_chunk(queues[worker], chunk, processes[worker])
+
+        for chunks, process in zip(queues, processes):
+            send_chunk(chunks, None, process)
+        for process in processes:
+            process.join()
+            if process.exitcode != 0:
+                raise RuntimeError(
+                    f"Co-occurrence worker exited with code {process.exitcode}"
+                )
+
+        logging.info(f"Merging {num_workers} partial co-occurrence matrices...")
+        max_entries = int(worker_memory_mb * 2**20) // ENTRY_BYTES
+        merged = tree_reduce(
+            partial(_merge_partials, max_entries=max_entries), partials, num_workers
+        )
+        keys, counts = load_pairs(merged)
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return CooccurrenceMatrix.from_keys(dictionary, keys, counts, count_scale(window))
+
+
+def build_cooccurrence_matrix(
+    corpus: Iterable[List[str]],
+    window: int = DEFAULT_WINDOW,
+    memory_limit_mb: float = DEFAULT_MEMORY_LIMIT_MB,
+    spill_dir: Optional[str] = None,
+    num_workers: int = 1,
+    dictionary: Optional[Mapping[str, int]] = None,
+) -> CooccurrenceMatrix:
+    """
+    Count the co-occurrences of a tokenized corpus within a memory budget.
+
+    Args:
+        corpus: Iterable of tokenized documents, e.g. from read_corpus.
+        window: Length of the (symmetric) context window, from 1 to
+            MAX_WINDOW.
+        memory_limit_mb: Approximate memory used for accumulating pairs
+            before they are spilled to disk, shared by all workers.
+        spill_dir: Directory in which spilled shards are created. Defaults
+            to the system temporary directory.
+        num_workers: Number of counting processes. The result is identical
+            for any number of workers.
+        dictionary: Optional fixed vocabulary, e.g. from build_vocabulary
+            or a leglove.vocab.CompactVocabulary.
+            Tokens outside it are dropped but still count towards the
+            distance between the tokens around them. If omitted, every
+            token is added in order of first occurrence.
+
+    Returns:
+        The co-occurrence matrix of the corpus.
+    """
+    check_window(window)
+    if num_workers < 1:
+        raise ValueError("num_workers must be at least 1")
+    if num_workers == 1:
+        return CooccurrenceBuilder(window, memory_limit_mb, spill_dir, dictionary).fit(
+            corpus
+        )
+    return _build_parallel(
+        corpus, window, memory_limit_mb, spill_dir, num_workers, dictionary
+    )
@@ -0,0 +1,204 @@
+import json
+import os
+import shutil
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set
+
+import numpy as np
+
+from .cooccurrence import (
+    COUNTS_SUFFIX,
+    ID_BITS,
+    KEYS_SUFFIX,
+    CooccurrenceMatrix,
+    load_pairs,
+    save_pairs,
+)
+from .vocab import CompactVocabulary
+
+"""
+    cooccurrence_store.py
+    --------
+    This module persists the co-occurrence matrix a model was trained
+    on, so that opinions published after training can be added to it
+    without counting the whole corpus again (see incremental.py). A
+    model "<model_name>.model" keeps its counts in the directory
+    "<model_name>.cooccurrence", which contains:
+
+        header.json      format version, window, count scale, number of
+                         words and entries and the preprocessing options
+                         of the run
+        pairs_keys.bin   raw int64 packed (row, column) keys, sorted
+        pairs_counts.bin raw int64 counts of each key, in units of
+                         1/scale (see cooccurrence.py)
+        strings.bin, offsets.i64, ids.i64
+                         the dictionary, as a leglove.vocab.CompactVocabulary
+        documents.txt    names of the opinions counted, one per line
+
+    Opinion names are stored relative to the corpus they were read from,
+    so the same opinions are recognized however the corpus path is
+    spelled. Stores are written to a temporary directory and renamed, so
+    readers never see a partially written store.
+"""
+
+# Constants
+FORMAT_VERSION = 1  # version of the on-disk layout
+STORE_SUFFIX = ".cooccurrence"  # directory name suffix of a stored matrix
+HEADER_FILE = "header.json"
+PAIRS_SHARD = "pairs"  # prefix of the keys and counts files
+DOCUMENTS_FILE = "documents.txt"
+
+
+def cooccurrence_store_path(model_file: str) -> str:
+    """Return the path of the co-occurrence store of a model file."""
+    return os.path.splitext(model_file)[0] + STORE_SUFFIX
+
+
+def relative_name(name: str, data_dir: Any) -> str:
+    """Return an opinion name relative to the corpus path it was read from."""
+    if isinstance(data_dir, str):
+        prefix = data_dir.rstrip("/") + "/"
+        if name.startswith(prefix):
+            return name[len(prefix) :]
+    return name
+
+
+def matrix_keys(matrix: CooccurrenceMatrix) -> np.ndarray:
+    """Return the packed keys of the entries of a matrix."""
+    return (np.asarray(matrix.rows, dtype=np.int64) << ID_BITS) | np.asarray(
+        matrix.cols, dtype=np.int64
+    )
+
+
+class CooccurrenceStore:
+    """
+    A stored co-occurrence matrix and the opinions counted into it.
+
+    Example:
+        >>> store = CooccurrenceStore.load(cooccurrence_store_path("LeGlove.model"))
+        >>> matrix = store.matrix()
+        >>> "scotus/1.json" in store.documents()
+        True
+    """
+
+    def __init__(self, path: str, header: Dict[str, Any]) -> None:
+        self.path = path
+        self.header = header
+
+    @classmethod
+    def load(cls, path: str) -> "CooccurrenceStore":
+        """Open a store written by write_store."""
+        header_path = os.path.join(path, HEADER_FILE)
+        if not os.path.exists(header_path):
+            raise FileNotFoundError(
+                f"No co-occurrence store at {path}; train the model with "
+                "save_cooccurrence=True first"
+            )
+        with open(header_path) as file:
+            header = json.load(file)
+        if header["version"] != FORMAT_VERSION:
+            raise ValueError(
+                f"{path} has format version {header['version']}, "
+                f"expected {FORMAT_VERSION}"
+            )
+        return cls(path, header)
+
+    @property
+    def window(self) -> int:
+        return self.header["window"]
+
+    @property
+    def scale(self) -> int:
+        return self.header["scale"]
+
+    @property
+    def num_words(self) -> int:
+        return self.header["num_words"]
+
+    @property
+    def nnz(self) -> int:
+        return self.header["nnz"]
+
+    @property
+    def pairs(self) -> str:
+        """Shard prefix of the stored pairs (see leglove.cooccurrence.load_pairs)."""
+        return os.path.join(self.path, PAIRS_SHARD)
+
+    def dictionary(self) -> Dict[str, int]:
+        """Return the word-to-id dict of the stored matrix."""
+        vocabulary = CompactVocabulary.load(self.path, mmap_mode=False)
+        return dict(zip(vocabulary, vocabulary.ids.tolist()))
+
+    def documents(self) -> Set[str]:
+        """Return the names of the opinions counted into the matrix."""
+        with open(os.path.join(self.path, DOCUMENTS_FILE), encoding="utf-8") as file:
+            return {line.rstrip("\n") for line in file if line.strip()}
+
+    def matrix(
+        self, dictionary: Optional[Mapping[str, int]] = None
+    ) -> CooccurrenceMatrix:
+        """Return the stored matrix, with its counts memory-mapped."""
+        if dictionary is None:
+            dictionary = self.dictionary()
+        keys, counts = load_pairs(self.pairs, mmap=True)
+        return CooccurrenceMatrix.from_keys(dictionary, keys, counts, self.scale)
+
+
+def write_store(
+    path: str,
+    dictionary: Mapping[str, int],
+    documents: Iterable[str],
+    window: int,
+    scale: int,
+    options: Optional[Dict[str, Any]] = None,
+    matrix: Optional[CooccurrenceMatrix] = None,
+    pairs: Optional[str] = None,
+) -> None:
+    """
+    Write a store from a matrix, or from a shard of sorted pairs.
+
+    Args:
+        path: Directory to create (or replace).
+        dictionary: Word-to-id dict of the matrix.
+        documents: Names of the opinions counted into the matrix.
+        window: Context window the pairs were counted with.
+        scale: Count units per unit of weight.
+        options: Preprocessing options to record, e.g. the tokenizer.
+        matrix: Matrix to store; either matrix or pairs must be given.
+        pairs: Shard written by leglove.cooccurrence.save_pairs, moved
+            into the store instead of writing a matrix. It must be on the
+            same file system as path.
+    """
+    if (matrix is None) == (pairs is None):
+        raise ValueError("Expected either a matrix or a shard of pairs")
+
+    temporary = path + ".tmp"
+    shutil.rmtree(temporary, ignore_errors=True)
+    os.makedirs(temporary)
+    shard = os.path.join(temporary, PAIRS_SHARD)
+    if matrix is not None:
+        save_pairs(shard, matrix_keys(matrix), matrix.counts)
+    else:
+        assert pairs is not None
+        for suffix in (KEYS_SUFFIX, COUNTS_SUFFIX):
+            os.replace(pairs + suffix, shard + suffix)
+
+    if not isinstance(dictionary, CompactVocabulary):
+        dictionary = CompactVocabulary.from_dictionary(dictionary)
+    dictionary.save(temporary)
+    names: List[str] = sorted(documents)
+    with open(os.path.join(temporary, DOCUMENTS_FILE), "w", encoding="utf-8") as file:
+        file.writelines(name + "\n" for name in names)
+    header = {
+        "version": FORMAT_VERSION,
+        "window": window,
+        "scale": scale,
+        "num_words": len(dictionary),
+        "nnz": os.path.getsize(shard + KEYS_SUFFIX) // 8,
+        "num_documents": len(names),
+        "options": options or {},
+    }
+    with open(os.path.join(temporary, HEADER_FILE), "w") as file:
+        json.dump(header, file)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.rename(temporary, path)
@@ -0,0 +1,461 @@
+import argparse
+import json
+import logging
+import os
+import shutil
+import tempfile
+from contextlib import ExitStack
+from functools import partial
+from itertools import chain, repeat
+from typing import Iterable, Iterator, List, Mapping, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from .cleanup import CLEANUP_BACKENDS, DEFAULT_CLEANUP_BACKEND
+from .parallel import DEFAULT_CHUNK_SIZE
+from .tokenizers import DEFAULT_TOKENIZER, TOKENIZERS
+from .train import read_documents
+from .vector_store import HEADER_FILE, VECTOR_DTYPE, VECTORS_FILE, load_model
+from .vocab import CompactVocabulary
+
+"""
+    documents.py
+    --------
+    This module embeds whole opinions as the average of their token
+    vectors, either unweighted ("mean") or weighted by inverse document
+    frequency ("tfidf", so that a token counts tf * idf times). Opinions
+    are streamed through the same cleanup and tokenization as training
+    (see train.read_documents), optionally in worker processes, and are
+    embedded in batches: the token ids of a batch are concatenated, their
+    vectors gathered in one indexing operation and summed per opinion
+    with np.add.reduceat. It is run with
+
+        leglove embed --model LeGlove.model --data_dir data/ --weighting tfidf
+
+    The vectors are written to a directory "<name>.docvecs", which
+    contains:
+
+        header.json   format version, number of documents and dimensions,
+                      weighting
+        vectors.f32   raw little-endian float32 document vectors, one row
+                      per document
+        strings.bin,  a leglove.vocab.CompactVocabulary from document id
+        offsets.i64,  (the opinion's path relative to the data directory,
+        ids.i64       without ".json", e.g. "scotus/12345") to row
+
+    DocumentVectors memory-maps it back. Tokens missing from the model
+    are skipped; opinions without any known token get a zero vector.
+"""
+
+# Constants
+FORMAT_VERSION = 1  # version of the on-disk layout
+DOCUMENTS_SUFFIX = ".docvecs"  # directory name suffix of document vectors
+WEIGHTINGS = ("mean", "tfidf")  # supported token weightings
+DEFAULT_WEIGHTING = "mean"
+BATCH_TOKENS = 1 << 16  # tokens gathered per batch, bounding its memory
+LOG_INTERVAL = 10000  # number of documents between progress logs
+
+
+def _batches(
+    documents: Iterable[Tuple[str, List[str]]],
+) -> Iterator[Tuple[List[str], List[List[str]]]]:
+    """Group documents into batches of about BATCH_TOKENS tokens."""
+    names: List[str] = []
+    batch: List[List[str]] = []
+    num_tokens = 0
+    for name, tokens in documents:
+        names.append(name)
+        batch.append(tokens)
+        num_tokens += len(tokens)
+        if num_tokens >= BATCH_TOKENS:
+            yield names, batch
+            names, batch, num_tokens = [], [], 0
+    if batch:
+        yield names, batch
+
+
+def _unique_documents(
+    documents: Iterable[Tuple[str, List[str]]], data_dir: str
+) -> Iterator[Tuple[str, List[str]]]:
+    """
+    Yield the (document id, tokens) of documents, skipping those whose id
+    was already seen, e.g. a member repeated in a tar archive.
+    """
+    seen: Set[str] = set()
+    for name, tokens in documents:
+        doc_id = document_id(name, data_dir)
+        if doc_id in seen:
+            logging.warning(f"Skipping {name}: the id {doc_id!r} is already embedded")
+            continue
+        seen.add(doc_id)
+        yield doc_id, tokens
+
+
+def token_ids(
+    documents: Sequence[List[str]], dictionary: Mapping[str, int]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return the concatenated word ids of the known tokens of documents and
+    the number of known tokens of each document.
+
+    Unless dictionary is a dict, every distinct token is looked up once,
+    so this is also fast for a leglove.vocab.CompactVocabulary.
+    """
+    if not isinstance(dictionary, dict):
+        dictionary = {
+            token: dictionary.get(token, -1) for token in set().union(*documents)
+        }
+    lengths = np.fromiter(map(len, documents), dtype=np.int64, count=len(documents))
+    ids = np.fromiter(
+        map(dictionary.get, chain.from_iterable(documents), repeat(-1)),
+        dtype=np.int64,
+        count=int(lengths.sum()),
+    )
+    known = ids >= 0
+    owners = np.repeat(np.arange(len(documents)), lengths)
+    counts = np.bincount(owners[known], minlength=len(documents))
+    return ids[known], counts
+
+
+def _term_counts(
+    ids: np.ndarray, counts: np.ndarray, num_words: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Return the distinct (document, word id) pairs of token_ids, sorted by
+    document, and the number of occurrences of each pair.
+    """
+    owners = np.repeat(np.arange(len(counts)), counts)
+    pairs, occurrences = np.unique(owners * num_words + ids, return_counts=True)
+    return pairs // num_words, pairs % num_words, occurrences
+
+
+def document_frequencies(
+    documents: Iterable[List[str]], dictionary: Mapping[str, int], num_words: int
+) -> Tuple[np.ndarray, int]:
+    """Return the number of documents containing each word id, and of documents."""
+    frequencies = np.zeros(num_words, dtype=np.int64)
+    num_documents = 0
+    for _, batch in _batches(("", tokens) for tokens in documents):
+        _, words, _ = _term_counts(*token_ids(batch, dictionary), num_words)
+        frequencies += np.bincount(words, minlength=num_words)
+        num_documents += len(batch)
+    return frequencies, num_documents
+
+
+def inverse_document_frequencies(
+    frequencies: np.ndarray, num_documents: int
+) -> np.ndarray:
+    """Return the smoothed idf, log((1 + n) / (1 + df)) + 1, of each word id."""
+    return (np.log((1.0 + num_documents) / (1.0 + frequencies)) + 1.0).astype(
+        np.float32
+    )
+
+
+def _vectors(model) -> np.ndarray:
+    """Return the word vectors of a model, or its codes if it is quantized."""
+    if getattr(model, "quantizer", None) is not None:
+        return model.codes
+    if model.word_vectors is None:
+        raise ValueError("Model must be fit and have a dictionary")
+    return model.word_vectors
+
+
+def _gather(model, ids: np.ndarray) -> np.ndarray:
+    """Return the vectors of word ids, decoding quantized models."""
+    rows = _vectors(model)[ids]
+    if getattr(model, "quantizer", None) is not None:
+        return model.quantizer.decode(rows)
+    return np.asarray(rows)
+
+
+def document_vectors(
+    model, documents: Sequence[List[str]], idf: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Embed tokenized documents as the average vector of their tokens.
+
+    Args:
+        model: Trained model with word_vectors (or quantized codes) and a
+            dictionary, e.g. a leglove.model.GloveModel or a
+            leglove.vector_store.MappedModel.
+        documents: Token lists, e.g. from leglove.train.tokenize_text.
+        idf: Optional weight of each word id. Without it every token
+            counts once.
+
+    Returns:
+        A (num_documents, no_components) float32 array. Documents without
+        any token in the model's dictionary get zero vectors.
+    """
+    if model.dictionary is None:
+        raise ValueError("Model must be fit and have a dictionary")
+    vectors = np.zeros((len(documents), model.no_components), dtype=np.float32)
+    owners, words, occurrences = _term_counts(
+        *token_ids(documents, model.dictionary), len(_vectors(model))
+    )
+    if len(words) == 0:
+        return vectors
+
+    # Repeated tokens are gathered once and weighted by their count
+    weights = occurrences.astype(np.float64)
+    if idf is not None:
+        weights *= idf[words]
+    rows = _gather(model, words)
+    rows *= weights[:, None]
+    # Segments of documents without known tokens would overlap the next
+    # one, so only the other documents are reduced
+    nonempty = np.unique(owners)
+    starts = np.flatnonzero(np.diff(owners, prepend=-1))
+    sums = np.add.reduceat(rows, starts, axis=0)
+    totals = np.add.reduceat(weights, starts)
+    vectors[nonempty] = sums / totals[:, None]
+    return vectors
+
+
+def documents_path(model_file: str) -> str:
+    """Return the default path of the document vectors of a model file."""
+    return os.path.splitext(model_file)[0] + DOCUMENTS_SUFFIX
+
+
+def document_id(json_file_path: str, data_dir: str) -> str:
+    """
+    Return the id of an opinion: its path relative to the data directory
+    (or archive) without ".json".
+    """
+    relative = os.path.relpath(json_file_path, data_dir)
+    return os.path.splitext(relative)[0].replace(os.sep, "/")
+
+
+def embed_documents(
+    model,
+    data_dir: str,
+    path: str,
+    weighting: str = DEFAULT_WEIGHTING,
+    num_workers: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    cache_dir: Optional[str] = None,
+    cleanup_backend: str = DEFAULT_CLEANUP_BACKEND,
+    tokenizer: str = DEFAULT_TOKENIZER,
+) -> "DocumentVectors":
+    """
+    Embed every opinion of a data directory and write the vectors to path.
+
+    The layout is written to a temporary directory next to path and then
+    renamed, so readers never see a partially written matrix. Only the
+    first opinion with a given id is embedded; later ones, such as a
+    member repeated in a tar archive, are skipped with a warning.
+
+    Args:
+        model: Trained model (see document_vectors).
+        data_dir: Corpus directory, archive or JSON lines file, as for
+            leglove.train.read_corpus.
+        path: Directory to create (or replace).
+        weighting: Token weighting, one of WEIGHTINGS. "tfidf" reads the
+            corpus twice, first to count document frequencies.
+        num_workers: Number of processes used for HTML cleanup and
+            tokenization.
+        chunk_size: Number of files sent to a worker process at once.
+        cache_dir: Optional directory of a persistent token cache (see
+            leglove.cache). A temporary one is used for the two passes of
+            "tfidf" when it is not given.
+        cleanup_backend: HTML cleanup backend, which should match training.
+        tokenizer: Word tokenizer, which should match training.
+
+    Returns:
+        The written DocumentVectors.
+    """
+    if weighting not in WEIGHTINGS:
+        raise ValueError(
+            f"Unknown weighting {weighting!r}, expected one of {WEIGHTINGS}"
+        )
+    if model.dictionary is None:
+        raise ValueError("Model must be fit and have a dictionary")
+
+    temporary = path + ".tmp"
+    shutil.rmtree(temporary, ignore_errors=True)
+    os.makedirs(temporary)
+    with ExitStack() as stack:
+        if weighting == "tfidf" and cache_dir is None:
+            # The corpus is read twice, so cache its tokens for this run
+            cache_dir = stack.enter_context(
+                tempfile.TemporaryDirectory(prefix="leglove-tokens-")
+            )
+        documents = partial(
+            read_documents,
+            data_dir,
+            num_workers=num_workers,
+            chunk_size=chunk_size,
+            cache_dir=cache_dir,
+            cleanup_backend=cleanup_backend,
+            tokenizer=tokenizer,
+        )
+
+        def corpus() -> Iterator[Tuple[str, List[str]]]:
+            return _unique_documents(documents(), data_dir)
+
+        idf = None
+        if weighting == "tfidf":
+            logging.info("Counting document frequencies...")
+            num_words = len(_vectors(model))
+            idf = inverse_document_frequencies(
+                *document_frequencies(
+                    (tokens for _, tokens in corpus()), model.dictionary, num_words
+                )
+            )
+
+        index = {}
+        num_rows = 0
+        num_empty = 0
+        with open(os.path.join(temporary, VECTORS_FILE), "wb") as file:
+            for doc_ids, batch in _batches(corpus()):
+                vectors = document_vectors(model, batch, idf)
+                file.write(vectors.astype(VECTOR_DTYPE, copy=False).tobytes())
+                num_empty += int(np.count_nonzero(~vectors.any(axis=1)))
+                for doc_id in doc_ids:
+                    index[doc_id] = num_rows
+                    num_rows += 1
+                if num_rows // LOG_INTERVAL > (num_rows - len(doc_ids)) // LOG_INTERVAL:
+                    logging.info(f"{num_rows} documents embedded...")
+
+    CompactVocabulary.from_dictionary(index).save(temporary)
+    header = {
+        "version": FORMAT_VERSION,
+        "num_documents": num_rows,
+        "no_components": model.no_components,
+        "weighting": weighting,
+        "num_empty": num_empty,
+    }
+    with open(os.path.join(temporary, HEADER_FILE), "w") as file:
+        json.dump(header, file)
+    logging.info(
+        f"Embedded {num_rows} documents ({num_empty} without known tokens) into {path}"
+    )
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.rename(temporary, path)
+    return DocumentVectors.load(path)
+
+
+class DocumentVectors:
+    """
+    Memory-mapped document vectors written by embed_documents.
+
+    The vectors and index can be searched like word vectors, e.g. with
+    leglove.neighbors.NearestNeighbors(documents.vectors, documents.index).
+
+    Example:
+        >>> documents = DocumentVectors.load("LeGlove.docvecs")
+        >>> documents.vector("scotus/12345")
+        memmap([ 0.02, -0.11, ...], dtype=float32)
+    """
+
+    def __init__(
+        self, vectors: np.ndarray, index: CompactVocabulary, weighting: str
+    ) -> None:
+        self.vectors = vectors
+        self.index = index
+        self.weighting = weighting
+
+    @classmethod
+    def load(cls, path: str) -> "DocumentVectors":
+        """Map document vectors written by embed_documents."""
+        with open(os.path.join(path, HEADER_FILE)) as file:
+            header = json.load(file)
+        if header["version"] != FORMAT_VERSION:
+            raise ValueError(
+                f"{path} has format version {header['version']}, "
+                f"expected {FORMAT_VERSION}"
+            )
+
+        shape = (header["num_documents"], header["no_components"])
+        if shape[0] == 0:
+            vectors = np.zeros(shape, dtype=VECTOR_DTYPE)
+        else:
+            vectors = np.memmap(
+                os.path.join(path, VECTORS_FILE),
+                dtype=VECTOR_DTYPE,
+                mode="r",
+                shape=shape,
+            )
+        return cls(vectors, CompactVocabulary.load(path), header["weighting"])
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.index
+
+    def vector(self, doc_id: str) -> np.ndarray:
+        """Return the vector of a document, as a view of the mapped file."""
+        try:
+            return self.vectors[self.index[doc_id]]
+        except KeyError:
+            raise KeyError(f"{doc_id!r} is not in the index") from None
+
+    def doc_id(self, row: int) -> str:
+        """Return the id of the document in a row."""
+        return self.index.word(row)
+
+
+def parse_arguments(argv: Optional[Sequence[str]] = None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        prog="leglove embed", description="Embed whole opinions with a LeGlove model"
+    )
+    parser.add_argument(
+        "--model",
+        default="LeGlove.model",
+        help="Model to embed with (i.e. 'LeGlove.model')",
+    )
+    parser.add_argument(
+        "--data_dir",
+        required=True,
+        help="Directory of jurisdiction directories, archive or JSON lines file",
+    )
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="Output directory (default: '<model_name>.docvecs')",
+    )
+    parser.add_argument(
+        "--weighting",
+        default=DEFAULT_WEIGHTING,
+        choices=WEIGHTINGS,
+        help="Average token vectors uniformly or weighted by tf-idf",
+    )
+    parser.add_argument(
+        "--workers",
+        default=1,
+        type=int,
+        help="Number of processes used for HTML cleanup and tokenization",
+    )
+    parser.add_argument(
+        "--cache_dir", default=None, help="Directory of a persistent token cache"
+    )
+    parser.add_argument(
+        "--cleanup_backend",
+        default=DEFAULT_CLEANUP_BACKEND,
+        choices=CLEANUP_BACKENDS,
+        help="HTML cleanup backend (should match training)",
+    )
+    parser.add_argument(
+        "--tokenizer",
+        default=DEFAULT_TOKENIZER,
+        choices=TOKENIZERS,
+        help="Word tokenizer (should match training)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Embed the opinions given on the command line."""
+    args = parse_arguments(argv)
+    embed_documents(
+        load_model(args.model),
+        args.data_dir,
+        args.output or documents_path(args.model),
+        weighting=args.weighting,
+        num_workers=args.workers,
+        cache_dir=args.cache_dir,
+        cleanup_backend=args.cleanup_backend,
+        tokenizer=args.tokenizer,
+    )
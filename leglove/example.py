@@ -2,14 +2,12 @@ import argparse
 import logging
 import pprint
 
-import numpy as np
-
-try:
-    from glove import Glove
-except ImportError:
-    Glove = None
-
+from .ann import DEFAULT_NUM_PROBES
+from .arguments import add_training_arguments
+from .neighbors import DEFAULT_METRIC, METRICS
+from .profiling import Profiler
 from .train import train_and_save_model
+from .vector_store import load_neighbors
 
 """
     example.py
@@ -17,8 +15,8 @@ from .train import train_and_save_model
     This program illustrates example usage of the LeGlove modules
     train.py and vectors.py. It can either train a model from a
     given corpus or load a pre-trained model. Afterwards, the top
-    K nearest neighbors of the query word by Euclidean vector
-    distance are printed.
+    K nearest neighbors of the query word by Euclidean (or cosine)
+    vector distance are printed.
 
     The following open-source github repository was used and adapted:
 
@@ -32,22 +30,37 @@ def parse_arguments():
     parser.add_argument(
         "--train_dir",
         default=None,
-        help="Master directory containing all jurisdiction-level directories, only for training",
+        help="Master directory containing all jurisdiction-level directories, or a "
+        "tar/zip archive or (gzipped) JSON lines file of opinions, only for training",
     )
     parser.add_argument(
         "--model_name", default="LeGlove", help="Name for output model file"
     )
+    add_training_arguments(parser)
     parser.add_argument(
-        "--num_epochs",
-        default=10,
-        type=int,
-        help="Train LeGlove model for this number of epochs",
+        "--save_cooccurrence",
+        action="store_true",
+        help="Keep the co-occurrence counts next to the model, so that new "
+        "opinions can be added later with 'leglove update'",
     )
     parser.add_argument(
-        "--parallel_threads",
-        default=1,
+        "--checkpoint_epochs",
+        default=0,
         type=int,
-        help="Number of parallel threads to use for training",
+        help="Checkpoint the co-occurrence matrix, and the model every this many "
+        "epochs, to <model_name>.checkpoint (0 disables checkpointing)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted training run from its checkpoint",
+    )
+    parser.add_argument(
+        "--jurisdictions",
+        default=None,
+        nargs="+",
+        help="Only train on these jurisdictions: abbreviations of "
+        "juris_abbrevs.txt, groups such as 'circuits' or glob patterns",
     )
     parser.add_argument(
         "--load_model",
@@ -57,6 +70,23 @@ def parse_arguments():
     parser.add_argument(
         "--query", default="legal", help="Get nearest neighbors of this word"
     )
+    parser.add_argument(
+        "--metric",
+        default=DEFAULT_METRIC,
+        choices=METRICS,
+        help="Distance used to rank the nearest neighbors",
+    )
+    parser.add_argument(
+        "--ann",
+        action="store_true",
+        help="Use an approximate nearest neighbor index saved next to the model",
+    )
+    parser.add_argument(
+        "--num_probes",
+        default=DEFAULT_NUM_PROBES,
+        type=int,
+        help="Index lists searched per query with --ann (more is slower but more accurate)",
+    )
     return parser.parse_args()
 
 
@@ -64,17 +94,27 @@ def parse_arguments():
 K = 10  # number of neighbors to output
 
 
-def find_nearest_neighbors(model_file: str, word: str) -> None:
+def find_nearest_neighbors(
+    model_file: str,
+    word: str,
+    metric: str = DEFAULT_METRIC,
+    ann: bool = False,
+    num_probes: int = DEFAULT_NUM_PROBES,
+) -> None:
     """
-    Find and print the K nearest neighbors of a word using Euclidean distance.
+    Find and print the K nearest neighbors of a word.
 
-    This function finds the K nearest neighbors of a given word using Euclidean
-    distance. It loads a trained GloVe model and prints the top K neighbors of
-    the query word along with their corresponding distances.
+    This function loads a trained GloVe model and prints the top K
+    neighbors of the query word along with their corresponding distances,
+    using the vectorized query engine in leglove.neighbors.
 
     Args:
         model_file: Path to the trained GloVe model file.
         word: Query word to find neighbors for.
+        metric: Distance metric, one of leglove.neighbors.METRICS.
+        ann: If True, search approximately with the IVF index stored next
+            to the model (see leglove.ann), building it on first use.
+        num_probes: Number of index lists searched when ann is True.
 
     Returns:
         None. Prints the nearest neighbors to stdout.
@@ -82,33 +122,14 @@ def find_nearest_neighbors(model_file: str, word: str) -> None:
     Example:
         >>> find_nearest_neighbors("LeGlove.model", "legal")
         The 10 nearest neighbors of legal are...
-        [('law', 0.123), ('court', 0.145), ...]
+        [('legal', 0.0), ('law', 0.123), ('court', 0.145), ...]
     """
     logging.info(f"The {K} nearest neighbors of {word} are...")
 
-    # Load model and get dictionary (from word to word index) and word vectors
-    if Glove is None:
-        raise ImportError(
-            "glove-python is required but not installed. Install with: uv sync --extra glove"
-        )
-    model = Glove.load(model_file)
-    dictionary = model.dictionary
-    word_vectors = model.word_vectors
-
-    word_to_vector = {w: word_vectors[dictionary[w]] for w in dictionary}
-
-    # Find closest neighbors by Euclidean distance
-    nbr_distances = []
-    query_vector = word_to_vector[word]
-
-    for nbr in word_to_vector:
-        nbr_vector = word_to_vector[nbr]
-        dist = np.linalg.norm(query_vector - nbr_vector)
-        nbr_distances.append((nbr, dist))
+    neighbors = load_neighbors(model_file, metric, ann, num_probes)
 
     # Print top K neighbors
-    nearest_neighbors = sorted(nbr_distances, key=lambda x: x[1])
-    pprint.pprint(nearest_neighbors[:K])
+    pprint.pprint(neighbors.query(word, k=K))
 
 
 def main() -> None:
@@ -122,19 +143,48 @@ def main() -> None:
 
     # Option 1: Train a model
     if args.train_dir:
+        profiler = Profiler(progress=True) if args.profile else None
         train_and_save_model(
             args.train_dir,
             model_name=args.model_name,
             num_epochs=args.num_epochs,
             parallel_threads=args.parallel_threads,
+            num_workers=args.preprocess_workers,
+            cache_dir=args.cache_dir,
+            cleanup_backend=args.cleanup_backend,
+            tokenizer=args.tokenizer,
+            cooccurrence_memory_mb=args.cooccurrence_memory_mb,
+            cooccurrence_workers=args.cooccurrence_workers,
+            min_count=args.min_count,
+            max_vocab_size=args.max_vocab_size,
+            backend=args.backend,
+            batch_size=args.batch_size,
+            quantization=args.quantization,
+            profiler=profiler,
+            prefetch=args.prefetch,
+            save_cooccurrence=args.save_cooccurrence,
+            jurisdictions=args.jurisdictions,
+            exclude_jurisdictions=args.exclude_jurisdictions,
+            checkpoint_epochs=args.checkpoint_epochs,
+            resume=args.resume,
         )
+        if profiler is not None:
+            profiler.close()
+            profiler.save(args.profile)
+            logging.info(f"Wrote profile to {args.profile}")
         model_file = args.model_name + ".model"
 
     # Option 2: Load a model
     else:
         model_file = args.load_model
 
-    find_nearest_neighbors(model_file, args.query)
+    find_nearest_neighbors(
+        model_file,
+        args.query,
+        metric=args.metric,
+        ann=args.ann,
+        num_probes=args.num_probes,
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,411 @@
+import argparse
+import logging
+import os
+import random
+import tempfile
+from collections import Counter
+from functools import partial
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Union,
+)
+
+from .cleanup import DEFAULT_CLEANUP_BACKEND
+from .cooccurrence import (
+    DEFAULT_MEMORY_LIMIT_MB,
+    ENTRY_BYTES,
+    CooccurrenceBuilder,
+    CooccurrenceMatrix,
+    load_pairs,
+    merge_pair_shards,
+)
+from .cooccurrence_store import (
+    CooccurrenceStore,
+    cooccurrence_store_path,
+    relative_name,
+    write_store,
+)
+from .jurisdictions import filtered_source, jurisdiction_filter
+from .model import GloveModel
+from .neighbors import NearestNeighbors
+from .profiling import Profiler, epoch_recorder, profile_stage
+from .quantize import QUANTIZATIONS
+from .sources import CorpusSource, OpinionRecord
+from .tokenizers import DEFAULT_TOKENIZER
+from .train import read_documents
+from .vector_store import export_model, store_path
+from .vocab import select_vocabulary
+
+"""
+    incremental.py
+    --------
+    This module folds newly published opinions into a trained model
+    without retraining it from scratch. A model trained with
+    train_and_save_model(..., save_cooccurrence=True) keeps its
+    co-occurrence counts and the names of the opinions counted in
+    "<model_name>.cooccurrence" (see cooccurrence_store.py). update_model
+    then:
+
+        1. reads only the opinions of the corpus that are not in the store,
+        2. adds the tokens of the new opinions that are not yet in the
+           vocabulary (optionally only those occurring min_count times),
+           with ids after the existing ones,
+        3. counts the co-occurrences of the new opinions and merges them
+           into the stored counts, so the store holds exactly the counts
+           of a full count of all opinions over its vocabulary, and
+        4. grows the model by the new words and runs a few warm-started
+           epochs on the merged matrix, continuing from the trained
+           vectors and AdaGrad state.
+
+    Opinions whose files changed after they were counted are not
+    recounted; a full retrain picks them up. Neither can a model whose
+    vocabulary was pruned (min_count or max_vocab_size, in training or in
+    an update that left out new words) be updated again: the pairs of
+    the words it left out were never counted, so a word that becomes
+    frequent enough would lack its co-occurrences with the opinions
+    counted before.
+
+    neighbor_drift measures how far the nearest neighbors of an updated
+    model are from those of a full retrain on the same opinions:
+
+        leglove update --data_dir data/ --model_name LeGlove --epochs 3
+"""
+
+# Constants
+DEFAULT_UPDATE_EPOCHS = 3  # warm-started epochs run by update_model
+DEFAULT_DRIFT_WORDS = 1000  # words sampled by neighbor_drift
+DEFAULT_DRIFT_K = 10  # neighbors compared per word by neighbor_drift
+
+
+class UpdateResult(NamedTuple):
+    """What update_model added to a model."""
+
+    documents: int  # new opinions counted
+    new_words: int  # words added to the vocabulary
+    num_words: int  # vocabulary size after the update
+    nnz: int  # nonzero co-occurrence entries after the update
+
+
+class _NewRecords:
+    """The records of a corpus source whose names are not in a set."""
+
+    def __init__(self, source: CorpusSource, data_dir: Any, counted: Set[str]) -> None:
+        self.source = source
+        self.data_dir = data_dir
+        self.counted = counted
+
+    def records(self, with_data: bool = True) -> Iterator[OpinionRecord]:
+        """Yield the records of opinions that have not been counted."""
+        for record in self.source.records(with_data=with_data):
+            if relative_name(record.name, self.data_dir) not in self.counted:
+                yield record
+
+
+def update_model(
+    data_dir: Union[str, CorpusSource],
+    model_name: str = "LeGlove",
+    num_epochs: int = DEFAULT_UPDATE_EPOCHS,
+    parallel_threads: int = 1,
+    num_workers: int = 1,
+    min_count: int = 1,
+    cooccurrence_memory_mb: float = DEFAULT_MEMORY_LIMIT_MB,
+    quantization: Optional[str] = None,
+    prefetch: int = 0,
+    profiler: Optional[Profiler] = None,
+) -> UpdateResult:
+    """
+    Add the opinions of a corpus that a model has not seen to the model.
+
+    The opinions are cleaned and tokenized with the options the model
+    was trained with, and only the jurisdictions it was trained on are
+    read. The model, its exported vectors and its co-occurrence store
+    are replaced by the updated ones. Models trained with min_count or
+    max_vocab_size cannot be updated, and neither can a model once an
+    update with min_count has left out new words.
+
+    Args:
+        data_dir: Corpus directory, archive or JSON lines file (see
+            leglove.train.read_corpus), holding the new opinions and
+            optionally the ones already counted, which are skipped.
+        model_name: Name of the model, trained with save_cooccurrence=True.
+        num_epochs: Number of warm-started training epochs.
+        parallel_threads: Number of training processes.
+        num_workers: Number of processes used for cleanup and tokenization.
+        min_count: Minimum number of occurrences in the new opinions of a
+            token that is not yet in the vocabulary to add it.
+        cooccurrence_memory_mb: Approximate memory budget for counting
+            and merging co-occurrences.
+        quantization: Optional quantization of the exported vectors.
+        prefetch: Number of opinion files read ahead (see read_corpus).
+        profiler: Optional leglove.profiling.Profiler timing the update.
+
+    Returns:
+        The UpdateResult of the update.
+    """
+
+    model_file = model_name + ".model"
+    store = CooccurrenceStore.load(cooccurrence_store_path(model_file))
+    options = store.header["options"]
+    if options.get("min_count", 1) > 1 or options.get("max_vocab_size") is not None:
+        raise ValueError(
+            f"{model_file} has a pruned vocabulary (min_count "
+            f"{options.get('min_count', 1)}, max_vocab_size "
+            f"{options.get('max_vocab_size')}), whose left out words have no "
+            "stored co-occurrences; retrain it instead"
+        )
+    model = GloveModel.load(model_file)
+    if model.word_vectors is None:
+        raise ValueError(f"{model_file} does not contain a trained model")
+    dictionary = store.dictionary()
+    if len(model.word_vectors) > len(dictionary):
+        raise ValueError(
+            f"{model_file} has more words than its co-occurrence store {store.path}"
+        )
+
+    counted = store.documents()
+    # Only read the jurisdictions the model was trained on
+    source = filtered_source(
+        data_dir,
+        jurisdiction_filter(
+            options.get("jurisdictions"), options.get("exclude_jurisdictions")
+        ),
+    )
+    # Work next to the store, so the merged pairs can be moved into it
+    work_parent = os.path.dirname(os.path.abspath(store.path))
+    with tempfile.TemporaryDirectory(prefix="leglove-update-", dir=work_parent) as work:
+        corpus = partial(
+            read_documents,
+            _NewRecords(source, data_dir, counted),
+            num_workers=num_workers,
+            cache_dir=os.path.join(work, "tokens"),
+            cleanup_backend=options.get("cleanup_backend", DEFAULT_CLEANUP_BACKEND),
+            tokenizer=options.get("tokenizer", DEFAULT_TOKENIZER),
+            profiler=profiler,
+            prefetch=prefetch,
+        )
+
+        names: List[str] = []
+        new_counts: Counter = Counter()
+        with profile_stage(profiler, "vocabulary"):
+            for name, tokens in corpus():
+                names.append(relative_name(name, data_dir))
+                new_counts.update(token for token in tokens if token not in dictionary)
+        if not names:
+            logging.info("No new opinions to add")
+            return UpdateResult(0, 0, len(dictionary), store.nnz)
+
+        new_words = select_vocabulary(new_counts.items(), min_count=min_count)
+        if len(new_words) < len(new_counts):
+            # The pairs of the left out words are not stored either
+            options = dict(options, min_count=min_count)
+        num_existing = len(dictionary)
+        for word, index in new_words.items():
+            dictionary[word] = num_existing + index
+        logging.info(
+            f"Adding {len(names)} opinions and {len(new_words)} new words "
+            f"to {len(counted)} opinions and {num_existing} words..."
+        )
+
+        with profile_stage(profiler, "cooccurrence"):
+            builder = CooccurrenceBuilder(
+                store.window,
+                cooccurrence_memory_mb,
+                spill_dir=work,
+                dictionary=dictionary,
+            )
+            new_pairs = os.path.join(work, "new")
+            for _, tokens in corpus():
+                builder.add_document(tokens)
+            builder.save(new_pairs)
+            merged = os.path.join(work, "merged")
+            max_entries = max(int(cooccurrence_memory_mb * 2**20) // ENTRY_BYTES, 1)
+            merge_pair_shards([store.pairs, new_pairs], merged, max_entries)
+            keys, counts = load_pairs(merged, mmap=True)
+            matrix = CooccurrenceMatrix.from_keys(dictionary, keys, counts, store.scale)
+
+        with profile_stage(profiler, "training"):
+            model.add_words(len(dictionary) - len(model.word_vectors))
+            fit_options = {}
+            if profiler is not None:
+                fit_options["callback"] = epoch_recorder(profiler)
+            model.fit(
+                matrix,
+                epochs=num_epochs,
+                no_threads=parallel_threads,
+                verbose=True,
+                warm_start=True,
+                **fit_options,
+            )
+            model.add_dictionary(dictionary)
+        result = UpdateResult(len(names), len(new_words), len(dictionary), matrix.nnz)
+        del matrix, keys, counts
+
+        with profile_stage(profiler, "save"):
+            # The store is replaced first: should saving the model fail, the
+            # next update grows the old model to the stored vocabulary
+            write_store(
+                store.path,
+                dictionary,
+                counted.union(names),
+                window=store.window,
+                scale=store.scale,
+                options=options,
+                pairs=merged,
+            )
+            model.save(model_file + ".tmp")
+            os.replace(model_file + ".tmp", model_file)
+            export_model(model, store_path(model_file), quantization=quantization)
+
+    logging.info(
+        f"Updated {model_file}: {result.num_words} words, {result.nnz} entries"
+    )
+    return result
+
+
+def neighbor_drift(
+    model,
+    reference,
+    k: int = DEFAULT_DRIFT_K,
+    num_words: int = DEFAULT_DRIFT_WORDS,
+    words: Optional[Sequence[str]] = None,
+    seed: int = 0,
+) -> Dict[str, float]:
+    """
+    Compare the nearest neighbors of words in two models.
+
+    Vectors of separately trained models live in unrelated coordinate
+    systems, so models are compared by their neighbors instead: for each
+    word, the share of its k nearest neighbors (the word itself aside)
+    that both models agree on.
+
+    Args:
+        model: Model to compare, e.g. one updated by update_model.
+        reference: Model to compare against, e.g. a full retrain.
+        k: Number of neighbors compared per word.
+        num_words: Number of words sampled from the common vocabulary,
+            unless words are given.
+        words: Optional words to compare.
+        seed: Seed of the word sample.
+
+    Returns:
+        The number of words compared, k, the mean overlap of their
+        neighbors and the drift, 1 - mean overlap.
+    """
+    index = NearestNeighbors.from_model(model)
+    reference_index = NearestNeighbors.from_model(reference)
+    if words is None:
+        common = sorted(set(index.words) & set(reference_index.words))
+        words = random.Random(seed).sample(common, min(num_words, len(common)))
+    if not words:
+        raise ValueError("The models have no words in common")
+
+    overlaps = []
+    for word, neighbors, reference_neighbors in zip(
+        words,
+        index.query_batch(words, k=k + 1),
+        reference_index.query_batch(words, k=k + 1),
+    ):
+        found = [nbr for nbr, _ in neighbors if nbr != word][:k]
+        expected = {nbr for nbr, _ in reference_neighbors if nbr != word}
+        overlaps.append(len(expected.intersection(found)) / k)
+
+    mean_overlap = sum(overlaps) / len(overlaps)
+    return {
+        "words": len(words),
+        "k": k,
+        "mean_overlap": mean_overlap,
+        "drift": 1.0 - mean_overlap,
+    }
+
+
+def parse_arguments(argv: Optional[Sequence[str]] = None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        prog="leglove update",
+        description="Add new opinions to a LeGlove model without retraining it",
+    )
+    parser.add_argument(
+        "--data_dir",
+        required=True,
+        help="Directory of jurisdiction directories, archive or JSON lines file",
+    )
+    parser.add_argument(
+        "--model_name",
+        default="LeGlove",
+        help="Name of the model to update (i.e. 'LeGlove')",
+    )
+    parser.add_argument(
+        "--epochs",
+        default=DEFAULT_UPDATE_EPOCHS,
+        type=int,
+        help="Number of warm-started training epochs",
+    )
+    parser.add_argument(
+        "--parallel_threads",
+        default=1,
+        type=int,
+        help="Number of parallel threads to use for training",
+    )
+    parser.add_argument(
+        "--workers",
+        default=1,
+        type=int,
+        help="Number of processes used for HTML cleanup and tokenization",
+    )
+    parser.add_argument(
+        "--min_count",
+        default=1,
+        type=int,
+        help="Minimum occurrences in the new opinions of a word to add it",
+    )
+    parser.add_argument(
+        "--quantization",
+        default=None,
+        choices=QUANTIZATIONS,
+        help="Export the updated vectors as int8 or product quantization codes",
+    )
+    parser.add_argument(
+        "--prefetch",
+        default=0,
+        type=int,
+        help="Number of opinion files to read ahead in background threads",
+    )
+    parser.add_argument(
+        "--reference_model",
+        default=None,
+        help="Model to report the nearest neighbor drift against, e.g. a full retrain",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Update a model with the opinions given on the command line."""
+    args = parse_arguments(argv)
+    result = update_model(
+        args.data_dir,
+        model_name=args.model_name,
+        num_epochs=args.epochs,
+        parallel_threads=args.parallel_threads,
+        num_workers=args.workers,
+        min_count=args.min_count,
+        quantization=args.quantization,
+        prefetch=args.prefetch,
+    )
+    logging.info(f"Added {result.documents} opinions and {result.new_words} new words")
+    if args.reference_model is not None:
+        drift = neighbor_drift(
+            GloveModel.load(args.model_name + ".model"),
+            GloveModel.load(args.reference_model),
+        )
+        logging.info(
+            f"Nearest neighbor overlap@{drift['k']} with {args.reference_model}: "
+            f"{drift['mean_overlap']:.3f} over {drift['words']} words "
+            f"(drift {drift['drift']:.3f})"
+        )
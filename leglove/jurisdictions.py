@@ -0,0 +1,157 @@
+import fnmatch
+import os
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+from .sources import CorpusSource, OpinionRecord, corpus_source, jurisdiction_of
+
+"""
+    jurisdictions.py
+    --------
+    This module selects the jurisdictions of a corpus to train on.
+    CourtListener groups opinions into one directory per court, named by
+    the abbreviations listed in juris_abbrevs.txt. A selection is a list
+    of entries, each of which is one of:
+
+        an abbreviation     e.g. "scotus" or "ca9"
+        a group             e.g. "circuits" (see JURISDICTION_GROUPS)
+        a glob pattern      e.g. "bap*" or "ca?"
+
+    juris_abbrevs.txt lists the courts by type, so each group is a range
+    of consecutive abbreviations of the file, named by its first and
+    last abbreviation. Glob patterns are matched against directory names
+    as they are, so they also select courts missing from the file.
+"""
+
+# Constants
+JURIS_ABBREVS_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "juris_abbrevs.txt"
+)
+JURISDICTION_GROUPS: Dict[str, Tuple[str, str]] = {
+    "federal": ("scotus", "vid"),  # every federal court
+    "circuits": ("ca1", "cafc"),  # the courts of appeals
+    "federal_special": ("ag", "cit"),  # military, tax, claims and other courts
+    "bankruptcy_appellate": ("bap1", "bapma"),
+    "bankruptcy": ("almb", "vib"),
+    "district": ("dcd", "vid"),
+    "state": ("ala", "wyo"),
+}
+GLOB_CHARACTERS = "*?["
+
+
+@lru_cache(maxsize=None)
+def abbreviations(path: str = JURIS_ABBREVS_FILE) -> Tuple[str, ...]:
+    """Return the jurisdiction abbreviations of juris_abbrevs.txt, in file order."""
+    with open(path, encoding="utf-8") as file:
+        return tuple(line.strip() for line in file if line.strip())
+
+
+def group_jurisdictions(group: str) -> List[str]:
+    """Return the abbreviations of a group of JURISDICTION_GROUPS."""
+    if group not in JURISDICTION_GROUPS:
+        raise ValueError(
+            f"Unknown jurisdiction group {group!r}, expected one of "
+            f"{tuple(JURISDICTION_GROUPS)}"
+        )
+    known = abbreviations()
+    first, last = JURISDICTION_GROUPS[group]
+    return list(known[known.index(first) : known.index(last) + 1])
+
+
+def _compile(entries: Sequence[str]) -> Tuple[Set[str], List[str]]:
+    """Split selection entries into a set of abbreviations and glob patterns."""
+    if isinstance(entries, str):
+        raise TypeError("Expected a list of jurisdictions, not a string")
+    known = set(abbreviations())
+    names: Set[str] = set()
+    patterns: List[str] = []
+    for entry in entries:
+        if entry in JURISDICTION_GROUPS:
+            names.update(group_jurisdictions(entry))
+        elif any(character in entry for character in GLOB_CHARACTERS):
+            patterns.append(entry)
+        elif entry in known:
+            names.add(entry)
+        else:
+            raise ValueError(
+                f"Unknown jurisdiction {entry!r}: expected an abbreviation of "
+                f"{os.path.basename(JURIS_ABBREVS_FILE)}, a glob pattern or one "
+                f"of the groups {tuple(JURISDICTION_GROUPS)}"
+            )
+    return names, patterns
+
+
+class JurisdictionFilter:
+    """
+    Selects jurisdictions by lists of abbreviations, groups and patterns.
+
+    Example:
+        >>> selected = JurisdictionFilter(["circuits", "scotus"], exclude=["cafc"])
+        >>> selected("ca9"), selected("cafc"), selected("cal")
+        (True, False, False)
+    """
+
+    def __init__(
+        self,
+        include: Optional[Sequence[str]] = None,
+        exclude: Optional[Sequence[str]] = None,
+    ) -> None:
+        self.include = None if include is None else list(include)
+        self.exclude = [] if exclude is None else list(exclude)
+        self._include = None if include is None else _compile(include)
+        self._exclude = _compile(self.exclude)
+
+    @staticmethod
+    def _matches(jurisdiction: str, selection: Tuple[Set[str], List[str]]) -> bool:
+        names, patterns = selection
+        return jurisdiction in names or any(
+            fnmatch.fnmatchcase(jurisdiction, pattern) for pattern in patterns
+        )
+
+    def __call__(self, jurisdiction: str) -> bool:
+        """Return True if a jurisdiction is included and not excluded."""
+        if self._include is not None and not self._matches(jurisdiction, self._include):
+            return False
+        return not self._matches(jurisdiction, self._exclude)
+
+
+def jurisdiction_filter(
+    include: Optional[Sequence[str]] = None, exclude: Optional[Sequence[str]] = None
+) -> Optional[JurisdictionFilter]:
+    """Return the filter of include and exclude lists, or None to read everything."""
+    if include is None and not exclude:
+        return None
+    return JurisdictionFilter(include, exclude)
+
+
+class JurisdictionSource:
+    """The records of any corpus source that are in selected jurisdictions."""
+
+    def __init__(self, source: CorpusSource, selected: Callable[[str], bool]) -> None:
+        self.source = source
+        self.selected = selected
+
+    def records(self, with_data: bool = True) -> Iterator[OpinionRecord]:
+        """Yield the records of the source in selected jurisdictions."""
+        for record in self.source.records(with_data=with_data):
+            if self.selected(jurisdiction_of(record.name)):
+                yield record
+
+
+def filtered_source(
+    data_dir: Union[str, CorpusSource],
+    selected: Optional[Callable[[str], bool]] = None,
+) -> Union[CorpusSource, JurisdictionSource]:
+    """
+    Return the source of a corpus path or source object, restricted to
+    the jurisdictions selected, if given.
+
+    Directories and archives skip other jurisdictions without reading
+    them (see leglove.sources); other sources are filtered record by
+    record.
+    """
+    if isinstance(data_dir, str):
+        return corpus_source(data_dir, selected)
+    if selected is None:
+        return data_dir
+    return JurisdictionSource(data_dir, selected)
@@ -0,0 +1,504 @@
+import logging
+import multiprocessing
+import pickle
+import queue
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+"""
+    model.py
+    --------
+    This module contains LeGlove's built-in GloVe trainer, a pure NumPy
+    replacement for the glove-python C extension. Each epoch visits the
+    nonzero co-occurrence entries in a random order, in minibatches: the
+    predictions and gradients of a whole batch are computed with array
+    operations, gradients of words that appear several times in a batch
+    are summed, and every touched word vector and bias is updated with
+    AdaGrad. Parameters are float32.
+
+    The model follows glove-python's formulation (a single set of word
+    vectors and biases shared by rows and columns, the same weighting
+    function, learning rate schedule and loss clipping) and is saved in
+    the same pickle format, so models trained by either backend can be
+    loaded with GloveModel.load or glove.Glove.load.
+
+    With several threads, training is Hogwild-style: the parameters and
+    AdaGrad accumulators are moved into shared memory, and every epoch
+    each worker process trains on its own slice of the shuffled entries,
+    updating the shared arrays without locks. Gradients computed by
+    concurrent minibatches are stale with respect to each other, so each
+    worker uses batch_size / no_threads entries per minibatch to keep the
+    number of entries in flight the same as in single-process training.
+"""
+
+# Constants
+DEFAULT_BATCH_SIZE = 4096  # co-occurrence entries per AdaGrad minibatch
+LOSS_BATCH_SIZE = 2**20  # entries per chunk when evaluating the loss
+WORKER_TIMEOUT = 1  # seconds between liveness checks of training workers
+PARAMETERS = (
+    "word_vectors",
+    "word_biases",
+    "vectors_sum_gradients",
+    "biases_sum_gradients",
+)
+
+
+def _entries(matrix) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return the rows, columns and values of a co-occurrence matrix."""
+    if hasattr(matrix, "counts"):
+        return matrix.rows, matrix.cols, matrix.values
+    # scipy.sparse.coo_matrix, as produced by glove.Corpus
+    return matrix.row, matrix.col, matrix.data
+
+
+def glove_loss(
+    word_vectors: np.ndarray,
+    word_biases: np.ndarray,
+    matrix,
+    max_count: float = 100.0,
+    alpha: float = 0.75,
+) -> float:
+    """
+    Return the mean weighted squared error of a model on a co-occurrence matrix.
+
+    This is the GloVe objective, 0.5 * f(x) * (w_i . w_j + b_i + b_j - log x)^2,
+    averaged over the nonzero entries. It is computed in chunks, so it can
+    evaluate models from either training backend on large matrices.
+    """
+    rows, cols, values = _entries(matrix)
+    if len(values) == 0:
+        return 0.0
+
+    total = 0.0
+    for start in range(0, len(values), LOSS_BATCH_SIZE):
+        stop = start + LOSS_BATCH_SIZE
+        row = rows[start:stop]
+        col = cols[start:stop]
+        value = np.asarray(values[start:stop], dtype=np.float64)
+        prediction = (
+            np.einsum("ij,ij->i", word_vectors[row], word_vectors[col])
+            + word_biases[row]
+            + word_biases[col]
+        )
+        difference = prediction - np.log(value)
+        weight = np.minimum(1.0, value / max_count) ** alpha
+        total += 0.5 * float(np.sum(weight * difference * difference))
+    return total / len(values)
+
+
+class GloveModel:
+    """
+    GloVe model trained with vectorized minibatch AdaGrad.
+
+    Example:
+        >>> model = GloveModel(no_components=100, learning_rate=0.05)
+        >>> model.fit(cooccurrence_matrix, epochs=10)
+        >>> model.add_dictionary(cooccurrence_matrix.dictionary)
+        >>> model.save("LeGlove.model")
+    """
+
+    def __init__(
+        self,
+        no_components: int = 30,
+        learning_rate: float = 0.05,
+        alpha: float = 0.75,
+        max_count: float = 100.0,
+        max_loss: float = 10.0,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        random_state: Optional[int] = None,
+    ) -> None:
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+
+        self.no_components = no_components
+        self.learning_rate = float(learning_rate)
+        self.alpha = float(alpha)
+        self.max_count = float(max_count)
+        self.max_loss = max_loss
+        self.batch_size = batch_size
+
+        self.word_vectors: Optional[np.ndarray] = None
+        self.word_biases: Optional[np.ndarray] = None
+
+        self.vectors_sum_gradients: Optional[np.ndarray] = None
+        self.biases_sum_gradients: Optional[np.ndarray] = None
+
+        self.dictionary: Optional[Mapping[str, int]] = None
+        self.inverse_dictionary: Optional[Dict[int, str]] = None
+
+        self.random_state = random_state
+        self.loss_history: List[float] = []
+
+    def _initialize(self, num_words: int, rng: np.random.Generator) -> None:
+        """Draw initial parameters the way glove-python does."""
+        self.word_vectors = (
+            rng.random((num_words, self.no_components), dtype=np.float32) - 0.5
+        ) / np.float32(self.no_components)
+        self.word_biases = np.zeros(num_words, dtype=np.float32)
+        self.vectors_sum_gradients = np.ones_like(self.word_vectors)
+        self.biases_sum_gradients = np.ones_like(self.word_biases)
+        self.loss_history = []
+
+    def fit(
+        self,
+        matrix,
+        epochs: int = 5,
+        no_threads: int = 1,
+        verbose: bool = False,
+        warm_start: bool = False,
+        callback: Optional[Callable[[int, float], None]] = None,
+    ) -> "GloveModel":
+        """
+        Estimate the word vectors.
+
+        Args:
+            matrix: Square co-occurrence matrix, either a
+                leglove.cooccurrence.CooccurrenceMatrix or a
+                scipy.sparse.coo_matrix.
+            epochs: Number of training epochs.
+            no_threads: Number of training processes. With more than one,
+                the processes update shared parameters without locking
+                (Hogwild), so results vary slightly from run to run.
+            verbose: If True, log the training loss after every epoch.
+            warm_start: If True, continue from the current parameters and
+                optimizer state instead of reinitializing them.
+            callback: Optional function called with the epoch number and
+                mean loss after every epoch.
+
+        Returns:
+            The fitted model.
+        """
+        shape = matrix.shape
+        if len(shape) != 2 or shape[0] != shape[1]:
+            raise ValueError("Cooccurrence matrix must be square")
+        if no_threads < 1:
+            raise ValueError("no_threads must be at least 1")
+
+        if not warm_start or self.word_vectors is None:
+            self._initialize(shape[0], np.random.default_rng(self.random_state))
+        elif len(self.word_vectors) != shape[0]:
+            raise ValueError("Cooccurrence matrix does not match the model size")
+
+        rows, cols, values = _entries(matrix)
+        values = np.asarray(values, dtype=np.float64)
+        entries = {
+            "rows": np.asarray(rows, dtype=np.int32),
+            "cols": np.asarray(cols, dtype=np.int32),
+            "log_values": np.log(values).astype(np.float32),
+            "weights": (np.minimum(1.0, values / self.max_count) ** self.alpha).astype(
+                np.float32
+            ),
+        }
+
+        if no_threads > 1 and len(values) > 0:
+            self._fit_hogwild(entries, epochs, no_threads, verbose, callback)
+            return self
+
+        for _ in range(epochs):
+            order = self._epoch_rng().permutation(len(values))
+            loss = self._fit_entries(order, entries)
+            self._finish_epoch(loss / max(len(values), 1), verbose, callback)
+        return self
+
+    def _fit_hogwild(
+        self,
+        entries: Dict[str, np.ndarray],
+        epochs: int,
+        no_threads: int,
+        verbose: bool,
+        callback: Optional[Callable[[int, float], None]],
+    ) -> None:
+        """Train with worker processes sharing the parameters in shared memory."""
+        num_entries = len(entries["rows"])
+        blocks: List[SharedMemory] = []
+        specs: Dict[str, Tuple[str, Tuple[int, ...], str]] = {}
+        arrays: Dict[str, np.ndarray] = {}
+
+        def share(name: str, array: np.ndarray) -> None:
+            block = SharedMemory(create=True, size=max(array.nbytes, 1))
+            blocks.append(block)
+            arrays[name] = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+            arrays[name][...] = array
+            specs[name] = (block.name, array.shape, array.dtype.str)
+
+        tasks: List[Any] = []
+        processes: List[multiprocessing.Process] = []
+        try:
+            for name in PARAMETERS:
+                share(name, getattr(self, name))
+                setattr(self, name, arrays[name])
+            for name, array in entries.items():
+                share(name, array)
+            share("order", np.arange(num_entries, dtype=np.int64))
+
+            results = multiprocessing.Queue()
+            tasks = [multiprocessing.Queue() for _ in range(no_threads)]
+            processes = [
+                multiprocessing.Process(
+                    target=_hogwild_worker,
+                    args=(self._worker_model(no_threads), specs, worker, no_threads),
+                    kwargs={"tasks": worker_tasks, "results": results},
+                    daemon=True,
+                )
+                for worker, worker_tasks in enumerate(tasks)
+            ]
+            for process in processes:
+                process.start()
+
+            for _ in range(epochs):
+                arrays["order"][...] = self._epoch_rng().permutation(num_entries)
+                for worker_tasks in tasks:
+                    worker_tasks.put(True)
+                loss = sum(_get_result(results, processes) for _ in processes)
+                self._finish_epoch(loss / num_entries, verbose, callback)
+
+            for worker_tasks in tasks:
+                worker_tasks.put(None)
+            for process in processes:
+                process.join()
+                if process.exitcode != 0:
+                    raise RuntimeError(
+                        f"Training worker exited with code {process.exitcode}"
+                    )
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+            for name in PARAMETERS:
+                if name in arrays:
+                    setattr(self, name, arrays[name].copy())
+            arrays.clear()
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    def _worker_model(self, no_threads: int) -> "GloveModel":
+        """Return a parameterless copy of the model for one of no_threads workers."""
+        return GloveModel(
+            no_components=self.no_components,
+            learning_rate=self.learning_rate,
+            alpha=self.alpha,
+            max_count=self.max_count,
+            max_loss=self.max_loss,
+            batch_size=max(self.batch_size // no_threads, 1),
+        )
+
+    def _fit_entries(self, order: np.ndarray, entries: Dict[str, np.ndarray]) -> float:
+        """Train on the given entries in minibatches and return the summed loss."""
+        loss = 0.0
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start : start + self.batch_size]
+            loss += self._fit_batch(
+                entries["rows"][batch],
+                entries["cols"][batch],
+                entries["log_values"][batch],
+                entries["weights"][batch],
+            )
+        return loss
+
+    def _finish_epoch(
+        self,
+        loss: float,
+        verbose: bool,
+        callback: Optional[Callable[[int, float], None]],
+    ) -> None:
+        """Check the parameters after an epoch and record its mean loss."""
+        assert self.word_vectors is not None
+        if not np.isfinite(self.word_vectors).all():
+            raise ValueError(
+                "Non-finite values in word vectors. Try reducing the "
+                "learning rate or the max_loss parameter."
+            )
+        self.loss_history.append(loss)
+        if verbose:
+            logging.info(
+                f"Epoch {len(self.loss_history) - 1}: loss {self.loss_history[-1]:.6f}"
+            )
+        if callback is not None:
+            callback(len(self.loss_history) - 1, loss)
+
+    def _epoch_rng(self) -> np.random.Generator:
+        """
+        Return the random generator that shuffles the next epoch.
+
+        With a random_state, each epoch has its own seed, so training in
+        several warm-started fit calls gives the same result as one call.
+        """
+        if self.random_state is None:
+            return np.random.default_rng()
+        return np.random.default_rng([self.random_state, len(self.loss_history)])
+
+    def _fit_batch(
+        self,
+        rows: np.ndarray,
+        cols: np.ndarray,
+        log_values: np.ndarray,
+        weights: np.ndarray,
+    ) -> float:
+        """Apply one AdaGrad step for a minibatch and return its summed loss."""
+        word_vectors = self.word_vectors
+        word_biases = self.word_biases
+        vectors_sum_gradients = self.vectors_sum_gradients
+        biases_sum_gradients = self.biases_sum_gradients
+        assert word_vectors is not None and word_biases is not None
+        assert vectors_sum_gradients is not None and biases_sum_gradients is not None
+
+        row_vectors = word_vectors[rows]
+        col_vectors = word_vectors[cols]
+        difference = (
+            np.einsum("ij,ij->i", row_vectors, col_vectors)
+            + word_biases[rows]
+            + word_biases[cols]
+            - log_values
+        )
+        weighted = weights * difference
+        loss = 0.5 * float(np.dot(weighted, difference))
+        weighted = np.clip(weighted, -self.max_loss, self.max_loss)
+
+        # Sum the gradients of every word over its occurrences in the batch
+        words = np.concatenate((rows, cols))
+        order = np.argsort(words, kind="stable")
+        words = words[order]
+        starts = np.flatnonzero(np.concatenate(([True], words[1:] != words[:-1])))
+        unique_words = words[starts]
+        vector_gradients = np.add.reduceat(
+            np.concatenate(
+                (weighted[:, None] * col_vectors, weighted[:, None] * row_vectors)
+            )[order],
+            starts,
+        )
+        bias_gradients = np.add.reduceat(
+            np.concatenate((weighted, weighted))[order], starts
+        )
+
+        learning_rate = np.float32(self.learning_rate)
+        word_vectors[unique_words] -= (
+            learning_rate
+            * vector_gradients
+            / np.sqrt(vectors_sum_gradients[unique_words])
+        )
+        vectors_sum_gradients[unique_words] += vector_gradients * vector_gradients
+        word_biases[unique_words] -= (
+            learning_rate * bias_gradients / np.sqrt(biases_sum_gradients[unique_words])
+        )
+        biases_sum_gradients[unique_words] += bias_gradients * bias_gradients
+        return loss
+
+    def add_words(self, num_words: int) -> None:
+        """
+        Append parameters for num_words new words, initialized as by fit,
+        so that a warm-started fit can train on a grown vocabulary.
+        """
+        if self.word_vectors is None or self.word_biases is None:
+            raise ValueError("Model must be fit before adding words")
+        assert self.vectors_sum_gradients is not None
+        assert self.biases_sum_gradients is not None
+        if num_words < 1:
+            return
+
+        seed = None
+        if self.random_state is not None:
+            seed = [self.random_state, len(self.word_vectors)]
+        new_vectors = (
+            np.random.default_rng(seed).random(
+                (num_words, self.no_components), dtype=np.float32
+            )
+            - 0.5
+        ) / np.float32(self.no_components)
+        self.word_vectors = np.concatenate((self.word_vectors, new_vectors))
+        self.word_biases = np.concatenate(
+            (self.word_biases, np.zeros(num_words, dtype=np.float32))
+        )
+        self.vectors_sum_gradients = np.concatenate(
+            (self.vectors_sum_gradients, np.ones_like(new_vectors))
+        )
+        self.biases_sum_gradients = np.concatenate(
+            (self.biases_sum_gradients, np.ones(num_words, dtype=np.float32))
+        )
+
+    def add_dictionary(self, dictionary: Mapping[str, int]) -> None:
+        """Supply a word-id dictionary to allow similarity queries."""
+        if self.word_vectors is None:
+            raise ValueError("Model must be fit before adding a dictionary")
+        if len(dictionary) > len(self.word_vectors):
+            raise ValueError(
+                "Dictionary length must be smaller or equal to the number of word vectors"
+            )
+
+        self.dictionary = dictionary
+        self.inverse_dictionary = {index: word for word, index in dictionary.items()}
+
+    def save(self, filename: str) -> None:
+        """Serialize the model in glove-python's pickle format."""
+        with open(filename, "wb") as savefile:
+            pickle.dump(self.__dict__, savefile, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, filename: str) -> "GloveModel":
+        """Load a model saved by GloveModel.save or glove.Glove.save."""
+        instance = cls()
+        with open(filename, "rb") as savefile:
+            instance.__dict__.update(pickle.load(savefile))
+        return instance
+
+
+def _get_result(results: Any, processes: List[multiprocessing.Process]) -> float:
+    """Wait for the loss of a training worker, failing if any worker has died."""
+    while True:
+        try:
+            return results.get(timeout=WORKER_TIMEOUT)
+        except queue.Empty:
+            for process in processes:
+                if not process.is_alive():
+                    raise RuntimeError(
+                        f"Training worker exited with code {process.exitcode}"
+                    ) from None
+
+
+def _attach(
+    specs: Dict[str, Tuple[str, Tuple[int, ...], str]], blocks: Dict[str, SharedMemory]
+) -> Dict[str, np.ndarray]:
+    """Return array views of shared memory blocks described by specs."""
+    return {
+        name: np.ndarray(shape, dtype=dtype, buffer=blocks[name].buf)
+        for name, (_, shape, dtype) in specs.items()
+    }
+
+
+def _hogwild_epochs(
+    model: GloveModel,
+    arrays: Dict[str, np.ndarray],
+    worker: int,
+    num_workers: int,
+    tasks: Any,
+    results: Any,
+) -> None:
+    """Train on this worker's slice of the shuffled entries once per task."""
+    for name in PARAMETERS:
+        setattr(model, name, arrays[name])
+    for _ in iter(tasks.get, None):
+        order = arrays["order"][worker::num_workers]
+        results.put(model._fit_entries(order, arrays))
+    for name in PARAMETERS:
+        setattr(model, name, None)
+
+
+def _hogwild_worker(
+    model: GloveModel,
+    specs: Dict[str, Tuple[str, Tuple[int, ...], str]],
+    worker: int,
+    num_workers: int,
+    tasks: Any,
+    results: Any,
+) -> None:
+    """Attach to the shared parameters and entries and train on them."""
+    blocks = {name: SharedMemory(name=spec[0]) for name, spec in specs.items()}
+    try:
+        _hogwild_epochs(
+            model, _attach(specs, blocks), worker, num_workers, tasks, results
+        )
+    finally:
+        for block in blocks.values():
+            block.close()
@@ -0,0 +1,161 @@
+from typing import Iterable, List, Mapping, Tuple
+
+import numpy as np
+
+from .vocab import CompactVocabulary
+
+"""
+    neighbors.py
+    --------
+    This module answers nearest neighbor queries over the word vectors
+    of a trained model. The vectors are kept in one contiguous float32
+    matrix with precomputed norms, so a batch of queries is scored
+    against the whole vocabulary with a single matrix multiplication.
+    The top K candidates of each query are selected with argpartition,
+    and only those K distances are recomputed exactly and sorted.
+
+    Words are mapped to rows by a leglove.vocab.CompactVocabulary rather
+    than a dict, so the index adds little memory beyond the vectors.
+
+    Two metrics are supported: "euclidean" (the distance between the
+    vectors) and "cosine" (one minus the cosine similarity).
+"""
+
+# Constants
+METRICS = ("euclidean", "cosine")  # supported distance metrics
+DEFAULT_METRIC = "euclidean"
+QUERY_BLOCK_SIZE = 256  # queries scored per matrix multiplication
+
+
+class NearestNeighbors:
+    """
+    Top-K nearest neighbor queries over a fixed set of word vectors.
+
+    Example:
+        >>> neighbors = NearestNeighbors.from_model(GloveModel.load("LeGlove.model"))
+        >>> neighbors.query("legal", k=3)
+        [('legal', 0.0), ('law', 0.83), ('court', 0.91)]
+    """
+
+    def __init__(
+        self,
+        word_vectors: np.ndarray,
+        dictionary: Mapping[str, int],
+        metric: str = DEFAULT_METRIC,
+    ) -> None:
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric {metric!r}, expected one of {METRICS}")
+
+        if not isinstance(dictionary, CompactVocabulary):
+            dictionary = CompactVocabulary.from_dictionary(dictionary)
+        self.metric = metric
+        # Rows follow the sorted word order of the vocabulary
+        self.dictionary = dictionary.renumber(np.arange(len(dictionary)))
+        self.vectors = np.ascontiguousarray(
+            np.asarray(word_vectors)[dictionary.ids], dtype=np.float32
+        )
+        self.norms = np.linalg.norm(self.vectors, axis=1)
+        if metric == "cosine":
+            # Zero vectors are left as they are instead of dividing by zero
+            self.vectors /= np.maximum(self.norms, np.finfo(np.float32).tiny)[:, None]
+            self.norms = np.linalg.norm(self.vectors, axis=1)
+        self._squared_norms = self.norms * self.norms
+
+    @classmethod
+    def from_model(cls, model, metric: str = DEFAULT_METRIC) -> "NearestNeighbors":
+        """Build the index from a model with word_vectors and a dictionary."""
+        if model.dictionary is None or model.word_vectors is None:
+            raise ValueError("Model must be fit and have a dictionary")
+        return cls(model.word_vectors, model.dictionary, metric)
+
+    def __len__(self) -> int:
+        return len(self.dictionary)
+
+    @property
+    def no_components(self) -> int:
+        return self.vectors.shape[1]
+
+    def __contains__(self, word: str) -> bool:
+        return word in self.dictionary
+
+    @property
+    def words(self) -> List[str]:
+        """Every indexed word, in row order."""
+        return [self.dictionary.word(row) for row in range(len(self))]
+
+    def vector(self, word: str) -> np.ndarray:
+        """Return the indexed vector of a word (unit length for cosine)."""
+        try:
+            return self.vectors[self.dictionary[word]]
+        except KeyError:
+            raise KeyError(f"{word!r} is not in the vocabulary") from None
+
+    def query(self, word: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Return the k nearest (word, distance) pairs of a word, itself included."""
+        return self.query_batch([word], k)[0]
+
+    def query_batch(
+        self, words: Iterable[str], k: int = 10
+    ) -> List[List[Tuple[str, float]]]:
+        """Return the k nearest (word, distance) pairs of each of several words."""
+        queries = np.array([self.vector(word) for word in words], dtype=np.float32)
+        indices, distances = self.search(queries.reshape(-1, self.no_components), k)
+        return [
+            [
+                (self.dictionary.word(index), float(distance))
+                for index, distance in zip(row_indices, row_distances)
+                if index >= 0
+            ]
+            for row_indices, row_distances in zip(indices, distances)
+        ]
+
+    def search(self, queries: np.ndarray, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the k nearest indexed vectors of each query vector.
+
+        Args:
+            queries: Array of shape (num_queries, dimensions).
+            k: Number of neighbors to return per query.
+
+        Returns:
+            A (num_queries, k) array of row indices of the words and a
+            (num_queries, k) array of their distances, nearest first.
+        """
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        queries = np.asarray(queries, dtype=np.float32)
+        if self.metric == "cosine":
+            norms = np.linalg.norm(queries, axis=1, keepdims=True)
+            queries = queries / np.maximum(norms, np.finfo(np.float32).tiny)
+        k = min(k, len(self))
+
+        indices = np.empty((len(queries), k), dtype=np.int64)
+        distances = np.empty((len(queries), k), dtype=np.float32)
+        for start in range(0, len(queries), QUERY_BLOCK_SIZE):
+            block = queries[start : start + QUERY_BLOCK_SIZE]
+            # Ranking only needs |x|^2 - 2 q.x for Euclidean, and -q.x for cosine
+            scores = block @ self.vectors.T
+            if self.metric == "euclidean":
+                scores *= -2.0
+                scores += self._squared_norms
+            else:
+                np.negative(scores, out=scores)
+            if k < len(self):
+                candidates = np.argpartition(scores, k - 1, axis=1)[:, :k]
+            else:
+                candidates = np.broadcast_to(np.arange(k), scores.shape)
+
+            exact = self._distances(block, candidates)
+            order = np.argsort(exact, axis=1, kind="stable")
+            stop = start + len(block)
+            indices[start:stop] = np.take_along_axis(candidates, order, axis=1)
+            distances[start:stop] = np.take_along_axis(exact, order, axis=1)
+        return indices, distances
+
+    def _distances(self, queries: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+        """Return the exact distances between queries and their candidate rows."""
+        if self.metric == "cosine":
+            products = np.einsum("ij,ikj->ik", queries, self.vectors[candidates])
+            return np.maximum(1.0 - products, 0.0)
+        differences = queries[:, None, :] - self.vectors[candidates]
+        return np.sqrt(np.einsum("ikj,ikj->ik", differences, differences))
@@ -0,0 +1,120 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Callable, Deque, Iterable, Iterator, List, Optional, TypeVar
+
+"""
+    parallel.py
+    --------
+    This module provides the process pool helpers used to spread the
+    expensive stages of the LeGlove pipeline (HTML cleanup, tokenization,
+    merging partial co-occurrence matrices) across several cores. Work
+    items are grouped into chunks to amortize inter-process
+    communication, and only a bounded number of chunks is kept in
+    flight so that memory use stays flat on large corpora.
+"""
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Constants
+DEFAULT_CHUNK_SIZE = 64  # number of work items sent to a worker at once
+PENDING_CHUNKS_PER_WORKER = 2  # in-flight chunks allowed per worker process
+
+
+def iter_chunks(items: Iterable[T], chunk_size: int) -> Iterator[List[T]]:
+    """Yield consecutive lists of at most chunk_size items."""
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+
+    chunk: List[T] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def parallel_map_chunks(
+    func: Callable[[List[T]], R],
+    items: Iterable[T],
+    num_workers: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_pending: Optional[int] = None,
+    ordered: bool = True,
+) -> Iterator[R]:
+    """
+    Apply func to chunks of items in a pool of worker processes.
+
+    Items are consumed lazily: at most max_pending chunks are submitted
+    to the pool at any time, so the input iterator may be arbitrarily long
+    without buffering it in memory.
+
+    Args:
+        func: Picklable function applied to each chunk of items.
+        items: Work items, consumed lazily.
+        num_workers: Number of worker processes.
+        chunk_size: Number of items per chunk.
+        max_pending: Maximum number of chunks in flight. Defaults to
+            PENDING_CHUNKS_PER_WORKER chunks per worker.
+        ordered: If True, results are yielded in input order; otherwise
+            they are yielded as soon as each chunk completes.
+
+    Returns:
+        An iterator over the result of func for each chunk.
+    """
+    if num_workers < 1:
+        raise ValueError("num_workers must be at least 1")
+    if max_pending is None:
+        max_pending = PENDING_CHUNKS_PER_WORKER * num_workers
+    max_pending = max(max_pending, 1)
+
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        pending: Deque[Future] = deque()
+
+        def next_done() -> Future:
+            if ordered:
+                return pending.popleft()
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            future = next(iter(done))
+            pending.remove(future)
+            return future
+
+        for chunk in iter_chunks(items, chunk_size):
+            pending.append(executor.submit(func, chunk))
+            while len(pending) >= max_pending:
+                yield next_done().result()
+
+        while pending:
+            yield next_done().result()
+
+
+def tree_reduce(func: Callable[[T, T], T], items: List[T], num_workers: int) -> T:
+    """
+    Combine items pairwise in rounds until a single result remains.
+
+    The merges of each round run in parallel worker processes, so n items
+    are combined in about log2(n) rounds. func must be associative; the
+    left-to-right order of the items is preserved.
+
+    Args:
+        func: Picklable function combining two items into one.
+        items: Items to combine.
+        num_workers: Number of worker processes.
+
+    Returns:
+        The combination of all items.
+    """
+    if not items:
+        raise ValueError("tree_reduce requires at least one item")
+    if num_workers < 1:
+        raise ValueError("num_workers must be at least 1")
+
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        while len(items) > 1:
+            merged = list(executor.map(func, items[0::2], items[1::2]))
+            if len(items) % 2:
+                merged.append(items[-1])
+            items = merged
+    return items[0]
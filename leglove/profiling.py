@@ -0,0 +1,249 @@
+import json
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    TypeVar,
+)
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+"""
+    profiling.py
+    --------
+    This module measures where a training run spends its time. A
+    Profiler accumulates the time, size and number of documents of each
+    named stage of the pipeline:
+
+        source              listing the corpus, or reading and
+                            decompressing archive members
+        file_read           reading opinion files (summed over reader
+                            threads when files are prefetched)
+        io_wait             waiting for prefetched files to be read
+        json_parse          extracting the opinion HTML from its JSON
+        clean_html          HTML cleanup
+        regex_substitution  replacing citations and other legal patterns
+        tokenization        word tokenization
+        read_corpus         the rest of reading the corpus, e.g. waiting
+                            for worker processes or loading cached tokens
+        vocabulary          the vocabulary pre-pass
+        cooccurrence        co-occurrence counting
+        training            fitting the model, besides its epochs
+        epoch_<n>           each training epoch
+        save                saving and exporting the model
+
+    Stage times are exclusive: while a stage consumes a generator that
+    runs other stages, their time is only counted for the inner stages,
+    so the stage times of one process add up to its wall time. Stages
+    timed in worker processes are merged into the profiler of the
+    calling process, so their times add up over all workers. Sizes are
+    in bytes, those of text in bytes of UTF-8 (see text_bytes).
+
+    Profiling is opt-in: without a profiler, the pipeline runs exactly
+    as before. With progress enabled, a live progress line is written
+    to stderr, and the report is available as JSON.
+"""
+
+# Constants
+PROGRESS_INTERVAL = 0.5  # minimum seconds between progress line updates
+PROGRESS_STAGE = "read_corpus"  # stage whose documents the progress line counts
+
+T = TypeVar("T")
+
+
+def text_bytes(text: str) -> int:
+    """Return the size of text in bytes of UTF-8, as profiles report it."""
+    return len(text.encode("utf-8", "surrogatepass"))
+
+
+def peak_rss_bytes(children: bool = False) -> Optional[int]:
+    """
+    Return the peak resident set size of this process, or the largest of
+    its terminated child processes, or None where it is unavailable.
+    """
+    if resource is None:
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    max_rss = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+class StageFrame:
+    """A stage being timed; its counts may be set before it ends."""
+
+    def __init__(self, name: str, docs: int = 0, num_bytes: int = 0) -> None:
+        self.name = name
+        self.docs = docs
+        self.num_bytes = num_bytes
+        self.nested_seconds = 0.0
+
+
+class Profiler:
+    """
+    Per-stage time, size and document counts of a training run.
+
+    Example:
+        >>> profiler = Profiler(progress=True)
+        >>> train_and_save_model("data/", profiler=profiler)
+        >>> profiler.close()
+        >>> profiler.save("profile.json")
+    """
+
+    def __init__(self, progress: bool = False, stream: Optional[TextIO] = None) -> None:
+        """
+        Args:
+            progress: If True, write a live progress line while stages run.
+            stream: Stream of the progress line. Defaults to sys.stderr.
+        """
+        self.progress = progress
+        self.stream = stream
+        # Name of each stage -> [seconds, docs, bytes], in order of first use
+        self.stages: Dict[str, List[float]] = {}
+        self._frames: List[StageFrame] = []
+        self._start = time.perf_counter()
+        self._last_progress = self._start
+
+    def _add(self, name: str, seconds: float, docs: int, num_bytes: int) -> None:
+        """Add to the totals of a stage."""
+        totals = self.stages.setdefault(name, [0.0, 0, 0])
+        totals[0] += seconds
+        totals[1] += docs
+        totals[2] += num_bytes
+        if self.progress:
+            now = time.perf_counter()
+            if now - self._last_progress >= PROGRESS_INTERVAL:
+                self._last_progress = now
+                self._write_progress()
+
+    def record(
+        self, name: str, seconds: float, docs: int = 0, num_bytes: int = 0
+    ) -> None:
+        """Add time measured elsewhere to a stage nested in the current one."""
+        if self._frames:
+            self._frames[-1].nested_seconds += seconds
+        self._add(name, seconds, docs, num_bytes)
+
+    def merge(self, stages: Dict[str, List[float]]) -> None:
+        """Add the stage totals of another profiler, e.g. of a worker process."""
+        for name, (seconds, docs, num_bytes) in stages.items():
+            self._add(name, seconds, int(docs), int(num_bytes))
+
+    @contextmanager
+    def stage(
+        self, name: str, docs: int = 0, num_bytes: int = 0
+    ) -> Iterator[StageFrame]:
+        """Time the body of a with statement as a stage."""
+        frame = StageFrame(name, docs, num_bytes)
+        self._frames.append(frame)
+        start = time.perf_counter()
+        try:
+            yield frame
+        finally:
+            elapsed = time.perf_counter() - start
+            self._frames.pop()
+            if self._frames:
+                self._frames[-1].nested_seconds += elapsed
+            self._add(name, elapsed - frame.nested_seconds, frame.docs, frame.num_bytes)
+
+    def iterate(
+        self,
+        name: str,
+        items: Iterable[T],
+        size: Optional[Callable[[T], int]] = None,
+    ) -> Iterator[T]:
+        """Yield items, timing the production of each as one document of a stage."""
+        iterator = iter(items)
+        while True:
+            with self.stage(name) as frame:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                frame.docs = 1
+                if size is not None:
+                    frame.num_bytes = size(item)
+            yield item
+
+    def report(self) -> Dict[str, Any]:
+        """Return the totals of every stage, the wall time and peak memory."""
+        stages = {}
+        for name, (seconds, docs, num_bytes) in self.stages.items():
+            stages[name] = {
+                "seconds": seconds,
+                "docs": docs,
+                "bytes": num_bytes,
+                "docs_per_second": docs / seconds if seconds > 0 else None,
+                "mb_per_second": num_bytes / 2**20 / seconds if seconds > 0 else None,
+            }
+        return {
+            "wall_seconds": time.perf_counter() - self._start,
+            "peak_rss_bytes": peak_rss_bytes(),
+            "peak_child_rss_bytes": peak_rss_bytes(children=True),
+            "stages": stages,
+        }
+
+    def save(self, path: str) -> None:
+        """Write the report to a JSON file."""
+        with open(path, "w") as file:
+            json.dump(self.report(), file, indent=2)
+
+    def progress_line(self) -> str:
+        """Return a one-line summary of the current stage and documents read."""
+        elapsed = time.perf_counter() - self._start
+        current = " > ".join(frame.name for frame in self._frames) or "-"
+        docs = int(self.stages.get(PROGRESS_STAGE, [0.0, 0, 0])[1])
+        line = (
+            f"[{elapsed:8.1f}s] {docs:,} docs ({docs / max(elapsed, 1e-9):,.1f}/s), "
+            f"stage {current}"
+        )
+        rss = peak_rss_bytes()
+        if rss is not None:
+            line += f", peak RSS {rss / 2**20:,.0f} MB"
+        return line
+
+    def _write_progress(self, final: bool = False) -> None:
+        """Write the progress line, in place on a terminal."""
+        stream = self.stream if self.stream is not None else sys.stderr
+        if stream.isatty():
+            stream.write("\r\x1b[K" + self.progress_line() + ("\n" if final else ""))
+        else:
+            stream.write(self.progress_line() + "\n")
+        stream.flush()
+
+    def close(self) -> None:
+        """Write the final progress line, if progress is enabled."""
+        if self.progress:
+            self._write_progress(final=True)
+
+
+def profile_stage(
+    profiler: Optional[Profiler], name: str
+) -> ContextManager[Optional[StageFrame]]:
+    """Return profiler.stage(name), or a context doing nothing without a profiler."""
+    return nullcontext() if profiler is None else profiler.stage(name)
+
+
+def epoch_recorder(profiler: Profiler) -> Callable[[int, float], None]:
+    """Return a GloveModel.fit callback recording each epoch as a stage."""
+    last = time.perf_counter()
+
+    def record_epoch(epoch: int, loss: float) -> None:
+        nonlocal last
+        now = time.perf_counter()
+        profiler.record(f"epoch_{epoch}", now - last)
+        last = now
+
+    return record_epoch
@@ -0,0 +1,484 @@
+import logging
+from typing import Any, Dict, Mapping, Optional, Tuple, Union
+
+import numpy as np
+
+from .ann import KMEANS_ITERATIONS, kmeans, nearest_centroids
+from .neighbors import DEFAULT_METRIC, METRICS, QUERY_BLOCK_SIZE, NearestNeighbors
+from .vocab import CompactVocabulary
+
+"""
+    quantize.py
+    --------
+    This module compresses word vectors for models that are kept in
+    memory many at a time. Two quantizers are provided:
+
+        int8  every dimension is mapped linearly onto 256 levels between
+              its minimum and maximum, one byte per dimension (4x smaller
+              than float32, 8x smaller than float64)
+        pq    product quantization: the vector is split into subvectors
+              of a few dimensions, and each subvector is replaced by the
+              id of its nearest of 256 k-means centroids, one byte per
+              subvector (64x smaller than float32 for 100-d vectors
+              split into 4-d subvectors). Vectors whose dimensions have
+              no divisor of a few dimensions, such as 101-d vectors, are
+              padded with zeros to a multiple of the subvector size
+
+    QuantizedNeighbors searches the codes directly, without decoding
+    them: for each query it computes the inner products with the
+    quantization levels (int8) or with every centroid of every subspace
+    (pq, the asymmetric distance tables) and scores a code by summing
+    its entries. The distances are those to the decoded vectors, so
+    they are approximate.
+"""
+
+# Constants
+QUANTIZATIONS = ("int8", "pq")  # supported quantizers
+PQ_NUM_CENTROIDS = 256  # centroids per subspace, so that a code is one byte
+PQ_SUBVECTOR_SIZE = 4  # default (minimum) dimensions per subspace
+PQ_MAX_SUBVECTOR_SIZE = 8  # largest default subspace before padding
+PQ_TRAINING_SAMPLE = 16384  # vectors sampled to train the codebooks
+SCAN_BLOCK_SIZE = 16384  # codes scored per step of a scan
+RECALL_K = 10  # neighbors compared by quantization_report
+RECALL_QUERIES = 1000  # words queried by quantization_report
+
+
+class ScalarQuantizer:
+    """
+    Quantize each dimension to int8 between its minimum and maximum.
+
+    A code c decodes to minimum + scale * (c + 128).
+    """
+
+    name = "int8"
+    code_dtype = np.dtype(np.int8)
+
+    def __init__(self, minimum: np.ndarray, scale: np.ndarray) -> None:
+        self.minimum = np.asarray(minimum, dtype=np.float32)
+        self.scale = np.asarray(scale, dtype=np.float32)
+
+    @classmethod
+    def fit(cls, vectors: np.ndarray) -> "ScalarQuantizer":
+        """Fit the quantization range of every dimension."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        minimum = vectors.min(axis=0, initial=np.inf)
+        maximum = vectors.max(axis=0, initial=-np.inf)
+        minimum[~np.isfinite(minimum)] = 0.0
+        maximum[~np.isfinite(maximum)] = 0.0
+        scale = (maximum - minimum) / 255.0
+        # Constant dimensions decode exactly with any scale
+        scale[scale == 0.0] = 1.0
+        return cls(minimum, scale)
+
+    @property
+    def no_components(self) -> int:
+        return len(self.minimum)
+
+    @property
+    def code_size(self) -> int:
+        """Bytes per encoded vector."""
+        return self.no_components
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the quantizer parameters."""
+        return self.minimum.nbytes + self.scale.nbytes
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Return the parameters as the keyword arguments of the constructor."""
+        return {"minimum": self.minimum, "scale": self.scale}
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Return the (num_vectors, code_size) codes of vectors."""
+        levels = np.rint(
+            (np.asarray(vectors, dtype=np.float32) - self.minimum) / self.scale
+        )
+        return (np.clip(levels, 0, 255) - 128).astype(np.int8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """Return the float32 vectors that codes stand for."""
+        return (np.asarray(codes, dtype=np.float32) + 128.0) * self.scale + self.minimum
+
+    def inner_products(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Return the (num_queries, num_codes) inner products with the decoded codes."""
+        scaled = queries * self.scale
+        bias = queries @ (128.0 * self.scale + self.minimum)
+        products = scaled @ codes.astype(np.float32).T
+        products += bias[:, None]
+        return products
+
+
+class ProductQuantizer:
+    """
+    Quantize subvectors to the nearest of PQ_NUM_CENTROIDS k-means centroids.
+
+    codebooks has shape (num_subspaces, num_centroids, subvector_size), and
+    a code holds one centroid id per subspace. Vectors of fewer than
+    num_subspaces * subvector_size dimensions are padded with zeros.
+    """
+
+    name = "pq"
+    code_dtype = np.dtype(np.uint8)
+
+    def __init__(self, codebooks: np.ndarray, dimensions: Optional[int] = None) -> None:
+        self.codebooks = np.asarray(codebooks, dtype=np.float32)
+        if dimensions is None:
+            dimensions = self.codebooks.shape[0] * self.codebooks.shape[2]
+        self.dimensions = int(dimensions)
+
+    @classmethod
+    def fit(
+        cls,
+        vectors: np.ndarray,
+        num_subspaces: Optional[int] = None,
+        iterations: int = KMEANS_ITERATIONS,
+        random_state: Optional[int] = None,
+    ) -> "ProductQuantizer":
+        """
+        Train the codebook of every subspace with k-means.
+
+        Args:
+            vectors: Array of shape (num_vectors, dimensions).
+            num_subspaces: Number of subvectors, which must divide the
+                dimensions. Defaults to subvectors of PQ_SUBVECTOR_SIZE to
+                PQ_MAX_SUBVECTOR_SIZE dimensions, or, when no such size
+                divides the dimensions, to zero padded subvectors of
+                PQ_SUBVECTOR_SIZE dimensions.
+            iterations: Lloyd iterations per subspace.
+            random_state: Seed of the sampling and k-means initialization.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        dimensions = vectors.shape[1]
+        if num_subspaces is None:
+            num_subspaces = default_num_subspaces(dimensions)
+        elif num_subspaces < 1 or dimensions % num_subspaces:
+            raise ValueError(
+                f"num_subspaces must divide the {dimensions} vector dimensions"
+            )
+        if len(vectors) == 0:
+            raise ValueError("Cannot train a product quantizer without vectors")
+
+        rng = np.random.default_rng(random_state)
+        if len(vectors) > PQ_TRAINING_SAMPLE:
+            vectors = vectors[
+                rng.choice(len(vectors), PQ_TRAINING_SAMPLE, replace=False)
+            ]
+        num_centroids = min(PQ_NUM_CENTROIDS, len(vectors))
+        subvector_size = -(-dimensions // num_subspaces)
+        subvectors = _pad(vectors, num_subspaces * subvector_size).reshape(
+            len(vectors), num_subspaces, subvector_size
+        )
+        logging.info(
+            f"Training {num_subspaces} product quantization codebooks "
+            f"on {len(vectors)} vectors..."
+        )
+        codebooks = np.stack(
+            [
+                kmeans(
+                    np.ascontiguousarray(subvectors[:, subspace]),
+                    num_centroids,
+                    iterations,
+                    rng,
+                )
+                for subspace in range(num_subspaces)
+            ]
+        )
+        return cls(codebooks, dimensions)
+
+    @property
+    def num_subspaces(self) -> int:
+        return self.codebooks.shape[0]
+
+    @property
+    def no_components(self) -> int:
+        return self.dimensions
+
+    @property
+    def padded_components(self) -> int:
+        """Dimensions of the padded vectors split into subspaces."""
+        return self.codebooks.shape[0] * self.codebooks.shape[2]
+
+    @property
+    def code_size(self) -> int:
+        """Bytes per encoded vector."""
+        return self.num_subspaces
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the codebooks."""
+        return self.codebooks.nbytes
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Return the parameters as the keyword arguments of the constructor."""
+        return {"codebooks": self.codebooks, "dimensions": np.array(self.dimensions)}
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Return the (num_vectors, code_size) codes of vectors."""
+        vectors = _pad(np.asarray(vectors, dtype=np.float32), self.padded_components)
+        subvectors = vectors.reshape(len(vectors), self.num_subspaces, -1)
+        codes = np.empty((len(vectors), self.num_subspaces), dtype=np.uint8)
+        for subspace, codebook in enumerate(self.codebooks):
+            codes[:, subspace] = nearest_centroids(
+                np.ascontiguousarray(subvectors[:, subspace]), codebook
+            )
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """Return the float32 vectors that codes stand for."""
+        codes = np.asarray(codes)
+        subvectors = self.codebooks[np.arange(self.num_subspaces), codes]
+        vectors = subvectors.reshape(len(codes), self.padded_components)
+        return vectors[:, : self.dimensions]
+
+    def distance_tables(self, queries: np.ndarray) -> np.ndarray:
+        """Return the (num_queries, num_subspaces, num_centroids) subvector products."""
+        subqueries = _pad(queries, self.padded_components).reshape(
+            len(queries), self.num_subspaces, -1
+        )
+        return np.einsum("qmd,mkd->qmk", subqueries, self.codebooks)
+
+    def inner_products(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Return the (num_queries, num_codes) inner products with the decoded codes."""
+        # Gathering whole rows of (num_centroids, num_queries) tables is
+        # much faster than gathering single entries per query
+        tables = np.ascontiguousarray(self.distance_tables(queries).transpose(1, 2, 0))
+        products = np.zeros((len(codes), len(queries)), dtype=np.float32)
+        for subspace in range(self.num_subspaces):
+            products += tables[subspace][codes[:, subspace]]
+        return products.T
+
+
+Quantizer = Union[ScalarQuantizer, ProductQuantizer]
+QUANTIZERS = {"int8": ScalarQuantizer, "pq": ProductQuantizer}
+
+
+def default_num_subspaces(dimensions: int) -> int:
+    """
+    Return the number of subspaces of PQ_SUBVECTOR_SIZE to
+    PQ_MAX_SUBVECTOR_SIZE dimensions, padding the vectors when no such
+    size divides the dimensions.
+    """
+    for size in range(PQ_SUBVECTOR_SIZE, PQ_MAX_SUBVECTOR_SIZE + 1):
+        if dimensions % size == 0:
+            return dimensions // size
+    if dimensions <= PQ_MAX_SUBVECTOR_SIZE:
+        return 1
+    return -(-dimensions // PQ_SUBVECTOR_SIZE)
+
+
+def _pad(vectors: np.ndarray, dimensions: int) -> np.ndarray:
+    """Return vectors padded with zero columns to the given dimensions."""
+    if vectors.shape[1] == dimensions:
+        return vectors
+    return np.pad(vectors, [(0, 0), (0, dimensions - vectors.shape[1])])
+
+
+def fit_quantizer(vectors: np.ndarray, quantization: str, **kwargs) -> Quantizer:
+    """Fit the quantizer named quantization, one of QUANTIZATIONS, to vectors."""
+    if quantization not in QUANTIZERS:
+        raise ValueError(
+            f"Unknown quantization {quantization!r}, expected one of {QUANTIZATIONS}"
+        )
+    return QUANTIZERS[quantization].fit(vectors, **kwargs)
+
+
+def save_quantizer(quantizer: Quantizer, filename: str) -> None:
+    """Save the parameters of a quantizer as an .npz file."""
+    with open(filename, "wb") as file:
+        arrays: Dict[str, Any] = dict(quantizer.arrays(), name=quantizer.name)
+        np.savez(file, **arrays)
+
+
+def load_quantizer(filename: str) -> Quantizer:
+    """Load a quantizer saved by save_quantizer."""
+    with np.load(filename) as data:
+        arrays = dict(data)
+    return QUANTIZERS[str(arrays.pop("name"))](**arrays)
+
+
+class QuantizedNeighbors(NearestNeighbors):
+    """
+    Top-K nearest neighbor queries over quantized word vectors.
+
+    Example:
+        >>> neighbors = QuantizedNeighbors.from_model(model, quantization="pq")
+        >>> neighbors.query("legal", k=3)
+        [('legal', 0.21), ('law', 0.86), ('court', 0.94)]
+    """
+
+    def __init__(
+        self,
+        quantizer: Quantizer,
+        codes: np.ndarray,
+        dictionary: Mapping[str, int],
+        metric: str = DEFAULT_METRIC,
+    ) -> None:
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric {metric!r}, expected one of {METRICS}")
+
+        if not isinstance(dictionary, CompactVocabulary):
+            dictionary = CompactVocabulary.from_dictionary(dictionary)
+        self.metric = metric
+        self.quantizer = quantizer
+        # Rows follow the sorted word order of the vocabulary
+        self.dictionary = dictionary.renumber(np.arange(len(dictionary)))
+        self.codes = np.ascontiguousarray(np.asarray(codes)[dictionary.ids])
+        self.norms = np.concatenate(
+            [np.zeros(0, dtype=np.float32)]
+            + [
+                np.linalg.norm(
+                    quantizer.decode(self.codes[start : start + SCAN_BLOCK_SIZE]),
+                    axis=1,
+                )
+                for start in range(0, len(self.codes), SCAN_BLOCK_SIZE)
+            ]
+        )
+        self._squared_norms = self.norms * self.norms
+
+    @classmethod
+    def quantize(
+        cls,
+        word_vectors: np.ndarray,
+        dictionary: Mapping[str, int],
+        metric: str = DEFAULT_METRIC,
+        quantization: str = "int8",
+        **kwargs,
+    ) -> "QuantizedNeighbors":
+        """Quantize word vectors and index their codes."""
+        quantizer = fit_quantizer(word_vectors, quantization, **kwargs)
+        return cls(quantizer, quantizer.encode(word_vectors), dictionary, metric)
+
+    @classmethod
+    def from_model(
+        cls, model, metric: str = DEFAULT_METRIC, quantization: str = "int8", **kwargs
+    ) -> "QuantizedNeighbors":
+        """
+        Index the codes of a quantized leglove.vector_store.MappedModel, or
+        quantize the word vectors of any other model.
+        """
+        if getattr(model, "quantizer", None) is not None:
+            return cls(model.quantizer, model.codes, model.dictionary, metric)
+        if model.dictionary is None or model.word_vectors is None:
+            raise ValueError("Model must be fit and have a dictionary")
+        return cls.quantize(
+            model.word_vectors, model.dictionary, metric, quantization, **kwargs
+        )
+
+    @property
+    def no_components(self) -> int:
+        return self.quantizer.no_components
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the codes and the quantizer."""
+        return self.codes.nbytes + self.quantizer.nbytes
+
+    def vector(self, word: str) -> np.ndarray:
+        """Return the decoded vector of a word."""
+        try:
+            row = self.dictionary[word]
+        except KeyError:
+            raise KeyError(f"{word!r} is not in the vocabulary") from None
+        return self.quantizer.decode(self.codes[row : row + 1])[0]
+
+    def search(self, queries: np.ndarray, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the k nearest quantized vectors of each query vector.
+
+        Args:
+            queries: Array of shape (num_queries, dimensions).
+            k: Number of neighbors to return per query.
+
+        Returns:
+            A (num_queries, k) array of row indices of the words and a
+            (num_queries, k) array of their distances to the decoded
+            vectors, nearest first.
+        """
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        queries = np.asarray(queries, dtype=np.float32)
+        query_norms = np.linalg.norm(queries, axis=1)
+        k = min(k, len(self))
+        tiny = np.finfo(np.float32).tiny
+
+        indices = np.empty((len(queries), k), dtype=np.int64)
+        distances = np.empty((len(queries), k), dtype=np.float32)
+        for start in range(0, len(queries), QUERY_BLOCK_SIZE):
+            block = queries[start : start + QUERY_BLOCK_SIZE]
+            # Ranking needs |x|^2 - 2 q.x for Euclidean, and -q.x / |x| for cosine
+            scores = np.empty((len(block), len(self)), dtype=np.float32)
+            for first in range(0, len(self), SCAN_BLOCK_SIZE):
+                last = first + SCAN_BLOCK_SIZE
+                products = self.quantizer.inner_products(block, self.codes[first:last])
+                if self.metric == "euclidean":
+                    products *= -2.0
+                    products += self._squared_norms[first:last]
+                else:
+                    products /= -np.maximum(self.norms[first:last], tiny)
+                scores[:, first:last] = products
+            if k < len(self):
+                candidates = np.argpartition(scores, k - 1, axis=1)[:, :k]
+            else:
+                candidates = np.broadcast_to(np.arange(k), scores.shape)
+            candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+            order = np.argsort(candidate_scores, axis=1, kind="stable")
+
+            stop = start + len(block)
+            indices[start:stop] = np.take_along_axis(candidates, order, axis=1)
+            best = np.take_along_axis(candidate_scores, order, axis=1)
+            block_norms = query_norms[start:stop, None]
+            if self.metric == "euclidean":
+                distances[start:stop] = np.sqrt(np.maximum(best + block_norms**2, 0.0))
+            else:
+                best = best / np.maximum(block_norms, tiny)
+                distances[start:stop] = np.maximum(1.0 + best, 0.0)
+        return indices, distances
+
+
+def quantization_report(
+    word_vectors: np.ndarray,
+    dictionary: Mapping[str, int],
+    neighbors: QuantizedNeighbors,
+    k: int = RECALL_K,
+    num_queries: int = RECALL_QUERIES,
+    random_state: Optional[int] = 0,
+) -> Dict[str, Any]:
+    """
+    Compare quantized vectors with the full-precision vectors.
+
+    Memory is compared with the vectors as given (e.g. float64) and as
+    float32. Recall is the mean fraction of the exact k nearest
+    neighbors of num_queries random words that the quantized search
+    also returns, using the metric of neighbors.
+    """
+    exact = NearestNeighbors(word_vectors, dictionary, neighbors.metric)
+    itemsize = np.asarray(word_vectors).dtype.itemsize
+    report: Dict[str, Any] = {
+        "quantization": neighbors.quantizer.name,
+        "num_words": len(exact),
+        "full_precision_bytes": itemsize * exact.vectors.size,
+        "float32_bytes": exact.vectors.nbytes,
+        "quantized_bytes": neighbors.nbytes,
+    }
+    report["compression"] = report["full_precision_bytes"] / max(
+        report["quantized_bytes"], 1
+    )
+
+    recall = 1.0
+    if len(exact):
+        rng = np.random.default_rng(random_state)
+        rows = rng.choice(len(exact), min(num_queries, len(exact)), replace=False)
+        words = [exact.dictionary.word(row) for row in rows.tolist()]
+        expected = exact.query_batch(words, k)
+        found = neighbors.query_batch(words, k)
+        recall = float(
+            np.mean(
+                [
+                    len({w for w, _ in a} & {w for w, _ in b}) / len(b)
+                    for a, b in zip(found, expected)
+                ]
+            )
+        )
+    report[f"recall@{k}"] = recall
+    report["recall_loss"] = 1.0 - recall
+    return report
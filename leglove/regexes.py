@@ -1,4 +1,5 @@
-from typing import List
+import re
+from typing import List, Pattern
 
 # Identifying star paginations:
 STAR_PAGINATION_REGEX = r"<span class=\"star-pagination\">\*\d+</span>"
@@ -39,7 +40,9 @@ FEDERAL_COURT_REPORTERS_PATTERN = "|".join(FEDERAL_COURT_REPORTERS)
 PAGE_NUMBER_REGEX = r"(?:, ((?:\d+(?:\-\d+)?)(?:(?: &)? n\. \d+)? ?))"
 YEAR_REGEX = r"(?: ?(?:, )?(\(\d\d\d\d\)))"
 PAGE_SUFFIX_REGEX = r"( ?n\. \d+)?"
-JUDICIAL_OPINION_CITATION_REGEX = rf"(\d+) ({FEDERAL_COURT_REPORTERS_PATTERN}) (?:at )?(\d+)(?:{PAGE_NUMBER_REGEX})?(?:{YEAR_REGEX})?({PAGE_SUFFIX_REGEX})?"
+# (the leading "\d\d*" is equivalent to "\d+", but lets the re module skip
+# ahead to the next digit instead of attempting a match at every position)
+JUDICIAL_OPINION_CITATION_REGEX = rf"(\d\d*) ({FEDERAL_COURT_REPORTERS_PATTERN}) (?:at )?(\d+)(?:{PAGE_NUMBER_REGEX})?(?:{YEAR_REGEX})?({PAGE_SUFFIX_REGEX})?"
 
 # List of all regexes above
 REGEXES: List[str] = [
@@ -58,3 +61,9 @@ REGEX_TOKENS: List[str] = [
     "LAW_CITATION",
     "STAR_PAGINATION",
 ]
+
+
+# Precompiled versions of REGEXES, in the same (precedence) order
+COMPILED_REGEXES: List[Pattern[str]] = [
+    re.compile(regex, re.IGNORECASE) for regex in REGEXES
+]
@@ -0,0 +1,593 @@
+import argparse
+import asyncio
+import json
+import logging
+import time
+from collections import Counter, OrderedDict, deque
+from typing import Any, Deque, Dict, Hashable, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from .ann import DEFAULT_NUM_PROBES
+from .neighbors import DEFAULT_METRIC, METRICS, NearestNeighbors
+from .vector_store import MappedModel, load_model, load_neighbors
+
+"""
+    serve.py
+    --------
+    This module serves a trained model over a local HTTP API, so that it
+    is loaded once instead of on every query. It is started with
+
+        leglove serve --model LeGlove.model --port 8000
+
+    and answers JSON GET (query string) or POST (JSON body) requests:
+
+        /vector?word=legal                       the word's vector
+        /neighbors?word=legal&k=10               its k nearest neighbors
+        /analogy?positive=king&positive=woman&negative=man&k=10
+                                                 nearest words to
+                                                 king + woman - man
+        /stats                                   request, latency, batch
+                                                 and cache counters
+
+    The server is a single asyncio event loop. Neighbor and analogy
+    queries that arrive together are batched into one matrix search, run
+    in a worker thread so that the loop keeps accepting requests, and
+    results are kept in an LRU cache of hot queries.
+"""
+
+# Constants
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+DEFAULT_K = 10  # neighbors returned when k is not given
+MAX_K = 1000  # largest k a request may ask for
+DEFAULT_CACHE_SIZE = 10000  # query results kept in the LRU cache
+DEFAULT_MAX_BATCH_SIZE = 256  # queries searched per matrix operation
+DEFAULT_BATCH_WAIT_MS = 1.0  # time to wait for more queries to batch
+LATENCY_WINDOW = 10000  # recent requests used for latency percentiles
+MAX_BODY_BYTES = 1 << 20  # largest accepted request body
+STATUS_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class RequestError(Exception):
+    """An error reported to the client with an HTTP status code."""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class LRUCache:
+    """Least recently used cache of query results, with hit counters."""
+
+    def __init__(self, max_size: int = DEFAULT_CACHE_SIZE) -> None:
+        self.max_size = max_size
+        self._items: OrderedDict[Hashable, Any] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value of key, or None."""
+        if key in self._items:
+            self._items.move_to_end(key)
+            self.hits += 1
+            return self._items[key]
+        self.misses += 1
+        return None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Cache a value, evicting the least recently used one if full."""
+        if self.max_size < 1:
+            return
+        self._items[key] = value
+        self._items.move_to_end(key)
+        if len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+
+class ServerStats:
+    """Request counts, latencies and batch sizes of a server."""
+
+    def __init__(self, window: int = LATENCY_WINDOW) -> None:
+        self.started = time.monotonic()
+        self.requests: Counter = Counter()
+        self.errors = 0
+        self.batches = 0
+        self.batched_queries = 0
+        self._latencies: Deque[float] = deque(maxlen=window)
+
+    def record_request(self, endpoint: str, seconds: float, ok: bool) -> None:
+        """Count a request and its latency."""
+        self.requests[endpoint] += 1
+        self.errors += not ok
+        self._latencies.append(seconds)
+
+    def record_batch(self, size: int) -> None:
+        """Count a batch of queries searched together."""
+        self.batches += 1
+        self.batched_queries += size
+
+    def snapshot(self, cache: LRUCache) -> Dict[str, Any]:
+        """Return the counters as a JSON-serializable dict."""
+        uptime = time.monotonic() - self.started
+        total = sum(self.requests.values())
+        latencies = np.array(self._latencies) * 1000.0
+        if len(latencies):
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99]).tolist()
+            latency = {
+                "mean": float(latencies.mean()),
+                "p50": p50,
+                "p95": p95,
+                "p99": p99,
+                "max": float(latencies.max()),
+            }
+        else:
+            latency = {}
+        lookups = cache.hits + cache.misses
+        return {
+            "uptime_seconds": uptime,
+            "requests": total,
+            "requests_by_endpoint": dict(self.requests),
+            "errors": self.errors,
+            "requests_per_second": total / uptime if uptime > 0 else 0.0,
+            "latency_ms": latency,
+            "batches": self.batches,
+            "mean_batch_size": self.batched_queries / self.batches
+            if self.batches
+            else 0.0,
+            "cache": {
+                "size": len(cache),
+                "max_size": cache.max_size,
+                "hits": cache.hits,
+                "misses": cache.misses,
+                "hit_rate": cache.hits / lookups if lookups else 0.0,
+            },
+        }
+
+
+class QueryBatcher:
+    """
+    Collect concurrent nearest neighbor queries and search them together.
+
+    Queries are searched in a worker thread; those submitted while a batch
+    is being searched form the next batch.
+    """
+
+    def __init__(
+        self,
+        neighbors: NearestNeighbors,
+        stats: ServerStats,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        batch_wait_ms: float = DEFAULT_BATCH_WAIT_MS,
+    ) -> None:
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.neighbors = neighbors
+        self.stats = stats
+        self.max_batch_size = max_batch_size
+        self.batch_wait = batch_wait_ms / 1000.0
+        self._queue: asyncio.Queue[Tuple[np.ndarray, int, asyncio.Future]] = (
+            asyncio.Queue()
+        )
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start searching submitted queries on the running event loop."""
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        """Stop the batching task."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def search(self, vector: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """Return the k nearest (row, distance) pairs of a query vector."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((vector, k, future))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            # Give concurrent requests a moment to join the batch
+            await asyncio.sleep(self.batch_wait)
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            queries = np.stack([vector for vector, _, _ in batch])
+            k = max(k for _, k, _ in batch)
+            self.stats.record_batch(len(batch))
+            try:
+                indices, distances = await loop.run_in_executor(
+                    None, self.neighbors.search, queries, k
+                )
+            except Exception as error:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            for (_, query_k, future), row_indices, row_distances in zip(
+                batch, indices.tolist(), distances.tolist()
+            ):
+                if not future.done():
+                    future.set_result(
+                        [
+                            (index, distance)
+                            for index, distance in zip(
+                                row_indices[:query_k], row_distances[:query_k]
+                            )
+                            if index >= 0
+                        ]
+                    )
+
+
+def _word_vector(model, word: str) -> np.ndarray:
+    """Return the vector of a word of a loaded model."""
+    if isinstance(model, MappedModel):
+        return model.vector(word)
+    try:
+        return model.word_vectors[model.dictionary[word]]
+    except KeyError:
+        raise KeyError(f"{word!r} is not in the vocabulary") from None
+
+
+class EmbeddingServer:
+    """
+    Answer vector, nearest neighbor and analogy requests for one model.
+
+    Example:
+        >>> server = EmbeddingServer(model, NearestNeighbors.from_model(model))
+        >>> asyncio.run(server.serve_forever("127.0.0.1", 8000))
+    """
+
+    def __init__(
+        self,
+        model,
+        neighbors: NearestNeighbors,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        batch_wait_ms: float = DEFAULT_BATCH_WAIT_MS,
+    ) -> None:
+        self.model = model
+        self.neighbors = neighbors
+        self.cache = LRUCache(cache_size)
+        self.stats = ServerStats()
+        self._max_batch_size = max_batch_size
+        self._batch_wait_ms = batch_wait_ms
+        self.batcher: Optional[QueryBatcher] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> int:
+        """Start listening and return the port (useful when port is 0)."""
+        self.batcher = QueryBatcher(
+            self.neighbors, self.stats, self._max_batch_size, self._batch_wait_ms
+        )
+        self.batcher.start()
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        sockets = self._server.sockets or []
+        return sockets[0].getsockname()[1] if sockets else port
+
+    async def stop(self) -> None:
+        """Stop listening and stop the batcher."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self.batcher is not None:
+            await self.batcher.stop()
+            self.batcher = None
+
+    async def serve_forever(
+        self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT
+    ) -> None:
+        """Serve until cancelled."""
+        port = await self.start(host, port)
+        logging.info(f"Serving {len(self.neighbors)} words on http://{host}:{port}")
+        try:
+            while True:
+                await asyncio.sleep(3600)
+        finally:
+            await self.stop()
+
+    async def handle(
+        self, path: str, params: Dict[str, List[str]]
+    ) -> Tuple[int, Dict[str, Any]]:
+        """Answer one request and return its status and JSON payload."""
+        start = time.perf_counter()
+        endpoint = path.strip("/") or "index"
+        status = 200
+        try:
+            if endpoint == "vector":
+                payload = self._vector(params)
+            elif endpoint == "neighbors":
+                payload = await self._neighbors(params)
+            elif endpoint == "analogy":
+                payload = await self._analogy(params)
+            elif endpoint == "stats":
+                payload = self.stats.snapshot(self.cache)
+            else:
+                raise RequestError(404, f"Unknown endpoint {path!r}")
+        except RequestError as error:
+            status, payload = error.status, {"error": str(error)}
+        except KeyError as error:
+            status, payload = 404, {"error": error.args[0]}
+        except Exception as error:
+            logging.exception(f"Error answering {path}")
+            status, payload = 500, {"error": str(error)}
+        if endpoint != "stats":
+            self.stats.record_request(
+                endpoint, time.perf_counter() - start, status == 200
+            )
+        return status, payload
+
+    def _vector(self, params: Dict[str, List[str]]) -> Dict[str, Any]:
+        word = _single(params, "word")
+        key = ("vector", word)
+        payload = self.cache.get(key)
+        if payload is None:
+            vector = _word_vector(self.model, word)
+            payload = {"word": word, "vector": np.asarray(vector).tolist()}
+            self.cache.put(key, payload)
+        return payload
+
+    async def _neighbors(self, params: Dict[str, List[str]]) -> Dict[str, Any]:
+        word = _single(params, "word")
+        k = _k(params)
+        key = ("neighbors", word, k)
+        payload = self.cache.get(key)
+        if payload is None:
+            results = await self._search(self.neighbors.vector(word), k)
+            payload = {"word": word, "k": k, "neighbors": results}
+            self.cache.put(key, payload)
+        return payload
+
+    async def _analogy(self, params: Dict[str, List[str]]) -> Dict[str, Any]:
+        positive = params.get("positive", [])
+        negative = params.get("negative", [])
+        if not positive:
+            raise RequestError(400, "Missing parameter 'positive'")
+        k = _k(params)
+        key = ("analogy", tuple(positive), tuple(negative), k)
+        payload = self.cache.get(key)
+        if payload is None:
+            vector = sum(self.neighbors.vector(word) for word in positive) - sum(
+                (self.neighbors.vector(word) for word in negative),
+                np.zeros(self.neighbors.no_components, dtype=np.float32),
+            )
+            # The query words are usually nearest, so search past them
+            inputs = set(positive) | set(negative)
+            results = await self._search(vector, k + len(inputs))
+            payload = {
+                "positive": positive,
+                "negative": negative,
+                "k": k,
+                "neighbors": [pair for pair in results if pair[0] not in inputs][:k],
+            }
+            self.cache.put(key, payload)
+        return payload
+
+    async def _search(self, vector: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        assert self.batcher is not None, "The server has not been started"
+        results = await self.batcher.search(np.asarray(vector, dtype=np.float32), k)
+        return [
+            (self.neighbors.dictionary.word(row), distance) for row, distance in results
+        ]
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, target, keep_alive, body = request
+                if method not in ("GET", "POST"):
+                    status, payload = 405, {"error": f"Method {method} not allowed"}
+                else:
+                    url = urlsplit(target)
+                    try:
+                        params = _parse_params(url.query, body)
+                    except RequestError as error:
+                        status, payload = error.status, {"error": str(error)}
+                    else:
+                        status, payload = await self.handle(url.path, params)
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except RequestError as error:
+            writer.write(_response(error.status, {"error": str(error)}, False))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def _single(params: Dict[str, List[str]], name: str) -> str:
+    """Return the single value of a required parameter."""
+    values = params.get(name)
+    if not values:
+        raise RequestError(400, f"Missing parameter {name!r}")
+    return values[0]
+
+
+def _k(params: Dict[str, List[str]]) -> int:
+    """Return the number of neighbors requested."""
+    try:
+        k = int(params.get("k", [DEFAULT_K])[0])
+    except ValueError:
+        raise RequestError(400, "k must be an integer") from None
+    if not 1 <= k <= MAX_K:
+        raise RequestError(400, f"k must be between 1 and {MAX_K}")
+    return k
+
+
+def _parse_params(query: str, body: bytes) -> Dict[str, List[str]]:
+    """Merge query string parameters with those of a JSON object body."""
+    params = parse_qs(query)
+    if body:
+        try:
+            values = json.loads(body)
+        except ValueError:
+            raise RequestError(400, "The request body is not valid JSON") from None
+        if not isinstance(values, dict):
+            raise RequestError(400, "The request body must be a JSON object")
+        for name, value in values.items():
+            items = value if isinstance(value, list) else [value]
+            params[name] = [str(item) for item in items]
+    return params
+
+
+async def _read_request(
+    reader: asyncio.StreamReader,
+) -> Optional[Tuple[str, str, bool, bytes]]:
+    """Read one HTTP/1.x request, or return None at the end of the connection."""
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, version = line.decode("latin-1").split()
+    except ValueError:
+        raise RequestError(400, "Malformed request line") from None
+
+    headers = {}
+    while True:
+        header = await reader.readline()
+        if header in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = header.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" and (
+        version == "HTTP/1.1" or connection == "keep-alive"
+    )
+    try:
+        length = int(headers.get("content-length", "0") or 0)
+    except ValueError:
+        raise RequestError(400, "Content-Length must be an integer") from None
+    if length < 0:
+        raise RequestError(400, "Content-Length must not be negative")
+    if length > MAX_BODY_BYTES:
+        raise RequestError(413, "The request body is too large")
+    body = await reader.readexactly(length) if length else b""
+    return method, target, keep_alive, body
+
+
+def _response(status: int, payload: Dict[str, Any], keep_alive: bool) -> bytes:
+    """Return an HTTP response with a JSON body."""
+    body = json.dumps(payload).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {STATUS_REASONS.get(status, '')}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+def serve(
+    model_file: str,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    metric: str = DEFAULT_METRIC,
+    ann: bool = False,
+    num_probes: int = DEFAULT_NUM_PROBES,
+    cache_size: int = DEFAULT_CACHE_SIZE,
+    max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+    batch_wait_ms: float = DEFAULT_BATCH_WAIT_MS,
+) -> None:
+    """Load a model once and serve it until interrupted."""
+    model = load_model(model_file)
+    neighbors = load_neighbors(model_file, metric, ann, num_probes, model=model)
+    server = EmbeddingServer(
+        model, neighbors, cache_size, max_batch_size, batch_wait_ms
+    )
+    try:
+        asyncio.run(server.serve_forever(host, port))
+    except KeyboardInterrupt:
+        pass
+
+
+def parse_arguments(argv: Optional[Sequence[str]] = None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        prog="leglove serve", description="Serve a LeGlove model over HTTP"
+    )
+    parser.add_argument(
+        "--model", default="LeGlove.model", help="Model to serve (i.e. 'LeGlove.model')"
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Address to listen on")
+    parser.add_argument(
+        "--port", default=DEFAULT_PORT, type=int, help="Port to listen on"
+    )
+    parser.add_argument(
+        "--metric",
+        default=DEFAULT_METRIC,
+        choices=METRICS,
+        help="Distance used to rank the nearest neighbors",
+    )
+    parser.add_argument(
+        "--ann",
+        action="store_true",
+        help="Use an approximate nearest neighbor index saved next to the model",
+    )
+    parser.add_argument(
+        "--num_probes",
+        default=DEFAULT_NUM_PROBES,
+        type=int,
+        help="Index lists searched per query with --ann",
+    )
+    parser.add_argument(
+        "--cache_size",
+        default=DEFAULT_CACHE_SIZE,
+        type=int,
+        help="Query results kept in the LRU cache (0 disables it)",
+    )
+    parser.add_argument(
+        "--max_batch_size",
+        default=DEFAULT_MAX_BATCH_SIZE,
+        type=int,
+        help="Largest number of queries searched together",
+    )
+    parser.add_argument(
+        "--batch_wait_ms",
+        default=DEFAULT_BATCH_WAIT_MS,
+        type=float,
+        help="Milliseconds to wait for concurrent queries to batch",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Serve the model given on the command line."""
+    args = parse_arguments(argv)
+    serve(
+        args.model,
+        host=args.host,
+        port=args.port,
+        metric=args.metric,
+        ann=args.ann,
+        num_probes=args.num_probes,
+        cache_size=args.cache_size,
+        max_batch_size=args.max_batch_size,
+        batch_wait_ms=args.batch_wait_ms,
+    )
@@ -0,0 +1,603 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+import numpy as np
+
+from .arguments import add_training_arguments
+from .cleanup import DEFAULT_CLEANUP_BACKEND
+from .cooccurrence import (
+    CHUNK_TOKENS,
+    COUNTS_SUFFIX,
+    DEFAULT_MEMORY_LIMIT_MB,
+    DEFAULT_WINDOW,
+    ENTRY_BYTES,
+    KEYS_SUFFIX,
+    CooccurrenceBuilder,
+    CooccurrenceMatrix,
+    check_window,
+    count_scale,
+    load_pairs,
+    merge_pair_shards,
+    remove_pairs,
+    renumber_pairs,
+    save_pairs,
+    send_chunk,
+    token_ids,
+)
+from .jurisdictions import JurisdictionFilter, filtered_source
+from .model import DEFAULT_BATCH_SIZE
+from .parallel import PENDING_CHUNKS_PER_WORKER
+from .profiling import Profiler, profile_stage
+from .sources import CorpusSource, jurisdiction_of
+from .tokenizers import DEFAULT_TOKENIZER
+from .train import (
+    CONTEXT_WINDOW,
+    DEFAULT_TRAINING_BACKEND,
+    check_training_backend,
+    fit_and_save_model,
+    read_documents,
+)
+from .vocab import select_vocabulary
+
+"""
+    sharded.py
+    --------
+    This module trains several models on different jurisdictions of one
+    corpus (see jurisdictions.py), e.g. one model per circuit and one for
+    all circuits, while reading the corpus only once. Every opinion is
+    cleaned and tokenized once, and its co-occurrences and tokens are
+    counted into partial counts of its jurisdiction, over a dictionary
+    shared by all jurisdictions. With several workers, the documents are
+    dealt out to worker processes that each keep partial counts of every
+    jurisdiction, which are merged at the end.
+
+    The matrix of a model is the sum of the partial matrices of its
+    jurisdictions, restricted to the vocabulary chosen from their token
+    counts, so a jurisdiction shared by several models is only counted
+    once. It has the same counts as the matrix train_and_save_model
+    would build from those jurisdictions alone.
+"""
+
+# Constants
+PAIRS_SUFFIX = ".pairs"  # shard of the co-occurrence pairs of a jurisdiction
+TOKENS_SUFFIX = ".tokens"  # shard of the token counts of a jurisdiction, keyed by id
+MIN_TOKEN_BATCH = 2**16  # token ids buffered before they are folded into counts
+
+
+class _TokenCounts:
+    """Exact counts of token ids, folded into sorted arrays in batches."""
+
+    def __init__(self) -> None:
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self._pending: List[np.ndarray] = []
+        self._num_pending = 0
+
+    def add(self, ids: np.ndarray) -> None:
+        """Count the token ids of one document."""
+        self._pending.append(ids)
+        self._num_pending += len(ids)
+        # Folding costs time in the number of distinct ids, so batches
+        # grow with it
+        if self._num_pending >= max(MIN_TOKEN_BATCH, len(self.ids)):
+            self.fold()
+
+    def fold(self) -> None:
+        """Add the pending ids to the sorted counts."""
+        if not self._pending:
+            return
+        ids, counts = np.unique(np.concatenate(self._pending), return_counts=True)
+        self._pending = []
+        self._num_pending = 0
+        self.ids, inverse = np.unique(
+            np.concatenate((self.ids, ids)), return_inverse=True
+        )
+        self.counts = np.bincount(
+            inverse.ravel(),
+            weights=np.concatenate((self.counts, counts)),
+            minlength=len(self.ids),
+        ).astype(np.int64)
+
+
+class JurisdictionCounter:
+    """
+    Counts the co-occurrences and tokens of documents per jurisdiction.
+
+    Every jurisdiction has its own CooccurrenceBuilder, but they share
+    one memory budget: whenever the pairs held in memory exceed it, the
+    jurisdiction holding the most pairs is spilled to disk.
+
+    Example:
+        >>> counter = JurisdictionCounter(window=2)
+        >>> counter.add_ids("ca1", np.array([0, 1, 2]))
+        >>> counter.save(path)
+        ['ca1']
+    """
+
+    def __init__(
+        self,
+        window: int = DEFAULT_WINDOW,
+        memory_limit_mb: float = DEFAULT_MEMORY_LIMIT_MB,
+        spill_dir: Optional[str] = None,
+    ) -> None:
+        check_window(window)
+        self.window = window
+        self.memory_limit_mb = memory_limit_mb
+        self.spill_dir = spill_dir
+        self._max_entries = max(int(memory_limit_mb * 2**20) // ENTRY_BYTES, 2 * window)
+        self.builders: Dict[str, CooccurrenceBuilder] = {}
+        self.tokens: Dict[str, _TokenCounts] = {}
+
+    def add_ids(self, jurisdiction: str, ids: np.ndarray) -> None:
+        """Add one document of a jurisdiction, mapped to dictionary ids."""
+        builder = self.builders.get(jurisdiction)
+        if builder is None:
+            builder = CooccurrenceBuilder(
+                self.window, self.memory_limit_mb, self.spill_dir
+            )
+            self.builders[jurisdiction] = builder
+            self.tokens[jurisdiction] = _TokenCounts()
+        builder.add_ids(ids)
+        self.tokens[jurisdiction].add(ids)
+
+        entries = [builder.num_entries for builder in self.builders.values()]
+        if sum(entries) > self._max_entries:
+            largest = max(
+                self.builders, key=lambda name: self.builders[name].num_entries
+            )
+            self.builders[largest].spill()
+
+    def save(self, path: str) -> List[str]:
+        """
+        Write the pair and token shards of every jurisdiction to a directory.
+
+        Returns:
+            The jurisdictions counted.
+        """
+        for jurisdiction, builder in self.builders.items():
+            builder.save(os.path.join(path, jurisdiction + PAIRS_SUFFIX))
+            tokens = self.tokens[jurisdiction]
+            tokens.fold()
+            save_pairs(
+                os.path.join(path, jurisdiction + TOKENS_SUFFIX),
+                tokens.ids,
+                tokens.counts,
+            )
+        return list(self.builders)
+
+
+class JurisdictionPartials:
+    """
+    The partial co-occurrence and token counts of each jurisdiction of a
+    corpus, over one shared dictionary, as shards in a directory.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        dictionary: Dict[str, int],
+        scale: int,
+        jurisdictions: List[str],
+    ) -> None:
+        self.path = path
+        self.dictionary = dictionary
+        self.scale = scale
+        self.jurisdictions = jurisdictions
+        self._words: Optional[List[str]] = None
+
+    def shard(self, jurisdiction: str, suffix: str) -> str:
+        """Return the shard of a jurisdiction with PAIRS_SUFFIX or TOKENS_SUFFIX."""
+        if jurisdiction not in self.jurisdictions:
+            raise ValueError(
+                f"No opinions were counted for jurisdiction {jurisdiction!r}"
+            )
+        return os.path.join(self.path, jurisdiction + suffix)
+
+    def _sum(
+        self, jurisdictions: Sequence[str], suffix: str, work_dir: str, max_entries: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the summed shards of some jurisdictions."""
+        shards = [self.shard(jurisdiction, suffix) for jurisdiction in jurisdictions]
+        if len(shards) == 1:
+            return load_pairs(shards[0])
+        output = os.path.join(work_dir, "sum" + suffix)
+        merge_pair_shards(shards, output, max_entries)
+        return load_pairs(output)
+
+    def matrix(
+        self,
+        jurisdictions: Sequence[str],
+        min_count: int = 1,
+        max_vocab_size: Optional[int] = None,
+        memory_limit_mb: float = DEFAULT_MEMORY_LIMIT_MB,
+    ) -> CooccurrenceMatrix:
+        """
+        Return the co-occurrence matrix of the opinions of some jurisdictions.
+
+        The vocabulary is chosen from the summed token counts of the
+        jurisdictions as by leglove.vocab.build_vocabulary, so word ids
+        are assigned by decreasing count.
+
+        Args:
+            jurisdictions: Jurisdictions to sum, from self.jurisdictions.
+            min_count: Minimum number of occurrences of a kept token.
+            max_vocab_size: Optional maximum number of tokens to keep.
+            memory_limit_mb: Approximate memory used to merge the shards.
+        """
+        if not jurisdictions:
+            raise ValueError("Expected at least one jurisdiction")
+        if self._words is None:
+            self._words = [""] * len(self.dictionary)
+            for word, index in self.dictionary.items():
+                self._words[index] = word
+        words = self._words
+
+        max_entries = max(int(memory_limit_mb * 2**20) // ENTRY_BYTES, 1)
+        with tempfile.TemporaryDirectory(prefix="sum-", dir=self.path) as work_dir:
+            ids, counts = self._sum(jurisdictions, TOKENS_SUFFIX, work_dir, max_entries)
+            dictionary = select_vocabulary(
+                zip((words[index] for index in ids.tolist()), counts.tolist()),
+                min_count=min_count,
+                max_vocab_size=max_vocab_size,
+            )
+            new_ids = np.full(len(self.dictionary), -1, dtype=np.int64)
+            new_ids[[self.dictionary[word] for word in dictionary]] = list(
+                dictionary.values()
+            )
+
+            keys, counts = self._sum(jurisdictions, PAIRS_SUFFIX, work_dir, max_entries)
+            keys, counts = renumber_pairs(keys, counts, new_ids)
+        return CooccurrenceMatrix.from_keys(dictionary, keys, counts, self.scale)
+
+
+def _count_worker(
+    chunks: Any, output_dir: str, window: int, memory_limit_mb: float
+) -> None:
+    """Count the (jurisdiction, ids) chunks received on a queue into shards."""
+    counter = JurisdictionCounter(window, memory_limit_mb, output_dir)
+    for chunk in iter(chunks.get, None):
+        for jurisdiction, ids in chunk:
+            counter.add_ids(jurisdiction, ids)
+    counter.save(output_dir)
+
+
+def _move_pairs(shard: str, output: str) -> None:
+    """Rename the files of a shard."""
+    for suffix in (KEYS_SUFFIX, COUNTS_SUFFIX):
+        os.replace(shard + suffix, output + suffix)
+
+
+def _count_parallel(
+    documents: Iterable[Tuple[str, List[str]]],
+    dictionary: Dict[str, int],
+    path: str,
+    window: int,
+    memory_limit_mb: float,
+    num_workers: int,
+) -> List[str]:
+    """Count jurisdictions in worker processes and merge their shards."""
+    worker_memory_mb = memory_limit_mb / num_workers
+    worker_dirs = [
+        os.path.join(path, f"worker_{index}") for index in range(num_workers)
+    ]
+    queues = [
+        multiprocessing.Queue(maxsize=PENDING_CHUNKS_PER_WORKER)
+        for _ in range(num_workers)
+    ]
+    processes = [
+        multiprocessing.Process(
+            target=_count_worker,
+            args=(chunks, worker_dir, window, worker_memory_mb),
+            daemon=True,
+        )
+        for chunks, worker_dir in zip(queues, worker_dirs)
+    ]
+    counted: List[Set[str]] = [set() for _ in range(num_workers)]
+
+    try:
+        for worker_dir, process in zip(worker_dirs, processes):
+            os.makedirs(worker_dir)
+            process.start()
+
+        # Ids are assigned here, so every worker counts over one dictionary
+        chunk: List[Tuple[str, np.ndarray]] = []
+        chunk_tokens = 0
+        worker = 0
+        for jurisdiction, tokens in documents:
+            ids = token_ids(dictionary, tokens)
+            if len(ids) == 0:
+                continue
+            chunk.append((jurisdiction, ids))
+            counted[worker].add(jurisdiction)
+            chunk_tokens += len(ids)
+            if chunk_tokens >= CHUNK_TOKENS:
+                send_chunk(queues[worker], chunk, processes[worker])
+                worker = (worker + 1) % num_workers
+                chunk = []
+                chunk_tokens = 0
+        if chunk:
+            send_chunk(queues[worker], chunk, processes[worker])
+
+        for chunks, process in zip(queues, processes):
+            send_chunk(chunks, None, process)
+        for process in processes:
+            process.join()
+            if process.exitcode != 0:
+                raise RuntimeError(
+                    f"Co-occurrence worker exited with code {process.exitcode}"
+                )
+
+        jurisdictions = sorted(set().union(*counted))
+        logging.info(
+            f"Merging the partial counts of {len(jurisdictions)} jurisdictions..."
+        )
+        max_entries = max(int(worker_memory_mb * 2**20) // ENTRY_BYTES, 1)
+        for jurisdiction in jurisdictions:
+            for suffix in (PAIRS_SUFFIX, TOKENS_SUFFIX):
+                shards = [
+                    os.path.join(worker_dir, jurisdiction + suffix)
+                    for worker_dir, names in zip(worker_dirs, counted)
+                    if jurisdiction in names
+                ]
+                output = os.path.join(path, jurisdiction + suffix)
+                if len(shards) == 1:
+                    _move_pairs(shards[0], output)
+                    continue
+                merge_pair_shards(shards, output, max_entries)
+                for shard in shards:
+                    remove_pairs(shard)
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for worker_dir in worker_dirs:
+            shutil.rmtree(worker_dir, ignore_errors=True)
+
+    return jurisdictions
+
+
+def count_jurisdictions(
+    documents: Iterable[Tuple[str, List[str]]],
+    path: str,
+    window: int = DEFAULT_WINDOW,
+    memory_limit_mb: float = DEFAULT_MEMORY_LIMIT_MB,
+    num_workers: int = 1,
+) -> JurisdictionPartials:
+    """
+    Count the co-occurrences and tokens of every jurisdiction in one pass.
+
+    Args:
+        documents: (jurisdiction, tokens) pairs, e.g. built from
+            leglove.train.read_documents with leglove.sources.jurisdiction_of.
+        path: Existing directory to write the partial counts to.
+        window: Length of the (symmetric) context window, from 1 to
+            MAX_WINDOW (see leglove.cooccurrence).
+        memory_limit_mb: Approximate memory used for accumulating pairs
+            before they are spilled to disk, shared by all workers and
+            jurisdictions. Token counts are held in memory besides.
+        num_workers: Number of counting processes.
+
+    Returns:
+        The JurisdictionPartials of the documents.
+    """
+    check_window(window)
+    if num_workers < 1:
+        raise ValueError("num_workers must be at least 1")
+
+    dictionary: Dict[str, int] = {}
+    if num_workers == 1:
+        counter = JurisdictionCounter(window, memory_limit_mb, path)
+        for jurisdiction, tokens in documents:
+            ids = token_ids(dictionary, tokens)
+            if len(ids):
+                counter.add_ids(jurisdiction, ids)
+        jurisdictions = sorted(counter.save(path))
+    else:
+        jurisdictions = _count_parallel(
+            documents, dictionary, path, window, memory_limit_mb, num_workers
+        )
+    return JurisdictionPartials(path, dictionary, count_scale(window), jurisdictions)
+
+
+def train_jurisdiction_models(
+    data_dir: Union[str, CorpusSource],
+    models: Mapping[str, Sequence[str]],
+    num_epochs: int = 10,
+    parallel_threads: int = 1,
+    num_workers: int = 1,
+    cache_dir: Optional[str] = None,
+    cleanup_backend: str = DEFAULT_CLEANUP_BACKEND,
+    tokenizer: str = DEFAULT_TOKENIZER,
+    cooccurrence_memory_mb: float = DEFAULT_MEMORY_LIMIT_MB,
+    cooccurrence_workers: int = 1,
+    min_count: int = 1,
+    max_vocab_size: Optional[int] = None,
+    backend: str = DEFAULT_TRAINING_BACKEND,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    quantization: Optional[str] = None,
+    profiler: Optional[Profiler] = None,
+    prefetch: int = 0,
+    exclude_jurisdictions: Optional[Sequence[str]] = None,
+) -> Dict[str, List[str]]:
+    """
+    Train and save one model per selection of jurisdictions, reading the
+    corpus once.
+
+    Example:
+        >>> train_jurisdiction_models(
+        ...     "data/", {"LeGlove-circuits": ["circuits"], "LeGlove-ca9": ["ca9"]}
+        ... )
+        {'LeGlove-circuits': ['ca1', 'ca10', ...], 'LeGlove-ca9': ['ca9']}
+
+    Args:
+        data_dir: Corpus directory or archive (see leglove.train.read_corpus).
+        models: The jurisdictions of each model, by model name, as lists
+            of abbreviations, groups or glob patterns (see
+            leglove.jurisdictions). Each model is saved like those of
+            train_and_save_model, as "<model_name>.model" and
+            "<model_name>.vectors".
+        exclude_jurisdictions: Optional jurisdictions left out of every model.
+        cooccurrence_workers: Number of processes counting the partial
+            co-occurrences of the jurisdictions.
+
+        The other arguments are those of train_and_save_model; min_count
+        and max_vocab_size apply to the vocabulary of each model.
+
+    Returns:
+        The jurisdictions each model was trained on, by model name.
+    """
+
+    if not models:
+        raise ValueError("Expected at least one model to train")
+    check_training_backend(backend)
+    filters = {
+        model_name: JurisdictionFilter(entries, exclude_jurisdictions)
+        for model_name, entries in models.items()
+    }
+    # Read every jurisdiction of some model, and nothing else
+    selected = JurisdictionFilter(
+        [entry for entries in models.values() for entry in entries],
+        exclude_jurisdictions,
+    )
+
+    documents = read_documents(
+        filtered_source(data_dir, selected),
+        num_workers=num_workers,
+        cache_dir=cache_dir,
+        cleanup_backend=cleanup_backend,
+        tokenizer=tokenizer,
+        profiler=profiler,
+        prefetch=prefetch,
+    )
+    with tempfile.TemporaryDirectory(prefix="leglove-jurisdictions-") as path:
+        with profile_stage(profiler, "cooccurrence"):
+            partials = count_jurisdictions(
+                ((jurisdiction_of(name), tokens) for name, tokens in documents),
+                path,
+                window=CONTEXT_WINDOW,
+                memory_limit_mb=cooccurrence_memory_mb,
+                num_workers=cooccurrence_workers,
+            )
+
+        model_jurisdictions = {
+            model_name: [
+                jurisdiction
+                for jurisdiction in partials.jurisdictions
+                if selected_by(jurisdiction)
+            ]
+            for model_name, selected_by in filters.items()
+        }
+        for model_name, jurisdictions in model_jurisdictions.items():
+            if not jurisdictions:
+                raise ValueError(
+                    f"No opinions of the jurisdictions {list(models[model_name])} "
+                    f"of model {model_name!r} were found in {data_dir}"
+                )
+
+        for model_name, jurisdictions in model_jurisdictions.items():
+            logging.info(
+                f"Training {model_name} on {len(jurisdictions)} jurisdictions..."
+            )
+            with profile_stage(profiler, "cooccurrence"):
+                cooccurrence = partials.matrix(
+                    jurisdictions,
+                    min_count=min_count,
+                    max_vocab_size=max_vocab_size,
+                    memory_limit_mb=cooccurrence_memory_mb,
+                )
+            fit_and_save_model(
+                cooccurrence,
+                model_name=model_name,
+                num_epochs=num_epochs,
+                parallel_threads=parallel_threads,
+                backend=backend,
+                batch_size=batch_size,
+                quantization=quantization,
+                profiler=profiler,
+            )
+    return model_jurisdictions
+
+
+def parse_model(spec: str) -> Tuple[str, List[str]]:
+    """Parse a "name=jurisdiction,jurisdiction" model argument."""
+    model_name, separator, entries = spec.partition("=")
+    jurisdictions = [entry.strip() for entry in entries.split(",") if entry.strip()]
+    if not separator or not model_name or not jurisdictions:
+        raise argparse.ArgumentTypeError(
+            f"Expected NAME=JURISDICTION[,JURISDICTION...], got {spec!r}"
+        )
+    return model_name, jurisdictions
+
+
+def parse_arguments(argv: Optional[Sequence[str]] = None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        prog="leglove sharded",
+        description="Train one LeGlove model per group of jurisdictions, "
+        "reading the corpus once",
+    )
+    parser.add_argument(
+        "--data_dir",
+        required=True,
+        help="Directory of jurisdiction directories, or a tar or zip archive of them",
+    )
+    parser.add_argument(
+        "--model",
+        dest="models",
+        required=True,
+        action="append",
+        type=parse_model,
+        metavar="NAME=JURISDICTIONS",
+        help="A model to train and its comma-separated jurisdictions, e.g. "
+        "'LeGlove-circuits=circuits' or 'LeGlove-ca9=ca9'; may be repeated",
+    )
+    add_training_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Train the models given on the command line."""
+    args = parse_arguments(argv)
+    profiler = Profiler(progress=True) if args.profile else None
+    model_jurisdictions = train_jurisdiction_models(
+        args.data_dir,
+        dict(args.models),
+        num_epochs=args.num_epochs,
+        parallel_threads=args.parallel_threads,
+        num_workers=args.preprocess_workers,
+        cache_dir=args.cache_dir,
+        cleanup_backend=args.cleanup_backend,
+        tokenizer=args.tokenizer,
+        cooccurrence_memory_mb=args.cooccurrence_memory_mb,
+        cooccurrence_workers=args.cooccurrence_workers,
+        min_count=args.min_count,
+        max_vocab_size=args.max_vocab_size,
+        backend=args.backend,
+        batch_size=args.batch_size,
+        quantization=args.quantization,
+        profiler=profiler,
+        prefetch=args.prefetch,
+        exclude_jurisdictions=args.exclude_jurisdictions,
+    )
+    if profiler is not None:
+        profiler.close()
+        profiler.save(args.profile)
+        logging.info(f"Wrote profile to {args.profile}")
+    for model_name, jurisdictions in model_jurisdictions.items():
+        logging.info(f"Saved {model_name}.model ({', '.join(jurisdictions)})")
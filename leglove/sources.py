@@ -0,0 +1,247 @@
+import gzip
+import logging
+import os
+import posixpath
+import tarfile
+import zipfile
+from typing import Callable, Dict, Iterator, NamedTuple, Optional, Type, Union
+
+"""
+    sources.py
+    --------
+    This module reads opinions from the layouts CourtListener bulk data
+    comes in, so that archives do not have to be extracted into millions
+    of small files before training:
+
+        directory     a master directory of jurisdiction directories of
+                      JSON opinion files (the original layout)
+        .tar, .tar.gz, .tgz
+                      a tar archive of JSON opinion files, read as a
+                      stream without seeking
+        .zip          a zip archive of JSON opinion files
+        .jsonl, .jsonl.gz
+                      one JSON opinion per line, optionally gzipped
+
+    A source yields OpinionRecords. Records of archives and JSON lines
+    carry the raw JSON of the opinion, read straight from the archive
+    into memory; records of a directory carry only the path, and the
+    file is read by whichever process cleans it up. Other sources can be
+    passed to leglove.train.read_corpus as any object with a records
+    method, or registered in SOURCE_SUFFIXES.
+
+    The jurisdiction of an opinion is the name of the directory holding
+    it, in a corpus directory or an archive. Directory and archive
+    sources can be restricted to some jurisdictions (see
+    leglove.jurisdictions); the directories of other jurisdictions are
+    then never listed, and their archive members never read.
+"""
+
+# Constants
+LOG_INTERVAL = 1000  # number of records between progress logs
+
+
+class OpinionRecord(NamedTuple):
+    """
+    One opinion of a corpus source.
+
+    name is the path of the opinion file, or the archive path joined
+    with the member name (or line number) with "/". data is the opinion
+    JSON, or None if it is to be read from the file at name. stamp
+    identifies the state of the opinion for the token cache; None means
+    the state of the file at name.
+    """
+
+    name: str
+    data: Optional[bytes] = None
+    stamp: Optional[str] = None
+
+
+def _archive_stamp(path: str) -> str:
+    """Return a stamp that changes whenever an archive file changes."""
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def jurisdiction_of(name: str) -> str:
+    """Return the jurisdiction of an opinion: the name of its directory."""
+    return posixpath.basename(posixpath.dirname(name.replace(os.sep, "/")))
+
+
+def _is_opinion(member_name: str) -> bool:
+    """Return True for JSON members outside hidden directories."""
+    return member_name.endswith(".json") and not any(
+        part.startswith(".") for part in member_name.split("/")
+    )
+
+
+def _selected(
+    member_name: str, jurisdiction_filter: Optional[Callable[[str], bool]]
+) -> bool:
+    """Return True if an archive member is in a selected jurisdiction."""
+    return jurisdiction_filter is None or jurisdiction_filter(
+        jurisdiction_of(member_name)
+    )
+
+
+class _Progress:
+    """Log the number of records read every LOG_INTERVAL records."""
+
+    def __init__(self, unit: str) -> None:
+        self.unit = unit
+        self.count = 0
+
+    def step(self) -> None:
+        self.count += 1
+        if self.count % LOG_INTERVAL == 0:
+            logging.info(f"{self.count} {self.unit} read...")
+
+
+class DirectorySource:
+    """JSON opinion files in the jurisdiction directories of a master directory."""
+
+    def __init__(
+        self, path: str, jurisdiction_filter: Optional[Callable[[str], bool]] = None
+    ) -> None:
+        self.path = path
+        self.jurisdiction_filter = jurisdiction_filter
+
+    def records(self, with_data: bool = True) -> Iterator[OpinionRecord]:
+        """Yield a record (without data) for every JSON file, in listing order."""
+        progress = _Progress("json files")
+        for juris_dir in os.listdir(self.path):
+            # Avoid hidden files in directory
+            if juris_dir.startswith("."):
+                continue
+            if self.jurisdiction_filter is not None and not self.jurisdiction_filter(
+                juris_dir
+            ):
+                continue
+            juris_dir_path = os.path.join(self.path, juris_dir)
+            if not os.path.isdir(juris_dir_path):
+                continue
+            logging.info(f"Reading {juris_dir}...")
+
+            for json_file in os.listdir(juris_dir_path):
+                if not json_file.endswith(".json"):
+                    continue
+                progress.step()
+                yield OpinionRecord(os.path.join(juris_dir_path, json_file))
+
+
+class TarSource:
+    """JSON opinion files in a (possibly compressed) tar archive."""
+
+    def __init__(
+        self, path: str, jurisdiction_filter: Optional[Callable[[str], bool]] = None
+    ) -> None:
+        self.path = path
+        self.jurisdiction_filter = jurisdiction_filter
+
+    def records(self, with_data: bool = True) -> Iterator[OpinionRecord]:
+        """
+        Yield a record for every JSON member, in archive order.
+
+        The archive is read as a stream, so compressed archives are
+        decompressed once from start to end. Without with_data, the
+        members are skipped instead of read.
+        """
+        stamp = _archive_stamp(self.path)
+        progress = _Progress("archive members")
+        with tarfile.open(self.path, mode="r|*") as archive:
+            for member in archive:
+                if not member.isfile() or not _is_opinion(member.name):
+                    continue
+                if not _selected(member.name, self.jurisdiction_filter):
+                    continue
+                data = None
+                if with_data:
+                    file = archive.extractfile(member)
+                    assert file is not None
+                    data = file.read()
+                progress.step()
+                yield OpinionRecord(f"{self.path}/{member.name}", data, stamp)
+
+
+class ZipSource:
+    """JSON opinion files in a zip archive."""
+
+    def __init__(
+        self, path: str, jurisdiction_filter: Optional[Callable[[str], bool]] = None
+    ) -> None:
+        self.path = path
+        self.jurisdiction_filter = jurisdiction_filter
+
+    def records(self, with_data: bool = True) -> Iterator[OpinionRecord]:
+        """Yield a record for every JSON member, in archive order."""
+        stamp = _archive_stamp(self.path)
+        progress = _Progress("archive members")
+        with zipfile.ZipFile(self.path) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or not _is_opinion(info.filename):
+                    continue
+                if not _selected(info.filename, self.jurisdiction_filter):
+                    continue
+                data = archive.read(info) if with_data else None
+                progress.step()
+                yield OpinionRecord(f"{self.path}/{info.filename}", data, stamp)
+
+
+class JsonLinesSource:
+    """One JSON opinion per line of a (possibly gzipped) file."""
+
+    def __init__(
+        self, path: str, jurisdiction_filter: Optional[Callable[[str], bool]] = None
+    ) -> None:
+        if jurisdiction_filter is not None:
+            raise ValueError(
+                f"Cannot select jurisdictions of {path!r}: JSON lines files do not "
+                "group opinions into jurisdiction directories"
+            )
+        self.path = path
+
+    def records(self, with_data: bool = True) -> Iterator[OpinionRecord]:
+        """Yield a record for every non-blank line, named by its line number."""
+        stamp = _archive_stamp(self.path)
+        progress = _Progress("json lines")
+        opener = gzip.open if self.path.endswith(".gz") else open
+        with opener(self.path, "rb") as file:
+            for line_number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                progress.step()
+                yield OpinionRecord(
+                    f"{self.path}/{line_number}", line if with_data else None, stamp
+                )
+
+
+CorpusSource = Union[DirectorySource, TarSource, ZipSource, JsonLinesSource]
+SOURCE_SUFFIXES: Dict[str, Type] = {
+    ".tar": TarSource,
+    ".tar.gz": TarSource,
+    ".tgz": TarSource,
+    ".tar.bz2": TarSource,
+    ".tar.xz": TarSource,
+    ".zip": ZipSource,
+    ".jsonl": JsonLinesSource,
+    ".jsonl.gz": JsonLinesSource,
+}
+
+
+def corpus_source(
+    path: str, jurisdiction_filter: Optional[Callable[[str], bool]] = None
+) -> CorpusSource:
+    """
+    Return the source reading a directory, or an archive named by its suffix.
+
+    If jurisdiction_filter is given, only the opinions of jurisdictions
+    for which it returns True are read.
+    """
+    if os.path.isdir(path):
+        return DirectorySource(path, jurisdiction_filter)
+    for suffix, source in SOURCE_SUFFIXES.items():
+        if path.endswith(suffix):
+            return source(path, jurisdiction_filter)
+    raise ValueError(
+        f"Cannot read a corpus from {path!r}: expected a directory or a file "
+        f"ending with one of {tuple(SOURCE_SUFFIXES)}"
+    )
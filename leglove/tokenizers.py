@@ -0,0 +1,137 @@
+import re
+from typing import Callable, Dict, List
+
+"""
+    tokenizers.py
+    --------
+    This module contains the word tokenizers available to
+    leglove.train.tokenize_text. Each tokenizer maps lowercased opinion
+    text (with citations already replaced by placeholder tokens) to a
+    list of tokens.
+
+    "nltk" is NLTK's word_tokenize (Punkt sentence splitting followed by
+    the Penn Treebank tokenizer). "legal" is a single-regex tokenizer that
+    follows the Treebank conventions (split clitics, `` and '' quotes,
+    separate punctuation) but keeps legal abbreviations such as "u.s.",
+    "id." and "v." whole, never splits placeholder tokens, and needs no
+    sentence splitting model.
+"""
+
+# Abbreviations that keep their trailing period in the legal tokenizer
+LEGAL_ABBREVIATIONS: List[str] = [
+    "id",
+    "ibid",
+    "v",
+    "vs",
+    "cf",
+    "mr",
+    "mrs",
+    "ms",
+    "dr",
+    "jr",
+    "sr",
+    "st",
+    "co",
+    "corp",
+    "inc",
+    "ltd",
+    "assn",
+    "dept",
+    "no",
+    "nos",
+    "art",
+    "arts",
+    "ch",
+    "cl",
+    "sec",
+    "secs",
+    "ed",
+    "eds",
+    "supp",
+    "app",
+    "cir",
+    "ct",
+    "dist",
+    "ann",
+    "stat",
+    "rev",
+    "cong",
+    "sess",
+    "amend",
+    "const",
+    "gov",
+    "govt",
+    "fed",
+    "reg",
+    "pp",
+    "nn",
+    "jj",
+]
+
+# Clitics split off the preceding word, as in the Penn Treebank
+CLITICS = r"(?:s|m|d|ll|re|ve)\b"
+
+LEGAL_TOKEN_REGEX = re.compile(
+    "|".join(
+        [
+            # Dotted abbreviations: u.s., e.g., i.e., u.s.c.
+            r"(?<!\w)(?:[a-z]\.){2,}(?:[a-z](?!\w))?",
+            # Word abbreviations and initials that keep their period
+            rf"(?<!\w)(?:{'|'.join(LEGAL_ABBREVIATIONS)}|[a-z])\.(?!\w)",
+            # Negated auxiliaries: "don't" -> "do", "n't"; "cannot" -> "can", "not"
+            r"\w+(?=n't\b)|n't\b|can(?=not\b)",
+            f"'{CLITICS}",
+            # Numbers with decimal points, thousands separators or times
+            r"\d+(?:[.,:]\d+)+",
+            # Words, including placeholder tokens, hyphenated words, dotted
+            # reporter names ("f.3d") and inner apostrophes ("o'connor")
+            rf"\w+(?:(?:-|\.(?=\w)|'(?!{CLITICS}))\w+)*",
+            # Section symbols, ellipses and dashes
+            r"§+|\.{2,}|-{2,}",
+            # Any other single character
+            r"\S",
+        ]
+    )
+)
+
+# Characters after which a double quote opens a quotation
+OPENING_QUOTE_CONTEXT = frozenset(" \t\n([{<")
+
+
+def legal_word_tokenize(text: str) -> List[str]:
+    """Tokenize text with the rule-based legal tokenizer."""
+    tokens = []
+    for match in LEGAL_TOKEN_REGEX.finditer(text):
+        token = match.group()
+        if token == '"':
+            start = match.start()
+            opening = start == 0 or text[start - 1] in OPENING_QUOTE_CONTEXT
+            token = "``" if opening else "''"
+        tokens.append(token)
+    return tokens
+
+
+def nltk_word_tokenize(text: str) -> List[str]:
+    """Tokenize text with NLTK's word_tokenize (requires the punkt data)."""
+    from nltk.tokenize import word_tokenize
+
+    return word_tokenize(text)
+
+
+# Tokenizers available to tokenize_text, by name. Register additional
+# module-level functions here to make them available to worker processes.
+TOKENIZERS: Dict[str, Callable[[str], List[str]]] = {
+    "nltk": nltk_word_tokenize,
+    "legal": legal_word_tokenize,
+}
+DEFAULT_TOKENIZER = "nltk"
+
+
+def get_tokenizer(name: str) -> Callable[[str], List[str]]:
+    """Return the tokenizer registered under the given name."""
+    try:
+        return TOKENIZERS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown tokenizer {name!r}, expected one of {sorted(TOKENIZERS)}"
+        ) from None
@@ -1,27 +1,68 @@
 import logging
-import os
-import re
-from typing import Generator, List
+import random
+import tempfile
+from contextlib import ExitStack
+from functools import partial
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 try:
-    from glove import Corpus, Glove
+    from glove import Glove
 except ImportError:
     Glove = None
-    Corpus = None
 
-from nltk.tokenize import word_tokenize
-
-from .cleanup import extract_text
-from .regexes import REGEX_TOKENS, REGEXES
+from .cache import TokenCache, preprocessing_fingerprint
+from .checkpoint import TrainingCheckpoint, checkpoint_path
+from .cleanup import (
+    DEFAULT_CLEANUP_BACKEND,
+    clean_html,
+    extract_html_from_json,
+    extract_text,
+    extract_text_from_json,
+    is_well_formatted,
+    read_bytes,
+)
+from .cooccurrence import (
+    DEFAULT_MEMORY_LIMIT_MB,
+    CooccurrenceMatrix,
+    build_cooccurrence_matrix,
+)
+from .cooccurrence_store import cooccurrence_store_path, relative_name, write_store
+from .jurisdictions import filtered_source, jurisdiction_filter
+from .model import DEFAULT_BATCH_SIZE, GloveModel
+from .parallel import DEFAULT_CHUNK_SIZE, parallel_map_chunks
+from .prefetch import prefetch_records
+from .profiling import Profiler, epoch_recorder, profile_stage, text_bytes
+from .regexes import COMPILED_REGEXES, REGEX_TOKENS
+from .sources import CorpusSource, OpinionRecord
+from .tokenizers import DEFAULT_TOKENIZER, get_tokenizer
+from .vector_store import export_model, store_path
+from .vocab import build_vocabulary
 
 """
     train.py
     --------
     This module trains a GloVe model on a given legal corpus to build
     legal domain-specific word vectors. The program first preprocesses
-    the legal opinions using a series of regexes and then calls GloVe
-    functions to output word vectors. The final trained model is saved
-    into the current directory as "LeGlove.model".
+    the legal opinions using a series of regexes, optionally prunes the
+    vocabulary (see vocab.py), counts word co-occurrences with a
+    bounded-memory builder (see cooccurrence.py) and then fits word
+    vectors with the built-in NumPy GloVe trainer (see model.py) or with
+    glove-python. The final trained model is saved into the current
+    directory as "LeGlove.model", and its vectors and dictionary are also
+    exported to a memory-mappable layout, "LeGlove.vectors" (see
+    vector_store.py).
 
     The following open-source github repository was used and adapted:
 
@@ -36,76 +77,641 @@ from .regexes import REGEX_TOKENS, REGEXES
 CONTEXT_WINDOW = 10  # length of the (symmetric)context window used for cooccurrence
 LEARNING_RATE = 0.05  # learning rate used for model training
 NUM_COMPONENTS = 100  # number of components/dimension of output word vectors
-LOG_INTERVAL = 1000  # number of files between progress logs
+TRAINING_BACKENDS = ("numpy", "glove-python")  # available GloVe trainers
+DEFAULT_TRAINING_BACKEND = "numpy"
 
 
 ## LeGlove #####################################################################################
 
 
-def tokenize_text(plain_text: str) -> List[str]:
-    """Tokenize legal text and replace regex matches with placeholder tokens."""
+def tokenize_text(plain_text: str, tokenizer: str = DEFAULT_TOKENIZER) -> List[str]:
+    """
+    Tokenize legal text and replace regex matches with placeholder tokens.
+
+    Args:
+        plain_text: Cleaned opinion text.
+        tokenizer: Name of the word tokenizer, one of leglove.tokenizers.TOKENIZERS.
+
+    Returns:
+        The lowercased tokens of the text.
+    """
+    word_tokenize = get_tokenizer(tokenizer)
 
     # Clean plain text by replacing all regex matches
     # with corresponding tokens
-    cleaned_text = plain_text
-    for regex, token in zip(REGEXES, REGEX_TOKENS):
-        cleaned_text = re.sub(regex, token, cleaned_text, flags=re.IGNORECASE)
+    cleaned_text = _substitute_regexes(plain_text)
 
-    # Use NLTK tokenizer to return tokenized form of cleaned text
+    # Use the selected tokenizer to return tokenized form of cleaned text
     tokens = word_tokenize(cleaned_text.lower())
     return tokens
 
 
-def read_corpus(data_dir: str) -> Generator[List[str], None, None]:
-    """Yield tokenized documents from JSON files in the given data directory."""
+def _substitute_regexes(plain_text: str) -> str:
+    """Replace all regex matches in legal text with their placeholder tokens."""
+    cleaned_text = plain_text
+    for regex, token in zip(COMPILED_REGEXES, REGEX_TOKENS):
+        cleaned_text = regex.sub(token, cleaned_text)
+    return cleaned_text
+
+
+def _profile_record(
+    record: OpinionRecord, cleanup_backend: str, tokenizer: str, profiler: Profiler
+) -> Optional[List[str]]:
+    """Preprocess an opinion like _preprocess_record, timing each stage."""
+    data = record.data
+    if data is None:
+        with profiler.stage("file_read", docs=1) as stage:
+            data = read_bytes(record.name)
+            stage.num_bytes = len(data)
+    with profiler.stage("json_parse", docs=1, num_bytes=len(data)):
+        raw_html = extract_html_from_json(data)
+    if not is_well_formatted(raw_html):
+        return None
+    with profiler.stage("clean_html", docs=1, num_bytes=text_bytes(raw_html)):
+        plain_text = clean_html(raw_html, backend=cleanup_backend)
+    if plain_text == "":
+        return None
+    with profiler.stage("regex_substitution", docs=1, num_bytes=text_bytes(plain_text)):
+        cleaned_text = _substitute_regexes(plain_text)
+    with profiler.stage("tokenization", docs=1, num_bytes=text_bytes(cleaned_text)):
+        return get_tokenizer(tokenizer)(cleaned_text.lower())
+
+
+def _preprocess_record(
+    record: OpinionRecord,
+    cleanup_backend: str = DEFAULT_CLEANUP_BACKEND,
+    tokenizer: str = DEFAULT_TOKENIZER,
+    profiler: Optional[Profiler] = None,
+) -> Optional[List[str]]:
+    """Return the tokens of an opinion, or None if it has no usable text."""
+    if profiler is not None:
+        return _profile_record(record, cleanup_backend, tokenizer, profiler)
+    if record.data is None:
+        plain_text = extract_text(record.name, backend=cleanup_backend)
+    else:
+        plain_text = extract_text_from_json(record.data, backend=cleanup_backend)
+    if plain_text == "":
+        return None
+    return tokenize_text(plain_text, tokenizer=tokenizer)
+
+
+def _preprocess_chunk(
+    records: List[OpinionRecord],
+    cleanup_backend: str = DEFAULT_CLEANUP_BACKEND,
+    tokenizer: str = DEFAULT_TOKENIZER,
+    profile: bool = False,
+) -> Tuple[List[Tuple[str, Optional[List[str]]]], Optional[Dict[str, List[float]]]]:
+    """
+    Preprocess a chunk of opinions inside a worker process, returning
+    the stage totals of the worker's profiler if profile is True.
+    """
+    profiler = Profiler() if profile else None
+    chunk_tokens = [
+        (record.name, _preprocess_record(record, cleanup_backend, tokenizer, profiler))
+        for record in records
+    ]
+    return chunk_tokens, None if profiler is None else profiler.stages
+
+
+def _preprocess_records(
+    records: Iterable[OpinionRecord],
+    num_workers: int,
+    chunk_size: int,
+    ordered: bool,
+    cleanup_backend: str,
+    tokenizer: str,
+    profiler: Optional[Profiler] = None,
+    prefetch: int = 0,
+) -> Iterator[Tuple[str, Optional[List[str]]]]:
+    """
+    Yield the name and tokens (or None) of each opinion, using worker
+    processes and reading files ahead if requested.
+    """
+
+    if prefetch > 0:
+        records = prefetch_records(records, prefetch, profiler)
+
+    if num_workers <= 1:
+        for record in records:
+            yield (
+                record.name,
+                _preprocess_record(record, cleanup_backend, tokenizer, profiler),
+            )
+        return
+
+    for chunk_tokens, stages in parallel_map_chunks(
+        partial(
+            _preprocess_chunk,
+            cleanup_backend=cleanup_backend,
+            tokenizer=tokenizer,
+            profile=profiler is not None,
+        ),
+        records,
+        num_workers,
+        chunk_size=chunk_size,
+        ordered=ordered,
+    ):
+        if profiler is not None and stages is not None:
+            profiler.merge(stages)
+        yield from chunk_tokens
+
+
+class _ProfiledSource:
+    """A corpus source timing the production of its records as a stage."""
+
+    def __init__(self, source: CorpusSource, profiler: Profiler) -> None:
+        self.source = source
+        self.profiler = profiler
+
+    def records(self, with_data: bool = True) -> Iterator[OpinionRecord]:
+        """Yield the records of the source."""
+        return self.profiler.iterate(
+            "source",
+            self.source.records(with_data=with_data),
+            size=lambda record: len(record.data or b""),
+        )
+
+
+def _read_cached_corpus(
+    source: CorpusSource,
+    cache_dir: str,
+    num_workers: int,
+    chunk_size: int,
+    cleanup_backend: str,
+    tokenizer: str,
+    profiler: Optional[Profiler],
+    prefetch: int,
+) -> Generator[Tuple[str, List[str]], None, None]:
+    """Refresh the token cache for all opinions of a source, then stream from it."""
+
+    cache = TokenCache(
+        cache_dir,
+        preprocessing_fingerprint(cleanup_backend=cleanup_backend, tokenizer=tokenizer),
+    )
+    keys = [
+        (record.name, cache.key(record.name, record.stamp))
+        for record in source.records(with_data=False)
+    ]
+    stale = {name: key for name, key in keys if key not in cache}
+    logging.info(f"Preprocessing {len(stale)} of {len(keys)} opinions...")
+
+    if stale:
+        stale_tokens = _preprocess_records(
+            (record for record in source.records() if record.name in stale),
+            num_workers,
+            chunk_size,
+            ordered=True,
+            cleanup_backend=cleanup_backend,
+            tokenizer=tokenizer,
+            profiler=profiler,
+            prefetch=prefetch,
+        )
+        for name, tokens in stale_tokens:
+            cache.store(stale[name], tokens)
+
+    for name, key in keys:
+        tokens = cache.load(key)
+        if tokens is not None:
+            yield name, tokens
+
+
+def read_documents(
+    data_dir: Union[str, CorpusSource],
+    num_workers: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ordered: bool = True,
+    cache_dir: Optional[str] = None,
+    cleanup_backend: str = DEFAULT_CLEANUP_BACKEND,
+    tokenizer: str = DEFAULT_TOKENIZER,
+    profiler: Optional[Profiler] = None,
+    prefetch: int = 0,
+    jurisdictions: Optional[Sequence[str]] = None,
+    exclude_jurisdictions: Optional[Sequence[str]] = None,
+) -> Generator[Tuple[str, List[str]], None, None]:
+    """
+    Yield the name (see leglove.sources.OpinionRecord) and tokens of every
+    non-empty opinion of a corpus.
+
+    Takes the same arguments as read_corpus.
+    """
+
+    source = filtered_source(
+        data_dir, jurisdiction_filter(jurisdictions, exclude_jurisdictions)
+    )
+    if profiler is not None:
+        source = _ProfiledSource(source, profiler)
+    if cache_dir is not None:
+        documents = _read_cached_corpus(
+            source,
+            cache_dir,
+            num_workers,
+            chunk_size,
+            cleanup_backend,
+            tokenizer,
+            profiler,
+            prefetch,
+        )
+    else:
+        documents = (
+            (name, tokens)
+            for name, tokens in _preprocess_records(
+                source.records(),
+                num_workers,
+                chunk_size,
+                ordered,
+                cleanup_backend,
+                tokenizer,
+                profiler,
+                prefetch,
+            )
+            if tokens is not None
+        )
+    if profiler is not None:
+        documents = profiler.iterate("read_corpus", documents)
+    yield from documents
+
+
+def read_corpus(
+    data_dir: Union[str, CorpusSource],
+    num_workers: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ordered: bool = True,
+    cache_dir: Optional[str] = None,
+    cleanup_backend: str = DEFAULT_CLEANUP_BACKEND,
+    tokenizer: str = DEFAULT_TOKENIZER,
+    profiler: Optional[Profiler] = None,
+    prefetch: int = 0,
+    jurisdictions: Optional[Sequence[str]] = None,
+    exclude_jurisdictions: Optional[Sequence[str]] = None,
+) -> Generator[List[str], None, None]:
+    """
+    Yield tokenized documents from the JSON opinions of a corpus.
 
-    num_files_read = 0
-    for juris_dir in os.listdir(data_dir):
-        # Avoid hidden files in directory
-        if juris_dir.startswith("."):
-            continue
-        juris_dir_path = os.path.join(data_dir, juris_dir)
-        if not os.path.isdir(juris_dir_path):
-            continue
-        logging.info(f"Reading {juris_dir}...")
+    Args:
+        data_dir: Master directory containing all jurisdiction-level
+            directories, a tar or zip archive of JSON files, or a
+            (gzipped) JSON lines file (see leglove.sources), or a corpus
+            source object.
+        num_workers: Number of processes used for HTML cleanup and tokenization.
+            With a single worker, files are processed in the calling process.
+        chunk_size: Number of files sent to a worker process at once.
+        ordered: If True, documents are yielded in directory listing
+            (or archive) order regardless of the number of workers.
+        cache_dir: Optional directory of a persistent token cache. Only files
+            that are new or changed since the cache was last populated are
+            preprocessed; all documents are then streamed from the cache in
+            directory listing order. Archive members are reprocessed when
+            their archive changes.
+        cleanup_backend: HTML cleanup backend, one of
+            leglove.cleanup.CLEANUP_BACKENDS.
+        tokenizer: Name of the word tokenizer, one of leglove.tokenizers.TOKENIZERS.
+        profiler: Optional leglove.profiling.Profiler timing every
+            preprocessing stage, including those run by worker processes.
+        prefetch: Number of opinion files read ahead in background threads
+            (see leglove.prefetch), so that reads overlap cleanup. 0 reads
+            each file when it is cleaned up. Useful on network storage;
+            with several workers, the files are read by the calling process
+            and their contents sent to the workers.
+        jurisdictions: Optional list of the jurisdictions to read:
+            abbreviations of juris_abbrevs.txt, groups such as "circuits"
+            or glob patterns (see leglove.jurisdictions). All are read if
+            None. The opinions of other jurisdictions are skipped without
+            being read.
+        exclude_jurisdictions: Optional list of jurisdictions not to read,
+            in the same form.
 
-        for json_file in os.listdir(juris_dir_path):
-            if not json_file.endswith(".json"):
-                continue
-            num_files_read += 1
-            if num_files_read % LOG_INTERVAL == 0:
-                logging.info(f"{num_files_read} json files read...")
+    Returns:
+        A generator over the token lists of all non-empty opinions.
+    """
 
-            json_file_path = os.path.join(juris_dir_path, json_file)
-            plain_text = extract_text(json_file_path)
-            if plain_text != "":
-                tokens = tokenize_text(plain_text)
-                yield tokens
+    for _, tokens in read_documents(
+        data_dir,
+        num_workers,
+        chunk_size,
+        ordered,
+        cache_dir,
+        cleanup_backend,
+        tokenizer,
+        profiler,
+        prefetch,
+        jurisdictions,
+        exclude_jurisdictions,
+    ):
+        yield tokens
+
+
+def check_training_backend(backend: str) -> None:
+    """Raise if a training backend is unknown or not installed."""
+    if backend not in TRAINING_BACKENDS:
+        raise ValueError(
+            f"Unknown training backend {backend!r}, expected one of {TRAINING_BACKENDS}"
+        )
+    if backend == "glove-python" and Glove is None:
+        raise ImportError(
+            "glove-python is required but not installed. Install with: uv sync --extra glove"
+        )
+
+
+def fit_and_save_model(
+    cooccurrence: CooccurrenceMatrix,
+    model_name: str = "LeGlove",
+    num_epochs: int = 10,
+    parallel_threads: int = 1,
+    backend: str = DEFAULT_TRAINING_BACKEND,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    quantization: Optional[str] = None,
+    profiler: Optional[Profiler] = None,
+    checkpoint: Optional[TrainingCheckpoint] = None,
+) -> None:
+    """
+    Train a GloVe model on a co-occurrence matrix and save it.
+
+    The model is saved as "<model_name>.model" and exported to
+    "<model_name>.vectors", as by train_and_save_model, which takes the
+    same arguments.
+
+    With a checkpoint (see leglove.checkpoint), the numpy trainer
+    continues from the newest model saved in it, for the epochs that are
+    left, and saves the model to it every checkpoint.every epochs.
+    """
+
+    check_training_backend(backend)
+    if checkpoint is not None and checkpoint.every and backend != "numpy":
+        raise ValueError("Checkpointing epochs requires the numpy backend")
+    with profile_stage(profiler, "training"):
+        if backend == "glove-python":
+            assert Glove is not None
+            glove = Glove(no_components=NUM_COMPONENTS, learning_rate=LEARNING_RATE)
+            glove.fit(
+                cooccurrence.to_coo(),
+                epochs=num_epochs,
+                no_threads=parallel_threads,
+                verbose=True,
+            )
+        else:
+            glove = None
+            if checkpoint is not None:
+                glove = checkpoint.load_model()
+            epochs = num_epochs
+            fit_options: Dict[str, Any] = {}
+            if glove is None:
+                model_options: Dict[str, Any] = {}
+                if checkpoint is not None:
+                    # Seed the run, so that a resumed run shuffles its
+                    # remaining epochs as this one would have (each epoch
+                    # is seeded by random_state and its number)
+                    model_options["random_state"] = random.getrandbits(63)
+                glove = GloveModel(
+                    no_components=NUM_COMPONENTS,
+                    learning_rate=LEARNING_RATE,
+                    batch_size=batch_size,
+                    **model_options,
+                )
+            else:
+                epochs = max(num_epochs - len(glove.loss_history), 0)
+                fit_options["warm_start"] = True
+
+            callbacks = []
+            if profiler is not None:
+                callbacks.append(epoch_recorder(profiler))
+            if checkpoint is not None:
+                callbacks.append(checkpoint.callback(glove))
+            if callbacks:
+
+                def after_epoch(epoch: int, loss: float) -> None:
+                    for callback in callbacks:
+                        callback(epoch, loss)
+
+                fit_options["callback"] = after_epoch
+            glove.fit(
+                cooccurrence,
+                epochs=epochs,
+                no_threads=parallel_threads,
+                verbose=True,
+                **fit_options,
+            )
+        glove.add_dictionary(cooccurrence.dictionary)
+
+    with profile_stage(profiler, "save"):
+        glove.save(model_name + ".model")
+        export_model(
+            glove, store_path(model_name + ".model"), quantization=quantization
+        )
 
 
 def train_and_save_model(
-    data_dir: str,
+    data_dir: Union[str, CorpusSource],
     model_name: str = "LeGlove",
     num_epochs: int = 10,
     parallel_threads: int = 1,
+    num_workers: int = 1,
+    cache_dir: Optional[str] = None,
+    cleanup_backend: str = DEFAULT_CLEANUP_BACKEND,
+    tokenizer: str = DEFAULT_TOKENIZER,
+    cooccurrence_memory_mb: float = DEFAULT_MEMORY_LIMIT_MB,
+    cooccurrence_workers: int = 1,
+    min_count: int = 1,
+    max_vocab_size: Optional[int] = None,
+    backend: str = DEFAULT_TRAINING_BACKEND,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    quantization: Optional[str] = None,
+    profiler: Optional[Profiler] = None,
+    prefetch: int = 0,
+    save_cooccurrence: bool = False,
+    jurisdictions: Optional[Sequence[str]] = None,
+    exclude_jurisdictions: Optional[Sequence[str]] = None,
+    checkpoint_epochs: int = 0,
+    resume: bool = False,
 ) -> None:
-    """Process a legal corpus and train and save a GloVe model."""
+    """
+    Process a legal corpus and train and save a GloVe model.
 
-    if Corpus is None or Glove is None:
-        raise ImportError(
-            "glove-python is required but not installed. Install with: uv sync --extra glove"
+    data_dir may be a corpus directory, archive or JSON lines file (see
+    read_corpus).
+
+    With quantization (see leglove.quantize.QUANTIZATIONS), the exported
+    "<model_name>.vectors" layout stores quantized codes instead of
+    float32 vectors; the pickled model keeps full precision.
+
+    With a profiler (see leglove.profiling), the time of every stage of
+    the run, down to each preprocessing step and training epoch, is
+    recorded in it.
+
+    With prefetch, that many opinion files are read ahead of cleanup in
+    background threads (see read_corpus).
+
+    With save_cooccurrence, the co-occurrence matrix and the names of the
+    opinions counted into it are also saved to "<model_name>.cooccurrence"
+    (see leglove.cooccurrence_store), so that the model can later be
+    updated with new opinions by leglove.incremental.update_model.
+
+    With jurisdictions or exclude_jurisdictions, the model is trained on
+    the opinions of the selected jurisdictions only (see read_corpus and
+    leglove.jurisdictions).
+
+    With checkpoint_epochs, the run is checkpointed to
+    "<model_name>.checkpoint" (see leglove.checkpoint): the co-occurrence
+    matrix once it is built, and the model parameters and optimizer state
+    every checkpoint_epochs epochs. With resume, a run with the same
+    options continues from that checkpoint, skipping the corpus and the
+    epochs already trained; without one, it starts from scratch. The
+    checkpoint is removed once the model is saved.
+    """
+
+    check_training_backend(backend)
+    # Reject unknown jurisdictions before reading anything
+    jurisdiction_filter(jurisdictions, exclude_jurisdictions)
+
+    checkpoint = None
+    if checkpoint_epochs or resume:
+        # Everything that changes the matrix or the training of the run
+        options = {
+            "data_dir": data_dir
+            if isinstance(data_dir, str)
+            else getattr(data_dir, "path", type(data_dir).__name__),
+            "cleanup_backend": cleanup_backend,
+            "tokenizer": tokenizer,
+            "min_count": min_count,
+            "max_vocab_size": max_vocab_size,
+            "jurisdictions": jurisdictions,
+            "exclude_jurisdictions": exclude_jurisdictions,
+            "backend": backend,
+            "batch_size": batch_size,
+        }
+        checkpoint = TrainingCheckpoint(
+            checkpoint_path(model_name + ".model"), options, every=checkpoint_epochs
         )
+        if checkpoint.every and backend != "numpy":
+            raise ValueError("checkpoint_epochs requires the numpy backend")
 
-    corpus_model = Corpus()
-    corpus_model.fit(read_corpus(data_dir), window=CONTEXT_WINDOW)
+    counted = None
+    if checkpoint is not None:
+        if resume:
+            counted = checkpoint.load_cooccurrence()
+        if counted is None:
+            # Saved epochs belong to the saved matrix
+            checkpoint.clear()
+    if counted is not None:
+        cooccurrence, documents = counted
+    else:
+        names: List[str] = []
+        cooccurrence = _count_corpus(
+            data_dir,
+            names if save_cooccurrence or checkpoint is not None else None,
+            {
+                "num_workers": num_workers,
+                "cache_dir": cache_dir,
+                "cleanup_backend": cleanup_backend,
+                "tokenizer": tokenizer,
+                "profiler": profiler,
+                "prefetch": prefetch,
+                "jurisdictions": jurisdictions,
+                "exclude_jurisdictions": exclude_jurisdictions,
+            },
+            cooccurrence_memory_mb=cooccurrence_memory_mb,
+            cooccurrence_workers=cooccurrence_workers,
+            min_count=min_count,
+            max_vocab_size=max_vocab_size,
+        )
+        documents = [relative_name(name, data_dir) for name in names]
+        if checkpoint is not None:
+            with profile_stage(profiler, "checkpoint"):
+                checkpoint.save_cooccurrence(cooccurrence, documents, CONTEXT_WINDOW)
 
-    glove = Glove(no_components=NUM_COMPONENTS, learning_rate=LEARNING_RATE)
-    glove.fit(
-        corpus_model.matrix,
-        epochs=num_epochs,
-        no_threads=parallel_threads,
-        verbose=True,
+    fit_and_save_model(
+        cooccurrence,
+        model_name=model_name,
+        num_epochs=num_epochs,
+        parallel_threads=parallel_threads,
+        backend=backend,
+        batch_size=batch_size,
+        quantization=quantization,
+        profiler=profiler,
+        checkpoint=checkpoint,
     )
-    glove.add_dictionary(corpus_model.dictionary)
 
-    glove.save(model_name + ".model")
+    if save_cooccurrence:
+        options = {
+            "cleanup_backend": cleanup_backend,
+            "tokenizer": tokenizer,
+            "min_count": min_count,
+            "max_vocab_size": max_vocab_size,
+        }
+        if jurisdictions is not None:
+            options["jurisdictions"] = list(jurisdictions)
+        if exclude_jurisdictions:
+            options["exclude_jurisdictions"] = list(exclude_jurisdictions)
+        with profile_stage(profiler, "save"):
+            write_store(
+                cooccurrence_store_path(model_name + ".model"),
+                cooccurrence.dictionary,
+                documents,
+                window=CONTEXT_WINDOW,
+                scale=cooccurrence.scale,
+                options=options,
+                matrix=cooccurrence,
+            )
+    if checkpoint is not None:
+        # The model is saved, so the run no longer needs its checkpoint
+        checkpoint.clear()
+
+
+def _count_corpus(
+    data_dir: Union[str, CorpusSource],
+    names: Optional[List[str]],
+    read_options: Dict[str, Any],
+    cooccurrence_memory_mb: float,
+    cooccurrence_workers: int,
+    min_count: int,
+    max_vocab_size: Optional[int],
+) -> CooccurrenceMatrix:
+    """
+    Choose the vocabulary of a corpus and count its co-occurrences, as
+    train_and_save_model does, collecting the names of the documents
+    counted into names if given.
+    """
+    profiler = read_options["profiler"]
+    prune_vocabulary = min_count > 1 or max_vocab_size is not None
+    with ExitStack() as stack:
+        if prune_vocabulary and read_options["cache_dir"] is None:
+            # The corpus is read twice, so cache its tokens for this run
+            # instead of cleaning and tokenizing every opinion again
+            read_options = {
+                **read_options,
+                "cache_dir": stack.enter_context(
+                    tempfile.TemporaryDirectory(prefix="leglove-tokens-")
+                ),
+            }
+        corpus = partial(read_corpus, data_dir, **read_options)
+        if names is not None:
+            # Record the name of every document counted into the matrix
+            corpus = partial(
+                _recording_names,
+                partial(read_documents, data_dir, **read_options),
+                names,
+            )
+
+        dictionary = None
+        if prune_vocabulary:
+            with profile_stage(profiler, "vocabulary"):
+                dictionary = build_vocabulary(
+                    corpus(), min_count=min_count, max_vocab_size=max_vocab_size
+                )
+        with profile_stage(profiler, "cooccurrence"):
+            return build_cooccurrence_matrix(
+                corpus(),
+                window=CONTEXT_WINDOW,
+                memory_limit_mb=cooccurrence_memory_mb,
+                num_workers=cooccurrence_workers,
+                dictionary=dictionary,
+            )
+
+
+def _recording_names(
+    documents: Callable[[], Iterable[Tuple[str, List[str]]]], names: List[str]
+) -> Iterator[List[str]]:
+    """Yield the tokens of documents, collecting their names (anew on each pass)."""
+    names.clear()
+    for name, tokens in documents():
+        names.append(name)
+        yield tokens
@@ -0,0 +1,293 @@
+import json
+import logging
+import os
+import shutil
+from typing import Any, Dict, Iterator, Optional
+
+import numpy as np
+
+from .ann import DEFAULT_NUM_PROBES, load_or_build_index
+from .model import GloveModel
+from .neighbors import DEFAULT_METRIC, NearestNeighbors
+from .quantize import (
+    QuantizedNeighbors,
+    Quantizer,
+    fit_quantizer,
+    load_quantizer,
+    quantization_report,
+    save_quantizer,
+)
+from .vocab import CompactVocabulary
+
+"""
+    vector_store.py
+    --------
+    This module exports trained models to a memory-mappable on-disk
+    layout and loads them back with np.memmap, so that loading a model
+    takes milliseconds and every process using it shares one copy in
+    the page cache instead of unpickling its own.
+
+    A model "<model_name>.model" is exported to the directory
+    "<model_name>.vectors", which contains:
+
+        header.json   format version, number of words and dimensions
+        vectors.f32   raw little-endian float32 word vectors, one row per
+                      word id
+        strings.bin   UTF-8 words concatenated in sorted byte order
+        offsets.i64   int64 offsets of each word in strings.bin, plus the
+                      end of the last word
+        ids.i64       int64 word id of each sorted word
+
+    The last three files are a leglove.vocab.CompactVocabulary: words are
+    looked up by binary search over the sorted string table, which reads
+    only about log2(n) words from disk.
+
+    Models can also be exported with quantized vectors (see quantize.py).
+    vectors.f32 is then replaced by
+
+        codes.bin       raw int8 or uint8 codes, one row per word id
+        quantizer.npz   the quantizer parameters
+
+    and the header records the quantization and how it compares with the
+    full-precision vectors in memory and nearest neighbor recall.
+
+    load_model loads a model from its exported layout when it is up to
+    date, and load_neighbors indexes it for nearest neighbor queries.
+"""
+
+# Constants
+FORMAT_VERSION = 2  # version of the on-disk layout
+READABLE_VERSIONS = (1, 2)  # layouts that load can read
+STORE_SUFFIX = ".vectors"  # directory name suffix of an exported model
+HEADER_FILE = "header.json"
+VECTORS_FILE = "vectors.f32"
+CODES_FILE = "codes.bin"
+QUANTIZER_FILE = "quantizer.npz"
+VECTOR_DTYPE = np.dtype("<f4")
+
+
+def store_path(model_file: str) -> str:
+    """Return the path of the exported layout of a model file."""
+    return os.path.splitext(model_file)[0] + STORE_SUFFIX
+
+
+def export_model(
+    model,
+    path: str,
+    quantization: Optional[str] = None,
+    metric: str = DEFAULT_METRIC,
+    **kwargs,
+) -> Optional[Dict[str, Any]]:
+    """
+    Write the word vectors and dictionary of a model to a directory.
+
+    The layout is written to a temporary directory next to path and then
+    renamed, so readers never see a partially written export.
+
+    Args:
+        model: Trained model with word_vectors and a dictionary, e.g. a
+            leglove.model.GloveModel or a glove.Glove.
+        path: Directory to create (or replace).
+        quantization: Optional quantizer, one of
+            leglove.quantize.QUANTIZATIONS, to store codes instead of
+            float32 vectors.
+        metric: Distance used to measure the neighbor recall of quantized
+            vectors.
+        **kwargs: Passed to the quantizer's fit method.
+
+    Returns:
+        The leglove.quantize.quantization_report of quantized exports,
+        which is also saved in the header, or None.
+    """
+    if model.dictionary is None or model.word_vectors is None:
+        raise ValueError("Model must be fit and have a dictionary")
+
+    vocabulary = model.dictionary
+    if not isinstance(vocabulary, CompactVocabulary):
+        vocabulary = CompactVocabulary.from_dictionary(vocabulary)
+    word_vectors = np.asarray(model.word_vectors)
+
+    temporary = path + ".tmp"
+    shutil.rmtree(temporary, ignore_errors=True)
+    os.makedirs(temporary)
+    report = None
+    if quantization is None:
+        with open(os.path.join(temporary, VECTORS_FILE), "wb") as file:
+            file.write(np.ascontiguousarray(word_vectors, dtype=VECTOR_DTYPE).tobytes())
+    else:
+        quantizer = fit_quantizer(word_vectors, quantization, **kwargs)
+        codes = quantizer.encode(word_vectors)
+        with open(os.path.join(temporary, CODES_FILE), "wb") as file:
+            file.write(np.ascontiguousarray(codes).tobytes())
+        save_quantizer(quantizer, os.path.join(temporary, QUANTIZER_FILE))
+        neighbors = QuantizedNeighbors(quantizer, codes, vocabulary, metric)
+        report = quantization_report(word_vectors, vocabulary, neighbors)
+        logging.info(
+            f"Quantized {report['num_words']} vectors with {quantization}: "
+            f"{report['full_precision_bytes']} -> {report['quantized_bytes']} bytes "
+            f"({report['compression']:.1f}x smaller), "
+            f"{metric} recall@10 {report['recall@10']:.3f}"
+        )
+    vocabulary.save(temporary)
+    header = {
+        "version": FORMAT_VERSION,
+        "num_vectors": word_vectors.shape[0],
+        "num_words": len(vocabulary),
+        "no_components": word_vectors.shape[1],
+        "quantization": quantization,
+        "quantization_report": report,
+    }
+    with open(os.path.join(temporary, HEADER_FILE), "w") as file:
+        json.dump(header, file)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.rename(temporary, path)
+    return report
+
+
+class MappedModel:
+    """
+    Read-only model whose vectors and dictionary are memory-mapped.
+
+    Models exported with quantization have codes and a quantizer instead
+    of word_vectors (which is None); vector decodes single words, and
+    leglove.quantize.QuantizedNeighbors searches the codes.
+
+    Example:
+        >>> model = MappedModel.load(store_path("LeGlove.model"))
+        >>> model.vector("legal")
+        memmap([ 0.12, -0.03, ...], dtype=float32)
+    """
+
+    def __init__(
+        self,
+        word_vectors: Optional[np.ndarray],
+        dictionary: CompactVocabulary,
+        codes: Optional[np.ndarray] = None,
+        quantizer: Optional[Quantizer] = None,
+    ) -> None:
+        if (word_vectors is None) == (quantizer is None or codes is None):
+            raise ValueError("Expected either word vectors or codes and a quantizer")
+        self.word_vectors = word_vectors
+        self.codes = codes
+        self.quantizer = quantizer
+        if quantizer is not None:
+            self.no_components = quantizer.no_components
+        else:
+            assert word_vectors is not None
+            self.no_components = word_vectors.shape[1]
+        self.dictionary = dictionary
+
+    @classmethod
+    def load(cls, path: str) -> "MappedModel":
+        """Map a model exported by export_model."""
+        with open(os.path.join(path, HEADER_FILE)) as file:
+            header = json.load(file)
+        if header["version"] not in READABLE_VERSIONS:
+            raise ValueError(
+                f"{path} has format version {header['version']}, "
+                f"expected one of {READABLE_VERSIONS}"
+            )
+
+        dictionary = CompactVocabulary.load(path)
+        if header.get("quantization") is not None:
+            quantizer = load_quantizer(os.path.join(path, QUANTIZER_FILE))
+            shape = (header["num_vectors"], quantizer.code_size)
+            codes = _map(os.path.join(path, CODES_FILE), quantizer.code_dtype, shape)
+            return cls(None, dictionary, codes, quantizer)
+
+        shape = (header["num_vectors"], header["no_components"])
+        word_vectors = _map(os.path.join(path, VECTORS_FILE), VECTOR_DTYPE, shape)
+        return cls(word_vectors, dictionary)
+
+    def __len__(self) -> int:
+        return len(self.dictionary)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self.dictionary
+
+    def word_id(self, word: str) -> int:
+        """Return the id of a word."""
+        try:
+            return self.dictionary[word]
+        except KeyError:
+            raise KeyError(f"{word!r} is not in the vocabulary") from None
+
+    def vector(self, word: str) -> np.ndarray:
+        """
+        Return the vector of a word, as a view of the mapped file, or
+        decoded from its code if the model is quantized.
+        """
+        index = self.word_id(word)
+        if self.quantizer is not None and self.codes is not None:
+            return self.quantizer.decode(self.codes[index : index + 1])[0]
+        assert self.word_vectors is not None
+        return self.word_vectors[index]
+
+    def words(self) -> Iterator[str]:
+        """Yield every word, in sorted order."""
+        return iter(self.dictionary)
+
+
+def model_source(model_file: str) -> str:
+    """
+    Return the path load_model reads a model from: its exported layout if
+    it is at least as new as the model file, or there is no model file.
+    """
+    path = store_path(model_file)
+    if os.path.isdir(path) and (
+        not os.path.exists(model_file)
+        or os.path.getmtime(path) >= os.path.getmtime(model_file)
+    ):
+        return path
+    return model_file
+
+
+def load_model(model_file: str):
+    """
+    Load a model, memory-mapping its exported layout when it is up to date.
+
+    Models trained by train_and_save_model are also exported to
+    "<model_name>.vectors" (see export_model), which loads in
+    milliseconds; older models are unpickled from the model file.
+    """
+    source = model_source(model_file)
+    if source != model_file:
+        return MappedModel.load(source)
+    return GloveModel.load(model_file)
+
+
+def load_neighbors(
+    model_file: str,
+    metric: str = DEFAULT_METRIC,
+    ann: bool = False,
+    num_probes: int = DEFAULT_NUM_PROBES,
+    model=None,
+) -> NearestNeighbors:
+    """
+    Load a model and index it for nearest neighbor queries.
+
+    Quantized exports are searched on their codes. With ann, the IVF index
+    stored next to the model is used instead (see leglove.ann), and built
+    on first use. An already loaded model can be passed to avoid loading
+    it again.
+    """
+    if ann:
+        index = load_or_build_index(model_file, metric=metric)
+        index.num_probes = num_probes
+        return index
+
+    if model is None:
+        model = load_model(model_file)
+    if isinstance(model, MappedModel) and model.quantizer is not None:
+        return QuantizedNeighbors.from_model(model, metric=metric)
+    if model.dictionary is None or model.word_vectors is None:
+        raise ValueError(f"{model_file} does not contain a trained model")
+    return NearestNeighbors.from_model(model, metric=metric)
+
+
+def _map(path: str, dtype: np.dtype, shape: tuple) -> np.ndarray:
+    """Memory-map a raw array file read-only, allowing empty arrays."""
+    if shape[0] == 0:
+        return np.zeros(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=shape)
@@ -0,0 +1,333 @@
+import heapq
+import json
+import logging
+import mmap
+import os
+import shutil
+import tempfile
+from collections import Counter
+from collections.abc import Mapping
+from itertools import groupby
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+"""
+    vocab.py
+    --------
+    This module builds the vocabulary of a corpus in a streaming pass
+    before co-occurrences are counted, so that rare tokens (OCR garbage,
+    stray numbers) never get a row in the co-occurrence matrix or a
+    vector in the model. Token counts are kept in memory up to a budget;
+    beyond it they are spilled to disk as sorted runs and combined by a
+    merge, so the counts stay exact on corpora of any size.
+
+    It also provides CompactVocabulary, a read-only replacement for the
+    word-to-id dict of a trained model: the words are stored as one
+    sorted UTF-8 blob with an offset array and looked up by binary
+    search, using a small fraction of the memory of a dict. It can be
+    saved as raw arrays and memory-mapped back.
+"""
+
+# Constants
+DEFAULT_MEMORY_LIMIT_MB = 256  # default memory budget for token counts
+ENTRY_BYTES = 200  # approximate bytes per distinct token held in a Counter
+STRINGS_FILE = "strings.bin"  # UTF-8 words concatenated in sorted byte order
+OFFSETS_FILE = "offsets.i64"  # int64 offsets of each word, plus the end
+IDS_FILE = "ids.i64"  # int64 id of each sorted word
+INDEX_DTYPE = np.dtype("<i8")
+SURROGATES = "surrogatepass"  # words may hold lone surrogates from JSON escapes
+
+
+class VocabularyCounter:
+    """
+    Exact token counter that spills sorted runs to disk.
+
+    Example:
+        >>> counter = VocabularyCounter()
+        >>> counter.update(["the", "court", "the"])
+        >>> list(counter.items())
+        [('court', 1), ('the', 2)]
+    """
+
+    def __init__(
+        self,
+        memory_limit_mb: float = DEFAULT_MEMORY_LIMIT_MB,
+        spill_dir: Optional[str] = None,
+    ) -> None:
+        self._counts: Counter = Counter()
+        self._max_entries = max(int(memory_limit_mb * 2**20) // ENTRY_BYTES, 1)
+        self._spill_parent = spill_dir
+        self._spill_dir: Optional[str] = None
+        self._runs: List[str] = []
+
+    def update(self, tokens: Iterable[str]) -> None:
+        """Count the tokens of one document."""
+        self._counts.update(tokens)
+        if len(self._counts) >= self._max_entries:
+            self._spill()
+
+    def _spill(self) -> None:
+        """Write the in-memory counts to disk as a run sorted by token."""
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(
+                prefix="leglove-vocabulary-", dir=self._spill_parent
+            )
+        run_path = os.path.join(self._spill_dir, f"run_{len(self._runs)}.jsonl")
+        with open(run_path, "w", encoding="utf-8") as file:
+            for item in sorted(self._counts.items()):
+                file.write(json.dumps(item) + "\n")
+        self._runs.append(run_path)
+        logging.info(f"Spilled {len(self._counts)} token counts to disk...")
+        self._counts = Counter()
+
+    def items(self) -> Iterator[Tuple[str, int]]:
+        """Yield every (token, count) pair in token order."""
+        if not self._runs:
+            yield from sorted(self._counts.items())
+            return
+
+        if self._counts:
+            self._spill()
+        files = [open(run_path, encoding="utf-8") for run_path in self._runs]
+        try:
+            runs = [(tuple(json.loads(line)) for line in file) for file in files]
+            merged = heapq.merge(*runs, key=itemgetter(0))
+            for token, group in groupby(merged, key=itemgetter(0)):
+                yield token, sum(count for _, count in group)
+        finally:
+            for file in files:
+                file.close()
+
+    def close(self) -> None:
+        """Delete any spilled runs."""
+        if self._spill_dir is not None:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+        self._runs = []
+        self._counts = Counter()
+
+
+def select_vocabulary(
+    counts: Iterable[Tuple[str, int]],
+    min_count: int = 1,
+    max_vocab_size: Optional[int] = None,
+) -> Dict[str, int]:
+    """
+    Choose the vocabulary from token counts.
+
+    Args:
+        counts: (token, count) pairs, each token appearing once.
+        min_count: Minimum number of occurrences of a kept token.
+        max_vocab_size: Optional maximum number of tokens to keep; the most
+            frequent tokens are kept.
+
+    Returns:
+        A dictionary mapping each kept token to its id. Ids are assigned
+        by decreasing count, ties broken by token.
+    """
+    if min_count < 1:
+        raise ValueError("min_count must be at least 1")
+    if max_vocab_size is not None and max_vocab_size < 1:
+        raise ValueError("max_vocab_size must be at least 1")
+
+    def rank(item: Tuple[str, int]) -> Tuple[int, str]:
+        return (-item[1], item[0])
+
+    kept = (item for item in counts if item[1] >= min_count)
+    if max_vocab_size is None:
+        selected = sorted(kept, key=rank)
+    else:
+        selected = heapq.nsmallest(max_vocab_size, kept, key=rank)
+    return {token: index for index, (token, _) in enumerate(selected)}
+
+
+def build_vocabulary(
+    corpus: Iterable[List[str]],
+    min_count: int = 1,
+    max_vocab_size: Optional[int] = None,
+    memory_limit_mb: float = DEFAULT_MEMORY_LIMIT_MB,
+    spill_dir: Optional[str] = None,
+) -> Dict[str, int]:
+    """
+    Count the tokens of a corpus and choose its vocabulary.
+
+    Args:
+        corpus: Iterable of tokenized documents, e.g. from read_corpus.
+        min_count: Minimum number of occurrences of a kept token.
+        max_vocab_size: Optional maximum number of tokens to keep.
+        memory_limit_mb: Approximate memory used for token counts before
+            they are spilled to disk.
+        spill_dir: Directory in which spilled runs are created. Defaults to
+            the system temporary directory.
+
+    Returns:
+        A dictionary mapping each kept token to its id, most frequent first.
+    """
+    counter = VocabularyCounter(memory_limit_mb, spill_dir)
+    try:
+        for tokens in corpus:
+            counter.update(tokens)
+        dictionary = select_vocabulary(counter.items(), min_count, max_vocab_size)
+    finally:
+        counter.close()
+
+    logging.info(f"Kept a vocabulary of {len(dictionary)} tokens...")
+    return dictionary
+
+
+def _map_bytes(path: str) -> Union[bytes, mmap.mmap]:
+    """Memory-map a file read-only as bytes, allowing empty files."""
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _map_array(path: str) -> np.ndarray:
+    """Memory-map a raw int64 array file read-only, allowing empty files."""
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=INDEX_DTYPE)
+    return np.memmap(path, dtype=INDEX_DTYPE, mode="r")
+
+
+class CompactVocabulary(Mapping):
+    """
+    Read-only word-to-id mapping stored as a sorted string table.
+
+    Iteration yields the words in sorted (UTF-8 byte) order. Lookups take
+    about log2(n) string comparisons.
+
+    Example:
+        >>> vocabulary = CompactVocabulary.from_dictionary({"the": 0, "court": 1})
+        >>> vocabulary["the"], "law" in vocabulary, list(vocabulary)
+        (0, False, ['court', 'the'])
+    """
+
+    def __init__(
+        self,
+        strings: Union[bytes, mmap.mmap],
+        offsets: np.ndarray,
+        ids: np.ndarray,
+    ) -> None:
+        if len(offsets) != len(ids) + 1:
+            raise ValueError("offsets must have one more entry than ids")
+        self.offsets = offsets.astype(np.int64, copy=False)
+        self.ids = ids.astype(np.int64, copy=False)
+        # Slicing bytes or an mmap and indexing a memoryview (ndarray.data)
+        # are much faster than indexing numpy arrays, which matters for
+        # the ~log2(n) probes of each binary search
+        self.strings = strings
+        self._offsets = self.offsets.data
+        self._ids = self.ids.data
+        self._positions: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_dictionary(cls, dictionary: "Mapping[str, int]") -> "CompactVocabulary":
+        """Build the vocabulary of a word-to-id dict."""
+        encoded = sorted(
+            (word.encode("utf-8", SURROGATES), index)
+            for word, index in dictionary.items()
+        )
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(word) for word, _ in encoded], out=offsets[1:])
+        ids = np.array([index for _, index in encoded], dtype=np.int64)
+        return cls(b"".join(word for word, _ in encoded), offsets, ids)
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: bool = True) -> "CompactVocabulary":
+        """
+        Load a vocabulary saved in a directory by save.
+
+        With mmap_mode, the files are memory-mapped instead of read, so
+        processes loading the same vocabulary share it in the page cache.
+        """
+        if mmap_mode:
+            return cls(
+                _map_bytes(os.path.join(path, STRINGS_FILE)),
+                _map_array(os.path.join(path, OFFSETS_FILE)),
+                _map_array(os.path.join(path, IDS_FILE)),
+            )
+
+        with open(os.path.join(path, STRINGS_FILE), "rb") as file:
+            strings = file.read()
+        return cls(
+            strings,
+            np.fromfile(os.path.join(path, OFFSETS_FILE), dtype=INDEX_DTYPE),
+            np.fromfile(os.path.join(path, IDS_FILE), dtype=INDEX_DTYPE),
+        )
+
+    def save(self, path: str) -> None:
+        """Write the string table, offsets and ids as raw files in a directory."""
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, STRINGS_FILE), "wb") as file:
+            file.write(self.strings[:])
+        self.offsets.astype(INDEX_DTYPE).tofile(os.path.join(path, OFFSETS_FILE))
+        self.ids.astype(INDEX_DTYPE).tofile(os.path.join(path, IDS_FILE))
+
+    def renumber(self, ids: np.ndarray) -> "CompactVocabulary":
+        """Return a vocabulary of the same words with new ids, in sorted word order."""
+        return CompactVocabulary(self.strings, self.offsets, np.asarray(ids))
+
+    def __reduce__(self):
+        # Memory-mapped strings cannot be pickled, so pickle a copy
+        return (
+            CompactVocabulary,
+            (self.strings[:], np.array(self.offsets), np.array(self.ids)),
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the string table, offsets and ids."""
+        return len(self.strings) + self.offsets.nbytes + self.ids.nbytes
+
+    def _word(self, position: int) -> bytes:
+        """Return the UTF-8 bytes of the word at a position of the string table."""
+        offsets = self._offsets
+        return self.strings[offsets[position] : offsets[position + 1]]
+
+    def _position(self, word: str) -> int:
+        """Return the string table position of a word, or -1 if it is missing."""
+        key = word.encode("utf-8", SURROGATES)
+        strings, offsets = self.strings, self._offsets
+        low, high = 0, len(self._ids)
+        while low < high:
+            middle = (low + high) // 2
+            if strings[offsets[middle] : offsets[middle + 1]] < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self._ids) and self._word(low) == key:
+            return low
+        return -1
+
+    def __getitem__(self, word: str) -> int:
+        position = self._position(word)
+        if position < 0:
+            raise KeyError(word)
+        return self._ids[position]
+
+    def __contains__(self, word: object) -> bool:
+        return isinstance(word, str) and self._position(word) >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        strings = self.strings[:]
+        offsets = self._offsets.tolist()
+        for begin, end in zip(offsets[:-1], offsets[1:]):
+            yield strings[begin:end].decode("utf-8", SURROGATES)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def word(self, index: int) -> str:
+        """Return the word with the given id."""
+        if self._positions is None:
+            # Id -> string table position, built on first use
+            self._positions = np.full(
+                int(self.ids.max(initial=-1)) + 1, -1, dtype=np.int64
+            )
+            self._positions[self.ids] = np.arange(len(self.ids))
+        if not 0 <= index < len(self._positions) or self._positions[index] < 0:
+            raise KeyError(index)
+        return self._word(int(self._positions[index])).decode("utf-8", SURROGATES)
@@ -0,0 +1,215 @@
+"""Tests for the ann module."""
+
+import os
+
+import numpy as np
+import pytest
+
+from leglove.ann import (
+    INDEX_VERSION,
+    IVFIndex,
+    index_file,
+    kmeans,
+    load_or_build_index,
+)
+from leglove.model import GloveModel
+from leglove.neighbors import NearestNeighbors
+from leglove.vector_store import export_model
+
+
+@pytest.fixture
+def word_vectors() -> np.ndarray:
+    """Clustered random word vectors."""
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(20, 8))
+    return centers[rng.integers(0, 20, 2000)] + 0.3 * rng.normal(size=(2000, 8))
+
+
+@pytest.fixture
+def dictionary() -> dict:
+    """Dictionary of the clustered word vectors."""
+    return {f"word{index}": index for index in range(2000)}
+
+
+def _recall(index: IVFIndex, exact: NearestNeighbors, words: list, k: int) -> float:
+    """Return the mean fraction of the exact k nearest words that index finds."""
+    found = index.query_batch(words, k)
+    expected = exact.query_batch(words, k)
+    return float(
+        np.mean(
+            [
+                len({w for w, _ in a} & {w for w, _ in b}) / k
+                for a, b in zip(found, expected)
+            ]
+        )
+    )
+
+
+class TestKmeans:
+    """Tests for the kmeans function."""
+
+    def test_recovers_separated_clusters(self) -> None:
+        """Test that well separated clusters are found."""
+        rng = np.random.default_rng(1)
+        centers = np.array([[0.0, 0.0], [10.0, 0.0], [0.0, 10.0]])
+        vectors = centers.repeat(50, axis=0) + 0.1 * rng.normal(size=(150, 2))
+
+        centroids = kmeans(vectors, 3, rng=rng)
+
+        distances = np.linalg.norm(centroids[:, None] - centers[None], axis=2)
+        assert distances.min(axis=0).max() < 0.5
+
+
+class TestIVFIndex:
+    """Tests for the IVFIndex class."""
+
+    @pytest.mark.parametrize("metric", ["euclidean", "cosine"])
+    def test_probing_all_lists_is_exact(
+        self, word_vectors: np.ndarray, dictionary: dict, metric: str
+    ) -> None:
+        """Test that searching every list gives the exact neighbors."""
+        index = IVFIndex(word_vectors, dictionary, metric, num_lists=16, random_state=0)
+        exact = NearestNeighbors(word_vectors, dictionary, metric)
+        words = [f"word{i}" for i in range(0, 2000, 97)]
+
+        index.num_probes = index.num_lists
+        for word in words:
+            assert [w for w, _ in index.query(word)] == [
+                w for w, _ in exact.query(word)
+            ]
+        np.testing.assert_allclose(
+            [d for _, d in index.query(words[0])],
+            [d for _, d in exact.query(words[0])],
+            rtol=1e-5,
+            atol=1e-6,
+        )
+
+    def test_recall_increases_with_probes(
+        self, word_vectors: np.ndarray, dictionary: dict
+    ) -> None:
+        """Test that probing more lists improves recall."""
+        index = IVFIndex(word_vectors, dictionary, num_lists=40, random_state=0)
+        exact = NearestNeighbors(word_vectors, dictionary)
+        words = [f"word{i}" for i in range(0, 2000, 13)]
+
+        recalls = []
+        for num_probes in [1, 4, 40]:
+            index.num_probes = num_probes
+            recalls.append(_recall(index, exact, words, 10))
+
+        assert recalls == sorted(recalls)
+        assert recalls[1] > 0.9
+        assert recalls[2] == 1.0
+
+    def test_lists_partition_the_vocabulary(
+        self, word_vectors: np.ndarray, dictionary: dict
+    ) -> None:
+        """Test that every word is stored in exactly one list."""
+        index = IVFIndex(word_vectors, dictionary, num_lists=10, random_state=0)
+
+        assert index.num_lists == 10
+        assert index.offsets[0] == 0 and index.offsets[-1] == 2000
+        assert sorted(index.words) == sorted(dictionary)
+        np.testing.assert_allclose(
+            index.vector("word5"), word_vectors[5].astype(np.float32)
+        )
+
+    def test_fewer_candidates_than_k(self) -> None:
+        """Test that searching small lists returns fewer than k neighbors."""
+        vectors = np.array([[0.0, 0.0], [0.1, 0.0], [9.0, 9.0], [9.1, 9.0]])
+        index = IVFIndex(
+            vectors, {"a": 0, "b": 1, "c": 2, "d": 3}, num_lists=2, num_probes=1
+        )
+
+        indices, distances = index.search(vectors[:1], k=3)
+
+        assert indices[0, 2] == -1 and np.isinf(distances[0, 2])
+        assert [word for word, _ in index.query("a", k=3)] == ["a", "b"]
+
+    def test_save_and_load(
+        self, word_vectors: np.ndarray, dictionary: dict, temp_dir: str
+    ) -> None:
+        """Test that a saved index answers queries like the original."""
+        dictionary = {f"wörd{index}": index for index in range(2000)}
+        index = IVFIndex(word_vectors, dictionary, "cosine", num_lists=20, num_probes=3)
+        path = os.path.join(temp_dir, "test.ivf.npz")
+
+        index.save(path)
+        loaded = IVFIndex.load(path)
+
+        assert loaded.metric == "cosine" and loaded.num_probes == 3
+        assert loaded.words == index.words
+        assert loaded.query_batch(["wörd1", "wörd2"]) == index.query_batch(
+            ["wörd1", "wörd2"]
+        )
+
+    def test_load_rejects_other_versions(
+        self, word_vectors: np.ndarray, dictionary: dict, temp_dir: str
+    ) -> None:
+        """Test that indexes in another format version are rejected."""
+        path = os.path.join(temp_dir, "test.ivf.npz")
+        IVFIndex(word_vectors, dictionary, num_lists=4).save(path)
+        with np.load(path) as data:
+            arrays = dict(data)
+        arrays["version"] = np.array(INDEX_VERSION + 1)
+        with open(path, "wb") as file:
+            np.savez(file, **arrays)
+
+        with pytest.raises(ValueError, match="format version"):
+            IVFIndex.load(path)
+
+    def test_invalid_num_lists(
+        self, word_vectors: np.ndarray, dictionary: dict
+    ) -> None:
+        """Test that the number of lists must fit the vocabulary."""
+        with pytest.raises(ValueError, match="num_lists must be between"):
+            IVFIndex(word_vectors, dictionary, num_lists=0)
+        with pytest.raises(ValueError, match="num_lists must be between"):
+            IVFIndex(word_vectors, dictionary, num_lists=2001)
+
+
+class TestLoadOrBuildIndex:
+    """Tests for the load_or_build_index function."""
+
+    def test_builds_then_reuses_index(
+        self, word_vectors: np.ndarray, dictionary: dict, temp_dir: str
+    ) -> None:
+        """Test that the index is saved next to the model and rebuilt when stale."""
+        model = GloveModel(no_components=8)
+        model.word_vectors = word_vectors.astype(np.float32)
+        model.add_dictionary(dictionary)
+        model_file = os.path.join(temp_dir, "LeGlove.model")
+        model.save(model_file)
+        path = index_file(model_file)
+        assert path == os.path.join(temp_dir, "LeGlove.ivf.npz")
+
+        built = load_or_build_index(model_file, num_lists=8)
+        assert os.path.exists(path)
+        assert load_or_build_index(model_file).num_lists == 8
+
+        # Another metric, or a newer model, rebuilds the index
+        assert load_or_build_index(model_file, "cosine", num_lists=4).num_lists == 4
+        newer = os.path.getmtime(path) + 10
+        os.utime(model_file, (newer, newer))
+        rebuilt = load_or_build_index(model_file, "cosine", num_lists=6)
+        assert rebuilt.num_lists == 6 and built.metric == "euclidean"
+
+    def test_exported_layout_only(
+        self, word_vectors: np.ndarray, dictionary: dict, temp_dir: str
+    ) -> None:
+        """Test building the index of a model of which only the export exists."""
+        model = GloveModel(no_components=8)
+        model.word_vectors = word_vectors.astype(np.float32)
+        model.add_dictionary(dictionary)
+        model_file = os.path.join(temp_dir, "LeGlove.model")
+        export_model(model, os.path.join(temp_dir, "LeGlove.vectors"))
+
+        built = load_or_build_index(model_file, num_lists=8)
+        assert not os.path.exists(model_file)
+        assert built.query("word3", k=1)[0][0] == "word3"
+        assert load_or_build_index(model_file, num_lists=4).num_lists == 8
+
+        # A newer export rebuilds the index
+        newer = os.path.getmtime(index_file(model_file)) + 10
+        os.utime(os.path.join(temp_dir, "LeGlove.vectors"), (newer, newer))
+        assert load_or_build_index(model_file, num_lists=4).num_lists == 4
@@ -0,0 +1,135 @@
+"""Tests for the cache module."""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+from leglove.cache import VOCABULARY_FILE, TokenCache, preprocessing_fingerprint
+
+
+def _write(file_path: str, content: str) -> None:
+    """Write content to a file."""
+    with open(file_path, "w") as f:
+        f.write(content)
+
+
+class TestPreprocessingFingerprint:
+    """Tests for the preprocessing_fingerprint function."""
+
+    def test_fingerprint_is_stable(self) -> None:
+        """Test that the fingerprint is deterministic."""
+        assert preprocessing_fingerprint() == preprocessing_fingerprint()
+
+    def test_fingerprint_depends_on_regexes(self) -> None:
+        """Test that changing the regexes changes the fingerprint."""
+        original = preprocessing_fingerprint()
+        with patch("leglove.cache.REGEXES", ["changed"]):
+            assert preprocessing_fingerprint() != original
+
+    def test_fingerprint_depends_on_cleanup_version(self) -> None:
+        """Test that bumping the cleanup version changes the fingerprint."""
+        original = preprocessing_fingerprint()
+        with patch("leglove.cache.CLEANUP_VERSION", -1):
+            assert preprocessing_fingerprint() != original
+
+    def test_fingerprint_depends_on_options(self) -> None:
+        """Test that preprocessing options change the fingerprint."""
+        assert preprocessing_fingerprint(backend="a") != preprocessing_fingerprint(
+            backend="b"
+        )
+
+
+class TestTokenCache:
+    """Tests for the TokenCache class."""
+
+    def test_store_and_load(self, temp_dir: str) -> None:
+        """Test round-tripping tokens through the cache."""
+        cache = TokenCache(os.path.join(temp_dir, "cache"))
+        cache.store("abc", ["the", "court", "held", "the"])
+
+        assert "abc" in cache
+        assert cache.load("abc") == ["the", "court", "held", "the"]
+        ids = cache.load_ids("abc")
+        assert ids is not None
+        assert ids.tolist() == [0, 1, 2, 0]
+
+    def test_store_empty_document(self, temp_dir: str) -> None:
+        """Test that files without usable text are cached as None."""
+        cache = TokenCache(os.path.join(temp_dir, "cache"))
+        cache.store("abc", None)
+
+        assert "abc" in cache
+        assert cache.load("abc") is None
+
+    def test_missing_key(self, temp_dir: str) -> None:
+        """Test looking up a key that was never stored."""
+        cache = TokenCache(os.path.join(temp_dir, "cache"))
+
+        assert "missing" not in cache
+        with pytest.raises(KeyError):
+            cache.load("missing")
+
+    def test_persists_across_instances(self, temp_dir: str) -> None:
+        """Test that a new cache instance reads existing shards and vocabulary."""
+        cache_dir = os.path.join(temp_dir, "cache")
+        TokenCache(cache_dir).store("abc", ["legal", "matters"])
+
+        cache = TokenCache(cache_dir)
+        assert cache.load("abc") == ["legal", "matters"]
+        assert cache.vocabulary == ["legal", "matters"]
+
+    def test_truncated_vocabulary_invalidates_shards(self, temp_dir: str) -> None:
+        """Test that shards referring to lost vocabulary entries are misses."""
+        cache_dir = os.path.join(temp_dir, "cache")
+        TokenCache(cache_dir).store("abc", ["legal", "matters"])
+        vocabulary_path = os.path.join(cache_dir, VOCABULARY_FILE)
+        with open(vocabulary_path, "r+b") as f:
+            f.truncate(os.path.getsize(vocabulary_path) - 3)
+
+        cache = TokenCache(cache_dir)
+        assert cache.vocabulary == ["legal"]
+        assert "abc" not in cache
+
+    def test_truncated_shard(self, temp_dir: str) -> None:
+        """Test that a shard cut short is a miss without reading its tokens."""
+        cache = TokenCache(os.path.join(temp_dir, "cache"))
+        cache.store("abc", ["the", "court", "held"])
+        shard_path = cache._shard_path("abc")
+        with open(shard_path, "r+b") as f:
+            f.truncate(os.path.getsize(shard_path) - 4)
+
+        with patch.object(cache, "load_ids") as mock_load_ids:
+            assert "abc" not in cache
+        mock_load_ids.assert_not_called()
+        with pytest.raises(KeyError):
+            cache.load("abc")
+
+    def test_key_changes_with_file_contents(self, temp_dir: str) -> None:
+        """Test that modifying a file changes its key."""
+        file_path = os.path.join(temp_dir, "opinion.json")
+        _write(file_path, "{}")
+        cache = TokenCache(os.path.join(temp_dir, "cache"))
+        original = cache.key(file_path)
+
+        _write(file_path, '{"html": ""}')
+        os.utime(file_path, ns=(0, 123))
+        assert cache.key(file_path) != original
+
+    def test_key_with_stamp(self, temp_dir: str) -> None:
+        """Test that stamped keys do not need the file and follow the stamp."""
+        cache = TokenCache(os.path.join(temp_dir, "cache"))
+        name = os.path.join(temp_dir, "data.tar", "opinion.json")
+
+        assert cache.key(name, "1:10") == cache.key(name, "1:10")
+        assert cache.key(name, "1:10") != cache.key(name, "2:10")
+
+    def test_key_changes_with_fingerprint(self, temp_dir: str) -> None:
+        """Test that keys depend on the preprocessing fingerprint."""
+        file_path = os.path.join(temp_dir, "opinion.json")
+        _write(file_path, "{}")
+        cache_dir = os.path.join(temp_dir, "cache")
+
+        first = TokenCache(cache_dir, fingerprint="first").key(file_path)
+        second = TokenCache(cache_dir, fingerprint="second").key(file_path)
+        assert first != second
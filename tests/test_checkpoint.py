@@ -0,0 +1,265 @@
+"""Tests for the checkpoint module and resumable training."""
+
+import os
+import random
+from unittest.mock import Mock, patch
+
+import numpy as np
+import pytest
+
+from leglove.checkpoint import (
+    TrainingCheckpoint,
+    checkpoint_path,
+    load_parameters,
+    save_parameters,
+)
+from leglove.cooccurrence import build_cooccurrence_matrix
+from leglove.cooccurrence_store import CooccurrenceStore, cooccurrence_store_path
+from leglove.model import PARAMETERS, GloveModel
+from leglove.train import fit_and_save_model, train_and_save_model
+
+
+class Interrupted(Exception):
+    """Stands in for a training run dying."""
+
+
+@pytest.fixture
+def matrix():
+    """A co-occurrence matrix of a random corpus."""
+    rng = random.Random(0)
+    words = [f"word{index}" for index in range(30)]
+    corpus = [[rng.choice(words) for _ in range(30)] for _ in range(20)]
+    return build_cooccurrence_matrix(corpus, window=3)
+
+
+def assert_same_model(model: GloveModel, other: GloveModel) -> None:
+    """Assert that two models have identical parameters and loss histories."""
+    for name in PARAMETERS:
+        np.testing.assert_array_equal(getattr(model, name), getattr(other, name))
+    assert model.loss_history == other.loss_history
+
+
+class TestParameters:
+    """Tests for saving model parameters as raw arrays."""
+
+    def test_round_trip(self, matrix, temp_dir: str) -> None:
+        """Test that parameters, optimizer state and history are restored."""
+        model = GloveModel(no_components=8, batch_size=64, random_state=3)
+        model.fit(matrix, epochs=2)
+        path = os.path.join(temp_dir, "epoch_2")
+
+        save_parameters(model, path)
+        loaded = load_parameters(path)
+
+        assert_same_model(loaded, model)
+        assert loaded.no_components == 8
+        assert loaded.batch_size == 64
+        assert loaded.random_state == 3
+        assert loaded.word_vectors is not None
+        assert loaded.word_vectors.dtype == np.float32
+        assert sorted(os.listdir(path)) == sorted(
+            [name + ".bin" for name in PARAMETERS] + ["header.json"]
+        )
+
+
+class TestTrainingCheckpoint:
+    """Tests for the TrainingCheckpoint class."""
+
+    def test_resume_matches_uninterrupted(self, matrix, temp_dir: str) -> None:
+        """Test that a resumed fit ends where an uninterrupted one does."""
+        expected = GloveModel(no_components=8, batch_size=64, random_state=1)
+        expected.fit(matrix, epochs=4)
+
+        checkpoint = TrainingCheckpoint(temp_dir, {}, every=2)
+        model = GloveModel(no_components=8, batch_size=64, random_state=1)
+        save_epoch = checkpoint.callback(model)
+
+        def dies_in_epoch_3(epoch: int, loss: float) -> None:
+            save_epoch(epoch, loss)
+            if epoch == 2:
+                raise Interrupted
+
+        with pytest.raises(Interrupted):
+            model.fit(matrix, epochs=4, callback=dies_in_epoch_3)
+
+        resumed = checkpoint.load_model()
+        assert resumed is not None
+        assert len(resumed.loss_history) == 2
+        resumed.fit(matrix, epochs=2, warm_start=True)
+        # Epochs 2 and 3 are shuffled as in the uninterrupted run
+        assert resumed.loss_history == expected.loss_history
+        assert_same_model(resumed, expected)
+
+    def test_hogwild(self, matrix, temp_dir: str) -> None:
+        """Test checkpointing parameters held in shared memory by workers."""
+        checkpoint = TrainingCheckpoint(temp_dir, {}, every=1)
+        model = GloveModel(no_components=4, random_state=0)
+
+        model.fit(matrix, epochs=2, no_threads=2, callback=checkpoint.callback(model))
+
+        loaded = checkpoint.load_model()
+        assert loaded is not None
+        assert_same_model(loaded, model)
+
+    def test_partial_write_is_ignored(self, matrix, temp_dir: str) -> None:
+        """Test that an interrupted write leaves the previous checkpoint."""
+        model = GloveModel(no_components=4, random_state=0)
+        model.fit(matrix, epochs=1)
+        checkpoint = TrainingCheckpoint(temp_dir, {}, every=1)
+        checkpoint.save_model(model)
+
+        model.fit(matrix, epochs=1, warm_start=True)
+        with patch("leglove.checkpoint.os.rename", side_effect=Interrupted):
+            with pytest.raises(Interrupted):
+                checkpoint.save_model(model)
+
+        loaded = checkpoint.load_model()
+        assert loaded is not None
+        assert len(loaded.loss_history) == 1
+
+        checkpoint.save_model(model)
+        assert sorted(os.listdir(temp_dir)) == ["epoch_2", "latest"]
+
+    def test_no_checkpoint(self, temp_dir: str) -> None:
+        """Test that an empty checkpoint has no matrix or model."""
+        checkpoint = TrainingCheckpoint(os.path.join(temp_dir, "x.checkpoint"), {})
+        assert checkpoint.load_cooccurrence() is None
+        assert checkpoint.load_model() is None
+        assert checkpoint_path("models/LeGlove.model") == "models/LeGlove.checkpoint"
+        with pytest.raises(ValueError, match="every must be at least 0"):
+            TrainingCheckpoint(temp_dir, {}, every=-1)
+
+    def test_cooccurrence_options(self, matrix, temp_dir: str) -> None:
+        """Test that the matrix is only resumed by a run with the same options."""
+        TrainingCheckpoint(temp_dir, {"tokenizer": "legal"}).save_cooccurrence(
+            matrix, ["b.json", "a.json"], window=3
+        )
+
+        loaded, documents = TrainingCheckpoint(
+            temp_dir, {"tokenizer": "legal"}
+        ).load_cooccurrence()
+        assert documents == ["a.json", "b.json"]
+        assert loaded.dictionary == matrix.dictionary
+        np.testing.assert_array_equal(loaded.counts, matrix.counts)
+
+        with pytest.raises(ValueError, match="other options"):
+            TrainingCheckpoint(temp_dir, {"tokenizer": "nltk"}).load_cooccurrence()
+
+
+class TestResumableTraining:
+    """Tests for checkpointing and resuming train_and_save_model."""
+
+    def test_resume_after_crash(self, sample_corpus_dir: str, temp_dir: str) -> None:
+        """Test that a resumed run skips the corpus and the epochs trained."""
+        model_name = os.path.join(temp_dir, "TestModel")
+        path = checkpoint_path(model_name + ".model")
+        save_model = TrainingCheckpoint.save_model
+
+        def dies_after_epoch_2(checkpoint, model) -> None:
+            save_model(checkpoint, model)
+            if len(model.loss_history) == 2:
+                raise Interrupted
+
+        with patch.object(TrainingCheckpoint, "save_model", dies_after_epoch_2):
+            with pytest.raises(Interrupted):
+                train_and_save_model(
+                    sample_corpus_dir,
+                    model_name=model_name,
+                    num_epochs=3,
+                    checkpoint_epochs=1,
+                    save_cooccurrence=True,
+                    tokenizer="legal",
+                )
+        assert not os.path.exists(model_name + ".model")
+        assert sorted(os.listdir(path)) == ["cooccurrence", "epoch_2", "latest"]
+
+        with patch("leglove.train.read_documents") as mock_read_documents:
+            train_and_save_model(
+                sample_corpus_dir,
+                model_name=model_name,
+                num_epochs=3,
+                checkpoint_epochs=1,
+                save_cooccurrence=True,
+                tokenizer="legal",
+                resume=True,
+            )
+
+        mock_read_documents.assert_not_called()
+        model = GloveModel.load(model_name + ".model")
+        assert len(model.loss_history) == 3
+        assert model.dictionary is not None and "opinion" in model.dictionary
+        store = CooccurrenceStore.load(cooccurrence_store_path(model_name + ".model"))
+        assert store.documents() == {"scotus/opinion_0.json", "scotus/opinion_1.json"}
+        assert not os.path.exists(path)
+
+    def test_resumed_fit_matches_uninterrupted(self, matrix, temp_dir: str) -> None:
+        """Test that a resumed run continues the shuffles of the run it resumes."""
+        model_name = os.path.join(temp_dir, "TestModel")
+        checkpoint = TrainingCheckpoint(
+            checkpoint_path(model_name + ".model"), {}, every=1
+        )
+        save_model = TrainingCheckpoint.save_model
+
+        def dies_after_epoch_2(checkpoint, model) -> None:
+            save_model(checkpoint, model)
+            if len(model.loss_history) == 2:
+                raise Interrupted
+
+        with patch.object(TrainingCheckpoint, "save_model", dies_after_epoch_2):
+            with pytest.raises(Interrupted):
+                fit_and_save_model(
+                    matrix, model_name=model_name, num_epochs=4, checkpoint=checkpoint
+                )
+        interrupted = checkpoint.load_model()
+        assert interrupted is not None and interrupted.random_state is not None
+
+        fit_and_save_model(
+            matrix, model_name=model_name, num_epochs=4, checkpoint=checkpoint
+        )
+
+        expected = GloveModel(
+            no_components=interrupted.no_components,
+            learning_rate=interrupted.learning_rate,
+            batch_size=interrupted.batch_size,
+            random_state=interrupted.random_state,
+        )
+        expected.fit(matrix, epochs=4)
+        resumed = GloveModel.load(model_name + ".model")
+        assert resumed.loss_history[:2] == interrupted.loss_history
+        assert resumed.loss_history == expected.loss_history
+        assert_same_model(resumed, expected)
+
+    def test_resume_without_checkpoint(
+        self, sample_corpus_dir: str, temp_dir: str
+    ) -> None:
+        """Test that resuming a run that never started trains from scratch."""
+        model_name = os.path.join(temp_dir, "TestModel")
+
+        train_and_save_model(
+            sample_corpus_dir, model_name=model_name, num_epochs=2, resume=True
+        )
+
+        assert len(GloveModel.load(model_name + ".model").loss_history) == 2
+        assert not os.path.exists(checkpoint_path(model_name + ".model"))
+
+    def test_resume_with_other_options(
+        self, sample_corpus_dir: str, temp_dir: str
+    ) -> None:
+        """Test that a checkpoint is not resumed by a run with other options."""
+        model_name = os.path.join(temp_dir, "TestModel")
+        with patch("leglove.train.fit_and_save_model", side_effect=Interrupted):
+            with pytest.raises(Interrupted):
+                train_and_save_model(
+                    sample_corpus_dir, model_name=model_name, checkpoint_epochs=1
+                )
+
+        with pytest.raises(ValueError, match="other options"):
+            train_and_save_model(
+                sample_corpus_dir, model_name=model_name, min_count=2, resume=True
+            )
+
+    @patch("leglove.train.Glove", Mock())
+    def test_checkpoint_epochs_requires_numpy(self, temp_dir: str) -> None:
+        """Test that epochs are only checkpointed by the numpy trainer."""
+        with pytest.raises(ValueError, match="requires the numpy backend"):
+            train_and_save_model(temp_dir, backend="glove-python", checkpoint_epochs=1)
@@ -2,11 +2,19 @@
 
 import json
 import os
+from typing import Any, Dict
+from unittest.mock import patch
 
+import pytest
+
+from leglove import cleanup
 from leglove.cleanup import (
+    CLEANUP_BACKENDS,
     clean_html,
     extract_html,
+    extract_html_from_json,
     extract_text,
+    extract_text_from_json,
     is_well_formatted,
     read_file,
 )
@@ -80,6 +88,75 @@ class TestExtractHtml:
         assert result == "Plain text fallback"
 
 
+class TestExtractHtmlFromJson:
+    """Tests for the extract_html_from_json function."""
+
+    @pytest.mark.parametrize(
+        "json_obj",
+        [
+            {
+                "id": 1,
+                "html_with_citations": '<p class="x">\\Caf\u00e9 "quoted" \U0001f600</p>',
+                "html_lawbox": "<p>Lawbox</p>",
+                "html": None,
+                "html_columbia": None,
+                "plain_text": "",
+            },
+            {
+                "html_with_citations": "",
+                "html_lawbox": None,
+                "html": '<p>"html": "not a key"</p>',
+                "html_columbia": "<p>Columbia</p>",
+                "plain_text": "Plain",
+                "cluster": {"absolute_url": "/opinion/1/"},
+            },
+            {
+                "html_with_citations": None,
+                "html_lawbox": None,
+                "html": None,
+                "html_columbia": None,
+                "plain_text": "Plain text\nfallback",
+            },
+            {
+                "html_with_citations": None,
+                "html_lawbox": None,
+                "html": None,
+                "html_columbia": None,
+                "plain_text": None,
+            },
+            {"html_with_citations": None, "html_lawbox": 0, "html": {"a": 1}},
+            {"x\\": 1, 'y\\"html': "<p>Key</p>", "html_with_citations": "<p>A</p>"},
+        ],
+    )
+    @pytest.mark.parametrize("orjson", [cleanup.orjson, None])
+    def test_matches_extract_html(self, json_obj: Dict[str, Any], orjson: Any) -> None:
+        """Test that the scan agrees with extract_html, with and without orjson."""
+        with patch("leglove.cleanup.orjson", orjson):
+            for data in [json.dumps(json_obj), json.dumps(json_obj, indent=2)]:
+                assert extract_html_from_json(data) == extract_html(json_obj)
+                assert extract_html_from_json(data.encode()) == extract_html(json_obj)
+            data = json.dumps(json_obj, ensure_ascii=False).encode("utf-8")
+            assert extract_html_from_json(data) == extract_html(json_obj)
+
+    def test_repeated_field(self) -> None:
+        """Test that repeated fields fall back to the last value, as in json."""
+        data = '{"html_with_citations": "<p>A</p>", "html_with_citations": "<p>B</p>"}'
+
+        assert extract_html_from_json(data) == "<p>B</p>"
+
+    def test_missing_field(self) -> None:
+        """Test that a missing field raises KeyError, as in extract_html."""
+        with pytest.raises(KeyError):
+            extract_html_from_json('{"html_with_citations": null}')
+
+    def test_scan_skips_other_fields(self) -> None:
+        """Test that the scan does not parse fields other than the selected one."""
+        data = b'{"meta": not json, "html_with_citations": "<p>A</p>"}'
+
+        with patch("leglove.cleanup.orjson", None):
+            assert extract_html_from_json(data) == "<p>A</p>"
+
+
 class TestIsWellFormatted:
     """Tests for the is_well_formatted function."""
 
@@ -133,6 +210,115 @@ class TestCleanHtml:
         assert result == ""
 
 
+# Opinion fragments on which every backend must agree with html5lib
+WELL_FORMED_HTML = [
+    "<p>First paragraph</p><p>Second paragraph</p>",
+    "<p>Text with<sup>1</sup> footnote</p>",
+    "<p>Text &amp; &quot;quoted&quot;</p>",
+    "<html><body></body></html>",
+    "<div><p>a<br>b</p><p>c <i>d</i> e</p></div>",
+    "<p>a<!-- comment -->b</p>",
+    "<p>one\r\n two</p>\n<p>three</p>",
+    "<p>&nbsp;x&#167;y</p>",
+    "<p>x &amp;amp; y &lt;b&gt;z&lt;/b&gt;</p>",
+    "<P>Upper case tags</P>",
+    "<sup><p>dropped</p></sup><p>kept</p>",
+    "<p>a<sup>b<sup>c</sup>d</sup>e</p>",
+    '<p>See <span class="star-pagination">*12</span> the <a class="footnote" '
+    'href="#fn1" id="fnref1">1</a> rule.</p>',
+]
+
+# Malformed fragments whose html5lib error recovery the html.parser backend emulates
+MALFORMED_HTML = [
+    "<p>a<div>b</div>c</p>",
+    "<p>a</p>b</p>c",
+    "<p>a<p>b",
+    "<p>a<sup>1<p>in</p></sup>b</p>",
+    "<p>a<table><tr><td>x</td></tr></table>b</p>",
+    "<p>a<li>b</li>c</p>",
+    "<p>a<span>b<div>c</div>d</span>e</p>",
+    "<p>a<pre>b</pre>c",
+    "<p/>x<p>y",
+    "<p>a</div>b</p>",
+    "<ul><li>a<li>b</ul><p>c</p>",
+    "<dl><dt><p>a<dd><p>b</dl>",
+]
+
+# Escaped markup, which html5lib parses again after decoding, and elements
+# whose content the html.parser backend has to read as text
+TEXT_MARKUP_HTML = [
+    "<p>See &lt;sup&gt;1&lt;/sup&gt; here</p>",
+    "<p>a &lt;p&gt;b&lt;/p&gt; c</p>",
+    "<p>x &lt;p&gt;y</p>z",
+    "<p>a <textarea>x &lt;b&gt;y&lt;/b&gt; <i>z</i></textarea> b</p>",
+    "<p>a <textarea>x &lt;/textarea&gt;y</textarea> b</p>",
+    "<p>a <title>x &amp;amp; <sup>y</sup></title> b</p>",
+    "<p>a <xmp>x &amp; <sup>y</sup></xmp> b</p>",
+    "<p>a <iframe><p>x</p></iframe> b</p>",
+    "<p>a <select><option>x</option><p>y</p></select> b</p>",
+    "<p>a <select><option>x<textarea>y</textarea> b</p>",
+    "<p>a <plaintext>x </p><p>y</p>",
+]
+
+# Documented divergences of the html.parser backend: (html, html5lib, html.parser)
+HTML_PARSER_DIVERGENCES = [
+    (
+        "<p>if a&lt;b then</p><p>next para</p>",
+        "if a\n\nnext para",
+        "if a<b then\n\nnext para",
+    ),
+    ("<p>a&lt;/p&gt;", "a\n\n", "a"),
+]
+
+
+class TestCleanHtmlBackends:
+    """Parity tests of the single-pass cleanup backends against html5lib."""
+
+    @pytest.mark.parametrize(
+        "html", WELL_FORMED_HTML + MALFORMED_HTML + TEXT_MARKUP_HTML
+    )
+    def test_html_parser_matches_html5lib(self, html: str) -> None:
+        """Test that the html.parser backend matches the reference output."""
+        expected = clean_html(html, backend="html5lib")
+        assert clean_html(html, backend="html.parser") == expected
+
+    @pytest.mark.parametrize("html,reference,result", HTML_PARSER_DIVERGENCES)
+    def test_html_parser_divergences(
+        self, html: str, reference: str, result: str
+    ) -> None:
+        """Test the documented differences of html.parser from the reference."""
+        assert clean_html(html, backend="html5lib") == reference
+        assert clean_html(html, backend="html.parser") == result
+
+    def test_default_backend(self) -> None:
+        """Test that the reference implementation is the default."""
+        html = HTML_PARSER_DIVERGENCES[0][0]
+        assert clean_html(html) == clean_html(html, backend="html5lib")
+
+    @pytest.mark.parametrize("html", WELL_FORMED_HTML)
+    def test_lxml_matches_html5lib(self, html: str) -> None:
+        """Test that the lxml backend matches the reference output."""
+        pytest.importorskip("lxml")
+        expected = clean_html(html, backend="html5lib")
+        assert clean_html(html, backend="lxml") == expected
+
+    @pytest.mark.parametrize("backend", CLEANUP_BACKENDS)
+    def test_backends_on_fixture(
+        self, backend: str, sample_json_opinion: Dict[str, Any]
+    ) -> None:
+        """Test every backend on the sample opinion fixture."""
+        if backend == "lxml":
+            pytest.importorskip("lxml")
+        html = sample_json_opinion["html_with_citations"]
+        result = clean_html(html, backend=backend)
+        assert result == "This is a test opinion with  citations.\n\nSecond paragraph."
+
+    def test_unknown_backend(self) -> None:
+        """Test that an unknown backend is rejected."""
+        with pytest.raises(ValueError, match="Unknown cleanup backend"):
+            clean_html("<p>Text</p>", backend="regex")
+
+
 class TestExtractText:
     """Tests for the extract_text function."""
 
@@ -143,6 +329,13 @@ class TestExtractText:
         assert "citations." in result
         assert "Second paragraph." in result
 
+    def test_extract_text_from_json(self, sample_json_opinion: Dict[str, Any]) -> None:
+        """Test that JSON bytes and strings give the text of the file."""
+        data = json.dumps(sample_json_opinion)
+
+        assert extract_text_from_json(data) == extract_text_from_json(data.encode())
+        assert "Second paragraph." in extract_text_from_json(data)
+
     def test_extract_text_malformed_html(self, temp_dir: str) -> None:
         """Test text extraction with malformed HTML."""
         json_obj = {
@@ -0,0 +1,280 @@
+"""Tests for the cooccurrence module."""
+
+import os
+import random
+from collections import defaultdict
+from typing import Dict, List, Tuple
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from leglove.cooccurrence import (
+    ID_BITS,
+    MAX_WINDOW,
+    CooccurrenceBuilder,
+    CooccurrenceMatrix,
+    build_cooccurrence_matrix,
+    count_scale,
+    renumber_pairs,
+)
+
+
+def _reference_cooccurrences(
+    corpus: List[List[str]], window: int
+) -> Tuple[Dict[str, int], Dict[Tuple[int, int], float]]:
+    """Count co-occurrences the way glove.Corpus.fit does."""
+    dictionary: Dict[str, int] = {}
+    cooccurrences: Dict[Tuple[int, int], float] = defaultdict(float)
+    for tokens in corpus:
+        ids = [dictionary.setdefault(token, len(dictionary)) for token in tokens]
+        for i, outer in enumerate(ids):
+            for j in range(i + 1, min(i + window + 1, len(ids))):
+                inner = ids[j]
+                if inner != outer:
+                    pair = (min(inner, outer), max(inner, outer))
+                    cooccurrences[pair] += 1.0 / (j - i)
+    return dictionary, dict(cooccurrences)
+
+
+def _as_dict(matrix: CooccurrenceMatrix) -> Dict[Tuple[int, int], float]:
+    """Return the entries of a matrix keyed by (row, column)."""
+    return {
+        (row, col): value
+        for row, col, value in zip(
+            matrix.rows.tolist(), matrix.cols.tolist(), matrix.values.tolist()
+        )
+    }
+
+
+def _random_corpus(num_docs: int, seed: int = 0) -> List[List[str]]:
+    """Return a corpus of random documents over a small vocabulary."""
+    rng = random.Random(seed)
+    words = [f"word{index}" for index in range(50)]
+    return [
+        [rng.choice(words) for _ in range(rng.randint(0, 40))] for _ in range(num_docs)
+    ]
+
+
+class TestCountScale:
+    """Tests for the count_scale function."""
+
+    def test_count_scale(self) -> None:
+        """Test that the scale is the least common multiple of all distances."""
+        assert count_scale(1) == 1
+        assert count_scale(4) == 12
+        assert count_scale(10) == 2520
+
+
+class TestCooccurrenceBuilder:
+    """Tests for the CooccurrenceBuilder class."""
+
+    def test_simple_document(self) -> None:
+        """Test the weights and ordering of a single document."""
+        matrix = build_cooccurrence_matrix([["the", "court", "held"]], window=2)
+
+        assert matrix.dictionary == {"the": 0, "court": 1, "held": 2}
+        assert matrix.shape == (3, 3)
+        assert _as_dict(matrix) == {(0, 1): 1.0, (0, 2): 0.5, (1, 2): 1.0}
+
+    def test_identical_words_skipped(self) -> None:
+        """Test that pairs of the same word are not counted."""
+        matrix = build_cooccurrence_matrix([["court", "court", "held"]], window=2)
+
+        assert _as_dict(matrix) == {(0, 1): 1.5}
+
+    def test_pairs_do_not_span_documents(self) -> None:
+        """Test that the window does not extend into the next document."""
+        matrix = build_cooccurrence_matrix([["a", "b"], ["c", "d"]], window=5)
+
+        assert _as_dict(matrix) == {(0, 1): 1.0, (2, 3): 1.0}
+
+    def test_matches_reference(self) -> None:
+        """Test that counts match a direct implementation of glove-python."""
+        corpus = _random_corpus(200)
+        dictionary, expected = _reference_cooccurrences(corpus, window=10)
+
+        matrix = build_cooccurrence_matrix(corpus, window=10)
+
+        assert matrix.dictionary == dictionary
+        result = _as_dict(matrix)
+        assert result.keys() == expected.keys()
+        for pair, value in expected.items():
+            assert result[pair] == pytest.approx(value)
+
+    def test_spilling_matches_in_memory(self, temp_dir: str) -> None:
+        """Test that a tiny memory budget spills to disk without changing counts."""
+        corpus = _random_corpus(200, seed=1)
+        in_memory = build_cooccurrence_matrix(corpus)
+
+        builder = CooccurrenceBuilder(memory_limit_mb=0.01, spill_dir=temp_dir)
+        for tokens in corpus:
+            builder.add_document(tokens)
+        spilled = builder.build()
+
+        assert builder.num_spills > 1
+        assert spilled.dictionary == in_memory.dictionary
+        np.testing.assert_array_equal(spilled.rows, in_memory.rows)
+        np.testing.assert_array_equal(spilled.cols, in_memory.cols)
+        np.testing.assert_array_equal(spilled.counts, in_memory.counts)
+        assert os.listdir(temp_dir) == []
+
+    def test_entries_sorted(self) -> None:
+        """Test that entries are upper triangular and sorted by row and column."""
+        matrix = build_cooccurrence_matrix(_random_corpus(50))
+
+        assert np.all(matrix.rows < matrix.cols)
+        keys = matrix.rows.astype(np.int64) * matrix.shape[0] + matrix.cols
+        assert np.all(np.diff(keys) > 0)
+
+    def test_fixed_dictionary(self) -> None:
+        """Test that tokens outside a fixed dictionary are dropped in place."""
+        dictionary = {"court": 0, "held": 1}
+
+        matrix = build_cooccurrence_matrix(
+            [["the", "court", "xqz", "held", "the"]], window=2, dictionary=dictionary
+        )
+
+        assert matrix.dictionary == {"court": 0, "held": 1}
+        assert _as_dict(matrix) == {(0, 1): 0.5}
+
+    def test_empty_corpus(self) -> None:
+        """Test building a matrix from an empty corpus."""
+        matrix = build_cooccurrence_matrix([])
+
+        assert matrix.dictionary == {}
+        assert matrix.nnz == 0
+
+    def test_invalid_window(self) -> None:
+        """Test that a non-positive window is rejected."""
+        with pytest.raises(ValueError, match="window must be at least 1"):
+            CooccurrenceBuilder(window=0)
+
+    def test_max_window(self) -> None:
+        """Test that the longest allowed window counts exactly."""
+        corpus = [[f"word{index}" for index in range(MAX_WINDOW + 1)]]
+        matrix = build_cooccurrence_matrix(corpus, window=MAX_WINDOW)
+
+        assert matrix.scale == count_scale(MAX_WINDOW)
+        assert _as_dict(matrix) == pytest.approx(
+            _reference_cooccurrences(corpus, MAX_WINDOW)[1]
+        )
+        assert _as_dict(matrix)[(0, MAX_WINDOW)] == 1.0 / MAX_WINDOW
+        # Even a pair at distance MAX_WINDOW in every window of a corpus of
+        # 2**35 tokens cannot overflow
+        assert np.iinfo(np.int64).max // matrix.scale > 2**35
+
+    @pytest.mark.parametrize("num_workers", [1, 2])
+    def test_window_too_long(self, num_workers: int) -> None:
+        """Test that windows whose counts could overflow are rejected."""
+        for window in [MAX_WINDOW + 1, 43]:
+            with pytest.raises(ValueError, match="window must be at most"):
+                build_cooccurrence_matrix(
+                    [["a", "b"]], window=window, num_workers=num_workers
+                )
+        with pytest.raises(ValueError, match="window must be at most"):
+            CooccurrenceBuilder(window=43)
+
+
+class TestRenumberPairs:
+    """Tests for the renumber_pairs function."""
+
+    def test_matches_fixed_dictionary(self) -> None:
+        """Test that renumbering equals counting over the new dictionary."""
+        corpus = _random_corpus(20)
+        full = build_cooccurrence_matrix(corpus, window=3)
+        kept = sorted(full.dictionary)[::2]
+        dictionary = {word: index for index, word in enumerate(kept)}
+        ids = np.full(len(full.dictionary), -1, dtype=np.int64)
+        for word, index in dictionary.items():
+            ids[full.dictionary[word]] = index
+
+        full_keys = (full.rows.astype(np.int64) << ID_BITS) | full.cols
+        keys, counts = renumber_pairs(full_keys, full.counts, ids)
+
+        matrix = CooccurrenceMatrix.from_keys(dictionary, keys, counts, full.scale)
+        expected = build_cooccurrence_matrix(corpus, window=3, dictionary=dictionary)
+        assert np.all(np.diff(keys) > 0)
+        assert _as_dict(matrix) == _as_dict(expected)
+
+
+class TestParallelCooccurrence:
+    """Tests for building co-occurrence matrices with several workers."""
+
+    def _assert_identical(
+        self, result: CooccurrenceMatrix, expected: CooccurrenceMatrix
+    ) -> None:
+        """Assert that two matrices have exactly the same entries."""
+        assert result.dictionary == expected.dictionary
+        np.testing.assert_array_equal(result.rows, expected.rows)
+        np.testing.assert_array_equal(result.cols, expected.cols)
+        np.testing.assert_array_equal(result.counts, expected.counts)
+
+    @pytest.mark.parametrize("num_workers", [2, 3, 4])
+    def test_matches_single_process(self, num_workers: int) -> None:
+        """Test that any number of workers gives exactly the same matrix."""
+        corpus = _random_corpus(300, seed=2)
+        expected = build_cooccurrence_matrix(corpus)
+
+        with patch("leglove.cooccurrence.CHUNK_TOKENS", 100):
+            result = build_cooccurrence_matrix(corpus, num_workers=num_workers)
+
+        self._assert_identical(result, expected)
+
+    def test_workers_spill_to_disk(self, temp_dir: str) -> None:
+        """Test that workers with a tiny memory budget still match exactly."""
+        corpus = _random_corpus(300, seed=3)
+        expected = build_cooccurrence_matrix(corpus)
+
+        with patch("leglove.cooccurrence.CHUNK_TOKENS", 100):
+            result = build_cooccurrence_matrix(
+                corpus, memory_limit_mb=0.02, spill_dir=temp_dir, num_workers=2
+            )
+
+        self._assert_identical(result, expected)
+        assert os.listdir(temp_dir) == []
+
+    def test_fixed_dictionary(self) -> None:
+        """Test that a fixed dictionary gives the same matrix with workers."""
+        corpus = _random_corpus(100, seed=4)
+        dictionary = {f"word{index}": index for index in range(0, 50, 2)}
+        expected = build_cooccurrence_matrix(corpus, dictionary=dict(dictionary))
+
+        with patch("leglove.cooccurrence.CHUNK_TOKENS", 100):
+            result = build_cooccurrence_matrix(
+                corpus, num_workers=2, dictionary=dict(dictionary)
+            )
+
+        self._assert_identical(result, expected)
+        assert result.dictionary == dictionary
+
+    def test_fewer_documents_than_workers(self) -> None:
+        """Test that idle workers contribute empty partial matrices."""
+        corpus = [["the", "court", "held"]]
+
+        result = build_cooccurrence_matrix(corpus, num_workers=4)
+
+        self._assert_identical(result, build_cooccurrence_matrix(corpus))
+
+    def test_invalid_num_workers(self) -> None:
+        """Test that a non-positive worker count is rejected."""
+        with pytest.raises(ValueError, match="num_workers must be at least 1"):
+            build_cooccurrence_matrix([], num_workers=0)
+
+
+class TestCooccurrenceMatrix:
+    """Tests for the CooccurrenceMatrix class."""
+
+    def test_to_coo(self) -> None:
+        """Test conversion to a scipy sparse matrix."""
+        pytest.importorskip("scipy")
+        matrix = build_cooccurrence_matrix([["the", "court", "held"]], window=2)
+
+        coo = matrix.to_coo()
+
+        assert coo.shape == (3, 3)
+        assert coo.toarray().tolist() == [
+            [0.0, 1.0, 0.5],
+            [0.0, 0.0, 1.0],
+            [0.0, 0.0, 0.0],
+        ]
@@ -0,0 +1,221 @@
+"""Tests for the documents module."""
+
+import io
+import json
+import os
+import tarfile
+from typing import List
+
+import numpy as np
+import pytest
+
+from leglove.cli import main as cli_main
+from leglove.documents import (
+    DocumentVectors,
+    document_frequencies,
+    document_vectors,
+    embed_documents,
+    inverse_document_frequencies,
+    token_ids,
+)
+from leglove.model import GloveModel
+from leglove.train import read_documents
+from leglove.vector_store import MappedModel, export_model
+
+
+@pytest.fixture
+def model() -> GloveModel:
+    """Model with random vectors for a few words."""
+    words = ["the", "court", "opinion", "legal", "second", "first", "."]
+    model = GloveModel(no_components=4)
+    model.word_vectors = np.random.default_rng(0).normal(size=(len(words), 4))
+    model.add_dictionary({word: index for index, word in enumerate(words)})
+    return model
+
+
+def _mean(model: GloveModel, tokens: List[str]) -> np.ndarray:
+    """Return the mean vector of the known tokens."""
+    assert model.dictionary is not None and model.word_vectors is not None
+    rows = [model.dictionary[token] for token in tokens if token in model.dictionary]
+    return model.word_vectors[rows].mean(axis=0)
+
+
+class TestDocumentVectors:
+    """Tests for token_ids and document_vectors."""
+
+    def test_token_ids(self, model: GloveModel) -> None:
+        """Test that unknown tokens are dropped and known tokens counted."""
+        assert model.dictionary is not None
+        ids, counts = token_ids(
+            [["the", "unknown", "court"], [], ["zzz"], ["legal"]], model.dictionary
+        )
+
+        np.testing.assert_array_equal(ids, [0, 1, 3])
+        np.testing.assert_array_equal(counts, [2, 0, 0, 1])
+
+    def test_mean(self, model: GloveModel) -> None:
+        """Test averaging, including documents without known tokens."""
+        documents = [
+            ["the", "court", "the"],
+            [],
+            ["unknown"],
+            ["legal", "opinion", "unknown"],
+        ]
+
+        vectors = document_vectors(model, documents)
+
+        assert vectors.dtype == np.float32 and vectors.shape == (4, 4)
+        np.testing.assert_allclose(vectors[0], _mean(model, documents[0]), rtol=1e-5)
+        np.testing.assert_array_equal(vectors[1:3], 0.0)
+        np.testing.assert_allclose(vectors[3], _mean(model, documents[3]), rtol=1e-5)
+
+    def test_tfidf(self, model: GloveModel) -> None:
+        """Test that tokens are weighted by their idf, once per occurrence."""
+        assert model.dictionary is not None and model.word_vectors is not None
+        documents = [["the", "court", "the"], ["the", "legal"]]
+        frequencies, num_documents = document_frequencies(
+            documents, model.dictionary, 7
+        )
+        idf = inverse_document_frequencies(frequencies, num_documents)
+
+        np.testing.assert_array_equal(frequencies, [2, 1, 0, 1, 0, 0, 0])
+        assert num_documents == 2
+        assert idf[0] == pytest.approx(1.0)
+        assert idf[1] == pytest.approx(np.log(1.5) + 1.0)
+
+        vectors = document_vectors(model, documents, idf)
+        weights = np.array([idf[0], idf[1], idf[0]])
+        expected = weights @ model.word_vectors[[0, 1, 0]] / weights.sum()
+        np.testing.assert_allclose(vectors[0], expected, rtol=1e-5)
+
+    def test_quantized_model(self, model: GloveModel, temp_dir: str) -> None:
+        """Test that quantized models are decoded."""
+        path = os.path.join(temp_dir, "test.vectors")
+        export_model(model, path, quantization="int8")
+
+        vectors = document_vectors(MappedModel.load(path), [["the", "court"]])
+
+        np.testing.assert_allclose(
+            vectors[0], _mean(model, ["the", "court"]), atol=0.05
+        )
+
+
+class TestEmbedDocuments:
+    """Tests for embed_documents and DocumentVectors."""
+
+    @pytest.mark.parametrize("weighting", ["mean", "tfidf"])
+    def test_embed_documents(
+        self, model: GloveModel, sample_corpus_dir: str, tmp_path, weighting: str
+    ) -> None:
+        """Test that every opinion is embedded under its id."""
+        path = str(tmp_path / "test.docvecs")
+
+        documents = embed_documents(model, sample_corpus_dir, path, weighting)
+
+        assert len(documents) == 2 and documents.weighting == weighting
+        assert "scotus/opinion_0" in documents and "scotus/missing" not in documents
+        assert isinstance(documents.vectors, np.memmap)
+        assert documents.doc_id(documents.index["scotus/opinion_1"]) == (
+            "scotus/opinion_1"
+        )
+        tokens = {
+            os.path.basename(path): tokens
+            for path, tokens in read_documents(sample_corpus_dir)
+        }
+        if weighting == "mean":
+            np.testing.assert_allclose(
+                documents.vector("scotus/opinion_0"),
+                _mean(model, tokens["opinion_0.json"]),
+                rtol=1e-5,
+            )
+        with pytest.raises(KeyError, match="not in the index"):
+            documents.vector("scotus/missing")
+        assert not os.path.exists(path + ".tmp")
+
+    def test_workers_match_serial(
+        self, model: GloveModel, sample_corpus_dir: str, tmp_path
+    ) -> None:
+        """Test that worker processes give the same matrix."""
+        serial = embed_documents(model, sample_corpus_dir, str(tmp_path / "serial"))
+        parallel = embed_documents(
+            model,
+            sample_corpus_dir,
+            str(tmp_path / "parallel"),
+            num_workers=2,
+            chunk_size=1,
+        )
+
+        np.testing.assert_array_equal(parallel.vectors, serial.vectors)
+        assert list(parallel.index) == list(serial.index)
+
+    @pytest.mark.parametrize("weighting", ["mean", "tfidf"])
+    def test_duplicate_member(
+        self, model: GloveModel, temp_dir: str, weighting: str
+    ) -> None:
+        """Test that a repeated id is embedded once and rows stay aligned."""
+        archive_path = os.path.join(temp_dir, "data.tar")
+        members = [
+            ("scotus/a.json", "The court held."),
+            ("scotus/b.json", "A second opinion."),
+            ("scotus/a.json", "Legal legal legal."),
+            ("scotus/c.json", "The first opinion."),
+        ]
+        with tarfile.open(archive_path, "w") as archive:
+            for name, text in members:
+                data = json.dumps(
+                    {"html_with_citations": f"<p>{text}</p>", "plain_text": text}
+                ).encode()
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
+        path = os.path.join(temp_dir, "test.docvecs")
+
+        documents = embed_documents(model, archive_path, path, weighting)
+
+        assert len(documents) == 3 and documents.vectors.shape == (3, 4)
+        assert [documents.doc_id(row) for row in range(3)] == [
+            "scotus/a",
+            "scotus/b",
+            "scotus/c",
+        ]
+        if weighting == "mean":
+            tokens = [tokens for _, tokens in read_documents(archive_path)]
+            # The first member named scotus/a is kept and c is not shifted
+            expected = document_vectors(model, [tokens[0], tokens[1], tokens[3]])
+            for row, doc_id in enumerate(["scotus/a", "scotus/b", "scotus/c"]):
+                np.testing.assert_allclose(
+                    documents.vector(doc_id), expected[row], rtol=1e-5
+                )
+
+    def test_empty_corpus_and_unknown_weighting(
+        self, model: GloveModel, temp_dir: str
+    ) -> None:
+        """Test an empty data directory and an unknown weighting."""
+        path = os.path.join(temp_dir, "empty.docvecs")
+        os.makedirs(os.path.join(temp_dir, "data"))
+
+        documents = embed_documents(model, os.path.join(temp_dir, "data"), path)
+
+        assert len(documents) == 0 and documents.vectors.shape == (0, 4)
+        with pytest.raises(ValueError, match="Unknown weighting"):
+            embed_documents(model, temp_dir, path, weighting="bm25")
+
+    def test_cli(self, model: GloveModel, sample_corpus_dir: str, tmp_path) -> None:
+        """Test that the command writes next to the model by default."""
+        model_file = str(tmp_path / "test.model")
+        model.save(model_file)
+
+        cli_main(
+            [
+                "embed",
+                "--model",
+                model_file,
+                "--data_dir",
+                sample_corpus_dir,
+                "--weighting",
+                "tfidf",
+            ]
+        )
+
+        documents = DocumentVectors.load(str(tmp_path / "test.docvecs"))
+        assert len(documents) == 2 and documents.weighting == "tfidf"
@@ -1,23 +1,28 @@
 """Tests for the example module."""
 
+import json
 import logging
+import os
 from unittest.mock import Mock, patch
 
 import numpy as np
 import pytest
 
 from leglove.example import find_nearest_neighbors, main
+from leglove.model import GloveModel
+from leglove.profiling import Profiler
+from leglove.vector_store import export_model
 
 
 class TestFindNearestNeighbors:
     """Tests for the find_nearest_neighbors function."""
 
-    @patch("leglove.example.Glove")
+    @patch("leglove.vector_store.GloveModel")
     @patch("leglove.example.pprint")
     def test_find_nearest_neighbors_basic(
         self,
         mock_pprint: Mock,
-        mock_glove_class: Mock,
+        mock_glove_model_class: Mock,
         caplog: pytest.LogCaptureFixture,
     ) -> None:
         """Test basic nearest neighbors functionality."""
@@ -30,12 +35,12 @@ class TestFindNearestNeighbors:
                 [0.6, 0.8],  # law
             ]
         )
-        mock_glove_class.load.return_value = mock_model
+        mock_glove_model_class.load.return_value = mock_model
 
         with caplog.at_level(logging.INFO):
             find_nearest_neighbors("test_model.model", "legal")
 
-        mock_glove_class.load.assert_called_once_with("test_model.model")
+        mock_glove_model_class.load.assert_called_once_with("test_model.model")
 
         assert "The 10 nearest neighbors of legal are..." in caplog.text
 
@@ -45,8 +50,10 @@ class TestFindNearestNeighbors:
         assert isinstance(pprint_arg, list)
         assert len(pprint_arg) <= 10  # Should be at most K neighbors
 
-    @patch("leglove.example.Glove")
-    def test_find_nearest_neighbors_distances(self, mock_glove_class: Mock) -> None:
+    @patch("leglove.vector_store.GloveModel")
+    def test_find_nearest_neighbors_distances(
+        self, mock_glove_model_class: Mock
+    ) -> None:
         """Test that distances are calculated correctly."""
         mock_model = Mock()
         mock_model.dictionary = {"word1": 0, "word2": 1, "word3": 2}
@@ -57,7 +64,7 @@ class TestFindNearestNeighbors:
                 [2.0, 0.0],  # word3
             ]
         )
-        mock_glove_class.load.return_value = mock_model
+        mock_glove_model_class.load.return_value = mock_model
 
         with patch("leglove.example.pprint") as mock_pprint:
             find_nearest_neighbors("test_model.model", "word1")
@@ -77,6 +84,60 @@ class TestFindNearestNeighbors:
             distances = [result[1] for result in results]
             assert distances == sorted(distances)
 
+    @patch("leglove.vector_store.GloveModel")
+    def test_find_nearest_neighbors_cosine(self, mock_glove_model_class: Mock) -> None:
+        """Test ranking neighbors by cosine distance."""
+        mock_model = Mock()
+        mock_model.dictionary = {"word1": 0, "word2": 1, "word3": 2}
+        mock_model.word_vectors = np.array([[1.0, 0.0], [0.0, 1.0], [5.0, 0.5]])
+        mock_glove_model_class.load.return_value = mock_model
+
+        with patch("leglove.example.pprint") as mock_pprint:
+            find_nearest_neighbors("test_model.model", "word1", metric="cosine")
+
+        results = mock_pprint.pprint.call_args[0][0]
+        assert [word for word, _ in results] == ["word1", "word3", "word2"]
+        assert results[0][1] == pytest.approx(0.0, abs=1e-6)
+        assert results[2][1] == pytest.approx(1.0)
+
+    def test_find_nearest_neighbors_quantized(self, temp_dir: str) -> None:
+        """Test that a quantized exported layout is searched on its codes."""
+        rng = np.random.default_rng(0)
+        model = GloveModel(no_components=4)
+        model.word_vectors = rng.normal(size=(50, 4)).astype(np.float32)
+        model.add_dictionary({f"word{index}": index for index in range(50)})
+        model_file = os.path.join(temp_dir, "test.model")
+        export_model(model, os.path.join(temp_dir, "test.vectors"), quantization="int8")
+
+        with patch("leglove.example.pprint") as mock_pprint:
+            find_nearest_neighbors(model_file, "word3", metric="cosine")
+        results = mock_pprint.pprint.call_args[0][0]
+        assert results[0][0] == "word3"
+        assert len(results) == 10
+
+    def test_find_nearest_neighbors_ann(self, temp_dir: str) -> None:
+        """Test that the ANN index is built next to the model and then reused."""
+        rng = np.random.default_rng(0)
+        model = GloveModel(no_components=4)
+        model.word_vectors = rng.normal(size=(50, 4)).astype(np.float32)
+        model.add_dictionary({f"word{index}": index for index in range(50)})
+        model_file = os.path.join(temp_dir, "test.model")
+        model.save(model_file)
+
+        with patch("leglove.example.pprint") as mock_pprint:
+            find_nearest_neighbors(model_file, "word3", ann=True, num_probes=100)
+        results = mock_pprint.pprint.call_args[0][0]
+        assert results[0] == ("word3", 0.0)
+        assert len(results) == 10
+        assert os.path.exists(os.path.join(temp_dir, "test.ivf.npz"))
+
+        with patch("leglove.example.pprint") as mock_pprint, patch(
+            "leglove.vector_store.GloveModel.load"
+        ) as mock_load:
+            find_nearest_neighbors(model_file, "word3", ann=True, num_probes=100)
+        mock_load.assert_not_called()
+        assert mock_pprint.pprint.call_args[0][0] == results
+
 
 class TestMain:
     """Tests for the main function."""
@@ -94,16 +155,60 @@ class TestMain:
         mock_args.model_name = "TestModel"
         mock_args.num_epochs = 15
         mock_args.parallel_threads = 4
+        mock_args.preprocess_workers = 8
+        mock_args.cache_dir = "/path/to/cache"
+        mock_args.cleanup_backend = "lxml"
+        mock_args.tokenizer = "legal"
+        mock_args.cooccurrence_memory_mb = 256.0
+        mock_args.cooccurrence_workers = 4
+        mock_args.min_count = 5
+        mock_args.max_vocab_size = 400000
+        mock_args.backend = "glove-python"
+        mock_args.batch_size = 1024
+        mock_args.quantization = "pq"
+        mock_args.profile = None
+        mock_args.prefetch = 16
+        mock_args.save_cooccurrence = True
+        mock_args.jurisdictions = ["circuits"]
+        mock_args.exclude_jurisdictions = ["cafc"]
+        mock_args.checkpoint_epochs = 2
+        mock_args.resume = True
         mock_args.query = "legal"
+        mock_args.metric = "cosine"
+        mock_args.ann = True
+        mock_args.num_probes = 4
         mock_parse_args.return_value = mock_args
 
         main()
 
         mock_train.assert_called_once_with(
-            "/path/to/data", model_name="TestModel", num_epochs=15, parallel_threads=4
+            "/path/to/data",
+            model_name="TestModel",
+            num_epochs=15,
+            parallel_threads=4,
+            num_workers=8,
+            cache_dir="/path/to/cache",
+            cleanup_backend="lxml",
+            tokenizer="legal",
+            cooccurrence_memory_mb=256.0,
+            cooccurrence_workers=4,
+            min_count=5,
+            max_vocab_size=400000,
+            backend="glove-python",
+            batch_size=1024,
+            quantization="pq",
+            profiler=None,
+            prefetch=16,
+            save_cooccurrence=True,
+            jurisdictions=["circuits"],
+            exclude_jurisdictions=["cafc"],
+            checkpoint_epochs=2,
+            resume=True,
         )
 
-        mock_find_neighbors.assert_called_once_with("TestModel.model", "legal")
+        mock_find_neighbors.assert_called_once_with(
+            "TestModel.model", "legal", metric="cosine", ann=True, num_probes=4
+        )
 
     @patch("leglove.example.parse_arguments")
     @patch("leglove.example.train_and_save_model")
@@ -116,13 +221,22 @@ class TestMain:
         mock_args.train_dir = None
         mock_args.load_model = "ExistingModel.model"
         mock_args.query = "court"
+        mock_args.metric = "euclidean"
+        mock_args.ann = False
+        mock_args.num_probes = 8
         mock_parse_args.return_value = mock_args
 
         main()
 
         mock_train.assert_not_called()
 
-        mock_find_neighbors.assert_called_once_with("ExistingModel.model", "court")
+        mock_find_neighbors.assert_called_once_with(
+            "ExistingModel.model",
+            "court",
+            metric="euclidean",
+            ann=False,
+            num_probes=8,
+        )
 
     @patch("leglove.example.parse_arguments")
     def test_main_no_input_error(self, mock_parse_args: Mock) -> None:
@@ -151,13 +265,99 @@ class TestMain:
         mock_args.model_name = "LeGlove"  # Default value
         mock_args.num_epochs = 10  # Default value
         mock_args.parallel_threads = 1  # Default value
+        mock_args.preprocess_workers = 1  # Default value
+        mock_args.cache_dir = None  # Default value
+        mock_args.cleanup_backend = "html5lib"  # Default value
+        mock_args.tokenizer = "nltk"  # Default value
+        mock_args.cooccurrence_memory_mb = 1024  # Default value
+        mock_args.cooccurrence_workers = 1  # Default value
+        mock_args.min_count = 1  # Default value
+        mock_args.max_vocab_size = None  # Default value
+        mock_args.backend = "numpy"  # Default value
+        mock_args.batch_size = 4096  # Default value
+        mock_args.quantization = None  # Default value
+        mock_args.profile = None  # Default value
+        mock_args.prefetch = 0  # Default value
+        mock_args.save_cooccurrence = False  # Default value
+        mock_args.jurisdictions = None  # Default value
+        mock_args.exclude_jurisdictions = None  # Default value
+        mock_args.checkpoint_epochs = 0  # Default value
+        mock_args.resume = False  # Default value
         mock_args.query = "legal"
+        mock_args.metric = "euclidean"  # Default value
+        mock_args.ann = False  # Default value
+        mock_args.num_probes = 8  # Default value
         mock_parse_args.return_value = mock_args
 
         main()
 
         mock_train.assert_called_once_with(
-            "/path/to/data", model_name="LeGlove", num_epochs=10, parallel_threads=1
+            "/path/to/data",
+            model_name="LeGlove",
+            num_epochs=10,
+            parallel_threads=1,
+            num_workers=1,
+            cache_dir=None,
+            cleanup_backend="html5lib",
+            tokenizer="nltk",
+            cooccurrence_memory_mb=1024,
+            cooccurrence_workers=1,
+            min_count=1,
+            max_vocab_size=None,
+            backend="numpy",
+            batch_size=4096,
+            quantization=None,
+            profiler=None,
+            prefetch=0,
+            save_cooccurrence=False,
+            jurisdictions=None,
+            exclude_jurisdictions=None,
+            checkpoint_epochs=0,
+            resume=False,
+        )
+
+        mock_find_neighbors.assert_called_once_with(
+            "LeGlove.model",
+            "legal",
+            metric="euclidean",
+            ann=False,
+            num_probes=8,
         )
 
-        mock_find_neighbors.assert_called_once_with("LeGlove.model", "legal")
+    @patch("leglove.example.parse_arguments")
+    @patch("leglove.example.train_and_save_model")
+    @patch("leglove.example.find_nearest_neighbors")
+    def test_main_profile(
+        self,
+        mock_find_neighbors: Mock,
+        mock_train: Mock,
+        mock_parse_args: Mock,
+        temp_dir: str,
+    ) -> None:
+        """Test that --profile passes a profiler to training and saves its report."""
+        report_path = os.path.join(temp_dir, "profile.json")
+        mock_args = Mock()
+        mock_args.train_dir = "/path/to/data"
+        mock_args.load_model = None
+        mock_args.model_name = "LeGlove"
+        mock_args.profile = report_path
+        mock_args.prefetch = 0
+        mock_args.save_cooccurrence = False
+        mock_args.jurisdictions = None
+        mock_args.exclude_jurisdictions = None
+        mock_args.checkpoint_epochs = 0
+        mock_args.resume = False
+        mock_parse_args.return_value = mock_args
+
+        def train(*args, profiler: Profiler, **kwargs) -> None:
+            with profiler.stage("cooccurrence"):
+                pass
+
+        mock_train.side_effect = train
+
+        main()
+
+        with open(report_path) as file:
+            report = json.load(file)
+        assert set(report["stages"]) == {"cooccurrence"}
+        assert isinstance(mock_train.call_args[1]["profiler"], Profiler)
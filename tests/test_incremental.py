@@ -0,0 +1,328 @@
+"""Tests for the incremental and cooccurrence_store modules."""
+
+import json
+import os
+import shutil
+from typing import Dict, Tuple
+
+import numpy as np
+import pytest
+
+from leglove.cli import main as cli_main
+from leglove.cooccurrence import CooccurrenceMatrix, build_cooccurrence_matrix
+from leglove.cooccurrence_store import (
+    CooccurrenceStore,
+    cooccurrence_store_path,
+    relative_name,
+    write_store,
+)
+from leglove.incremental import neighbor_drift, update_model
+from leglove.model import GloveModel
+from leglove.train import CONTEXT_WINDOW, read_corpus, train_and_save_model
+from leglove.vector_store import MappedModel
+from leglove.vocab import build_vocabulary
+
+NEW_OPINIONS = [
+    "<p>A third opinion about appeals and legal remedies.</p>",
+    "<p>The fourth opinion concerns court fees.</p>",
+]
+
+
+def write_opinion(path: str, html: str) -> None:
+    """Write an opinion JSON file with the given HTML."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        json.dump(
+            {
+                "html_with_citations": html,
+                "html_lawbox": None,
+                "html": None,
+                "html_columbia": None,
+                "plain_text": "",
+            },
+            file,
+        )
+
+
+def word_counts(matrix: CooccurrenceMatrix) -> Dict[Tuple[str, str], int]:
+    """Return the counts of a matrix keyed by word pairs, independent of ids."""
+    words = {index: word for word, index in matrix.dictionary.items()}
+    return {
+        tuple(sorted((words[row], words[col]))): count
+        for row, col, count in zip(
+            matrix.rows.tolist(), matrix.cols.tolist(), matrix.counts.tolist()
+        )
+    }
+
+
+@pytest.fixture
+def trained_model(sample_corpus_dir: str, temp_dir: str) -> str:
+    """Name of a model trained on the sample corpus with a co-occurrence store."""
+    model_name = os.path.join(temp_dir, "models", "TestModel")
+    os.makedirs(os.path.dirname(model_name))
+    train_and_save_model(
+        sample_corpus_dir,
+        model_name=model_name,
+        num_epochs=2,
+        tokenizer="legal",
+        save_cooccurrence=True,
+    )
+    return model_name
+
+
+class TestCooccurrenceStore:
+    """Tests for the cooccurrence_store module."""
+
+    def test_write_and_load(self, temp_dir: str) -> None:
+        """Test that a stored matrix is read back unchanged."""
+        matrix = build_cooccurrence_matrix(
+            [["the", "court", "held"], ["the", "law"]], window=2
+        )
+        path = os.path.join(temp_dir, "Test.cooccurrence")
+
+        write_store(
+            path,
+            matrix.dictionary,
+            ["scotus/b.json", "scotus/a.json"],
+            window=2,
+            scale=matrix.scale,
+            options={"tokenizer": "legal"},
+            matrix=matrix,
+        )
+
+        store = CooccurrenceStore.load(path)
+        assert store.window == 2
+        assert store.num_words == 4
+        assert store.nnz == matrix.nnz
+        assert store.header["options"] == {"tokenizer": "legal"}
+        assert store.dictionary() == matrix.dictionary
+        assert store.documents() == {"scotus/a.json", "scotus/b.json"}
+        loaded = store.matrix()
+        np.testing.assert_array_equal(loaded.rows, matrix.rows)
+        np.testing.assert_array_equal(loaded.cols, matrix.cols)
+        np.testing.assert_array_equal(loaded.counts, matrix.counts)
+        assert not os.path.exists(path + ".tmp")
+
+    def test_missing_store(self, temp_dir: str) -> None:
+        """Test that a missing store is reported."""
+        with pytest.raises(FileNotFoundError, match="save_cooccurrence"):
+            CooccurrenceStore.load(os.path.join(temp_dir, "Missing.cooccurrence"))
+
+    def test_paths(self) -> None:
+        """Test the store path of a model and relative opinion names."""
+        assert (
+            cooccurrence_store_path("dir/LeGlove.model") == "dir/LeGlove.cooccurrence"
+        )
+        assert relative_name("data/scotus/1.json", "data/") == "scotus/1.json"
+        assert relative_name("data.tar/scotus/1.json", "data.tar") == "scotus/1.json"
+        assert relative_name("other/1.json", "data") == "other/1.json"
+
+
+class TestUpdateModel:
+    """Tests for the update_model function."""
+
+    def test_train_saves_store(self, trained_model: str) -> None:
+        """Test that training with save_cooccurrence stores the counted opinions."""
+        store = CooccurrenceStore.load(
+            cooccurrence_store_path(trained_model + ".model")
+        )
+        model = GloveModel.load(trained_model + ".model")
+
+        assert store.documents() == {"scotus/opinion_0.json", "scotus/opinion_1.json"}
+        assert store.dictionary() == dict(model.dictionary)
+        assert store.header["options"]["tokenizer"] == "legal"
+
+    def test_update_matches_full_count(
+        self, sample_corpus_dir: str, trained_model: str
+    ) -> None:
+        """Test that updated counts equal counting every opinion from scratch."""
+        for index, html in enumerate(NEW_OPINIONS):
+            write_opinion(
+                os.path.join(sample_corpus_dir, "ca1", f"new_{index}.json"), html
+            )
+        model = GloveModel.load(trained_model + ".model")
+        assert model.word_vectors is not None
+        trained = {
+            word: model.word_vectors[index].copy()
+            for word, index in model.dictionary.items()
+        }
+
+        result = update_model(sample_corpus_dir, model_name=trained_model, num_epochs=1)
+
+        store = CooccurrenceStore.load(
+            cooccurrence_store_path(trained_model + ".model")
+        )
+        full = build_cooccurrence_matrix(
+            read_corpus(sample_corpus_dir, tokenizer="legal"), window=CONTEXT_WINDOW
+        )
+        assert word_counts(store.matrix()) == word_counts(full)
+        assert len(store.documents()) == 4
+        assert result.documents == 2
+        assert result.num_words == len(full.dictionary)
+        assert result.new_words == len(full.dictionary) - len(trained)
+        assert result.nnz == full.nnz
+
+        updated = GloveModel.load(trained_model + ".model")
+        assert updated.word_vectors is not None
+        assert updated.word_vectors.shape == (len(full.dictionary), 100)
+        assert "appeals" in updated.dictionary
+        assert len(updated.loss_history) == 3  # two trained, one warm-started
+        for word, index in model.dictionary.items():
+            assert updated.dictionary[word] == index
+        assert not all(
+            np.array_equal(updated.word_vectors[index], trained[word])
+            for word, index in model.dictionary.items()
+        )
+        assert len(MappedModel.load(trained_model + ".vectors")) == result.num_words
+
+    def test_update_skips_counted_opinions(
+        self, sample_corpus_dir: str, trained_model: str, temp_dir: str
+    ) -> None:
+        """Test that opinions already counted are skipped, wherever the corpus is."""
+        moved = os.path.join(temp_dir, "moved")
+        shutil.copytree(
+            sample_corpus_dir, moved, ignore=shutil.ignore_patterns("models")
+        )
+
+        result = update_model(moved + "/", model_name=trained_model)
+
+        assert result.documents == 0
+        model = GloveModel.load(trained_model + ".model")
+        assert len(model.loss_history) == 2
+
+    def test_update_min_count(self, sample_corpus_dir: str, trained_model: str) -> None:
+        """Test that rare new tokens are left out, and no later update is run."""
+        write_opinion(
+            os.path.join(sample_corpus_dir, "ca1", "new.json"),
+            "<p>Appeals appeals appeals and a remedy.</p>",
+        )
+
+        result = update_model(
+            sample_corpus_dir, model_name=trained_model, num_epochs=1, min_count=2
+        )
+
+        model = GloveModel.load(trained_model + ".model")
+        assert result.new_words == 1
+        assert "appeals" in model.dictionary
+        assert "remedy" not in model.dictionary
+        store_dir = cooccurrence_store_path(trained_model + ".model")
+        store = CooccurrenceStore.load(store_dir)
+        corpus = list(read_corpus(sample_corpus_dir, tokenizer="legal"))
+        full = build_cooccurrence_matrix(
+            corpus, window=CONTEXT_WINDOW, dictionary=store.dictionary()
+        )
+        assert word_counts(store.matrix()) == word_counts(full)
+        assert store.header["options"]["min_count"] == 2
+
+        # Once "remedy" is frequent enough, its pairs in the opinion counted
+        # above would be missing, so a second update is refused
+        write_opinion(
+            os.path.join(sample_corpus_dir, "ca1", "newer.json"),
+            "<p>A remedy, and another remedy.</p>",
+        )
+        corpus = list(read_corpus(sample_corpus_dir, tokenizer="legal"))
+        full = build_cooccurrence_matrix(corpus, window=CONTEXT_WINDOW)
+        stored = word_counts(store.matrix())
+        assert ("and", "remedy") in word_counts(full)
+        assert ("and", "remedy") not in stored
+        with pytest.raises(ValueError, match="pruned vocabulary"):
+            update_model(
+                sample_corpus_dir, model_name=trained_model, num_epochs=1, min_count=2
+            )
+
+        assert word_counts(CooccurrenceStore.load(store_dir).matrix()) == stored
+
+    def test_pruned_vocabulary(self, sample_corpus_dir: str, temp_dir: str) -> None:
+        """Test that a model trained on a pruned vocabulary is not updated."""
+        model_name = os.path.join(temp_dir, "models", "Pruned")
+        os.makedirs(os.path.dirname(model_name))
+        train_and_save_model(
+            sample_corpus_dir,
+            model_name=model_name,
+            num_epochs=1,
+            tokenizer="legal",
+            min_count=2,
+            save_cooccurrence=True,
+        )
+        store_dir = cooccurrence_store_path(model_name + ".model")
+        assert CooccurrenceStore.load(store_dir).header["options"]["min_count"] == 2
+        # The stored counts miss the pairs of the pruned words, so an update
+        # could not match a full recount once they occur often enough
+        write_opinion(
+            os.path.join(sample_corpus_dir, "ca1", "new.json"),
+            "<p>The first opinion concerns opinion appeals.</p>",
+        )
+        corpus = list(read_corpus(sample_corpus_dir, tokenizer="legal"))
+        full = build_cooccurrence_matrix(
+            corpus,
+            window=CONTEXT_WINDOW,
+            dictionary=build_vocabulary(corpus, min_count=2),
+        )
+        stored = word_counts(CooccurrenceStore.load(store_dir).matrix())
+        assert set(word_counts(full)) - set(stored)
+
+        with pytest.raises(ValueError, match="pruned vocabulary"):
+            update_model(sample_corpus_dir, model_name=model_name, num_epochs=1)
+
+        store = CooccurrenceStore.load(store_dir)
+        assert word_counts(store.matrix()) == stored
+        assert "ca1/new.json" not in store.documents()
+        assert len(GloveModel.load(model_name + ".model").loss_history) == 1
+
+    def test_cli(self, sample_corpus_dir: str, trained_model: str) -> None:
+        """Test the update subcommand, reporting drift against another model."""
+        write_opinion(
+            os.path.join(sample_corpus_dir, "ca1", "new.json"), NEW_OPINIONS[0]
+        )
+        shutil.copy(trained_model + ".model", trained_model + "Reference.model")
+
+        cli_main(
+            [
+                "update",
+                "--data_dir",
+                sample_corpus_dir,
+                "--model_name",
+                trained_model,
+                "--epochs",
+                "1",
+                "--reference_model",
+                trained_model + "Reference.model",
+            ]
+        )
+
+        store = CooccurrenceStore.load(
+            cooccurrence_store_path(trained_model + ".model")
+        )
+        assert "ca1/new.json" in store.documents()
+
+
+class TestNeighborDrift:
+    """Tests for the neighbor_drift function."""
+
+    @pytest.fixture
+    def model(self) -> GloveModel:
+        """A small trained model."""
+        corpus = [[f"word{(i * 7 + j) % 30}" for j in range(20)] for i in range(30)]
+        matrix = build_cooccurrence_matrix(corpus, window=3)
+        model = GloveModel(no_components=8, random_state=0)
+        model.fit(matrix, epochs=3)
+        model.add_dictionary(matrix.dictionary)
+        return model
+
+    def test_identical_models(self, model: GloveModel) -> None:
+        """Test that a model does not drift from itself."""
+        drift = neighbor_drift(model, model, k=5)
+
+        assert drift == {"words": 30, "k": 5, "mean_overlap": 1.0, "drift": 0.0}
+
+    def test_different_models(self, model: GloveModel) -> None:
+        """Test that a model with shuffled vectors drifts."""
+        assert model.word_vectors is not None
+        shuffled = GloveModel(no_components=8)
+        shuffled.word_vectors = np.random.default_rng(0).permutation(model.word_vectors)
+        shuffled.add_dictionary(model.dictionary)
+
+        drift = neighbor_drift(model, shuffled, k=5, words=["word0", "word1"])
+
+        assert drift["words"] == 2
+        assert 0.0 < drift["drift"] <= 1.0
@@ -0,0 +1,231 @@
+"""Tests for the jurisdictions module and jurisdiction filtering of sources."""
+
+import io
+import json
+import os
+import tarfile
+import zipfile
+from typing import Dict
+
+import pytest
+
+from leglove.cooccurrence_store import CooccurrenceStore, cooccurrence_store_path
+from leglove.incremental import update_model
+from leglove.jurisdictions import (
+    JURISDICTION_GROUPS,
+    JurisdictionFilter,
+    JurisdictionSource,
+    abbreviations,
+    filtered_source,
+    group_jurisdictions,
+    jurisdiction_filter,
+)
+from leglove.sources import corpus_source, jurisdiction_of
+from leglove.train import read_corpus, read_documents, train_and_save_model
+
+
+def opinion_json(text: str) -> bytes:
+    """Return the JSON of an opinion with the given text."""
+    return json.dumps(
+        {
+            "html_with_citations": f"<p>{text}</p>",
+            "html_lawbox": None,
+            "html": None,
+            "html_columbia": None,
+            "plain_text": text,
+        }
+    ).encode("utf-8")
+
+
+@pytest.fixture
+def opinions() -> Dict[str, bytes]:
+    """JSON of opinions of several jurisdictions by member name."""
+    texts = {
+        "scotus/a.json": "Supreme court opinion on certiorari.",
+        "ca1/b.json": "First circuit appeal of a judgment.",
+        "ca9/c.json": "Ninth circuit habeas petition.",
+        "cal/d.json": "California appellate opinion.",
+    }
+    return {name: opinion_json(text) for name, text in texts.items()}
+
+
+@pytest.fixture
+def corpora(temp_dir: str, opinions: Dict[str, bytes]) -> Dict[str, str]:
+    """The opinions as a directory, a tar archive and a zip archive."""
+    paths = {"directory": os.path.join(temp_dir, "data")}
+    for name, data in opinions.items():
+        path = os.path.join(paths["directory"], name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as file:
+            file.write(data)
+
+    paths["tar"] = os.path.join(temp_dir, "data.tar")
+    with tarfile.open(paths["tar"], "w") as archive:
+        for name, data in opinions.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+    paths["zip"] = os.path.join(temp_dir, "data.zip")
+    with zipfile.ZipFile(paths["zip"], "w") as archive:
+        for name, data in opinions.items():
+            archive.writestr(name, data)
+    return paths
+
+
+class TestJurisdictionFilter:
+    """Tests for selecting jurisdictions."""
+
+    def test_abbreviations(self) -> None:
+        """Test that the packaged abbreviations are read without blanks."""
+        known = abbreviations()
+        assert known[0] == "scotus"
+        assert len(known) == len(set(known))
+        assert all(name == name.strip() and name for name in known)
+
+    def test_groups(self) -> None:
+        """Test that groups are ranges of the abbreviations."""
+        circuits = group_jurisdictions("circuits")
+        assert circuits[0] == "ca1" and circuits[-1] == "cafc"
+        assert {"ca9", "cadc"} <= set(circuits)
+        assert "cal" not in circuits
+        assert set(group_jurisdictions("district")) <= set(
+            group_jurisdictions("federal")
+        )
+        assert not set(group_jurisdictions("state")) & set(
+            group_jurisdictions("federal")
+        )
+        for group in JURISDICTION_GROUPS:
+            assert group_jurisdictions(group)
+        with pytest.raises(ValueError, match="Unknown jurisdiction group"):
+            group_jurisdictions("tribal")
+
+    def test_include_and_exclude(self) -> None:
+        """Test abbreviations, groups and patterns, with exclusions winning."""
+        selected = JurisdictionFilter(["circuits", "scotus"], exclude=["cafc"])
+        assert selected("ca9") and selected("scotus")
+        assert not selected("cafc")
+        assert not selected("cal")
+
+        patterns = JurisdictionFilter(["ca?"], exclude=["ca1"])
+        assert patterns("ca9") and patterns("cal")
+        assert not patterns("ca1") and not patterns("ca10")
+
+        everything = JurisdictionFilter(exclude=["state"])
+        assert everything("scotus") and everything("unlisted")
+        assert not everything("cal")
+
+    def test_unknown_entries(self) -> None:
+        """Test that typos are reported rather than selecting nothing."""
+        with pytest.raises(ValueError, match="Unknown jurisdiction 'ca99'"):
+            JurisdictionFilter(["ca99"])
+        with pytest.raises(ValueError, match="Unknown jurisdiction"):
+            JurisdictionFilter(exclude=["circuit"])
+        with pytest.raises(TypeError, match="list of jurisdictions"):
+            JurisdictionFilter("ca9")
+
+    def test_jurisdiction_filter(self) -> None:
+        """Test that no filter is built when everything is read."""
+        assert jurisdiction_filter() is None
+        assert jurisdiction_filter(exclude=[]) is None
+        assert isinstance(jurisdiction_filter(["ca9"]), JurisdictionFilter)
+        assert isinstance(jurisdiction_filter(exclude=["ca9"]), JurisdictionFilter)
+
+    def test_jurisdiction_of(self) -> None:
+        """Test that the jurisdiction is the directory holding an opinion."""
+        assert jurisdiction_of("data/ca9/1.json") == "ca9"
+        assert jurisdiction_of("data.zip/scotus/2.json") == "scotus"
+        assert jurisdiction_of("3.json") == ""
+
+
+class TestFilteredSources:
+    """Tests for reading the selected jurisdictions of a corpus."""
+
+    @pytest.mark.parametrize("kind", ["directory", "tar", "zip"])
+    def test_sources_skip_jurisdictions(
+        self, corpora: Dict[str, str], kind: str
+    ) -> None:
+        """Test that sources only yield opinions of selected jurisdictions."""
+        selected = JurisdictionFilter(["circuits"], exclude=["ca1"])
+        records = list(corpus_source(corpora[kind], selected).records())
+
+        assert [os.path.relpath(record.name, corpora[kind]) for record in records] == [
+            os.path.join("ca9", "c.json") if kind == "directory" else "ca9/c.json"
+        ]
+
+    def test_json_lines_cannot_be_filtered(self, temp_dir: str) -> None:
+        """Test that JSON lines files, without jurisdictions, reject a filter."""
+        path = os.path.join(temp_dir, "data.jsonl")
+        with open(path, "wb") as file:
+            file.write(opinion_json("An opinion.") + b"\n")
+
+        with pytest.raises(ValueError, match="jurisdiction"):
+            corpus_source(path, JurisdictionFilter(["ca9"]))
+
+    def test_source_objects(self, corpora: Dict[str, str]) -> None:
+        """Test that other source objects are filtered record by record."""
+        source = corpus_source(corpora["zip"])
+        assert filtered_source(source) is source
+
+        filtered = filtered_source(source, JurisdictionFilter(["scotus"]))
+        assert isinstance(filtered, JurisdictionSource)
+        assert [record.name for record in filtered.records()] == [
+            f"{corpora['zip']}/scotus/a.json"
+        ]
+
+    def test_read_corpus(self, corpora: Dict[str, str]) -> None:
+        """Test reading the selected jurisdictions with leglove.train."""
+        documents = list(
+            read_corpus(corpora["directory"], jurisdictions=["ca9", "scotus"])
+        )
+        assert len(documents) == 2
+        assert "certiorari" in documents[0] + documents[1]
+
+        names = [
+            os.path.relpath(name, corpora["tar"])
+            for name, _ in read_documents(
+                corpora["tar"], exclude_jurisdictions=["circuits"]
+            )
+        ]
+        assert sorted(names) == ["cal/d.json", "scotus/a.json"]
+
+    def test_training_records_jurisdictions(
+        self, corpora: Dict[str, str], temp_dir: str
+    ) -> None:
+        """Test that updates only read the jurisdictions a model was trained on."""
+        data_dir = corpora["directory"]
+        model_name = os.path.join(temp_dir, "Circuits")
+        train_and_save_model(
+            data_dir,
+            model_name=model_name,
+            num_epochs=1,
+            save_cooccurrence=True,
+            jurisdictions=["circuits"],
+        )
+        store_path = cooccurrence_store_path(model_name + ".model")
+        store = CooccurrenceStore.load(store_path)
+        assert store.header["options"]["jurisdictions"] == ["circuits"]
+        assert store.documents() == {"ca1/b.json", "ca9/c.json"}
+
+        for name in ["ca2/e.json", "ny/f.json"]:
+            path = os.path.join(data_dir, name)
+            os.makedirs(os.path.dirname(path))
+            with open(path, "wb") as file:
+                file.write(opinion_json("A new opinion."))
+
+        result = update_model(data_dir, model_name=model_name, num_epochs=1)
+
+        assert result.documents == 1
+        assert "ca2/e.json" in CooccurrenceStore.load(store_path).documents()
+
+    def test_unknown_jurisdiction_fails_early(
+        self, corpora: Dict[str, str], temp_dir: str
+    ) -> None:
+        """Test that training rejects an unknown jurisdiction before reading."""
+        with pytest.raises(ValueError, match="Unknown jurisdiction"):
+            train_and_save_model(
+                corpora["directory"],
+                model_name=os.path.join(temp_dir, "Typo"),
+                jurisdictions=["circuts"],
+            )
+        assert not os.path.exists(os.path.join(temp_dir, "Typo.model"))
@@ -0,0 +1,229 @@
+"""Tests for the model module."""
+
+import os
+import pickle
+import random
+
+import numpy as np
+import pytest
+
+from leglove.cooccurrence import CooccurrenceMatrix, build_cooccurrence_matrix
+from leglove.model import GloveModel, glove_loss
+
+
+@pytest.fixture
+def cooccurrence_matrix() -> CooccurrenceMatrix:
+    """Co-occurrence matrix of a small random corpus."""
+    rng = random.Random(0)
+    words = [f"word{index}" for index in range(40)]
+    corpus = [[rng.choice(words) for _ in range(30)] for _ in range(50)]
+    return build_cooccurrence_matrix(corpus, window=5)
+
+
+class TestGloveModel:
+    """Tests for the GloveModel class."""
+
+    def test_fit_reduces_loss(self, cooccurrence_matrix: CooccurrenceMatrix) -> None:
+        """Test that training decreases the GloVe objective."""
+        model = GloveModel(no_components=10, batch_size=64, random_state=0)
+        model._initialize(cooccurrence_matrix.shape[0], np.random.default_rng(0))
+        assert model.word_vectors is not None and model.word_biases is not None
+        initial_loss = glove_loss(
+            model.word_vectors, model.word_biases, cooccurrence_matrix
+        )
+
+        model.fit(cooccurrence_matrix, epochs=20)
+
+        assert model.word_vectors.dtype == np.float32
+        assert len(model.loss_history) == 20
+        assert model.loss_history[-1] < model.loss_history[0]
+        final_loss = glove_loss(
+            model.word_vectors, model.word_biases, cooccurrence_matrix
+        )
+        assert final_loss < initial_loss / 2
+
+    def test_warm_start_matches_single_fit(
+        self, cooccurrence_matrix: CooccurrenceMatrix
+    ) -> None:
+        """Test that warm-started epochs continue exactly where training stopped."""
+        single = GloveModel(no_components=10, random_state=1)
+        single.fit(cooccurrence_matrix, epochs=4)
+
+        split = GloveModel(no_components=10, random_state=1)
+        split.fit(cooccurrence_matrix, epochs=1)
+        split.fit(cooccurrence_matrix, epochs=3, warm_start=True)
+
+        np.testing.assert_array_equal(split.word_vectors, single.word_vectors)
+        np.testing.assert_array_equal(split.word_biases, single.word_biases)
+        assert split.loss_history == single.loss_history
+
+    @pytest.mark.parametrize("no_threads", [1, 2])
+    def test_fit_callback(
+        self, cooccurrence_matrix: CooccurrenceMatrix, no_threads: int
+    ) -> None:
+        """Test that the callback receives every epoch and its loss."""
+        model = GloveModel(no_components=10, random_state=0)
+        model.fit(cooccurrence_matrix, epochs=2)
+        calls = []
+
+        model.fit(
+            cooccurrence_matrix,
+            epochs=3,
+            no_threads=no_threads,
+            warm_start=True,
+            callback=lambda epoch, loss: calls.append((epoch, loss)),
+        )
+
+        assert calls == list(enumerate(model.loss_history))[2:]
+
+    def test_add_words(self, cooccurrence_matrix: CooccurrenceMatrix) -> None:
+        """Test that new words get fresh parameters and existing ones are kept."""
+        model = GloveModel(no_components=10, random_state=0)
+        model.fit(cooccurrence_matrix, epochs=2)
+        assert model.word_vectors is not None
+        trained = model.word_vectors.copy()
+
+        model.add_words(3)
+
+        assert model.word_vectors.shape == (43, 10)
+        np.testing.assert_array_equal(model.word_vectors[:40], trained)
+        assert np.abs(model.word_vectors[40:]).max() <= 0.5 / 10
+        np.testing.assert_array_equal(model.word_biases[40:], np.zeros(3))
+        np.testing.assert_array_equal(model.vectors_sum_gradients[40:], 1.0)
+        np.testing.assert_array_equal(model.biases_sum_gradients[40:], 1.0)
+        assert model.word_vectors.dtype == np.float32
+
+    def test_add_words_before_fit(self) -> None:
+        """Test that words cannot be added to an untrained model."""
+        with pytest.raises(ValueError, match="fit"):
+            GloveModel().add_words(1)
+
+    def test_batch_update(self) -> None:
+        """Test one minibatch step, including a word that appears twice."""
+        model = GloveModel(no_components=3, learning_rate=0.1, max_count=10.0)
+        model._initialize(3, np.random.default_rng(2))
+        assert model.word_vectors is not None and model.word_biases is not None
+        vectors = model.word_vectors.astype(np.float64)
+        biases = model.word_biases.astype(np.float64)
+
+        rows = np.array([0, 0], dtype=np.int32)
+        cols = np.array([1, 2], dtype=np.int32)
+        values = np.array([2.0, 20.0])
+        model._fit_batch(
+            rows,
+            cols,
+            np.log(values).astype(np.float32),
+            (np.minimum(1.0, values / 10.0) ** 0.75).astype(np.float32),
+        )
+
+        weighted = (np.minimum(1.0, values / 10.0) ** 0.75) * (
+            np.sum(vectors[rows] * vectors[cols], axis=1)
+            + biases[rows]
+            + biases[cols]
+            - np.log(values)
+        )
+        gradients = np.zeros_like(vectors)
+        np.add.at(gradients, rows, weighted[:, None] * vectors[cols])
+        np.add.at(gradients, cols, weighted[:, None] * vectors[rows])
+        bias_gradients = np.zeros_like(biases)
+        np.add.at(bias_gradients, rows, weighted)
+        np.add.at(bias_gradients, cols, weighted)
+
+        np.testing.assert_allclose(
+            model.word_vectors, vectors - 0.1 * gradients, rtol=1e-5
+        )
+        np.testing.assert_allclose(
+            model.word_biases, biases - 0.1 * bias_gradients, rtol=1e-5, atol=1e-7
+        )
+        assert model.vectors_sum_gradients is not None
+        np.testing.assert_allclose(
+            model.vectors_sum_gradients, 1.0 + gradients**2, rtol=1e-5
+        )
+
+    def test_hogwild_fit(self, cooccurrence_matrix: CooccurrenceMatrix) -> None:
+        """Test that training with several processes converges like one process."""
+        single = GloveModel(no_components=10, batch_size=64, random_state=5)
+        single.fit(cooccurrence_matrix, epochs=10)
+        hogwild = GloveModel(no_components=10, batch_size=64, random_state=5)
+        hogwild.fit(cooccurrence_matrix, epochs=5, no_threads=2)
+        hogwild.fit(cooccurrence_matrix, epochs=5, no_threads=2, warm_start=True)
+
+        assert len(hogwild.loss_history) == 10
+        assert hogwild.loss_history[-1] < hogwild.loss_history[0] / 2
+        assert hogwild.loss_history[-1] == pytest.approx(
+            single.loss_history[-1], rel=0.2
+        )
+        # Parameters are copied out of shared memory once training ends
+        for name in ["word_vectors", "vectors_sum_gradients"]:
+            array = getattr(hogwild, name)
+            assert isinstance(array, np.ndarray) and array.flags.owndata
+            assert array.dtype == np.float32
+        assert hogwild.vectors_sum_gradients is not None
+        assert (hogwild.vectors_sum_gradients > 1.0).any()
+
+    def test_fit_coo_matrix(self, cooccurrence_matrix: CooccurrenceMatrix) -> None:
+        """Test fitting a scipy.sparse.coo_matrix, as built by glove.Corpus."""
+        pytest.importorskip("scipy")
+        from_coo = GloveModel(no_components=5, random_state=3)
+        from_coo.fit(cooccurrence_matrix.to_coo(), epochs=2)
+        direct = GloveModel(no_components=5, random_state=3)
+        direct.fit(cooccurrence_matrix, epochs=2)
+
+        assert from_coo.word_vectors is not None and direct.word_vectors is not None
+        np.testing.assert_allclose(from_coo.word_vectors, direct.word_vectors)
+
+    def test_save_and_load(
+        self, cooccurrence_matrix: CooccurrenceMatrix, temp_dir: str
+    ) -> None:
+        """Test that models are saved in glove-python's pickle format."""
+        model = GloveModel(no_components=5, random_state=4)
+        model.fit(cooccurrence_matrix, epochs=1)
+        model.add_dictionary(cooccurrence_matrix.dictionary)
+        model_file = os.path.join(temp_dir, "test.model")
+
+        model.save(model_file)
+        loaded = GloveModel.load(model_file)
+
+        with open(model_file, "rb") as file:
+            state = pickle.load(file)
+        for attribute in ["word_vectors", "word_biases", "dictionary", "no_components"]:
+            assert attribute in state
+        assert loaded.dictionary == cooccurrence_matrix.dictionary
+        assert loaded.inverse_dictionary == {
+            index: word for word, index in cooccurrence_matrix.dictionary.items()
+        }
+        np.testing.assert_array_equal(loaded.word_vectors, model.word_vectors)
+
+    def test_add_dictionary_before_fit(self) -> None:
+        """Test that a dictionary can only be added to a fitted model."""
+        with pytest.raises(ValueError, match="Model must be fit"):
+            GloveModel().add_dictionary({"word": 0})
+
+    def test_invalid_arguments(self, cooccurrence_matrix: CooccurrenceMatrix) -> None:
+        """Test that invalid batch sizes, thread counts and matrices are rejected."""
+        with pytest.raises(ValueError, match="batch_size must be at least 1"):
+            GloveModel(batch_size=0)
+        model = GloveModel(no_components=5)
+        with pytest.raises(ValueError, match="no_threads must be at least 1"):
+            model.fit(cooccurrence_matrix, no_threads=0)
+        model.fit(cooccurrence_matrix, epochs=1)
+        smaller = build_cooccurrence_matrix([["a", "b"]])
+        with pytest.raises(ValueError, match="does not match the model size"):
+            model.fit(smaller, epochs=1, warm_start=True)
+
+    def test_loss_close_to_glove_python(
+        self, cooccurrence_matrix: CooccurrenceMatrix
+    ) -> None:
+        """Test that the loss curve tracks glove-python's on the same matrix."""
+        glove = pytest.importorskip("glove")
+        reference = glove.Glove(no_components=10, learning_rate=0.05, random_state=0)
+        reference.fit(cooccurrence_matrix.to_coo(), epochs=10, no_threads=1)
+        model = GloveModel(no_components=10, learning_rate=0.05, random_state=0)
+        model.fit(cooccurrence_matrix, epochs=10)
+        assert model.word_vectors is not None and model.word_biases is not None
+
+        reference_loss = glove_loss(
+            reference.word_vectors, reference.word_biases, cooccurrence_matrix
+        )
+        loss = glove_loss(model.word_vectors, model.word_biases, cooccurrence_matrix)
+        assert loss < 1.5 * reference_loss
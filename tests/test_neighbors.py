@@ -0,0 +1,111 @@
+"""Tests for the neighbors module."""
+
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+
+from leglove.neighbors import QUERY_BLOCK_SIZE, NearestNeighbors
+
+
+@pytest.fixture
+def word_vectors() -> np.ndarray:
+    """Random word vectors."""
+    return np.random.default_rng(0).normal(size=(300, 8))
+
+
+@pytest.fixture
+def dictionary() -> dict:
+    """Dictionary of the random word vectors."""
+    return {f"word{index}": index for index in range(300)}
+
+
+def _brute_force(word_vectors: np.ndarray, index: int, metric: str) -> np.ndarray:
+    """Return the distances from one vector to all vectors, computed directly."""
+    if metric == "euclidean":
+        return np.linalg.norm(word_vectors - word_vectors[index], axis=1)
+    unit = word_vectors / np.linalg.norm(word_vectors, axis=1, keepdims=True)
+    return 1.0 - unit @ unit[index]
+
+
+class TestNearestNeighbors:
+    """Tests for the NearestNeighbors class."""
+
+    @pytest.mark.parametrize("metric", ["euclidean", "cosine"])
+    def test_query_matches_brute_force(
+        self, word_vectors: np.ndarray, dictionary: dict, metric: str
+    ) -> None:
+        """Test that queries return the same neighbors as an exhaustive search."""
+        neighbors = NearestNeighbors(word_vectors, dictionary, metric=metric)
+
+        for index in [0, 17, 299]:
+            distances = _brute_force(word_vectors, index, metric)
+            expected = np.argsort(distances)[:10]
+
+            results = neighbors.query(f"word{index}", k=10)
+
+            assert [word for word, _ in results] == [f"word{i}" for i in expected]
+            np.testing.assert_allclose(
+                [distance for _, distance in results],
+                distances[expected],
+                rtol=1e-4,
+                atol=1e-5,
+            )
+            assert results[0][0] == f"word{index}"
+
+    def test_query_batch_matches_single_queries(
+        self, word_vectors: np.ndarray, dictionary: dict
+    ) -> None:
+        """Test that batched queries, spanning several blocks, match single ones."""
+        neighbors = NearestNeighbors(word_vectors, dictionary)
+        words = [f"word{index % 300}" for index in range(QUERY_BLOCK_SIZE + 5)]
+
+        results = neighbors.query_batch(words, k=5)
+
+        assert len(results) == len(words)
+        for word in [words[0], words[-1]]:
+            assert results[words.index(word)] == neighbors.query(word, k=5)
+
+    def test_k_larger_than_vocabulary(self) -> None:
+        """Test that all words are returned, sorted, when k exceeds the vocabulary."""
+        neighbors = NearestNeighbors(
+            np.array([[0.0, 0.0], [3.0, 4.0], [1.0, 0.0]]), {"a": 0, "b": 1, "c": 2}
+        )
+
+        results = neighbors.query("a", k=10)
+
+        assert results == [("a", 0.0), ("c", 1.0), ("b", 5.0)]
+
+    def test_dictionary_subset(self, word_vectors: np.ndarray) -> None:
+        """Test that vectors without a word in the dictionary are not returned."""
+        neighbors = NearestNeighbors(word_vectors, {"first": 0, "last": 299})
+
+        assert len(neighbors) == 2
+        assert "first" in neighbors and "word1" not in neighbors
+        assert [word for word, _ in neighbors.query("last", k=5)] == ["last", "first"]
+        np.testing.assert_allclose(
+            neighbors.vector("last"), word_vectors[299].astype(np.float32)
+        )
+
+    def test_from_model(self, word_vectors: np.ndarray, dictionary: dict) -> None:
+        """Test building the index from a model, which must be fit."""
+        model = Mock(word_vectors=word_vectors, dictionary=dictionary)
+        neighbors = NearestNeighbors.from_model(model, metric="cosine")
+        assert neighbors.metric == "cosine"
+        assert neighbors.vectors.dtype == np.float32
+        assert neighbors.vectors.flags.c_contiguous
+
+        with pytest.raises(ValueError, match="Model must be fit"):
+            NearestNeighbors.from_model(Mock(word_vectors=None, dictionary=None))
+
+    def test_invalid_arguments(
+        self, word_vectors: np.ndarray, dictionary: dict
+    ) -> None:
+        """Test that unknown metrics, words and k values are rejected."""
+        with pytest.raises(ValueError, match="Unknown metric"):
+            NearestNeighbors(word_vectors, dictionary, metric="manhattan")
+        neighbors = NearestNeighbors(word_vectors, dictionary)
+        with pytest.raises(KeyError, match="not in the vocabulary"):
+            neighbors.query("missing")
+        with pytest.raises(ValueError, match="k must be at least 1"):
+            neighbors.query("word0", k=0)
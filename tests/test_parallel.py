@@ -0,0 +1,107 @@
+"""Tests for the parallel module."""
+
+import os
+from typing import List
+
+import pytest
+
+from leglove.parallel import iter_chunks, parallel_map_chunks, tree_reduce
+
+
+def _square_chunk(chunk: List[int]) -> List[int]:
+    """Square every item of a chunk (module level so it can be pickled)."""
+    return [item * item for item in chunk]
+
+
+def _chunk_pid(chunk: List[int]) -> int:
+    """Return the id of the process that handled a chunk."""
+    return os.getpid()
+
+
+class TestIterChunks:
+    """Tests for the iter_chunks function."""
+
+    def test_iter_chunks_even(self) -> None:
+        """Test splitting items into equally sized chunks."""
+        assert list(iter_chunks(range(6), 3)) == [[0, 1, 2], [3, 4, 5]]
+
+    def test_iter_chunks_remainder(self) -> None:
+        """Test that the last chunk holds the remaining items."""
+        assert list(iter_chunks(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+    def test_iter_chunks_empty(self) -> None:
+        """Test chunking an empty iterable."""
+        assert list(iter_chunks([], 4)) == []
+
+    def test_iter_chunks_invalid_size(self) -> None:
+        """Test that a non-positive chunk size is rejected."""
+        with pytest.raises(ValueError, match="chunk_size must be at least 1"):
+            list(iter_chunks(range(3), 0))
+
+
+class TestParallelMapChunks:
+    """Tests for the parallel_map_chunks function."""
+
+    def test_ordered_results(self) -> None:
+        """Test that ordered mode preserves input order."""
+        results = parallel_map_chunks(
+            _square_chunk, range(100), num_workers=2, chunk_size=7
+        )
+        flattened = [item for chunk in results for item in chunk]
+        assert flattened == [item * item for item in range(100)]
+
+    def test_unordered_results(self) -> None:
+        """Test that unordered mode yields every result exactly once."""
+        results = parallel_map_chunks(
+            _square_chunk, range(100), num_workers=3, chunk_size=5, ordered=False
+        )
+        flattened = [item for chunk in results for item in chunk]
+        assert sorted(flattened) == [item * item for item in range(100)]
+
+    def test_runs_in_worker_processes(self) -> None:
+        """Test that chunks are processed outside the calling process."""
+        pids = set(parallel_map_chunks(_chunk_pid, range(10), num_workers=2))
+        assert os.getpid() not in pids
+
+    def test_lazy_consumption(self) -> None:
+        """Test that input is consumed lazily within the in-flight bound."""
+        consumed: List[int] = []
+
+        def items():
+            for item in range(1000):
+                consumed.append(item)
+                yield item
+
+        results = parallel_map_chunks(
+            _square_chunk, items(), num_workers=1, chunk_size=10, max_pending=2
+        )
+        next(results)
+        assert len(consumed) <= 30
+
+    def test_invalid_num_workers(self) -> None:
+        """Test that a non-positive worker count is rejected."""
+        with pytest.raises(ValueError, match="num_workers must be at least 1"):
+            list(parallel_map_chunks(_square_chunk, range(3), num_workers=0))
+
+
+def _concatenate(left: str, right: str) -> str:
+    """Concatenate two strings (module level so it can be pickled)."""
+    return left + right
+
+
+class TestTreeReduce:
+    """Tests for the tree_reduce function."""
+
+    def test_preserves_order(self) -> None:
+        """Test that items are combined in left-to-right order."""
+        items = [str(index) for index in range(7)]
+        assert tree_reduce(_concatenate, items, num_workers=2) == "0123456"
+
+    def test_single_item(self) -> None:
+        """Test that a single item is returned unchanged."""
+        assert tree_reduce(_concatenate, ["only"], num_workers=2) == "only"
+
+    def test_empty_items(self) -> None:
+        """Test that there must be something to reduce."""
+        with pytest.raises(ValueError, match="at least one item"):
+            tree_reduce(_concatenate, [], num_workers=2)
@@ -0,0 +1,120 @@
+"""Tests for the prefetch module."""
+
+import os
+import threading
+import time
+from typing import List
+from unittest.mock import patch
+
+import pytest
+
+from leglove.prefetch import PrefetchStats, prefetch_records
+from leglove.profiling import Profiler
+from leglove.sources import OpinionRecord
+
+
+@pytest.fixture
+def opinion_files(temp_dir: str) -> List[str]:
+    """Five small files with distinct contents."""
+    paths = []
+    for index in range(5):
+        path = os.path.join(temp_dir, f"opinion_{index}.json")
+        with open(path, "wb") as file:
+            file.write(b"x" * (index + 1))
+        paths.append(path)
+    return paths
+
+
+class TestPrefetchRecords:
+    """Tests for the prefetch_records function."""
+
+    @pytest.mark.parametrize("depth", [1, 2, 64])
+    def test_reads_in_order(self, opinion_files: List[str], depth: int) -> None:
+        """Test that records are yielded in order with their file contents."""
+        records = [OpinionRecord(path) for path in opinion_files]
+
+        result = list(prefetch_records(records, depth))
+
+        assert [record.name for record in result] == opinion_files
+        assert [record.data for record in result] == [
+            b"x" * (index + 1) for index in range(5)
+        ]
+        assert all(record.stamp is None for record in result)
+
+    def test_passes_through_records_with_data(self, opinion_files: List[str]) -> None:
+        """Test that records carrying data are not read again."""
+        records = [
+            OpinionRecord("archive.tar/a.json", b"{}", "stamp"),
+            OpinionRecord(opinion_files[0]),
+        ]
+
+        result = list(prefetch_records(records, 4))
+
+        assert result == [records[0], OpinionRecord(opinion_files[0], b"x")]
+
+    def test_bounded_in_flight(self, opinion_files: List[str]) -> None:
+        """Test that at most depth files are read ahead of the consumer."""
+        consumed = 0
+        in_flight = []
+        lock = threading.Lock()
+
+        def read(file_path: str) -> bytes:
+            with lock:
+                in_flight.append(opinion_files.index(file_path) - consumed)
+            return b""
+
+        with patch("leglove.prefetch.read_bytes", side_effect=read):
+            for _ in prefetch_records(
+                (OpinionRecord(path) for path in opinion_files), 2
+            ):
+                consumed += 1
+
+        assert len(in_flight) == 5
+        assert max(in_flight) <= 2
+
+    def test_overlaps_reads(self, opinion_files: List[str]) -> None:
+        """Test that slow reads run concurrently in several threads."""
+
+        def slow_read(file_path: str) -> bytes:
+            time.sleep(0.05)
+            return b""
+
+        stats = PrefetchStats()
+        with patch("leglove.prefetch.read_bytes", side_effect=slow_read):
+            start = time.perf_counter()
+            list(
+                prefetch_records(
+                    [OpinionRecord(path) for path in opinion_files], 5, stats=stats
+                )
+            )
+            elapsed = time.perf_counter() - start
+
+        assert stats.files == 5
+        assert stats.read_seconds >= 0.25
+        assert elapsed < stats.read_seconds
+
+    def test_stats_and_profiler(self, opinion_files: List[str]) -> None:
+        """Test that reads and waits are counted and profiled."""
+        profiler = Profiler()
+        stats = PrefetchStats()
+
+        list(
+            prefetch_records(
+                [OpinionRecord(path) for path in opinion_files],
+                2,
+                profiler=profiler,
+                stats=stats,
+            )
+        )
+
+        assert stats.files == 5
+        assert stats.num_bytes == 15
+        assert stats.wait_seconds <= stats.elapsed_seconds
+        assert list(profiler.stages) == ["file_read", "io_wait"]
+        assert profiler.stages["file_read"][1:] == [5, 15]
+        assert "Prefetched 5 files" in stats.summary()
+
+    def test_invalid_depth(self) -> None:
+        """Test that a depth below one is rejected."""
+        with pytest.raises(ValueError, match="depth"):
+            list(prefetch_records([], 0))
@@ -0,0 +1,157 @@
+"""Tests for the profiling module."""
+
+import io
+import json
+import os
+from typing import Iterator
+from unittest.mock import patch
+
+import pytest
+
+from leglove.profiling import Profiler, peak_rss_bytes, profile_stage, text_bytes
+
+
+@pytest.fixture
+def clock() -> Iterator[list]:
+    """A fake perf_counter, advanced by appending to the returned list."""
+    now = [0.0]
+    with patch("leglove.profiling.time.perf_counter", side_effect=lambda: now[-1]):
+        yield now
+
+
+class TestProfiler:
+    """Tests for the Profiler class."""
+
+    def test_nested_stages_are_exclusive(self, clock: list) -> None:
+        """Test that time in a nested stage is not counted for its parent."""
+        profiler = Profiler()
+        with profiler.stage("outer"):
+            clock.append(1.0)
+            with profiler.stage("inner", docs=1, num_bytes=10):
+                clock.append(4.0)
+            profiler.record("measured", 2.0)
+            clock.append(10.0)
+
+        assert profiler.stages == {
+            "inner": [3.0, 1, 10],
+            "measured": [2.0, 0, 0],
+            "outer": [5.0, 0, 0],
+        }
+
+    def test_stage_counts_set_in_body(self, clock: list) -> None:
+        """Test that counts set on the frame are recorded."""
+        profiler = Profiler()
+        for size in [3, 4]:
+            with profiler.stage("file_read", docs=1) as stage:
+                stage.num_bytes = size
+
+        assert profiler.stages["file_read"] == [0.0, 2, 7]
+
+    def test_iterate(self, clock: list) -> None:
+        """Test that producing each item is timed as a document of a stage."""
+        profiler = Profiler()
+
+        def produce() -> Iterator[bytes]:
+            for item in [b"ab", b"cde"]:
+                clock.append(clock[-1] + 1.0)
+                yield item
+
+        with profiler.stage("consumer"):
+            items = []
+            for item in profiler.iterate("producer", produce(), size=len):
+                clock.append(clock[-1] + 5.0)
+                items.append(item)
+
+        assert items == [b"ab", b"cde"]
+        assert profiler.stages["producer"] == [2.0, 2, 5]
+        assert profiler.stages["consumer"] == [10.0, 0, 0]
+
+    def test_merge(self) -> None:
+        """Test that stage totals of another profiler are added."""
+        profiler = Profiler()
+        profiler.record("clean_html", 1.0, docs=2, num_bytes=100)
+        worker = Profiler()
+        worker.record("clean_html", 0.5, docs=1, num_bytes=50)
+        worker.record("tokenization", 0.25, docs=1, num_bytes=40)
+
+        profiler.merge(worker.stages)
+
+        assert profiler.stages == {
+            "clean_html": [1.5, 3, 150],
+            "tokenization": [0.25, 1, 40],
+        }
+
+    def test_report_and_save(self, temp_dir: str) -> None:
+        """Test the JSON report of stage totals and throughput."""
+        profiler = Profiler()
+        profiler.record("clean_html", 2.0, docs=4, num_bytes=2**21)
+        profiler.record("empty", 0.0)
+        path = os.path.join(temp_dir, "profile.json")
+
+        profiler.save(path)
+
+        with open(path) as file:
+            report = json.load(file)
+        assert report["stages"]["clean_html"] == {
+            "seconds": 2.0,
+            "docs": 4,
+            "bytes": 2**21,
+            "docs_per_second": 2.0,
+            "mb_per_second": 1.0,
+        }
+        assert report["stages"]["empty"]["docs_per_second"] is None
+        assert report["wall_seconds"] >= 0
+        assert report["peak_rss_bytes"] == peak_rss_bytes()
+
+    def test_progress(self) -> None:
+        """Test that progress lines are written at most every interval."""
+        stream = io.StringIO()
+        profiler = Profiler(progress=True, stream=stream)
+
+        with patch("leglove.profiling.PROGRESS_INTERVAL", 0.0):
+            for _ in profiler.iterate("read_corpus", range(3)):
+                pass
+        profiler.record("read_corpus", 1.0)
+        profiler.close()
+
+        lines = stream.getvalue().splitlines()
+        assert len(lines) == 5
+        assert "3 docs" in lines[-1]
+
+    def test_no_progress_by_default(self) -> None:
+        """Test that nothing is written unless progress is enabled."""
+        stream = io.StringIO()
+        profiler = Profiler(stream=stream)
+
+        with patch("leglove.profiling.PROGRESS_INTERVAL", 0.0):
+            profiler.record("read_corpus", 1.0, docs=1)
+        profiler.close()
+
+        assert stream.getvalue() == ""
+
+
+class TestProfileStage:
+    """Tests for the profile_stage function."""
+
+    def test_without_profiler(self) -> None:
+        """Test that no profiler gives a context doing nothing."""
+        with profile_stage(None, "cooccurrence") as stage:
+            assert stage is None
+
+    def test_with_profiler(self) -> None:
+        """Test that a profiler times the stage."""
+        profiler = Profiler()
+        with profile_stage(profiler, "cooccurrence"):
+            pass
+
+        assert list(profiler.stages) == ["cooccurrence"]
+
+
+class TestTextBytes:
+    """Tests for the text_bytes function."""
+
+    def test_text_bytes(self) -> None:
+        """Test that text is measured in bytes of UTF-8, not in characters."""
+        assert text_bytes("court") == 5
+        assert text_bytes("§ 12") == 5
+        assert text_bytes("a\ud800") == 4
@@ -0,0 +1,231 @@
+"""Tests for the quantize module."""
+
+import os
+
+import numpy as np
+import pytest
+
+from leglove.model import GloveModel
+from leglove.neighbors import NearestNeighbors
+from leglove.quantize import (
+    ProductQuantizer,
+    QuantizedNeighbors,
+    ScalarQuantizer,
+    default_num_subspaces,
+    fit_quantizer,
+    load_quantizer,
+    quantization_report,
+    save_quantizer,
+)
+
+
+@pytest.fixture
+def word_vectors() -> np.ndarray:
+    """Clustered random word vectors."""
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(20, 8))
+    return centers[rng.integers(0, 20, 1000)] + 0.3 * rng.normal(size=(1000, 8))
+
+
+@pytest.fixture
+def dictionary() -> dict:
+    """Dictionary of the clustered word vectors."""
+    return {f"word{index}": index for index in range(1000)}
+
+
+class TestScalarQuantizer:
+    """Tests for the ScalarQuantizer class."""
+
+    def test_round_trip(self, word_vectors: np.ndarray) -> None:
+        """Test that decoding is within half a quantization step."""
+        quantizer = ScalarQuantizer.fit(word_vectors)
+        codes = quantizer.encode(word_vectors)
+
+        assert codes.dtype == np.int8 and codes.shape == word_vectors.shape
+        error = np.abs(quantizer.decode(codes) - word_vectors)
+        assert np.all(error <= quantizer.scale / 2 + 1e-5)
+
+    def test_constant_dimensions(self) -> None:
+        """Test that constant dimensions decode exactly."""
+        vectors = np.array([[1.0, 2.0], [1.0, 4.0]])
+        quantizer = ScalarQuantizer.fit(vectors)
+
+        np.testing.assert_allclose(quantizer.decode(quantizer.encode(vectors)), vectors)
+
+    def test_inner_products(self, word_vectors: np.ndarray) -> None:
+        """Test that inner products on codes match the decoded vectors."""
+        quantizer = ScalarQuantizer.fit(word_vectors)
+        codes = quantizer.encode(word_vectors)
+        queries = word_vectors[:5].astype(np.float32)
+
+        np.testing.assert_allclose(
+            quantizer.inner_products(queries, codes),
+            queries @ quantizer.decode(codes).T,
+            rtol=1e-4,
+            atol=1e-4,
+        )
+
+
+class TestProductQuantizer:
+    """Tests for the ProductQuantizer class."""
+
+    def test_round_trip(self, word_vectors: np.ndarray) -> None:
+        """Test that codes decode to their nearest centroids."""
+        quantizer = ProductQuantizer.fit(word_vectors, num_subspaces=2, random_state=0)
+        codes = quantizer.encode(word_vectors)
+
+        assert codes.dtype == np.uint8 and codes.shape == (1000, 2)
+        assert quantizer.codebooks.shape == (2, 256, 4)
+        decoded = quantizer.decode(codes)
+        assert decoded.shape == word_vectors.shape
+        # Each decoded subvector is its nearest centroid, so it is no
+        # farther than the first centroid
+        first = quantizer.decode(np.zeros_like(codes))
+        for begin in [0, 4]:
+            sub = slice(begin, begin + 4)
+            nearest = np.linalg.norm(decoded[:, sub] - word_vectors[:, sub], axis=1)
+            other = np.linalg.norm(first[:, sub] - word_vectors[:, sub], axis=1)
+            assert np.all(nearest <= other + 1e-5)
+
+    def test_inner_products(self, word_vectors: np.ndarray) -> None:
+        """Test that the distance tables give the decoded inner products."""
+        quantizer = ProductQuantizer.fit(word_vectors, random_state=0)
+        codes = quantizer.encode(word_vectors)
+        queries = word_vectors[:5].astype(np.float32)
+
+        np.testing.assert_allclose(
+            quantizer.inner_products(queries, codes),
+            queries @ quantizer.decode(codes).T,
+            rtol=1e-4,
+            atol=1e-4,
+        )
+
+    def test_small_vocabulary_and_invalid_subspaces(self) -> None:
+        """Test codebooks of fewer vectors than centroids, and bad splits."""
+        vectors = np.arange(12.0).reshape(3, 4)
+        quantizer = ProductQuantizer.fit(vectors, num_subspaces=2)
+
+        assert quantizer.codebooks.shape == (2, 3, 2)
+        np.testing.assert_allclose(quantizer.decode(quantizer.encode(vectors)), vectors)
+        with pytest.raises(ValueError, match="must divide"):
+            ProductQuantizer.fit(vectors, num_subspaces=3)
+
+    def test_default_num_subspaces(self) -> None:
+        """Test the default split into subvectors of at least 4 dimensions."""
+        assert default_num_subspaces(100) == 25
+        assert default_num_subspaces(50) == 10
+        assert default_num_subspaces(7) == 1
+        assert default_num_subspaces(3) == 1
+        # Prime dimensions are padded to subvectors of 4 dimensions
+        assert default_num_subspaces(101) == 26
+        assert default_num_subspaces(11) == 3
+
+    def test_padded_dimensions(self, word_vectors: np.ndarray, temp_dir: str) -> None:
+        """Test that vectors of a prime dimension are split into padded subspaces."""
+        vectors = np.hstack([word_vectors, word_vectors[:, :3]])
+        quantizer = ProductQuantizer.fit(vectors, random_state=0)
+        codes = quantizer.encode(vectors)
+
+        assert codes.shape == (1000, 3)
+        assert quantizer.codebooks.shape == (3, 256, 4)
+        assert quantizer.no_components == 11
+        decoded = quantizer.decode(codes)
+        assert decoded.shape == vectors.shape
+        assert np.mean(np.linalg.norm(decoded - vectors, axis=1)) < np.mean(
+            np.linalg.norm(vectors, axis=1)
+        )
+        queries = vectors[:5].astype(np.float32)
+        np.testing.assert_allclose(
+            quantizer.inner_products(queries, codes),
+            queries @ decoded.T,
+            rtol=1e-4,
+            atol=1e-4,
+        )
+
+        path = os.path.join(temp_dir, "quantizer.npz")
+        save_quantizer(quantizer, path)
+        loaded = load_quantizer(path)
+        assert loaded.no_components == 11
+        np.testing.assert_array_equal(loaded.decode(codes), decoded)
+
+
+class TestSaveQuantizer:
+    """Tests for save_quantizer and load_quantizer."""
+
+    @pytest.mark.parametrize("quantization", ["int8", "pq"])
+    def test_save_and_load(
+        self, word_vectors: np.ndarray, temp_dir: str, quantization: str
+    ) -> None:
+        """Test that a loaded quantizer decodes like the original."""
+        quantizer = fit_quantizer(word_vectors, quantization)
+        path = os.path.join(temp_dir, "quantizer.npz")
+
+        save_quantizer(quantizer, path)
+        loaded = load_quantizer(path)
+
+        codes = quantizer.encode(word_vectors)
+        assert type(loaded) is type(quantizer)
+        np.testing.assert_array_equal(loaded.decode(codes), quantizer.decode(codes))
+
+    def test_unknown_quantization(self, word_vectors: np.ndarray) -> None:
+        """Test that unknown quantizers are rejected."""
+        with pytest.raises(ValueError, match="Unknown quantization"):
+            fit_quantizer(word_vectors, "int4")
+
+
+class TestQuantizedNeighbors:
+    """Tests for the QuantizedNeighbors class."""
+
+    @pytest.mark.parametrize("metric", ["euclidean", "cosine"])
+    def test_matches_search_of_decoded_vectors(
+        self, word_vectors: np.ndarray, dictionary: dict, metric: str
+    ) -> None:
+        """Test that searching the codes equals exact search of decoded vectors."""
+        neighbors = QuantizedNeighbors.quantize(word_vectors, dictionary, metric)
+        decoded = NearestNeighbors(
+            neighbors.quantizer.decode(neighbors.codes), neighbors.dictionary, metric
+        )
+        words = [f"word{index}" for index in range(0, 1000, 101)]
+
+        queries = np.array([word_vectors[dictionary[word]] for word in words])
+        indices, distances = neighbors.search(queries, k=5)
+        expected_indices, expected_distances = decoded.search(queries, k=5)
+
+        np.testing.assert_array_equal(indices, expected_indices)
+        np.testing.assert_allclose(distances, expected_distances, atol=1e-3)
+
+    def test_pq_recall(self, word_vectors: np.ndarray, dictionary: dict) -> None:
+        """Test that the report measures memory and recall against exact search."""
+        neighbors = QuantizedNeighbors.quantize(
+            word_vectors, dictionary, quantization="pq", random_state=0
+        )
+
+        report = quantization_report(word_vectors, dictionary, neighbors, k=10)
+
+        assert report["num_words"] == 1000
+        assert report["full_precision_bytes"] == 1000 * 8 * 8
+        assert report["float32_bytes"] == 1000 * 8 * 4
+        assert report["quantized_bytes"] == neighbors.codes.nbytes + 2 * 256 * 4 * 4
+        assert report["compression"] > 1
+        assert 0.5 < report["recall@10"] <= 1.0
+        assert report["recall_loss"] == pytest.approx(1 - report["recall@10"])
+
+    def test_from_model_and_lookups(
+        self, word_vectors: np.ndarray, dictionary: dict
+    ) -> None:
+        """Test building from a model and looking up words."""
+        model = GloveModel(no_components=8)
+        model.word_vectors = word_vectors.astype(np.float32)
+        model.add_dictionary(dictionary)
+        neighbors = QuantizedNeighbors.from_model(model, "cosine")
+
+        assert len(neighbors) == 1000 and "word5" in neighbors
+        assert neighbors.no_components == 8
+        np.testing.assert_allclose(
+            neighbors.vector("word5"), word_vectors[5], atol=0.05
+        )
+        assert [word for word, _ in neighbors.query("word5", k=1)] == ["word5"]
+        with pytest.raises(KeyError, match="not in the vocabulary"):
+            neighbors.vector("missing")
+        with pytest.raises(ValueError, match="Model must be fit"):
+            QuantizedNeighbors.from_model(GloveModel())
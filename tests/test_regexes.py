@@ -5,6 +5,7 @@ import re
 import pytest
 
 from leglove.regexes import (
+    COMPILED_REGEXES,
     FEDERAL_COURT_REPORTERS,
     FOOTNOTE_REGEX,
     ID_CITATION_REGEX,
@@ -96,6 +97,20 @@ class TestJudicialOpinionCitationRegex:
         match = re.search(JUDICIAL_OPINION_CITATION_REGEX, text)
         assert match is not None
 
+    def test_citation_starts_at_first_digit(self) -> None:
+        """Test that the volume number is matched in full."""
+        text = "See 1234 U.S. 56"
+        match = re.search(JUDICIAL_OPINION_CITATION_REGEX, text)
+        assert match is not None
+        assert match.group(1) == "1234"
+
+    def test_citation_after_longer_number(self) -> None:
+        """Test that a volume is found after an unrelated number."""
+        text = "In 1999 and 12 F.2d 34"
+        match = re.search(JUDICIAL_OPINION_CITATION_REGEX, text)
+        assert match is not None
+        assert match.group() == "12 F.2d 34"
+
     def test_us_citation(self) -> None:
         """Test U.S. Supreme Court citation."""
         text = "123 U.S. 456"
@@ -153,3 +168,8 @@ class TestRegexesAndTokens:
             "STAR_PAGINATION",
         ]
         assert REGEX_TOKENS == expected_tokens
+
+    def test_compiled_regexes(self) -> None:
+        """Test that COMPILED_REGEXES mirror REGEXES case-insensitively."""
+        assert [regex.pattern for regex in COMPILED_REGEXES] == REGEXES
+        assert all(regex.flags & re.IGNORECASE for regex in COMPILED_REGEXES)
@@ -0,0 +1,232 @@
+"""Tests for the serve module."""
+
+import asyncio
+import json
+import os
+from typing import Any, Dict, Tuple
+from unittest.mock import Mock, patch
+
+import numpy as np
+import pytest
+
+from leglove.cli import main as cli_main
+from leglove.model import GloveModel
+from leglove.neighbors import NearestNeighbors
+from leglove.quantize import QuantizedNeighbors
+from leglove.serve import EmbeddingServer, LRUCache, ServerStats, main
+from leglove.vector_store import MappedModel, export_model
+
+
+@pytest.fixture
+def model() -> GloveModel:
+    """Model with random vectors for 50 words."""
+    model = GloveModel(no_components=4)
+    rng = np.random.default_rng(0)
+    model.word_vectors = rng.normal(size=(50, 4)).astype(np.float32)
+    model.add_dictionary({f"word{index}": index for index in range(50)})
+    return model
+
+
+async def _request(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    request: bytes,
+) -> Tuple[int, Dict[str, Any]]:
+    """Send one HTTP request on an open connection and read the response."""
+    writer.write(request)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    headers = dict(line.lower().split(": ", 1) for line in lines[1:] if line)
+    body = await reader.readexactly(int(headers["content-length"]))
+    return int(lines[0].split()[1]), json.loads(body)
+
+
+class TestLRUCache:
+    """Tests for the LRUCache class."""
+
+    def test_evicts_least_recently_used(self) -> None:
+        """Test that the least recently used entry is evicted first."""
+        cache = LRUCache(max_size=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert cache.get("a") == 1
+        cache.put("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1 and cache.get("c") == 3
+        assert len(cache) == 2
+        assert (cache.hits, cache.misses) == (3, 1)
+
+    def test_disabled(self) -> None:
+        """Test that a cache of size 0 keeps nothing."""
+        cache = LRUCache(max_size=0)
+        cache.put("a", 1)
+
+        assert cache.get("a") is None and len(cache) == 0
+
+
+class TestServerStats:
+    """Tests for the ServerStats class."""
+
+    def test_snapshot(self) -> None:
+        """Test the request, latency, batch and cache counters."""
+        stats = ServerStats()
+        stats.record_request("neighbors", 0.002, True)
+        stats.record_request("neighbors", 0.004, False)
+        stats.record_request("vector", 0.001, True)
+        stats.record_batch(2)
+
+        snapshot = stats.snapshot(LRUCache())
+
+        assert snapshot["requests"] == 3
+        assert snapshot["requests_by_endpoint"] == {"neighbors": 2, "vector": 1}
+        assert snapshot["errors"] == 1
+        assert snapshot["latency_ms"]["p50"] == pytest.approx(2.0)
+        assert snapshot["latency_ms"]["max"] == pytest.approx(4.0)
+        assert snapshot["mean_batch_size"] == 2.0
+        assert snapshot["cache"]["hit_rate"] == 0.0
+        json.dumps(snapshot)
+
+
+class TestEmbeddingServer:
+    """Tests for the EmbeddingServer class."""
+
+    def test_http_endpoints(self, model: GloveModel) -> None:
+        """Test every endpoint over one keep-alive connection."""
+        server = EmbeddingServer(model, NearestNeighbors.from_model(model))
+        exact = NearestNeighbors.from_model(model)
+        word_vectors = model.word_vectors
+        assert word_vectors is not None
+
+        async def run() -> None:
+            port = await server.start("127.0.0.1", 0)
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+            status, payload = await _request(
+                reader, writer, b"GET /neighbors?word=word3&k=3 HTTP/1.1\r\n\r\n"
+            )
+            assert status == 200
+            assert [word for word, _ in payload["neighbors"]] == [
+                word for word, _ in exact.query("word3", k=3)
+            ]
+
+            status, payload = await _request(
+                reader, writer, b"GET /vector?word=word3 HTTP/1.1\r\n\r\n"
+            )
+            assert status == 200
+            np.testing.assert_allclose(payload["vector"], word_vectors[3])
+
+            body = b'{"positive": ["word1", "word2"], "negative": "word3", "k": 2}'
+            status, payload = await _request(
+                reader,
+                writer,
+                b"POST /analogy HTTP/1.1\r\nContent-Length: %d\r\n\r\n%s"
+                % (len(body), body),
+            )
+            assert status == 200
+            assert len(payload["neighbors"]) == 2
+            assert not {"word1", "word2", "word3"} & {
+                word for word, _ in payload["neighbors"]
+            }
+
+            for request, expected in [
+                (b"GET /neighbors?word=missing HTTP/1.1\r\n\r\n", 404),
+                (b"GET /neighbors?word=word1&k=0 HTTP/1.1\r\n\r\n", 400),
+                (b"GET /neighbors HTTP/1.1\r\n\r\n", 400),
+                (b"GET /unknown HTTP/1.1\r\n\r\n", 404),
+                (b"DELETE /vector HTTP/1.1\r\n\r\n", 405),
+                (b"POST /vector HTTP/1.1\r\nContent-Length: 3\r\n\r\n{x}", 400),
+            ]:
+                status, payload = await _request(reader, writer, request)
+                assert status == expected and "error" in payload
+
+            status, payload = await _request(
+                reader, writer, b"GET /stats HTTP/1.1\r\nConnection: close\r\n\r\n"
+            )
+            assert status == 200
+            # Requests with a bad method or body are answered before routing
+            assert payload["requests"] == 7 and payload["errors"] == 4
+            assert await reader.read() == b""
+            writer.close()
+            await server.stop()
+
+        asyncio.run(run())
+
+    @pytest.mark.parametrize("length", [b"ten", b"-1", b"999999999"])
+    def test_bad_content_length(self, model: GloveModel, length: bytes) -> None:
+        """Test that a bad Content-Length is answered and closes the connection."""
+        server = EmbeddingServer(model, NearestNeighbors.from_model(model))
+
+        async def run() -> None:
+            port = await server.start("127.0.0.1", 0)
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+            status, payload = await _request(
+                reader,
+                writer,
+                b"POST /vector HTTP/1.1\r\nContent-Length: %s\r\n\r\n" % length,
+            )
+            assert status == (413 if length.isdigit() else 400)
+            assert "error" in payload
+            assert await reader.read() == b""
+            writer.close()
+            await server.stop()
+
+        asyncio.run(run())
+
+    def test_batches_concurrent_queries_and_caches(self, model: GloveModel) -> None:
+        """Test that concurrent queries share searches and repeats hit the cache."""
+        server = EmbeddingServer(model, NearestNeighbors.from_model(model))
+        words = [f"word{index}" for index in range(40)]
+
+        async def run() -> None:
+            await server.start("127.0.0.1", 0)
+            results = await asyncio.gather(
+                *[server.handle("/neighbors", {"word": [word]}) for word in words]
+            )
+            assert all(status == 200 for status, _ in results)
+            assert server.stats.batched_queries == 40
+            assert server.stats.batches < 40
+
+            status, payload = await server.handle("/neighbors", {"word": ["word0"]})
+            assert status == 200 and payload == results[0][1]
+            assert server.cache.hits == 1
+            await server.stop()
+
+        asyncio.run(run())
+
+    def test_serves_quantized_exports(self, model: GloveModel, temp_dir: str) -> None:
+        """Test that the command line loads a quantized layout and serves it."""
+        export_model(model, os.path.join(temp_dir, "test.vectors"), quantization="int8")
+        model_file = os.path.join(temp_dir, "test.model")
+
+        with patch("leglove.serve.EmbeddingServer") as mock_server, patch(
+            "leglove.serve.asyncio.run"
+        ) as mock_run:
+            main(["--model", model_file, "--port", "0", "--cache_size", "5"])
+
+        loaded, neighbors, cache_size, _, _ = mock_server.call_args[0]
+        assert isinstance(loaded, MappedModel) and loaded.quantizer is not None
+        assert isinstance(neighbors, QuantizedNeighbors)
+        assert cache_size == 5
+        mock_server.return_value.serve_forever.assert_called_once_with("127.0.0.1", 0)
+        mock_run.assert_called_once()
+
+
+class TestCli:
+    """Tests for the leglove command."""
+
+    def test_dispatches_subcommands(self) -> None:
+        """Test that subcommands receive the remaining arguments."""
+        serve = Mock()
+        with patch.dict("leglove.cli.COMMANDS", {"serve": serve}):
+            cli_main(["serve", "--port", "9000"])
+        serve.assert_called_once_with(["--port", "9000"])
+
+    def test_unknown_subcommand(self) -> None:
+        """Test that unknown subcommands print the usage."""
+        with pytest.raises(SystemExit, match="usage: leglove"):
+            cli_main(["train"])
+        with pytest.raises(SystemExit, match="usage: leglove"):
+            cli_main([])
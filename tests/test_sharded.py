@@ -0,0 +1,233 @@
+"""Tests for the sharded module."""
+
+import json
+import os
+import random
+from typing import Dict, List, Tuple
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from leglove.cli import main as cli_main
+from leglove.cooccurrence import CooccurrenceMatrix, build_cooccurrence_matrix
+from leglove.model import GloveModel
+from leglove.sharded import (
+    JurisdictionCounter,
+    count_jurisdictions,
+    parse_model,
+    train_jurisdiction_models,
+)
+from leglove.vocab import build_vocabulary
+
+JURISDICTIONS = ["scotus", "ca1", "ca9", "cal"]
+
+
+def random_documents(num_docs: int, seed: int = 0) -> List[Tuple[str, List[str]]]:
+    """Return (jurisdiction, tokens) documents over a small vocabulary."""
+    rng = random.Random(seed)
+    words = [f"word{index}" for index in range(60)]
+    return [
+        (
+            rng.choice(JURISDICTIONS),
+            [rng.choice(words) for _ in range(rng.randint(0, 40))],
+        )
+        for _ in range(num_docs)
+    ]
+
+
+def expected_matrix(
+    documents: List[Tuple[str, List[str]]],
+    jurisdictions: List[str],
+    min_count: int = 1,
+    max_vocab_size=None,
+) -> CooccurrenceMatrix:
+    """Count the documents of some jurisdictions as train_and_save_model does."""
+    corpus = [
+        tokens for jurisdiction, tokens in documents if jurisdiction in jurisdictions
+    ]
+    dictionary = None
+    if min_count > 1 or max_vocab_size is not None:
+        dictionary = build_vocabulary(
+            corpus, min_count=min_count, max_vocab_size=max_vocab_size
+        )
+    return build_cooccurrence_matrix(corpus, window=3, dictionary=dictionary)
+
+
+def word_counts(matrix: CooccurrenceMatrix) -> Dict[Tuple[str, str], int]:
+    """Return the counts of a matrix keyed by word pairs, independent of ids."""
+    words = {index: word for word, index in matrix.dictionary.items()}
+    return {
+        tuple(sorted((words[row], words[col]))): count
+        for row, col, count in zip(
+            matrix.rows.tolist(), matrix.cols.tolist(), matrix.counts.tolist()
+        )
+    }
+
+
+class TestCountJurisdictions:
+    """Tests for counting the partial matrices of jurisdictions."""
+
+    @pytest.mark.parametrize(
+        "jurisdictions", [["ca1"], ["ca1", "ca9"], ["scotus", "ca9", "cal"]]
+    )
+    def test_matches_single_model(self, temp_dir: str, jurisdictions) -> None:
+        """Test that summed partials equal counting the jurisdictions alone."""
+        documents = random_documents(200)
+        partials = count_jurisdictions(iter(documents), temp_dir, window=3)
+        assert partials.jurisdictions == sorted(JURISDICTIONS)
+
+        matrix = partials.matrix(jurisdictions)
+        expected = expected_matrix(documents, jurisdictions)
+        assert set(matrix.dictionary) == set(expected.dictionary)
+        assert word_counts(matrix) == word_counts(expected)
+
+        # With a pruned vocabulary, ids are assigned the same way too
+        matrix = partials.matrix(jurisdictions, min_count=30, max_vocab_size=40)
+        expected = expected_matrix(documents, jurisdictions, 30, 40)
+        assert matrix.dictionary == expected.dictionary
+        assert np.array_equal(matrix.rows, expected.rows)
+        assert np.array_equal(matrix.cols, expected.cols)
+        assert np.array_equal(matrix.counts, expected.counts)
+
+    def test_parallel_matches_single_process(self, temp_dir: str) -> None:
+        """Test that workers, spilling to disk, count the same partials."""
+        documents = random_documents(300, seed=1)
+        single_dir = os.path.join(temp_dir, "single")
+        parallel_dir = os.path.join(temp_dir, "parallel")
+        os.makedirs(single_dir)
+        os.makedirs(parallel_dir)
+
+        single = count_jurisdictions(iter(documents), single_dir, window=3)
+        with patch("leglove.sharded.CHUNK_TOKENS", 100):
+            parallel = count_jurisdictions(
+                iter(documents),
+                parallel_dir,
+                window=3,
+                memory_limit_mb=0.01,
+                num_workers=3,
+            )
+
+        assert parallel.jurisdictions == single.jurisdictions
+        for jurisdictions in [["ca9"], JURISDICTIONS]:
+            assert word_counts(parallel.matrix(jurisdictions)) == word_counts(
+                single.matrix(jurisdictions)
+            )
+        assert sorted(os.listdir(parallel_dir)) == sorted(os.listdir(single_dir))
+
+    def test_shared_memory_budget(self, temp_dir: str) -> None:
+        """Test that jurisdictions are spilled to disk to stay within budget."""
+        counter = JurisdictionCounter(
+            window=2, memory_limit_mb=0.001, spill_dir=temp_dir
+        )
+        rng = np.random.default_rng(0)
+        for index in range(50):
+            counter.add_ids(JURISDICTIONS[index % 2], rng.integers(0, 100, 30))
+
+        assert all(builder.num_spills > 0 for builder in counter.builders.values())
+        assert counter.save(temp_dir) == JURISDICTIONS[:2]
+        assert os.path.exists(os.path.join(temp_dir, "scotus.pairs_keys.bin"))
+
+    def test_unknown_jurisdiction(self, temp_dir: str) -> None:
+        """Test that summing a jurisdiction that was not counted fails."""
+        partials = count_jurisdictions(iter(random_documents(10)), temp_dir, window=3)
+        with pytest.raises(ValueError, match="No opinions were counted"):
+            partials.matrix(["ny"])
+        with pytest.raises(ValueError, match="at least one jurisdiction"):
+            partials.matrix([])
+
+    def test_window_too_long(self, temp_dir: str) -> None:
+        """Test that windows whose counts could overflow are rejected."""
+        with pytest.raises(ValueError, match="window must be at most"):
+            count_jurisdictions(iter(random_documents(10)), temp_dir, window=43)
+
+
+@pytest.fixture
+def corpus_dir(temp_dir: str) -> str:
+    """A corpus with a few opinions in several jurisdictions."""
+    data_dir = os.path.join(temp_dir, "data")
+    texts = {
+        "scotus/a.json": "The supreme court granted certiorari on appeal.",
+        "ca1/b.json": "The court of appeals affirmed the judgment below.",
+        "ca9/c.json": "The court of appeals reversed the habeas petition.",
+        "cal/d.json": "The state court affirmed the judgment on appeal.",
+    }
+    for name, text in texts.items():
+        path = os.path.join(data_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            json.dump(
+                {
+                    "html_with_citations": f"<p>{text}</p>",
+                    "html_lawbox": None,
+                    "html": None,
+                    "html_columbia": None,
+                    "plain_text": text,
+                },
+                file,
+            )
+    return data_dir
+
+
+class TestTrainJurisdictionModels:
+    """Tests for training several models in one pass."""
+
+    def test_trains_each_model(self, corpus_dir: str, temp_dir: str) -> None:
+        """Test that each model is trained on the words of its jurisdictions."""
+        circuits = os.path.join(temp_dir, "Circuits")
+        everything = os.path.join(temp_dir, "Federal")
+
+        result = train_jurisdiction_models(
+            corpus_dir,
+            {circuits: ["circuits"], everything: ["federal"]},
+            num_epochs=1,
+            exclude_jurisdictions=["ca1"],
+        )
+
+        assert result == {circuits: ["ca9"], everything: ["ca9", "scotus"]}
+        model = GloveModel.load(circuits + ".model")
+        assert "habeas" in model.dictionary
+        assert "certiorari" not in model.dictionary
+        assert "below" not in model.dictionary
+        assert "certiorari" in GloveModel.load(everything + ".model").dictionary
+        assert os.path.isdir(everything + ".vectors")
+
+    def test_model_without_opinions(self, corpus_dir: str, temp_dir: str) -> None:
+        """Test that a model whose jurisdictions have no opinions is an error."""
+        with pytest.raises(ValueError, match="No opinions of the jurisdictions"):
+            train_jurisdiction_models(
+                corpus_dir,
+                {os.path.join(temp_dir, "Bankruptcy"): ["bankruptcy"]},
+                num_epochs=1,
+            )
+        with pytest.raises(ValueError, match="Unknown jurisdiction"):
+            train_jurisdiction_models(
+                corpus_dir, {os.path.join(temp_dir, "Typo"): ["circuts"]}
+            )
+
+    def test_parse_model(self) -> None:
+        """Test parsing model arguments of the command line."""
+        assert parse_model("LeGlove-ca=ca1, ca9") == ("LeGlove-ca", ["ca1", "ca9"])
+        for spec in ["LeGlove", "=ca1", "LeGlove="]:
+            with pytest.raises(Exception, match="Expected NAME=JURISDICTION"):
+                parse_model(spec)
+
+    def test_cli(self, corpus_dir: str, temp_dir: str) -> None:
+        """Test the sharded subcommand."""
+        model_name = os.path.join(temp_dir, "Appeals")
+
+        cli_main(
+            [
+                "sharded",
+                "--data_dir",
+                corpus_dir,
+                "--model",
+                f"{model_name}=ca1,ca9",
+                "--num_epochs",
+                "1",
+            ]
+        )
+
+        model = GloveModel.load(model_name + ".model")
+        assert "reversed" in model.dictionary
+        assert "state" not in model.dictionary
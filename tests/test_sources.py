@@ -0,0 +1,155 @@
+"""Tests for the sources module."""
+
+import gzip
+import io
+import json
+import os
+import tarfile
+import zipfile
+from typing import Dict
+from unittest.mock import patch
+
+import pytest
+
+from leglove.sources import (
+    DirectorySource,
+    JsonLinesSource,
+    TarSource,
+    ZipSource,
+    corpus_source,
+)
+from leglove.train import read_corpus, read_documents
+
+
+@pytest.fixture
+def opinions() -> Dict[str, bytes]:
+    """JSON of a few opinions by member name."""
+    texts = ["First opinion about legal matters.", "Second opinion on procedure."]
+    return {
+        f"scotus/opinion_{index}.json": json.dumps(
+            {
+                "html_with_citations": f"<p>{text}</p>",
+                "html_lawbox": None,
+                "html": None,
+                "html_columbia": None,
+                "plain_text": text,
+            }
+        ).encode("utf-8")
+        for index, text in enumerate(texts)
+    }
+
+
+@pytest.fixture
+def archives(temp_dir: str, opinions: Dict[str, bytes]) -> Dict[str, str]:
+    """The opinions as a directory and as every supported archive."""
+    paths = {"directory": os.path.join(temp_dir, "data")}
+    for name, data in opinions.items():
+        os.makedirs(os.path.join(paths["directory"], "scotus"), exist_ok=True)
+        with open(os.path.join(paths["directory"], name), "wb") as file:
+            file.write(data)
+
+    extra = {"scotus/notes.txt": b"not an opinion", ".hidden/x.json": b"{}"}
+    for kind in ["tar", "tar.gz"]:
+        paths[kind] = os.path.join(temp_dir, f"data.{kind}")
+        with tarfile.open(paths[kind], "w:gz" if kind == "tar.gz" else "w") as archive:
+            for name, data in {**opinions, **extra}.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
+
+    paths["zip"] = os.path.join(temp_dir, "data.zip")
+    with zipfile.ZipFile(paths["zip"], "w") as archive:
+        for name, data in {**opinions, **extra}.items():
+            archive.writestr(name, data)
+
+    paths["jsonl.gz"] = os.path.join(temp_dir, "data.jsonl.gz")
+    with gzip.open(paths["jsonl.gz"], "wb") as file:
+        file.write(b"\n".join(opinions.values()) + b"\n\n")
+    return paths
+
+
+class TestCorpusSources:
+    """Tests for the corpus source classes."""
+
+    def test_corpus_source(self, archives: Dict[str, str]) -> None:
+        """Test that sources are chosen by path type and suffix."""
+        assert isinstance(corpus_source(archives["directory"]), DirectorySource)
+        assert isinstance(corpus_source(archives["tar"]), TarSource)
+        assert isinstance(corpus_source(archives["tar.gz"]), TarSource)
+        assert isinstance(corpus_source(archives["zip"]), ZipSource)
+        assert isinstance(corpus_source(archives["jsonl.gz"]), JsonLinesSource)
+        with pytest.raises(ValueError, match="Cannot read a corpus"):
+            corpus_source("data.rar")
+
+    @pytest.mark.parametrize("kind", ["tar", "tar.gz", "zip"])
+    def test_archive_records(
+        self, archives: Dict[str, str], opinions: Dict[str, bytes], kind: str
+    ) -> None:
+        """Test that archives yield the JSON members outside hidden directories."""
+        path = archives[kind]
+        records = list(corpus_source(path).records())
+
+        assert {record.name: record.data for record in records} == {
+            f"{path}/{name}": data for name, data in opinions.items()
+        }
+        assert len({record.stamp for record in records}) == 1
+        assert all(
+            record.data is None
+            for record in corpus_source(path).records(with_data=False)
+        )
+
+    def test_json_lines_records(
+        self, archives: Dict[str, str], opinions: Dict[str, bytes]
+    ) -> None:
+        """Test that lines are named by line number and blank lines skipped."""
+        path = archives["jsonl.gz"]
+        records = list(corpus_source(path).records())
+
+        assert [record.name for record in records] == [f"{path}/1", f"{path}/2"]
+        assert [record.data for record in records] == [
+            data + b"\n" for data in opinions.values()
+        ]
+
+
+class TestReadArchives:
+    """Tests for reading archives with leglove.train."""
+
+    @pytest.mark.parametrize("kind", ["tar", "tar.gz", "zip", "jsonl.gz"])
+    def test_matches_directory(self, archives: Dict[str, str], kind: str) -> None:
+        """Test that every source gives the documents of the directory."""
+        expected = sorted(read_corpus(archives["directory"]))
+
+        assert sorted(read_corpus(archives[kind])) == expected
+        assert (
+            sorted(read_corpus(archives[kind], num_workers=2, chunk_size=1)) == expected
+        )
+
+    def test_names_relative_to_archive(self, archives: Dict[str, str]) -> None:
+        """Test that member names extend the archive path."""
+        names = sorted(name for name, _ in read_documents(archives["zip"]))
+
+        assert [os.path.relpath(name, archives["zip"]) for name in names] == [
+            "scotus/opinion_0.json",
+            "scotus/opinion_1.json",
+        ]
+
+    def test_cache(self, archives: Dict[str, str], temp_dir: str) -> None:
+        """Test that cached archives are reprocessed only when they change."""
+        cache_dir = os.path.join(temp_dir, "cache")
+        path = archives["tar.gz"]
+        expected = list(read_corpus(path))
+
+        assert list(read_corpus(path, cache_dir=cache_dir)) == expected
+        with patch("leglove.train.extract_text_from_json") as mock_extract:
+            assert list(read_corpus(path, cache_dir=cache_dir)) == expected
+        mock_extract.assert_not_called()
+
+        os.utime(path, ns=(0, 123))
+        with patch(
+            "leglove.train.extract_text_from_json", return_value="Changed."
+        ) as mock_extract:
+            assert list(read_corpus(path, cache_dir=cache_dir)) == [
+                ["changed", "."],
+                ["changed", "."],
+            ]
+        assert mock_extract.call_count == 2
@@ -0,0 +1,114 @@
+"""Tests for the tokenizers module."""
+
+import pytest
+
+from leglove.tokenizers import (
+    DEFAULT_TOKENIZER,
+    TOKENIZERS,
+    get_tokenizer,
+    legal_word_tokenize,
+)
+
+
+class TestLegalWordTokenize:
+    """Tests for the legal_word_tokenize function."""
+
+    def test_placeholder_tokens_intact(self) -> None:
+        """Test that placeholder tokens are never split."""
+        text = "under law_citation and judicial_opinion_citation, see footnote."
+        result = legal_word_tokenize(text)
+
+        assert "law_citation" in result
+        assert "judicial_opinion_citation" in result
+        assert result[-2:] == ["footnote", "."]
+
+    def test_legal_abbreviations(self) -> None:
+        """Test that legal abbreviations keep their periods."""
+        result = legal_word_tokenize("the u.s. court in smith v. jones. id. at 5.")
+
+        assert result == [
+            "the",
+            "u.s.",
+            "court",
+            "in",
+            "smith",
+            "v.",
+            "jones",
+            ".",
+            "id.",
+            "at",
+            "5",
+            ".",
+        ]
+
+    def test_section_symbols(self) -> None:
+        """Test that section symbols are separate tokens."""
+        assert legal_word_tokenize("§ 12 and §§ 3-4") == ["§", "12", "and", "§§", "3-4"]
+
+    def test_clitics(self) -> None:
+        """Test that clitics are split as in the Penn Treebank."""
+        result = legal_word_tokenize("the defendant's claim isn't valid; we can't")
+
+        assert result == [
+            "the",
+            "defendant",
+            "'s",
+            "claim",
+            "is",
+            "n't",
+            "valid",
+            ";",
+            "we",
+            "ca",
+            "n't",
+        ]
+
+    def test_cannot(self) -> None:
+        """Test that 'cannot' is split as in the Penn Treebank."""
+        assert legal_word_tokenize("we cannot") == ["we", "can", "not"]
+
+    def test_quotes(self) -> None:
+        """Test that double quotes become Treebank opening and closing quotes."""
+        result = legal_word_tokenize('he said "no" (and "yes")')
+
+        assert result == [
+            "he",
+            "said",
+            "``",
+            "no",
+            "''",
+            "(",
+            "and",
+            "``",
+            "yes",
+            "''",
+            ")",
+        ]
+
+    def test_numbers(self) -> None:
+        """Test that numbers with separators are kept whole."""
+        assert legal_word_tokenize("1,000.50 at 12:30") == ["1,000.50", "at", "12:30"]
+
+    def test_punctuation(self) -> None:
+        """Test that punctuation, ellipses and dashes are split off."""
+        result = legal_word_tokenize("wait... what -- (really)?")
+
+        assert result == ["wait", "...", "what", "--", "(", "really", ")", "?"]
+
+    def test_empty_text(self) -> None:
+        """Test tokenizing empty text."""
+        assert legal_word_tokenize("") == []
+
+
+class TestGetTokenizer:
+    """Tests for the get_tokenizer function."""
+
+    def test_registered_tokenizers(self) -> None:
+        """Test that the registered tokenizers are available."""
+        assert get_tokenizer("legal") is legal_word_tokenize
+        assert DEFAULT_TOKENIZER in TOKENIZERS
+
+    def test_unknown_tokenizer(self) -> None:
+        """Test that an unknown tokenizer is rejected."""
+        with pytest.raises(ValueError, match="Unknown tokenizer"):
+            get_tokenizer("whitespace")
@@ -3,7 +3,19 @@
 import os
 from unittest.mock import Mock, patch
 
-from leglove.train import read_corpus, tokenize_text, train_and_save_model
+import numpy as np
+import pytest
+
+from leglove.cache import TokenCache
+from leglove.model import GloveModel
+from leglove.profiling import Profiler
+from leglove.train import (
+    read_corpus,
+    read_documents,
+    tokenize_text,
+    train_and_save_model,
+)
+from leglove.vector_store import MappedModel
 
 
 class TestTokenizeText:
@@ -48,6 +60,30 @@ class TestTokenizeText:
 
         assert all(token.islower() for token in result if token.isalpha())
 
+    def test_tokenize_legal_tokenizer(self) -> None:
+        """Test tokenizing with the rule-based legal tokenizer."""
+        text = "See Smith v. Jones, 123 F.3d 456 (2020); Id. at 5."
+        result = tokenize_text(text, tokenizer="legal")
+
+        assert result == [
+            "see",
+            "smith",
+            "v.",
+            "jones",
+            ",",
+            "judicial_opinion_citation",
+            ";",
+            "id.",
+            "at",
+            "5",
+            ".",
+        ]
+
+    def test_tokenize_unknown_tokenizer(self) -> None:
+        """Test that an unknown tokenizer is rejected."""
+        with pytest.raises(ValueError, match="Unknown tokenizer"):
+            tokenize_text("Text", tokenizer="whitespace")
+
 
 class TestReadCorpus:
     """Tests for the read_corpus function."""
@@ -100,25 +136,195 @@ class TestReadCorpus:
         result = list(read_corpus(temp_dir))
         assert result == []
 
+    def test_read_corpus_multiple_workers(self, sample_corpus_dir: str) -> None:
+        """Test that multi-process preprocessing matches serial preprocessing."""
+        serial = list(read_corpus(sample_corpus_dir))
+        parallel = list(read_corpus(sample_corpus_dir, num_workers=2, chunk_size=1))
+
+        assert parallel == serial
+
+    def test_read_documents_paths(self, sample_corpus_dir: str, temp_dir: str) -> None:
+        """Test that documents are yielded with the paths of their files."""
+        expected = list(read_corpus(sample_corpus_dir))
+        cache_dir = os.path.join(temp_dir, "cache")
+
+        for documents in [
+            list(read_documents(sample_corpus_dir)),
+            list(read_documents(sample_corpus_dir, num_workers=2, chunk_size=1)),
+            list(read_documents(sample_corpus_dir, cache_dir=cache_dir)),
+        ]:
+            assert [tokens for _, tokens in documents] == expected
+            assert sorted(os.path.basename(path) for path, _ in documents) == [
+                "opinion_0.json",
+                "opinion_1.json",
+            ]
+
+    @pytest.mark.parametrize("num_workers", [1, 2])
+    def test_read_corpus_profiler(
+        self, sample_corpus_dir: str, temp_dir: str, num_workers: int
+    ) -> None:
+        """Test that every preprocessing stage is profiled, also in workers."""
+        expected = list(read_corpus(sample_corpus_dir))
+        profiler = Profiler()
+
+        result = list(
+            read_corpus(
+                sample_corpus_dir,
+                num_workers=num_workers,
+                chunk_size=1,
+                cache_dir=os.path.join(temp_dir, "cache"),
+                profiler=profiler,
+            )
+        )
+
+        assert result == expected
+        stages = profiler.report()["stages"]
+        assert list(stages) == [
+            "source",
+            "file_read",
+            "json_parse",
+            "clean_html",
+            "regex_substitution",
+            "tokenization",
+            "read_corpus",
+        ]
+        assert stages["source"]["docs"] == 4  # listed, then read for preprocessing
+        assert all(stages[name]["docs"] == 2 for name in list(stages)[1:])
+        assert stages["file_read"]["bytes"] == sum(
+            os.path.getsize(os.path.join(sample_corpus_dir, "scotus", name))
+            for name in os.listdir(os.path.join(sample_corpus_dir, "scotus"))
+        )
+        assert stages["clean_html"]["bytes"] == sum(
+            len(html.encode("utf-8"))
+            for html in [
+                "<p>First opinion about legal matters.</p>",
+                "<p>Second opinion discussing court procedures.</p>",
+            ]
+        )
+
+    @pytest.mark.parametrize("num_workers", [1, 2])
+    def test_read_corpus_prefetch(
+        self, sample_corpus_dir: str, temp_dir: str, num_workers: int
+    ) -> None:
+        """Test that prefetching files yields the same documents."""
+        expected = list(read_corpus(sample_corpus_dir))
+        profiler = Profiler()
+
+        for cache_dir in [None, os.path.join(temp_dir, "cache")]:
+            result = list(
+                read_corpus(
+                    sample_corpus_dir,
+                    num_workers=num_workers,
+                    chunk_size=1,
+                    cache_dir=cache_dir,
+                    profiler=profiler,
+                    prefetch=4,
+                )
+            )
+            assert result == expected
+
+        stages = profiler.report()["stages"]
+        assert stages["file_read"]["docs"] == 4
+        assert stages["io_wait"]["docs"] == 0
+
+    def test_read_corpus_unordered(self, sample_corpus_dir: str) -> None:
+        """Test that unordered preprocessing yields the same documents."""
+        serial = list(read_corpus(sample_corpus_dir))
+        parallel = list(
+            read_corpus(sample_corpus_dir, num_workers=2, chunk_size=1, ordered=False)
+        )
+
+        assert sorted(parallel) == sorted(serial)
+
+    def test_read_corpus_cache(self, sample_corpus_dir: str, temp_dir: str) -> None:
+        """Test that cached reads match uncached reads."""
+        cache_dir = os.path.join(temp_dir, "cache")
+        uncached = list(read_corpus(sample_corpus_dir))
+
+        assert list(read_corpus(sample_corpus_dir, cache_dir=cache_dir)) == uncached
+        assert list(read_corpus(sample_corpus_dir, cache_dir=cache_dir)) == uncached
+
+    def test_read_corpus_cache_reads_shards_once(
+        self, sample_corpus_dir: str, temp_dir: str
+    ) -> None:
+        """Test that a warm cache loads each shard once, and not to check it."""
+        cache_dir = os.path.join(temp_dir, "cache")
+        list(read_corpus(sample_corpus_dir, cache_dir=cache_dir))
+
+        with patch.object(
+            TokenCache, "load_ids", autospec=True, side_effect=TokenCache.load_ids
+        ) as mock_load_ids:
+            assert len(list(read_corpus(sample_corpus_dir, cache_dir=cache_dir))) == 2
+        assert mock_load_ids.call_count == 2
+
+    def test_read_corpus_cache_skips_cleanup(
+        self, sample_corpus_dir: str, temp_dir: str
+    ) -> None:
+        """Test that a warm cache avoids reprocessing unchanged files."""
+        cache_dir = os.path.join(temp_dir, "cache")
+        expected = list(read_corpus(sample_corpus_dir, cache_dir=cache_dir))
+
+        with patch("leglove.train.extract_text") as mock_extract_text:
+            result = list(read_corpus(sample_corpus_dir, cache_dir=cache_dir))
+
+        mock_extract_text.assert_not_called()
+        assert result == expected
+
+    def test_read_corpus_cache_keyed_by_tokenizer(
+        self, sample_corpus_dir: str, temp_dir: str
+    ) -> None:
+        """Test that switching tokenizers does not reuse cached tokens."""
+        cache_dir = os.path.join(temp_dir, "cache")
+        list(read_corpus(sample_corpus_dir, cache_dir=cache_dir))
+
+        with patch(
+            "leglove.train.extract_text", return_value="Text."
+        ) as mock_extract_text:
+            list(read_corpus(sample_corpus_dir, cache_dir=cache_dir, tokenizer="legal"))
+
+        assert mock_extract_text.call_count == 2
+
+    def test_read_corpus_cache_reprocesses_changed_files(
+        self, sample_corpus_dir: str, temp_dir: str
+    ) -> None:
+        """Test that only modified files are preprocessed again."""
+        cache_dir = os.path.join(temp_dir, "cache")
+        list(read_corpus(sample_corpus_dir, cache_dir=cache_dir))
+
+        changed_path = os.path.join(sample_corpus_dir, "scotus", "opinion_0.json")
+        with open(changed_path, "w") as f:
+            f.write('{"html_with_citations": "<p>Changed opinion.</p>"}')
+        os.utime(changed_path, ns=(0, 123))
+
+        with patch(
+            "leglove.train.extract_text", return_value="Changed opinion."
+        ) as mock_extract_text:
+            result = list(read_corpus(sample_corpus_dir, cache_dir=cache_dir))
+
+        mock_extract_text.assert_called_once_with(changed_path, backend="html5lib")
+        assert ["changed", "opinion", "."] in result
+
 
 class TestTrainAndSaveModel:
     """Tests for the train_and_save_model function."""
 
+    @patch("leglove.train.export_model")
     @patch("leglove.train.Glove")
-    @patch("leglove.train.Corpus")
+    @patch("leglove.train.build_cooccurrence_matrix")
     @patch("leglove.train.read_corpus")
     def test_train_and_save_model_basic(
         self,
         mock_read_corpus: Mock,
-        mock_corpus_class: Mock,
+        mock_build_cooccurrence: Mock,
         mock_glove_class: Mock,
+        mock_export_model: Mock,
         temp_dir: str,
     ) -> None:
         """Test basic model training and saving."""
-        mock_corpus = Mock()
-        mock_corpus.matrix = "mock_matrix"
-        mock_corpus.dictionary = {"word": 0}
-        mock_corpus_class.return_value = mock_corpus
+        mock_cooccurrence = Mock()
+        mock_cooccurrence.to_coo.return_value = "mock_matrix"
+        mock_cooccurrence.dictionary = {"word": 0}
+        mock_build_cooccurrence.return_value = mock_cooccurrence
 
         mock_glove = Mock()
         mock_glove_class.return_value = mock_glove
@@ -126,11 +332,20 @@ class TestTrainAndSaveModel:
         mock_read_corpus.return_value = [["word1", "word2"], ["word3", "word4"]]
 
         train_and_save_model(
-            temp_dir, model_name="TestModel", num_epochs=5, parallel_threads=2
+            temp_dir,
+            model_name="TestModel",
+            num_epochs=5,
+            parallel_threads=2,
+            backend="glove-python",
         )
 
-        mock_corpus_class.assert_called_once()
-        mock_corpus.fit.assert_called_once()
+        mock_build_cooccurrence.assert_called_once_with(
+            mock_read_corpus.return_value,
+            window=10,
+            memory_limit_mb=1024,
+            num_workers=1,
+            dictionary=None,
+        )
 
         mock_glove_class.assert_called_once_with(no_components=100, learning_rate=0.05)
         mock_glove.fit.assert_called_once_with(
@@ -138,31 +353,152 @@ class TestTrainAndSaveModel:
         )
         mock_glove.add_dictionary.assert_called_once_with({"word": 0})
         mock_glove.save.assert_called_once_with("TestModel.model")
+        mock_export_model.assert_called_once_with(
+            mock_glove, "TestModel.vectors", quantization=None
+        )
 
-    @patch("leglove.train.Glove")
-    @patch("leglove.train.Corpus")
+    @patch("leglove.train.export_model")
+    @patch("leglove.train.GloveModel")
+    @patch("leglove.train.build_cooccurrence_matrix")
     @patch("leglove.train.read_corpus")
     def test_train_and_save_model_default_params(
         self,
         mock_read_corpus: Mock,
-        mock_corpus_class: Mock,
-        mock_glove_class: Mock,
+        mock_build_cooccurrence: Mock,
+        mock_glove_model_class: Mock,
+        mock_export_model: Mock,
         temp_dir: str,
     ) -> None:
-        """Test model training with default parameters."""
-        mock_corpus = Mock()
-        mock_corpus.matrix = "mock_matrix"
-        mock_corpus.dictionary = {"word": 0}
-        mock_corpus_class.return_value = mock_corpus
+        """Test that the built-in NumPy trainer is used by default."""
+        mock_cooccurrence = Mock()
+        mock_cooccurrence.dictionary = {"word": 0}
+        mock_build_cooccurrence.return_value = mock_cooccurrence
 
         mock_glove = Mock()
-        mock_glove_class.return_value = mock_glove
+        mock_glove_model_class.return_value = mock_glove
 
         mock_read_corpus.return_value = [["word1", "word2"]]
 
         train_and_save_model(temp_dir)
 
+        mock_glove_model_class.assert_called_once_with(
+            no_components=100, learning_rate=0.05, batch_size=4096
+        )
         mock_glove.fit.assert_called_once_with(
-            "mock_matrix", epochs=10, no_threads=1, verbose=True
+            mock_cooccurrence, epochs=10, no_threads=1, verbose=True
         )
+        mock_glove.add_dictionary.assert_called_once_with({"word": 0})
         mock_glove.save.assert_called_once_with("LeGlove.model")
+        mock_export_model.assert_called_once_with(
+            mock_glove, "LeGlove.vectors", quantization=None
+        )
+
+    def test_train_and_save_model_end_to_end(
+        self, sample_corpus_dir: str, temp_dir: str
+    ) -> None:
+        """Test training and saving a real model with the NumPy trainer."""
+        model_name = os.path.join(temp_dir, "TestModel")
+
+        train_and_save_model(sample_corpus_dir, model_name=model_name, num_epochs=2)
+
+        model = GloveModel.load(model_name + ".model")
+        assert model.dictionary is not None
+        assert "opinion" in model.dictionary
+        assert model.word_vectors is not None
+        assert model.word_vectors.shape == (len(model.dictionary), 100)
+
+        mapped = MappedModel.load(model_name + ".vectors")
+        assert len(mapped) == len(model.dictionary)
+        np.testing.assert_array_equal(
+            mapped.vector("opinion"), model.word_vectors[model.dictionary["opinion"]]
+        )
+
+    def test_train_and_save_model_lone_surrogates(self, temp_dir: str) -> None:
+        """Test exporting tokens with lone surrogates escaped in the JSON."""
+        os.makedirs(os.path.join(temp_dir, "scotus"))
+        with open(os.path.join(temp_dir, "scotus", "opinion.json"), "w") as file:
+            file.write(
+                '{"html_with_citations": "<p>The court held x\\ud800y here.</p>", '
+                '"html_lawbox": null, "html": null, "html_columbia": null, '
+                '"plain_text": null}'
+            )
+        model_name = os.path.join(temp_dir, "TestModel")
+
+        train_and_save_model(
+            temp_dir, model_name=model_name, num_epochs=1, tokenizer="legal"
+        )
+
+        model = GloveModel.load(model_name + ".model")
+        mapped = MappedModel.load(model_name + ".vectors")
+        assert "\ud800" in model.dictionary
+        np.testing.assert_array_equal(
+            mapped.vector("\ud800"), model.word_vectors[model.dictionary["\ud800"]]
+        )
+
+    def test_train_and_save_model_profiler(
+        self, sample_corpus_dir: str, temp_dir: str
+    ) -> None:
+        """Test that every stage of a training run is profiled."""
+        profiler = Profiler()
+
+        train_and_save_model(
+            sample_corpus_dir,
+            model_name=os.path.join(temp_dir, "TestModel"),
+            num_epochs=2,
+            min_count=2,
+            profiler=profiler,
+        )
+
+        stages = profiler.report()["stages"]
+        for name in [
+            "clean_html",
+            "read_corpus",
+            "vocabulary",
+            "cooccurrence",
+            "training",
+            "epoch_0",
+            "epoch_1",
+            "save",
+        ]:
+            assert name in stages
+        assert stages["read_corpus"]["docs"] == 4  # vocabulary and cooccurrence
+
+    def test_train_and_save_model_unknown_backend(self, temp_dir: str) -> None:
+        """Test that an unknown training backend is rejected."""
+        with pytest.raises(ValueError, match="Unknown training backend"):
+            train_and_save_model(temp_dir, backend="tensorflow")
+
+    @patch("leglove.train.Glove", None)
+    def test_train_and_save_model_missing_glove(self, temp_dir: str) -> None:
+        """Test that the glove-python backend requires glove-python."""
+        with pytest.raises(ImportError, match="glove-python is required"):
+            train_and_save_model(temp_dir, backend="glove-python")
+
+    @patch("leglove.train.export_model")
+    @patch("leglove.train.GloveModel")
+    @patch("leglove.train.build_cooccurrence_matrix")
+    def test_train_and_save_model_prunes_vocabulary(
+        self,
+        mock_build_cooccurrence: Mock,
+        mock_glove_model_class: Mock,
+        mock_export_model: Mock,
+        sample_corpus_dir: str,
+    ) -> None:
+        """Test that min_count prunes the vocabulary before counting pairs."""
+        documents = []
+
+        def build_cooccurrence_matrix(corpus, **kwargs):
+            documents.extend(corpus)
+            return Mock(dictionary=kwargs["dictionary"])
+
+        mock_build_cooccurrence.side_effect = build_cooccurrence_matrix
+
+        with patch(
+            "leglove.train.extract_text", return_value="The court. The law."
+        ) as mock_extract_text:
+            train_and_save_model(sample_corpus_dir, min_count=3, tokenizer="legal")
+
+        # Both passes read the corpus, but each opinion is only cleaned once
+        assert mock_extract_text.call_count == 2
+        assert len(documents) == 2
+        assert mock_build_cooccurrence.call_args[1]["dictionary"] == {".": 0, "the": 1}
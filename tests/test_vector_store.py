@@ -0,0 +1,191 @@
+"""Tests for the vector_store module."""
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+from leglove.model import GloveModel
+from leglove.quantize import ProductQuantizer, QuantizedNeighbors
+from leglove.vector_store import (
+    HEADER_FILE,
+    MappedModel,
+    export_model,
+    load_model,
+    store_path,
+)
+
+
+def _model(dictionary: dict, no_components: int = 3) -> GloveModel:
+    """Return a model with random vectors for the given dictionary."""
+    model = GloveModel(no_components=no_components)
+    rng = np.random.default_rng(0)
+    model.word_vectors = rng.normal(size=(len(dictionary), no_components)).astype(
+        np.float32
+    )
+    model.add_dictionary(dictionary)
+    return model
+
+
+class TestExportModel:
+    """Tests for export_model and MappedModel."""
+
+    def test_round_trip(self, temp_dir: str) -> None:
+        """Test that every word maps to its vector after export."""
+        dictionary = {"the": 0, "court": 1, "zoning": 2, "§": 3, "élan": 4, "a": 5}
+        model = _model(dictionary)
+        path = store_path(os.path.join(temp_dir, "LeGlove.model"))
+        assert path == os.path.join(temp_dir, "LeGlove.vectors")
+
+        export_model(model, path)
+        mapped = MappedModel.load(path)
+
+        assert isinstance(mapped.word_vectors, np.memmap)
+        assert len(mapped) == len(dictionary)
+        assert mapped.no_components == 3
+        assert model.word_vectors is not None
+        for word, index in dictionary.items():
+            assert word in mapped
+            assert mapped.word_id(word) == index
+            np.testing.assert_array_equal(
+                mapped.vector(word), model.word_vectors[index]
+            )
+        assert list(mapped.words()) == sorted(
+            dictionary, key=lambda word: word.encode("utf-8")
+        )
+        assert mapped.dictionary == dictionary
+
+    def test_missing_words(self, temp_dir: str) -> None:
+        """Test lookups of words before, between and after the stored ones."""
+        path = os.path.join(temp_dir, "model.vectors")
+        export_model(_model({"b": 0, "d": 1}), path)
+        mapped = MappedModel.load(path)
+
+        for word in ["a", "c", "e", "", "bb"]:
+            assert word not in mapped
+        with pytest.raises(KeyError, match="not in the vocabulary"):
+            mapped.vector("c")
+
+    def test_empty_model(self, temp_dir: str) -> None:
+        """Test exporting a model without words."""
+        path = os.path.join(temp_dir, "empty.vectors")
+        model = GloveModel(no_components=3)
+        model.word_vectors = np.zeros((0, 3), dtype=np.float32)
+        model.add_dictionary({})
+
+        export_model(model, path)
+        mapped = MappedModel.load(path)
+
+        assert len(mapped) == 0
+        assert "word" not in mapped
+        assert mapped.word_vectors is not None
+        assert mapped.word_vectors.shape == (0, 3)
+
+    def test_export_replaces_existing(self, temp_dir: str) -> None:
+        """Test that exporting again replaces the previous layout."""
+        path = os.path.join(temp_dir, "model.vectors")
+        export_model(_model({"old": 0, "words": 1}), path)
+        export_model(_model({"new": 0}), path)
+
+        mapped = MappedModel.load(path)
+        assert list(mapped.words()) == ["new"]
+        assert not os.path.exists(path + ".tmp")
+
+    def test_rejects_unfit_models_and_other_versions(self, temp_dir: str) -> None:
+        """Test that unfit models and unknown format versions are rejected."""
+        path = os.path.join(temp_dir, "model.vectors")
+        with pytest.raises(ValueError, match="Model must be fit"):
+            export_model(GloveModel(), path)
+
+        export_model(_model({"word": 0}), path)
+        header_path = os.path.join(path, HEADER_FILE)
+        with open(header_path) as file:
+            header = json.load(file)
+        header["version"] += 1
+        with open(header_path, "w") as file:
+            json.dump(header, file)
+        with pytest.raises(ValueError, match="format version"):
+            MappedModel.load(path)
+
+
+class TestQuantizedExport:
+    """Tests for exporting quantized vectors."""
+
+    @pytest.mark.parametrize("quantization", ["int8", "pq"])
+    def test_round_trip(self, temp_dir: str, quantization: str) -> None:
+        """Test that quantized vectors decode close to the originals."""
+        dictionary = {f"word{index}": index for index in range(300)}
+        model = _model(dictionary, no_components=8)
+        path = os.path.join(temp_dir, "model.vectors")
+
+        report = export_model(model, path, quantization=quantization)
+        mapped = MappedModel.load(path)
+
+        assert mapped.word_vectors is None and mapped.codes is not None
+        assert mapped.no_components == 8
+        assert mapped.codes.shape == (300, 8 if quantization == "int8" else 2)
+        assert model.word_vectors is not None
+        tolerance = 0.05 if quantization == "int8" else 1.5
+        np.testing.assert_allclose(
+            mapped.vector("word7"), model.word_vectors[7], atol=tolerance
+        )
+        assert report is not None
+        assert report["quantization"] == quantization
+        assert report["quantized_bytes"] < report["float32_bytes"]
+        assert 0.0 <= report["recall_loss"] <= 1.0
+        with open(os.path.join(path, HEADER_FILE)) as file:
+            assert json.load(file)["quantization_report"] == report
+
+        neighbors = QuantizedNeighbors.from_model(mapped)
+        assert neighbors.query("word7", k=1)[0][0] == "word7"
+
+    def test_quantizer_options(self, temp_dir: str) -> None:
+        """Test that keyword arguments are passed to the quantizer."""
+        path = os.path.join(temp_dir, "model.vectors")
+        export_model(
+            _model({"a": 0, "b": 1}, 4), path, quantization="pq", num_subspaces=4
+        )
+
+        mapped = MappedModel.load(path)
+        assert isinstance(mapped.quantizer, ProductQuantizer)
+        assert mapped.quantizer.num_subspaces == 4
+        assert export_model(_model({"a": 0}), path) is None
+
+    def test_reads_version_1(self, temp_dir: str) -> None:
+        """Test that layouts written before quantization are still read."""
+        path = os.path.join(temp_dir, "model.vectors")
+        export_model(_model({"word": 0}), path)
+        header_path = os.path.join(path, HEADER_FILE)
+        with open(header_path) as file:
+            header = json.load(file)
+        for key in ["quantization", "quantization_report"]:
+            del header[key]
+        header["version"] = 1
+        with open(header_path, "w") as file:
+            json.dump(header, file)
+
+        assert MappedModel.load(path).vector("word").shape == (3,)
+
+
+class TestLoadModel:
+    """Tests for the load_model function."""
+
+    def test_load_model_prefers_exported_layout(self, temp_dir: str) -> None:
+        """Test that an up-to-date exported layout is memory-mapped."""
+        model = GloveModel(no_components=2)
+        model.word_vectors = np.array([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32)
+        model.add_dictionary({"legal": 0, "court": 1})
+        model_file = os.path.join(temp_dir, "test.model")
+        model.save(model_file)
+        assert isinstance(load_model(model_file), GloveModel)
+
+        export_model(model, os.path.join(temp_dir, "test.vectors"))
+        mapped = load_model(model_file)
+        assert isinstance(mapped, MappedModel)
+        assert mapped.dictionary == {"legal": 0, "court": 1}
+
+        # A model saved after the export is loaded from the model file
+        newer = os.path.getmtime(model_file) + 10
+        os.utime(model_file, (newer, newer))
+        assert isinstance(load_model(model_file), GloveModel)
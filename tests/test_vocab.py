@@ -0,0 +1,191 @@
+"""Tests for the vocab module."""
+
+import os
+import pickle
+import random
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from leglove.cooccurrence import build_cooccurrence_matrix
+from leglove.vocab import (
+    CompactVocabulary,
+    VocabularyCounter,
+    build_vocabulary,
+    select_vocabulary,
+)
+
+
+class TestVocabularyCounter:
+    """Tests for the VocabularyCounter class."""
+
+    def test_counts_in_memory(self) -> None:
+        """Test counting tokens without spilling."""
+        counter = VocabularyCounter()
+        counter.update(["the", "court", "the"])
+        counter.update(["held"])
+
+        assert list(counter.items()) == [("court", 1), ("held", 1), ("the", 2)]
+
+    def test_spilled_counts_are_exact(self, temp_dir: str) -> None:
+        """Test that counts spilled to disk are merged exactly."""
+        rng = random.Random(0)
+        documents = [
+            [f"word{rng.randint(0, 500)}" for _ in range(50)] for _ in range(100)
+        ]
+        counter = VocabularyCounter(memory_limit_mb=0.01, spill_dir=temp_dir)
+        for tokens in documents:
+            counter.update(tokens)
+
+        expected = Counter(token for tokens in documents for token in tokens)
+        assert len(counter._runs) > 1
+        assert list(counter.items()) == sorted(expected.items())
+
+        counter.close()
+        assert os.listdir(temp_dir) == []
+
+
+class TestSelectVocabulary:
+    """Tests for the select_vocabulary function."""
+
+    COUNTS = [("appeal", 3), ("court", 5), ("xqz", 1), ("the", 9), ("writ", 3)]
+
+    def test_ids_by_frequency(self) -> None:
+        """Test that ids are assigned by decreasing count, ties by token."""
+        assert select_vocabulary(self.COUNTS) == {
+            "the": 0,
+            "court": 1,
+            "appeal": 2,
+            "writ": 3,
+            "xqz": 4,
+        }
+
+    def test_min_count(self) -> None:
+        """Test that tokens below min_count are dropped."""
+        assert select_vocabulary(self.COUNTS, min_count=3) == {
+            "the": 0,
+            "court": 1,
+            "appeal": 2,
+            "writ": 3,
+        }
+
+    def test_max_vocab_size(self) -> None:
+        """Test that only the most frequent tokens are kept."""
+        assert select_vocabulary(self.COUNTS, max_vocab_size=3) == {
+            "the": 0,
+            "court": 1,
+            "appeal": 2,
+        }
+
+    def test_invalid_arguments(self) -> None:
+        """Test that non-positive limits are rejected."""
+        with pytest.raises(ValueError, match="min_count must be at least 1"):
+            select_vocabulary(self.COUNTS, min_count=0)
+        with pytest.raises(ValueError, match="max_vocab_size must be at least 1"):
+            select_vocabulary(self.COUNTS, max_vocab_size=0)
+
+
+class TestBuildVocabulary:
+    """Tests for the build_vocabulary function."""
+
+    def test_build_vocabulary(self) -> None:
+        """Test building a pruned vocabulary from a corpus."""
+        corpus = [["the", "court", "the"], ["the", "court", "xqz"]]
+
+        assert build_vocabulary(corpus, min_count=2) == {"the": 0, "court": 1}
+
+    def test_empty_corpus(self) -> None:
+        """Test building the vocabulary of an empty corpus."""
+        assert build_vocabulary([]) == {}
+
+
+class TestCompactVocabulary:
+    """Tests for the CompactVocabulary class."""
+
+    DICTIONARY = {"the": 0, "court": 1, "zoning": 2, "§": 3, "élan": 4, "a": 5}
+
+    def test_lookups(self) -> None:
+        """Test that every word maps to its id and others are missing."""
+        vocabulary = CompactVocabulary.from_dictionary(self.DICTIONARY)
+
+        assert len(vocabulary) == len(self.DICTIONARY)
+        for word, index in self.DICTIONARY.items():
+            assert word in vocabulary
+            assert vocabulary[word] == index
+            assert vocabulary.word(index) == word
+        for word in ["", "b", "courts", "zzz", "élans"]:
+            assert word not in vocabulary
+            assert vocabulary.get(word) is None
+        assert 0 not in vocabulary
+        with pytest.raises(KeyError):
+            vocabulary["missing"]
+        with pytest.raises(KeyError):
+            vocabulary.word(6)
+
+    def test_iteration_and_equality(self) -> None:
+        """Test that words iterate in byte order and compare equal to the dict."""
+        vocabulary = CompactVocabulary.from_dictionary(self.DICTIONARY)
+
+        assert list(vocabulary) == sorted(
+            self.DICTIONARY, key=lambda word: word.encode("utf-8")
+        )
+        assert vocabulary == self.DICTIONARY
+        assert dict(vocabulary.items()) == self.DICTIONARY
+
+    @pytest.mark.parametrize("mmap_mode", [True, False])
+    def test_save_and_load(self, temp_dir: str, mmap_mode: bool) -> None:
+        """Test that a saved vocabulary loads back with the same mapping."""
+        CompactVocabulary.from_dictionary(self.DICTIONARY).save(temp_dir)
+        vocabulary = CompactVocabulary.load(temp_dir, mmap_mode=mmap_mode)
+
+        assert vocabulary == self.DICTIONARY
+        assert vocabulary.word(3) == "§"
+        assert pickle.loads(pickle.dumps(vocabulary)) == self.DICTIONARY
+
+    def test_lone_surrogates(self, temp_dir: str) -> None:
+        """Test words with lone surrogates, which JSON escapes can produce."""
+        dictionary = {"\ud800": 0, "a\udfffb": 1, "court": 2, "\ue000": 3}
+        CompactVocabulary.from_dictionary(dictionary).save(temp_dir)
+        vocabulary = CompactVocabulary.load(temp_dir)
+
+        assert vocabulary == dictionary
+        assert list(vocabulary) == ["a\udfffb", "court", "\ud800", "\ue000"]
+        assert vocabulary["\ud800"] == 0
+        assert vocabulary.word(1) == "a\udfffb"
+        assert "\udc00" not in vocabulary
+
+    def test_empty(self, temp_dir: str) -> None:
+        """Test an empty vocabulary, in memory and on disk."""
+        CompactVocabulary.from_dictionary({}).save(temp_dir)
+        vocabulary = CompactVocabulary.load(temp_dir)
+
+        assert len(vocabulary) == 0
+        assert list(vocabulary) == []
+        assert "word" not in vocabulary
+        with pytest.raises(KeyError):
+            vocabulary.word(0)
+
+    def test_renumber_and_nbytes(self) -> None:
+        """Test renumbering and the memory used by the arrays."""
+        vocabulary = CompactVocabulary.from_dictionary({"b": 7, "a": 3})
+        renumbered = vocabulary.renumber(np.array([0, 1]))
+
+        assert renumbered == {"a": 0, "b": 1}
+        assert vocabulary.nbytes == 2 + 3 * 8 + 2 * 8
+        with pytest.raises(ValueError, match="one more entry"):
+            CompactVocabulary(b"ab", np.array([0, 1, 2]), np.array([0]))
+
+    def test_fixed_dictionary_for_training(self) -> None:
+        """Test that a compact vocabulary can fix the co-occurrence dictionary."""
+        corpus = [["the", "court", "held", "the", "zoning", "law"]] * 3
+        dictionary = build_vocabulary(corpus, min_count=3)
+        vocabulary = CompactVocabulary.from_dictionary(dictionary)
+
+        expected = build_cooccurrence_matrix(corpus, window=2, dictionary=dictionary)
+        matrix = build_cooccurrence_matrix(corpus, window=2, dictionary=vocabulary)
+
+        assert matrix.dictionary is vocabulary
+        np.testing.assert_array_equal(
+            matrix.to_coo().toarray(), expected.to_coo().toarray()
+        )